@@ -0,0 +1,48 @@
+"""Compare two benchmark result files.
+
+Usage:
+    python -m benchmarks.compare OLD.json NEW.json
+
+Prints every numeric metric present in both runs with its relative change.
+"""
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+
+def _flatten(value: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            # Label list entries by their parameter (fleet size, viewers) rather than position
+            label = next((f"{key}={item[key]}" for key in ("fleet_size", "viewers") if isinstance(item, dict) and key in item), str(index))
+            yield from _flatten(item, f"{prefix}[{label}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    before = dict(_flatten(old["results"]))
+    after = dict(_flatten(new["results"]))
+    print(f"old: {old.get('started_at')} {old.get('git_commit', '')[:10]}")
+    print(f"new: {new.get('started_at')} {new.get('git_commit', '')[:10]}")
+    for key in sorted(before.keys() & after.keys()):
+        change = f"{(after[key] - before[key]) / before[key] * 100:+7.1f}%" if before[key] else "      -"
+        print(f"{key:<60} {before[key]:>12.3f} {after[key]:>12.3f} {change}")
+
+
+def main() -> None:
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(2)
+    with open(sys.argv[1]) as f:
+        old = json.load(f)
+    with open(sys.argv[2]) as f:
+        new = json.load(f)
+    compare(old, new)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,626 @@
+"""In-process fake Docker daemon speaking the subset of the Engine HTTP API RunnerPilot uses.
+
+The real docker SDK talks to it over TCP (DOCKER_HOST=tcp://127.0.0.1:<port>),
+so benchmarks exercise the same client code, connection pool and
+instrumentation as production. Every non-streaming response is delayed by
+`latency` seconds to model daemon round trips.
+"""
+import io
+import json
+import re
+import struct
+import sys
+import tarfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+API_VERSION = "1.43"
+DEFAULT_IMAGE_ID = "sha256:" + "ab" * 32
+
+
+class LogLines(list):
+    """A container's log lines, remembering when each was written like the daemon's log driver does."""
+
+    def __init__(self, lines=()):
+        super().__init__()
+        self.times: List[float] = []
+        self.extend(lines)
+
+    def append(self, line: str) -> None:
+        self.times.append(time.time())
+        super().append(line)
+
+    def extend(self, lines) -> None:
+        for line in lines:
+            self.append(line)
+
+    def __iadd__(self, lines):
+        self.extend(lines)
+        return self
+
+
+def _log_timestamp(at: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(at)) + f".{int(at % 1 * 1e9):09d}Z "
+
+
+class FakeContainer:
+    def __init__(self, name: str, image: str, env: List[str], labels: Dict[str, str], host_config: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex + uuid.uuid4().hex
+        self.name = name
+        self.image = image
+        self.image_id = DEFAULT_IMAGE_ID
+        self.env = env
+        self.labels = labels
+        self.host_config = host_config or {}
+        self.status = "created"
+        self.created = time.strftime("%Y-%m-%dT%H:%M:%S.000000000Z", time.gmtime())
+        self.logs = LogLines(["Listening for Jobs"])
+        self.execs: List[List[str]] = []  # Commands run with exec, oldest first
+        self.size_rw = 0
+        self.created_at = int(time.time())
+
+    def inspect(self) -> Dict[str, Any]:
+        return {
+            "Id": self.id,
+            "Name": f"/{self.name}",
+            "Created": self.created,
+            "Image": self.image_id,
+            "State": {"Status": self.status, "Running": self.status == "running"},
+            "Config": {"Image": self.image, "Env": self.env, "Labels": self.labels, "Tty": False},
+            "HostConfig": {"LogConfig": {"Type": "json-file", "Config": {}}, **self.host_config},
+            "Mounts": [],
+            "NetworkSettings": {"Networks": {}},
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "Id": self.id,
+            "Names": [f"/{self.name}"],
+            "Image": self.image,
+            "ImageID": self.image_id,
+            "State": self.status,
+            "Status": self.status,
+            "Labels": self.labels,
+            "Created": self.created_at,
+        }
+
+
+class FakeDockerDaemon:
+    """Threaded HTTP server holding a fleet of fake containers.
+
+    Attributes that benchmarks tune or read:
+        latency: seconds added to every request
+        log_interval: seconds between generated lines on a followed log stream
+        requests: number of API requests served
+        open_log_streams / max_log_streams: followed log streams
+    """
+
+    def __init__(self, latency: float = 0.0, log_interval: float = 0.1):
+        self.latency = latency
+        self.log_interval = log_interval
+        self.containers: Dict[str, FakeContainer] = {}
+        self.by_name: Dict[str, FakeContainer] = {}
+        self.volumes: Dict[str, Dict[str, Any]] = {}
+        self.builds: List[str] = []  # Dockerfiles built, oldest first
+        self.registry_mirrors: List[str] = []  # Reported by /info, as in the daemon's daemon.json
+        # With strict_images, only pulled and built images exist; otherwise every image does
+        self.strict_images = False
+        self.images: Dict[str, Dict[str, Any]] = {}  # Image ID -> inspect data
+        self.build_cache_bytes = 0  # Reported by /system/df and freed by /build/prune
+        self.exec_outputs: Dict[str, str] = {}  # Output of exec'd commands by program name; empty otherwise
+        self._execs: Dict[str, tuple] = {}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.open_log_streams = 0
+        self.max_log_streams = 0
+        self.stopping = threading.Event()
+        self._server: Optional["_Server"] = None
+
+    # -------- Fleet ---------
+
+    def add_container(self, name: str, image: str = "0xaungkon/gh-runner:latest", status: str = "running") -> FakeContainer:
+        container = FakeContainer(name, image, [], {})
+        container.status = status
+        with self.lock:
+            self.containers[container.id] = container
+            self.by_name[name] = container
+        return container
+
+    def add_image(self, tags: List[str], labels: Optional[Dict[str, str]] = None, user: str = "", size: int = 0) -> Dict[str, Any]:
+        image_id = "sha256:" + uuid.uuid4().hex + uuid.uuid4().hex
+        image = {
+            "Id": image_id,
+            "RepoTags": list(tags),
+            "RepoDigests": [],
+            "Created": time.strftime("%Y-%m-%dT%H:%M:%S.000000000Z", time.gmtime()),
+            "Size": size,
+            "Config": {"User": user, "Labels": labels or {}},
+        }
+        with self.lock:
+            for other in self.images.values():
+                other["RepoTags"] = [tag for tag in other["RepoTags"] if tag not in tags]
+            self.images[image_id] = image
+        return image
+
+    def find_image(self, ref: str) -> Optional[Dict[str, Any]]:
+        # An ID prefix of 12 or more hex digits, as docker-py uses after a build, also names an image
+        short_id = ref if re.fullmatch(r"[0-9a-f]{12,64}", ref) else None
+        ref = ref if ":" in ref.rsplit("/", 1)[-1] or ref.startswith("sha256:") else f"{ref}:latest"
+        with self.lock:
+            for image in self.images.values():
+                if image["Id"] == ref or ref in image["RepoTags"]:
+                    return image
+            for image in self.images.values():
+                if short_id and image["Id"][7:].startswith(short_id):
+                    return image
+        return None
+
+    def find(self, ref: str) -> Optional[FakeContainer]:
+        with self.lock:
+            return self.by_name.get(ref) or self.containers.get(ref)
+
+    def remove(self, container: FakeContainer) -> None:
+        with self.lock:
+            self.containers.pop(container.id, None)
+            self.by_name.pop(container.name, None)
+
+    # -------- Server ---------
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"tcp://{host}:{port}"
+
+    def start(self) -> "FakeDockerDaemon":
+        daemon = self
+
+        class Handler(_Handler):
+            fake = daemon
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="fake-docker").start()
+        return self
+
+    def stop(self) -> None:
+        self.stopping.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+_VERSION_PREFIX = re.compile(r"^/v[0-9.]+")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping followed log streams is expected, not worth a traceback
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every call
+    disable_nagle_algorithm = True
+    fake: FakeDockerDaemon
+
+    def log_message(self, format, *args):
+        pass
+
+    # -------- Plumbing ---------
+
+    def _route(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        path = _VERSION_PREFIX.sub("", parsed.path)
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if raw and "json" not in (self.headers.get("Content-Type") or "json"):
+            body = raw  # Build contexts are tar archives
+        else:
+            body = json.loads(raw or b"null") if length else None
+
+        fake = self.fake
+        with fake.lock:
+            fake.requests += 1
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        for pattern, verb, handler in ROUTES:
+            match = pattern.match(path)
+            if match and verb == method:
+                handler(self, query, body, *match.groups())
+                return
+        self._json(404, {"message": f"page not found: {method} {path}"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_DELETE(self):
+        self._route("DELETE")
+
+    def _json(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Api-Version", API_VERSION)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _empty(self, status: int = 204) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _container(self, ref: str) -> Optional[FakeContainer]:
+        container = self.fake.find(ref)
+        if container is None:
+            self._json(404, {"message": f"No such container: {ref}"})
+        return container
+
+    # -------- System ---------
+
+    def ping(self, query, body):
+        data = b"OK"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def version(self, query, body):
+        self._json(200, {"ApiVersion": API_VERSION, "Version": "24.0.0-fake", "Os": "linux", "Arch": "amd64"})
+
+    def info(self, query, body):
+        with self.fake.lock:
+            containers = len(self.fake.containers)
+        self._json(200, {"Containers": containers, "RegistryConfig": {"Mirrors": list(self.fake.registry_mirrors)}})
+
+    # -------- Containers ---------
+
+    def list_containers(self, query, body):
+        show_all = query.get("all") in ("1", "true", "True")
+        with self.fake.lock:
+            containers = list(self.fake.containers.values())
+        filters = json.loads(query.get("filters") or "{}")
+        wanted = filters.get("id")
+        statuses = filters.get("status")
+        labels = filters.get("label") or []
+        summaries = []
+        for c in containers:
+            if (
+                (show_all or c.status == "running")
+                and (not wanted or c.id in wanted)
+                and (not statuses or c.status in statuses)
+                and all(label.split("=")[0] in c.labels for label in labels)
+            ):
+                summary = c.summary()
+                if query.get("size") in ("1", "true", "True"):
+                    summary["SizeRw"] = c.size_rw
+                summaries.append(summary)
+        self._json(200, summaries)
+
+    def create_container(self, query, body):
+        name = query.get("name") or uuid.uuid4().hex[:12]
+        if self.fake.find(name):
+            self._json(409, {"message": f'Conflict. The container name "/{name}" is already in use'})
+            return
+        image = self.fake.find_image(body.get("Image", ""))
+        if image is None and self.fake.strict_images:
+            self._json(404, {"message": f"No such image: {body.get('Image', '')}"})
+            return
+        container = FakeContainer(name, body.get("Image", ""), body.get("Env") or [], body.get("Labels") or {}, body.get("HostConfig"))
+        if image is not None:
+            container.image_id = image["Id"]
+        with self.fake.lock:
+            self.fake.containers[container.id] = container
+            self.fake.by_name[name] = container
+        self._json(201, {"Id": container.id, "Warnings": []})
+
+    def inspect_container(self, query, body, ref):
+        container = self._container(ref)
+        if container:
+            self._json(200, container.inspect())
+
+    def remove_container(self, query, body, ref):
+        container = self._container(ref)
+        if container:
+            self.fake.remove(container)
+            self._empty()
+
+    def container_stats(self, query, body, ref):
+        if not self._container(ref):
+            return
+        now = time.time()
+        self._json(200, {
+            "read": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)),
+            "cpu_stats": {"cpu_usage": {"total_usage": int(now * 1e7)}, "system_cpu_usage": int(now * 1e9), "online_cpus": 2},
+            "memory_stats": {"usage": 256 * 1024 * 1024, "limit": 2 * 1024 * 1024 * 1024, "stats": {"inactive_file": 0}},
+            "networks": {"eth0": {"rx_bytes": int(now), "tx_bytes": int(now)}},
+            "blkio_stats": {"io_service_bytes_recursive": []},
+        })
+
+    def container_logs(self, query, body, ref):
+        container = self._container(ref)
+        if not container:
+            return
+        follow = query.get("follow") == "1"
+        timestamps = query.get("timestamps") == "1"
+        since = float(query.get("since") or 0)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(line: str, at: Optional[float] = None) -> None:
+            if timestamps:
+                line = _log_timestamp(time.time() if at is None else at) + line
+            payload = (line + "\n").encode()
+            frame = struct.pack(">BxxxL", 1, len(payload)) + payload  # stdout frame
+            self.wfile.write(f"{len(frame):x}\r\n".encode() + frame + b"\r\n")
+            self.wfile.flush()
+
+        fake = self.fake
+        try:
+            sent = len(container.logs)
+            for line, at in zip(container.logs[:sent], container.logs.times[:sent]):
+                if at >= since:
+                    send(line, at)
+            if follow:
+                with fake.lock:
+                    fake.open_log_streams += 1
+                    fake.max_log_streams = max(fake.max_log_streams, fake.open_log_streams)
+                try:
+                    sequence = 0
+                    while container.status == "running" and not fake.stopping.is_set():
+                        time.sleep(fake.log_interval)
+                        # Lines appended by a test while following are streamed too
+                        for line, at in zip(container.logs[sent:], container.logs.times[sent:]):
+                            send(line, at)
+                            sent += 1
+                        sequence += 1
+                        # Emit time lets readers measure end-to-end delivery latency
+                        send(f"bench-line {sequence} {time.time():.6f}")
+                finally:
+                    with fake.lock:
+                        fake.open_log_streams -= 1
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def create_exec(self, query, body, ref):
+        container = self._container(ref)
+        if container:
+            exec_id = uuid.uuid4().hex
+            container.execs.append(body.get("Cmd") or [])
+            with self.fake.lock:
+                self.fake._execs[exec_id] = (container, body.get("Cmd") or [])
+            self._json(201, {"Id": exec_id})
+
+    def start_exec(self, query, body, exec_id):
+        container, command = self.fake._execs[exec_id]
+        output = self.fake.exec_outputs.get(command[0] if command else "", "").encode()
+        # Like the daemon: the raw multiplexed stream, ended by closing the connection
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.docker.multiplexed-stream")
+        self.end_headers()
+        self.wfile.flush()
+        # The SDK reads the output from the raw socket once the headers are parsed; output sent
+        # along with them would end up in the HTTP client's buffer, where it is never read
+        time.sleep(0.05)
+        if output:
+            self.wfile.write(struct.pack(">BxxxL", 1, len(output)) + output)
+        self.wfile.flush()
+        self.close_connection = True
+
+    def inspect_exec(self, query, body, exec_id):
+        container, command = self.fake._execs[exec_id]
+        self._json(200, {"ID": exec_id, "Running": False, "ExitCode": 0, "ProcessConfig": {"entrypoint": command[0] if command else ""}})
+
+    # -------- Images ---------
+
+    def pull_image(self, query, body):
+        image = query.get("fromImage", "")
+        tag = f"{image}:{query.get('tag') or 'latest'}"
+        if self.fake.find_image(tag) is None:
+            self.fake.add_image([tag], user="runner")
+        data = (json.dumps({"status": f"Pulling from {image}"}) + "\n" + json.dumps({"status": "Downloaded newer image"}) + "\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def inspect_image(self, query, body, name):
+        image = self.fake.find_image(name)
+        if image is not None:
+            self._json(200, image)
+        elif self.fake.strict_images:
+            self._json(404, {"message": f"No such image: {name}"})
+        else:
+            self._json(200, {"Id": DEFAULT_IMAGE_ID, "RepoTags": [name], "RepoDigests": [f"{name.split(':')[0]}@sha256:{'cd' * 32}"], "Size": 0, "Config": {"Labels": {}}})
+
+    def list_images(self, query, body):
+        wanted = json.loads(query.get("filters") or "{}").get("label") or []
+        with self.fake.lock:
+            images = list(self.fake.images.values())
+        summaries = [
+            {"Id": i["Id"], "RepoTags": i["RepoTags"], "Created": 0, "Size": i["Size"], "Labels": i["Config"]["Labels"]}
+            for i in images
+            if all(label.split("=")[0] in i["Config"]["Labels"] for label in wanted)
+        ]
+        self._json(200, summaries)
+
+    def remove_image(self, query, body, name):
+        image = self.fake.find_image(name)
+        if image is None:
+            self._json(404, {"message": f"No such image: {name}"})
+            return
+        with self.fake.lock:
+            in_use = any(c.image_id == image["Id"] for c in self.fake.containers.values())
+            if not in_use:
+                self.fake.images.pop(image["Id"], None)
+        if in_use:
+            self._json(409, {"message": f"conflict: unable to remove {name}: image is being used by a container"})
+        else:
+            self._json(200, [{"Deleted": image["Id"]}])
+
+    def build_image(self, query, body):
+        # The body is the build context; a Dockerfile step running `exit 1` fails the build
+        with tarfile.open(fileobj=io.BytesIO(body or b"")) as context:
+            dockerfile = context.extractfile(query.get("dockerfile") or "Dockerfile").read().decode()
+        self.fake.builds.append(dockerfile)
+        lines = [{"stream": f"Step {n}/{len(dockerfile.splitlines())} : {line}\n"} for n, line in enumerate(dockerfile.splitlines(), 1)]
+        if "exit 1" in dockerfile:
+            lines.append({"errorDetail": {"code": 1, "message": "The command returned a non-zero code: 1"}, "error": "The command returned a non-zero code: 1"})
+        else:
+            user = [line.split(None, 1)[1] for line in dockerfile.splitlines() if line.startswith("USER ")][-1:] or [""]
+            image = self.fake.add_image([query["t"]] if query.get("t") else [], json.loads(query.get("labels") or "{}"), user[0])
+            lines.append({"aux": {"ID": image["Id"]}})
+            lines.append({"stream": f"Successfully built {image['Id'][7:19]}\n"})
+        data = "".join(json.dumps(line) + "\r\n" for line in lines).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def prune_images(self, query, body):
+        # Dangling images are the ones without tags; `until` is ignored
+        with self.fake.lock:
+            in_use = {c.image_id for c in self.fake.containers.values()}
+            dangling = [i for i in self.fake.images.values() if not i["RepoTags"] and i["Id"] not in in_use]
+            for image in dangling:
+                self.fake.images.pop(image["Id"], None)
+        self._json(200, {"ImagesDeleted": [{"Deleted": i["Id"]} for i in dangling], "SpaceReclaimed": sum(i["Size"] for i in dangling)})
+
+    def prune_build_cache(self, query, body):
+        keep = int(query.get("keep-storage") or 0)
+        with self.fake.lock:
+            freed = max(self.fake.build_cache_bytes - keep, 0)
+            self.fake.build_cache_bytes -= freed
+        self._json(200, {"CachesDeleted": ["fake"] if freed else [], "SpaceReclaimed": freed})
+
+    def system_df(self, query, body):
+        with self.fake.lock:
+            containers = list(self.fake.containers.values())
+            images = list(self.fake.images.values())
+            volumes = list(self.fake.volumes.values())
+            cache = self.fake.build_cache_bytes
+        self._json(200, {
+            "LayersSize": sum(i["Size"] for i in images),
+            "Images": [
+                {
+                    "Id": i["Id"], "RepoTags": i["RepoTags"], "Size": i["Size"], "SharedSize": 0,
+                    "Containers": sum(c.image_id == i["Id"] for c in containers),
+                }
+                for i in images
+            ],
+            "Containers": [{**c.summary(), "SizeRw": c.size_rw} for c in containers],
+            "Volumes": [{**v, "UsageData": {"Size": v.get("Size", 0), "RefCount": 0}} for v in volumes],
+            "BuildCache": [{"ID": "fake", "Size": cache, "InUse": False, "Shared": False}] if cache else [],
+        })
+
+    # -------- Volumes ---------
+
+    def create_volume(self, query, body):
+        name = body.get("Name") or uuid.uuid4().hex
+        with self.fake.lock:
+            volume = self.fake.volumes.setdefault(name, {
+                "Name": name,
+                "Anonymous": not body.get("Name"),
+                "Driver": body.get("Driver") or "local",
+                "Mountpoint": f"/var/lib/docker/volumes/{name}/_data",
+                "Labels": body.get("Labels") or {},
+                "Options": body.get("DriverOpts") or {},
+                "Scope": "local",
+                "CreatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            })
+        self._json(201, volume)
+
+    def list_volumes(self, query, body):
+        with self.fake.lock:
+            volumes = list(self.fake.volumes.values())
+        self._json(200, {"Volumes": volumes, "Warnings": []})
+
+    def inspect_volume(self, query, body, name):
+        volume = self.fake.volumes.get(name)
+        if volume is None:
+            self._json(404, {"message": f"get {name}: no such volume"})
+        else:
+            self._json(200, volume)
+
+    def prune_volumes(self, query, body):
+        # Anonymous volumes are the ones created without a name; RunnerPilot's are all named
+        excluded = json.loads(query.get("filters") or "{}").get("label!") or []
+        with self.fake.lock:
+            pruned = [
+                v for v in self.fake.volumes.values()
+                if v.get("Anonymous") and not any(label.split("=")[0] in v["Labels"] for label in excluded)
+            ]
+            for volume in pruned:
+                self.fake.volumes.pop(volume["Name"], None)
+        self._json(200, {"VolumesDeleted": [v["Name"] for v in pruned], "SpaceReclaimed": sum(v.get("Size", 0) for v in pruned)})
+
+    def remove_volume(self, query, body, name):
+        with self.fake.lock:
+            volume = self.fake.volumes.pop(name, None)
+        if volume is None:
+            self._json(404, {"message": f"get {name}: no such volume"})
+        else:
+            self._empty()
+
+
+def _status_handler(status: str):
+    def handler(self: _Handler, query, body, ref):
+        container = self._container(ref)
+        if container:
+            container.status = status
+            self._empty()
+    return handler
+
+
+ROUTES = [
+    (re.compile(r"^/_ping$"), "GET", _Handler.ping),
+    (re.compile(r"^/version$"), "GET", _Handler.version),
+    (re.compile(r"^/info$"), "GET", _Handler.info),
+    (re.compile(r"^/containers/json$"), "GET", _Handler.list_containers),
+    (re.compile(r"^/containers/create$"), "POST", _Handler.create_container),
+    (re.compile(r"^/containers/([^/]+)/json$"), "GET", _Handler.inspect_container),
+    (re.compile(r"^/containers/([^/]+)/start$"), "POST", _status_handler("running")),
+    (re.compile(r"^/containers/([^/]+)/restart$"), "POST", _status_handler("running")),
+    (re.compile(r"^/containers/([^/]+)/stop$"), "POST", _status_handler("exited")),
+    (re.compile(r"^/containers/([^/]+)/kill$"), "POST", _status_handler("exited")),
+    (re.compile(r"^/containers/([^/]+)/logs$"), "GET", _Handler.container_logs),
+    (re.compile(r"^/containers/([^/]+)/stats$"), "GET", _Handler.container_stats),
+    (re.compile(r"^/containers/([^/]+)$"), "DELETE", _Handler.remove_container),
+    (re.compile(r"^/containers/([^/]+)/exec$"), "POST", _Handler.create_exec),
+    (re.compile(r"^/exec/([^/]+)/start$"), "POST", _Handler.start_exec),
+    (re.compile(r"^/exec/([^/]+)/json$"), "GET", _Handler.inspect_exec),
+    (re.compile(r"^/images/create$"), "POST", _Handler.pull_image),
+    (re.compile(r"^/images/json$"), "GET", _Handler.list_images),
+    (re.compile(r"^/images/prune$"), "POST", _Handler.prune_images),
+    (re.compile(r"^/images/(.+)/json$"), "GET", _Handler.inspect_image),
+    (re.compile(r"^/images/(.+)$"), "DELETE", _Handler.remove_image),
+    (re.compile(r"^/build$"), "POST", _Handler.build_image),
+    (re.compile(r"^/build/prune$"), "POST", _Handler.prune_build_cache),
+    (re.compile(r"^/system/df$"), "GET", _Handler.system_df),
+    (re.compile(r"^/volumes/create$"), "POST", _Handler.create_volume),
+    (re.compile(r"^/volumes$"), "GET", _Handler.list_volumes),
+    (re.compile(r"^/volumes/prune$"), "POST", _Handler.prune_volumes),
+    (re.compile(r"^/volumes/([^/]+)$"), "GET", _Handler.inspect_volume),
+    (re.compile(r"^/volumes/([^/]+)$"), "DELETE", _Handler.remove_volume),
+]
@@ -0,0 +1,190 @@
+"""In-process stand-in for a pull-through registry mirror, for testing the mirror offline.
+
+It answers the Registry HTTP API calls a pull makes (/v2/, manifests and
+blobs) for any image name and tag, generating deterministic content in place
+of an upstream registry. Blobs are cached in the same on-disk layout the
+`registry` image uses under `store_dir`, so a blob removed by RunnerPilot's
+eviction is a miss on its next pull, like with the real mirror. The proxy
+hit and miss counters are published at /debug/vars in the registry's expvar
+format.
+
+Point the backend at it with REGISTRY_MIRROR_DEBUG_URL=<url> and
+VOLUME_PATH=<directory containing store_dir>, or run it standalone:
+
+    python -m benchmarks.fake_registry --port 5001 --store /tmp/runnerpilot/registry-mirror
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+MANIFEST_TYPE = "application/vnd.oci.image.manifest.v1+json"
+CONFIG_TYPE = "application/vnd.oci.image.config.v1+json"
+LAYER_TYPE = "application/vnd.oci.image.layer.v1.tar+gzip"
+
+
+def _digest(data: bytes) -> str:
+    return "sha256:" + hashlib.sha256(data).hexdigest()
+
+
+class FakeRegistry:
+    """Threaded HTTP server; `layers` and `layer_size` shape every generated image."""
+
+    def __init__(self, store_dir: str, layers: int = 3, layer_size: int = 64 * 1024):
+        self.store_dir = store_dir
+        self.layers = layers
+        self.layer_size = layer_size
+        self.upstream: Dict[str, bytes] = {}  # Digest -> content the "upstream" registry serves
+        self.manifests: Dict[Tuple[str, str], str] = {}  # (name, reference) -> manifest digest
+        self.counters = {kind: {"Requests": 0, "Hits": 0, "Misses": 0, "BytesPulled": 0, "BytesPushed": 0} for kind in ("blobs", "manifests")}
+        self.lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # -------- Content ---------
+
+    def _upstream_manifest(self, name: str, reference: str) -> str:
+        """Generate an image for name:reference as the upstream would serve it; returns its digest."""
+        layers = []
+        for index in range(self.layers):
+            seed = hashlib.sha256(f"{name}:{reference}:{index}".encode()).digest()
+            data = (seed * (self.layer_size // len(seed) + 1))[:self.layer_size]
+            self.upstream[_digest(data)] = data
+            layers.append({"mediaType": LAYER_TYPE, "digest": _digest(data), "size": len(data)})
+        config = json.dumps({"architecture": "amd64", "os": "linux", "rootfs": {"type": "layers", "diff_ids": []}}).encode()
+        self.upstream[_digest(config)] = config
+        manifest = json.dumps({
+            "schemaVersion": 2,
+            "mediaType": MANIFEST_TYPE,
+            "config": {"mediaType": CONFIG_TYPE, "digest": _digest(config), "size": len(config)},
+            "layers": layers,
+        }).encode()
+        self.upstream[_digest(manifest)] = manifest
+        return _digest(manifest)
+
+    def blob_path(self, digest: str) -> str:
+        algorithm, hex_digest = digest.split(":", 1)
+        return os.path.join(self.store_dir, "docker", "registry", "v2", "blobs", algorithm, hex_digest[:2], hex_digest, "data")
+
+    def fetch(self, kind: str, digest: str) -> Optional[bytes]:
+        """Serve a blob from the local store, pulling it from the generated upstream on a miss."""
+        path = self.blob_path(digest)
+        with self.lock:
+            counters = self.counters[kind]
+            counters["Requests"] += 1
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    data = f.read()
+                counters["Hits"] += 1
+            else:
+                data = self.upstream.get(digest)
+                if data is None:
+                    return None
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(data)
+                counters["Misses"] += 1
+                counters["BytesPulled"] += len(data)
+            counters["BytesPushed"] += len(data)
+            return data
+
+    # -------- Server ---------
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self, port: int = 0) -> "FakeRegistry":
+        registry = self
+
+        class Handler(_Handler):
+            fake = registry
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True, name="fake-registry").start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+_MANIFEST = re.compile(r"^/v2/(.+)/manifests/([^/]+)$")
+_BLOB = re.compile(r"^/v2/(.+)/blobs/(sha256:[0-9a-f]{64})$")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeRegistry
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, data: bytes = b"", content_type: str = "application/json", headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Docker-Distribution-Api-Version", "registry/2.0")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        fake = self.fake
+        if self.path == "/debug/vars":
+            with fake.lock:
+                payload = {"registry": {"proxy": json.loads(json.dumps(fake.counters))}}
+            self._send(200, json.dumps(payload).encode())
+            return
+        if self.path == "/v2/":
+            self._send(200, b"{}")
+            return
+        match = _MANIFEST.match(self.path)
+        if match:
+            name, reference = match.groups()
+            with fake.lock:
+                digest = reference if reference.startswith("sha256:") else fake.manifests.get((name, reference))
+                if digest is None:
+                    digest = fake.manifests[(name, reference)] = fake._upstream_manifest(name, reference)
+            data = fake.fetch("manifests", digest)
+            if data is None:
+                self._send(404, json.dumps({"errors": [{"code": "MANIFEST_UNKNOWN"}]}).encode())
+            else:
+                self._send(200, data, MANIFEST_TYPE, {"Docker-Content-Digest": digest})
+            return
+        match = _BLOB.match(self.path)
+        if match:
+            data = fake.fetch("blobs", match.group(2))
+            if data is None:
+                self._send(404, json.dumps({"errors": [{"code": "BLOB_UNKNOWN"}]}).encode())
+            else:
+                self._send(200, data, "application/octet-stream", {"Docker-Content-Digest": match.group(2)})
+            return
+        self._send(404, json.dumps({"errors": [{"code": "NOT_FOUND"}]}).encode())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--store", required=True, help="Blob store directory, e.g. VOLUME_PATH/registry-mirror")
+    parser.add_argument("--layers", type=int, default=3)
+    parser.add_argument("--layer-size", type=int, default=64 * 1024)
+    args = parser.parse_args()
+    registry = FakeRegistry(args.store, args.layers, args.layer_size).start(args.port)
+    print(f"Fake registry mirror on {registry.url}, storing blobs in {args.store}")
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Boots the FastAPI app under uvicorn against a fake Docker daemon in one process.
+
+Settings are read at import time, so `start()` must run before anything
+imports `inc` or `main`.
+"""
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from benchmarks.fake_docker import FakeDockerDaemon
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Harness:
+    def __init__(self, latency: float, log_interval: float, background: bool):
+        self.workdir = tempfile.mkdtemp(prefix="runnerpilot-bench-")
+        self.fake = FakeDockerDaemon(latency=latency, log_interval=log_interval).start()
+        self.background = background
+        self.base_url = ""
+        self.token = ""
+        self._server = None
+
+    def start(self) -> "Harness":
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{os.path.join(self.workdir, 'bench.db')}",
+            "VOLUME_PATH": self.workdir,
+            "DOCKER_HOST": self.fake.url,
+            "ENVIRONMENT": "production",
+        })
+        if not self.background:
+            # Keep the job-state tracker and stats sampler from competing with the measured requests
+            os.environ["JOB_STATE_POLL_SECONDS"] = "3600"
+            os.environ["STATS_INTERVAL_SECONDS"] = "3600"
+
+        os.chdir(BACKEND_DIR)
+        if BACKEND_DIR not in sys.path:
+            sys.path.insert(0, BACKEND_DIR)
+
+        import uvicorn
+        from fastapi import Depends
+        from inc.auth import AuthorizedUser, authorized_user, create_access_token
+        from inc.config import settings
+        import main
+
+        # Identical endpoints with and without the auth dependency, to isolate its cost
+        @main.app.get("/_bench/open", include_in_schema=False)
+        def bench_open():
+            return {"ok": True}
+
+        @main.app.get("/_bench/authed", include_in_schema=False)
+        def bench_authed(user: AuthorizedUser = Depends(authorized_user)):
+            return {"ok": True}
+
+        port = _free_port()
+        config = uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+        self._server = uvicorn.Server(config)
+        threading.Thread(target=self._server.run, daemon=True, name="bench-uvicorn").start()
+        deadline = time.monotonic() + 30
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.token = create_access_token({"sub": settings.ADMIN_EMAIL})
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.should_exit = True
+        self.fake.stop()
+
+    # -------- Fleet ---------
+
+    def seed_fleet(self, size: int, running_ratio: float = 0.9) -> None:
+        """Replace all runners with `size` synthetic ones, each backed by a fake container."""
+        from inc.db import db
+        from models import RunnerInstance
+
+        RunnerInstance.delete().execute()
+        with self.fake.lock:
+            self.fake.containers.clear()
+            self.fake.by_name.clear()
+
+        rows = []
+        running = int(size * running_ratio)
+        for index in range(size):
+            name = f"bench-{index:05d}"
+            container = self.fake.add_container(name, status="running" if index < running else "exited")
+            rows.append({
+                "runner_name": name,
+                "github_url": "https://github.com/bench/repo",
+                "token": "bench-token",
+                "labels": "bench,linux",
+                "hostname": container.id,
+            })
+        with db.atomic():
+            for start in range(0, len(rows), 500):
+                RunnerInstance.insert_many(rows[start:start + 500]).execute()
+
+    def first_runner_id(self) -> Optional[int]:
+        from models import RunnerInstance
+
+        row = RunnerInstance.select(RunnerInstance.id).order_by(RunnerInstance.id).first()
+        return row.id if row else None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,255 @@
+"""RunnerPilot benchmark suite.
+
+Drives the real app over HTTP (uvicorn on localhost) against an in-process
+fake Docker daemon, so it runs offline on a plain Linux box without Docker.
+
+Usage (from backend/):
+    make bench
+    python -m benchmarks.run --fleet-sizes 10,100,1000,10000 --latency-ms 1 --only list
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Benchmarks:
+    list   GET /runner latency for each fleet size
+    clone  POST /runner/{id}/clone throughput
+    logs   /runner/{id}/logs fan-out: lines and delivery latency per viewer
+    auth   cost of the bearer-token dependency on a trivial endpoint
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.harness import BACKEND_DIR, Harness
+
+BENCHMARKS = ("list", "clone", "logs", "auth")
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(percentile: float) -> float:
+        return ordered[min(int(round(percentile / 100.0 * (len(ordered) - 1))), len(ordered) - 1)]
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def _timed(client: httpx.Client, method: str, url: str, **kwargs) -> float:
+    started = time.perf_counter()
+    response = client.request(method, url, **kwargs)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return elapsed
+
+
+# -------- Benchmarks ---------
+
+def bench_list(harness: Harness, client: httpx.Client, args) -> List[Dict[str, Any]]:
+    results = []
+    for size in args.fleet_sizes:
+        harness.seed_fleet(size)
+        # Fewer repetitions for large fleets keep a full run in minutes
+        repeat = max(1, min(args.repeat, args.repeat * 100 // max(size, 1)))
+        client.get("/runner").raise_for_status()  # Warm up connections and caches
+
+        requests_before = harness.fake.requests
+        samples = []
+        payload_bytes = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get("/runner")
+            samples.append(time.perf_counter() - started)
+            response.raise_for_status()
+            payload_bytes = len(response.content)
+        results.append({
+            "fleet_size": size,
+            **_summary(samples),
+            "payload_bytes": payload_bytes,
+            "docker_requests_per_list": round((harness.fake.requests - requests_before) / repeat, 1),
+        })
+        print(f"  list  fleet={size:<6} p50={results[-1]['p50_ms']:.1f}ms p95={results[-1]['p95_ms']:.1f}ms")
+    return results
+
+
+def bench_clone(harness: Harness, client: httpx.Client, args) -> Dict[str, Any]:
+    harness.seed_fleet(1)
+    runner_id = harness.first_runner_id()
+    requests_before = harness.fake.requests
+    elapsed = _timed(client, "POST", f"/runner/{runner_id}/clone", json={"count": args.clone_count})
+    result = {
+        "count": args.clone_count,
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "runners_per_second": round(args.clone_count / elapsed, 2),
+        "docker_requests_per_clone": round((harness.fake.requests - requests_before) / args.clone_count, 1),
+    }
+    print(f"  clone count={args.clone_count} {result['runners_per_second']:.1f} runners/s")
+    return result
+
+
+def _view_logs(base_url: str, headers: Dict[str, str], path: str, duration: float, out: Dict[str, Any]) -> None:
+    lines = 0
+    latencies = []
+    deadline = time.monotonic() + duration
+    try:
+        with httpx.Client(base_url=base_url, headers=headers, timeout=duration + 30) as viewer:
+            with viewer.stream("GET", path) as response:
+                for raw in response.iter_lines():
+                    if raw:
+                        log = json.loads(raw).get("log", "")
+                        if log.startswith("bench-line "):
+                            lines += 1
+                            latencies.append(time.time() - float(log.split()[2]))
+                    if time.monotonic() >= deadline:
+                        break
+    except Exception as e:
+        out["error"] = str(e)
+    out["lines"] = lines
+    out["latencies"] = latencies
+
+
+def bench_logs(harness: Harness, client: httpx.Client, args) -> List[Dict[str, Any]]:
+    harness.seed_fleet(1)
+    runner_id = harness.first_runner_id()
+    container = next(iter(harness.fake.containers.values()))
+    headers = {"Authorization": f"Bearer {harness.token}"}
+    expected = args.log_seconds / harness.fake.log_interval
+
+    results = []
+    for viewers in args.viewers:
+        container.status = "running"
+        harness.fake.max_log_streams = 0
+        outputs = [{} for _ in range(viewers)]
+        threads = [
+            threading.Thread(target=_view_logs, args=(harness.base_url, headers, f"/runner/{runner_id}/logs", args.log_seconds, out))
+            for out in outputs
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        latencies = [latency for out in outputs for latency in out["latencies"]]
+        lines = [out["lines"] for out in outputs]
+        result = {
+            "viewers": viewers,
+            "lines_per_viewer_mean": round(statistics.fmean(lines), 1),
+            "lines_per_viewer_min": min(lines),
+            "delivery_ratio": round(statistics.fmean(lines) / expected, 3) if expected else None,
+            "delivery_latency": _summary(latencies) if latencies else None,
+            "docker_log_streams": harness.fake.max_log_streams,
+            "errors": sum(1 for out in outputs if "error" in out),
+        }
+        results.append(result)
+        print(f"  logs  viewers={viewers:<4} delivered={result['delivery_ratio']} streams={result['docker_log_streams']}")
+
+        # End the followed streams server-side before the next round
+        container.status = "exited"
+        deadline = time.monotonic() + 10
+        while harness.fake.open_log_streams and time.monotonic() < deadline:
+            time.sleep(0.05)
+    return results
+
+
+def bench_auth(harness: Harness, client: httpx.Client, args) -> Dict[str, Any]:
+    open_samples = [_timed(client, "GET", "/_bench/open") for _ in range(args.auth_requests)]
+    authed_samples = [_timed(client, "GET", "/_bench/authed") for _ in range(args.auth_requests)]
+
+    # The dependency alone, without HTTP and routing noise
+    from fastapi.security import HTTPAuthorizationCredentials
+    from inc.auth import authorized_user
+
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=harness.token)
+    calls = 5000
+    started = time.perf_counter()
+    for _ in range(calls):
+        authorized_user(credentials)
+    dependency_us = (time.perf_counter() - started) / calls * 1e6
+
+    open_summary = _summary(open_samples)
+    authed_summary = _summary(authed_samples)
+    result = {
+        "open": open_summary,
+        "authed": authed_summary,
+        "overhead_mean_ms": round(authed_summary["mean_ms"] - open_summary["mean_ms"], 3),
+        "dependency_us_per_call": round(dependency_us, 2),
+    }
+    print(f"  auth  overhead={result['overhead_mean_ms']:.3f}ms dependency={result['dependency_us_per_call']:.1f}us")
+    return result
+
+
+# -------- Entry point ---------
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"Comma-separated subset of {', '.join(BENCHMARKS)}")
+    parser.add_argument("--fleet-sizes", type=_int_list, default=[10, 100, 1000, 10000])
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Added to every fake Docker API call")
+    parser.add_argument("--repeat", type=int, default=20, help="List requests per fleet size (scaled down for large fleets)")
+    parser.add_argument("--clone-count", type=int, default=50)
+    parser.add_argument("--viewers", type=_int_list, default=[1, 10, 50])
+    parser.add_argument("--log-seconds", type=float, default=5.0)
+    parser.add_argument("--log-interval-ms", type=float, default=50.0, help="Gap between lines on a followed log stream")
+    parser.add_argument("--auth-requests", type=int, default=500)
+    parser.add_argument("--background", action="store_true", help="Keep the job-state tracker and stats sampler running")
+    parser.add_argument("--output", default=os.path.join(BACKEND_DIR, "benchmarks", "results"))
+    args = parser.parse_args()
+
+    selected = [name for name in args.only.split(",") if name]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    harness = Harness(args.latency_ms / 1000.0, args.log_interval_ms / 1000.0, args.background).start()
+    results: Dict[str, Any] = {}
+    try:
+        with httpx.Client(base_url=harness.base_url, headers={"Authorization": f"Bearer {harness.token}"}, timeout=600) as client:
+            for name in selected:
+                print(f"{name}:")
+                results[name] = globals()[f"bench_{name}"](harness, client, args)
+    finally:
+        harness.stop()
+
+    now = datetime.now(timezone.utc)
+    report = {
+        "started_at": now.isoformat(),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{now.strftime('%Y%m%dT%H%M%SZ')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
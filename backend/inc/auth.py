@@ -3,7 +3,7 @@ from typing import Any, Dict, Optional
 import jwt
 from inc.config import settings
 from pydantic import BaseModel, EmailStr
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -32,7 +32,22 @@ _bearer_scheme = HTTPBearer(auto_error=True)
 
 
 def authorized_user(credentials: HTTPAuthorizationCredentials = Depends(_bearer_scheme)) -> AuthorizedUser:
-    token = credentials.credentials
+    return _user_from_token(credentials.credentials)
+
+
+def authorized_stream_user(request: Request) -> AuthorizedUser:
+    """Like `authorized_user`, but also accepts `?token=` for clients that cannot
+    set headers, such as the browser EventSource."""
+    header = request.headers.get("authorization", "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = request.query_params.get("token", "")
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return _user_from_token(token)
+
+
+def _user_from_token(token: str) -> AuthorizedUser:
     try:
         payload = decode_access_token(token)
         # Normalize exp to datetime if necessary
@@ -10,6 +10,86 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "production"
     VOLUME_PATH: str = "/volume"
     RELEASE_CACHE_TTL_HOURS: int = 72
+    RELEASE_API_URL: str = "https://api.github.com/repos/actions/runner/releases"  # A file:// URL works for testing
+    RUNNER_RELEASE_CACHE: bool = False  # Mount a shared runner install instead of the one baked into the image
+    RUNNER_VERSION: str = ""  # Runner release to install; latest stable when empty
+    RUNNER_ARCH: str = ""  # x64, arm64 or arm; detected from the host when empty
+    RUNNER_INSTALL_MOUNT: str = "/opt/actions-runner"  # Where runner containers see the shared install
+    HOST_VOLUME_PATH: str = ""  # Host path of VOLUME_PATH for bind mounts; detected when empty
+    RUNNER_UID: int = 1000  # User the runner image runs jobs as; owns the writable cache layers
+    CACHE_DEFAULT_QUOTA_MB: int = 10240  # Per shared cache of a template, unless the template sets one
+    DERIVED_IMAGE_REPOSITORY: str = "runnerpilot/runner"  # Template images are tagged <repository>:<content hash>
+    DERIVED_IMAGE_GRACE_HOURS: int = 24  # Unused derived images younger than this are kept
+    RUNNER_WORK_MOUNT: str = "/app/_work"  # The runner's work folder, where template work storage is mounted
+    RUNNER_WORK_CLEANUP_HOOK: str = "/app/clean-work.sh"  # Job-completed hook in the runner image that empties the work folder
+    RUNNER_LOG_DRIVER: str = "local"  # "local" or "json-file"; templates can override every RUNNER_LOG_* setting
+    RUNNER_LOG_MAX_SIZE: str = "20m"  # Log file size at which the daemon rotates
+    RUNNER_LOG_MAX_FILE: int = 5  # Rotated files kept, so a runner holds at most max size * max file of logs
+    RUNNER_LOG_COMPRESS: bool = True  # Compress rotated files
+    REGISTRY_MIRROR: bool = False  # Run a pull-through registry mirror for runner jobs
+    REGISTRY_MIRROR_IMAGE: str = "registry:3"
+    REGISTRY_MIRROR_UPSTREAM: str = "https://registry-1.docker.io"  # Any registry; a local one works for offline testing
+    REGISTRY_MIRROR_USERNAME: str = ""  # Upstream credentials, e.g. for higher Docker Hub rate limits
+    REGISTRY_MIRROR_PASSWORD: str = ""
+    REGISTRY_MIRROR_PORT: int = 5000  # Published on 127.0.0.1, where the host daemon reaches it
+    REGISTRY_MIRROR_DEBUG_PORT: int = 5001  # Published on 127.0.0.1; serves the hit counters
+    REGISTRY_MIRROR_DEBUG_URL: str = ""  # Where the backend reads the counters; set when it runs in a container
+    REGISTRY_MIRROR_TTL_HOURS: int = 168  # Cached content is dropped this long after it was fetched
+    REGISTRY_MIRROR_QUOTA_MB: int = 20480  # Least recently used blobs are evicted above this
+    REGISTRY_MIRROR_CHECK_SECONDS: int = 300
+    DISK_GC: bool = False  # Reclaim disk space from what runner jobs leave in the host daemon
+    DISK_GC_HIGH_WATERMARK: int = 85  # Percent of the disk in use that starts a collection
+    DISK_GC_LOW_WATERMARK: int = 70  # Percent a collection brings usage down to
+    DISK_GC_INTERVAL_SECONDS: int = 300
+    DISK_GC_MIN_AGE_HOURS: int = 1  # Containers, images and build cache younger than this are kept
+    DISK_GC_PATH: str = ""  # Path on the disk to watch; defaults to Docker's root directory
+    RUNNER_IMAGE: str = "0xaungkon/gh-runner:latest"
+    DOCKER_MAX_POOL_SIZE: int = 32
+    DOCKER_TIMEOUT_SECONDS: int = 10  # Per request for quick calls such as inspect and list
+    DOCKER_SLOW_TIMEOUT_SECONDS: int = 60  # Create, remove, image removal and df
+    DOCKER_MIN_CONCURRENCY: int = 2
+    DOCKER_MAX_CONCURRENCY: int = 32  # Adaptive limit on calls in flight stays within these bounds
+    DOCKER_LATENCY_TOLERANCE: float = 2.0  # Back off when reads get this much slower than baseline
+    DOCKER_READ_RETRIES: int = 2
+    DOCKER_BREAKER_FAILURES: int = 5  # Consecutive daemon failures that open the circuit
+    DOCKER_BREAKER_COOLDOWN_SECONDS: int = 10
+    RUNNER_STOP_TIMEOUT_SECONDS: int = 10
+    BULK_MAX_CONCURRENCY: int = 16
+    DRAIN_TIMEOUT_SECONDS: int = 3600
+    CAPACITY_CHECK_SECONDS: int = 60  # How often capacity schedules are reconciled
+    JOB_STATE_POLL_SECONDS: int = 5
+    JOB_HISTORY_RETENTION_DAYS: int = 30
+    ROLLUP_MINUTE_RETENTION_HOURS: int = 48
+    ROLLUP_HOUR_RETENTION_DAYS: int = 90
+    STATS_INTERVAL_SECONDS: int = 10
+    STATS_SAMPLER_CONCURRENCY: int = 4
+    STATS_RAW_POINTS: int = 360  # 1 hour at the default interval
+    STATS_MINUTE_POINTS: int = 1440  # 1 day
+    STATS_HOUR_POINTS: int = 720  # 30 days
+    METRICS_TOKEN: str = ""  # Bearer token required by /metrics when set
+    METRICS_SNAPSHOT_SECONDS: float = 5  # How often each API worker publishes its metrics for /metrics of the others
+    PROFILING_ENABLED: bool = False  # Initial value; switchable at runtime via /system/profiling
+    PROFILING_SAMPLE_RATE: float = 0.01
+    PROFILING_SLOW_MS: int = 1000
+    PROFILING_INTERVAL_MS: int = 10
+    PROFILING_MAX_SAMPLES: int = 60000
+    PROFILING_MAX_PROFILES: int = 200
+    PROFILING_MAX_BYTES: int = 50 * 1024 * 1024
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATIO: float = 0.1  # Fraction of requests traced
+    TRACING_MAX_FILE_BYTES: int = 20 * 1024 * 1024
+    TRACING_MAX_FILES: int = 5
+    CONTAINER_RECONCILE_SECONDS: int = 15  # Fallback when Docker events are missed
+    RUNNER_TOMBSTONE_RETENTION_HOURS: int = 24  # Older `since` values get a full resync
+    SSE_REPLAY_EVENTS: int = 1000  # Events kept for Last-Event-ID resume
+    SSE_HEARTBEAT_SECONDS: int = 15
+    SSE_RETRY_MS: int = 3000  # Reconnect delay suggested to EventSource clients
+    OPERATION_WORKERS: int = 4  # Background operations run at most this many at a time
+    OPERATION_RETENTION_DAYS: int = 7
+    CLUSTER_POLL_MS: int = 250  # How often workers pick up messages from the other workers
+    CLUSTER_MESSAGE_RETENTION_SECONDS: int = 120
+    LEADER_RETRY_SECONDS: int = 2  # Followers retry the leader lock this often
+    STARTUP_BUDGET_MS: int = 1500  # Startup slower than this is logged as a warning
 
     class Config:
         env_file = ".env"
@@ -1,7 +1,11 @@
 from peewee import SqliteDatabase
 from .config import settings
+from .utils.metrics import DB_QUERY_SECONDS
+from .utils.tracing import KIND_CLIENT, start_span
 from typing import List, Optional
+import fcntl
 import inspect
+import time
 
 try:
 	# local import to avoid importing models at module import time in some contexts
@@ -9,8 +13,25 @@ try:
 except Exception:
 	models_pkg = None
 
+
+
+class InstrumentedSqliteDatabase(SqliteDatabase):
+	"""SqliteDatabase that records query latency by statement type (SELECT, INSERT, ...)
+	and traces queries made inside a traced request."""
+
+	def execute_sql(self, sql, params=None, *args, **kwargs):
+		statement = sql.split(None, 1)[0].upper() if sql else "UNKNOWN"
+		started = time.perf_counter()
+		try:
+			with start_span(f"db {statement}", KIND_CLIENT, **{"db.statement": sql[:500]}):
+				return super().execute_sql(sql, params, *args, **kwargs)
+		finally:
+			DB_QUERY_SECONDS.labels(statement).observe(time.perf_counter() - started)
+
+
 db_path = settings.DATABASE_URL.replace("sqlite:///", "")
-db = SqliteDatabase(db_path)
+# WAL lets the API workers read while one of them writes; writers wait for the lock instead of failing
+db = InstrumentedSqliteDatabase(db_path, pragmas={"journal_mode": "wal", "busy_timeout": 5000})
 
 
 def init_db(models: list = None) -> None:
@@ -53,3 +74,33 @@ def init_db(models: list = None) -> None:
 
 	if models:
 		db.create_tables(models)
+		_add_missing_columns(models)
+
+
+def _add_missing_columns(models: list) -> None:
+	"""Add columns declared on models but missing from already existing tables.
+
+	`create_tables` skips tables that exist, so new fields (which must be
+	nullable or have a default) are added here instead. Every API worker runs
+	this at startup, so the columns are read and added under an flock next to
+	the database file, and a column another worker added first counts as added.
+	"""
+	from peewee import OperationalError
+	from playhouse.migrate import SqliteMigrator, migrate
+
+	migrator = SqliteMigrator(db)
+	with open(f"{db_path}.migrate.lock", "a+") as lock:
+		fcntl.flock(lock, fcntl.LOCK_EX)
+		for model in models:
+			table = model._meta.table_name
+			existing = {column.name for column in db.get_columns(table)}
+			for field in model._meta.sorted_fields:
+				if field.column_name in existing:
+					continue
+				try:
+					with db.atomic():
+						migrate(migrator.add_column(table, field.column_name, field))
+				except OperationalError as e:
+					# Added by a process that does not take the lock, e.g. an older release
+					if "duplicate column name" not in str(e):
+						raise
@@ -0,0 +1,264 @@
+# Time-based capacity for groups of runners.
+#
+# A capacity schedule names a group (runners carrying all of its labels
+# and/or registered to its URL) and how many of them should be running
+# when: weekly windows such as {"days": "mon-fri", "start": "08:00",
+# "end": "20:00", "runners": 40}, with `default_runners` outside all of
+# them. The leader reconciles every group each CAPACITY_CHECK_SECONDS,
+# cheapest step first:
+#
+#   scale up    cancel the group's pending stop drains, start stopped runners,
+#               then create the rest by cloning a runner of the group
+#   scale down  drain the excess with action "stop", idle runners first, so
+#               a job in flight finishes before its runner stops
+#   trim        delete stopped runners beyond what the busiest window needs
+#
+# Stopped runners are kept for the next scale-up, since starting a container
+# is far cheaper than creating and registering one. Everything reads the
+# time from `clock`, which tests replace to move through the week.
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+from inc.config import settings
+from inc.utils.docker_client import DOCKER_AVAILABLE
+from inc.utils.drain import cancel_drain, request_drain
+from inc.utils.event_bus import publish
+from inc.utils.metrics import CAPACITY_RUNNERS, CAPACITY_TARGET
+from inc.utils.runner_ops import clone_runners, container_status_map, delete_runner, provision_runner, select_instances, start_runner
+from models import CapacitySchedule, RunnerInstance
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+clock: Callable[[], datetime] = _utc_now  # Replaced in tests; naive datetimes are taken as UTC
+
+_loop: Optional[threading.Thread] = None
+_lock = threading.Lock()  # One reconcile at a time in this worker
+
+
+# -------- Windows ---------
+
+def parse_days(spec: str) -> Set[int]:
+    """Weekday numbers (Monday 0) in a spec like "mon-fri", "sat,sun" or "*"; raises ValueError."""
+    if spec.strip() in ("*", "daily"):
+        return set(range(7))
+    days: Set[int] = set()
+    for part in spec.lower().split(","):
+        first, _, last = part.strip().partition("-")
+        if first not in DAYS or (last and last not in DAYS):
+            raise ValueError(f"Unknown day in '{spec}'; use mon..sun, ranges like mon-fri or *")
+        start, end = DAYS.index(first), DAYS.index(last or first)
+        days.update((start + offset) % 7 for offset in range((end - start) % 7 + 1))  # fri-mon wraps over the weekend
+    return days
+
+
+def parse_time(value: str) -> int:
+    """Minutes since midnight of "HH:MM", up to "24:00"; raises ValueError."""
+    hours, sep, minutes = value.partition(":")
+    if not (sep and hours.isdigit() and minutes.isdigit() and len(minutes) == 2):
+        raise ValueError(f"Time '{value}' is not HH:MM")
+    total = int(hours) * 60 + int(minutes)
+    if int(minutes) >= 60 or total > 24 * 60:
+        raise ValueError(f"Time '{value}' is not between 00:00 and 24:00")
+    return total
+
+
+def _in_window(window: Dict[str, Any], local: datetime) -> bool:
+    days = parse_days(window.get("days", "*"))
+    start, end = parse_time(window["start"]), parse_time(window["end"])
+    minute = local.hour * 60 + local.minute
+    if start < end:
+        return local.weekday() in days and start <= minute < end
+    # Past midnight, e.g. 22:00-06:00: the early hours belong to the window that started the day before
+    return (local.weekday() in days and minute >= start) or ((local.weekday() - 1) % 7 in days and minute < end)
+
+
+def _local(schedule: CapacitySchedule, now: datetime) -> datetime:
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    return now.astimezone(ZoneInfo(schedule.timezone))
+
+
+def desired_runners(schedule: CapacitySchedule, now: Optional[datetime] = None) -> int:
+    """Runner count the schedule asks for at `now`."""
+    local = _local(schedule, now or clock())
+    for window in json.loads(schedule.windows or "[]"):
+        if _in_window(window, local):
+            return window["runners"]
+    return schedule.default_runners
+
+
+def peak_runners(schedule: CapacitySchedule) -> int:
+    """The most runners the schedule ever asks for; stopped runners beyond it are deleted."""
+    return max([schedule.default_runners] + [window["runners"] for window in json.loads(schedule.windows or "[]")])
+
+
+def next_change(schedule: CapacitySchedule, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """When within the next week the runner count changes next, and to what."""
+    local = _local(schedule, now or clock())
+    current = desired_runners(schedule, local)
+    # The count can only change where a window opens or closes
+    boundaries = {parse_time(window[edge]) for window in json.loads(schedule.windows or "[]") for edge in ("start", "end")}
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    candidates = sorted(
+        midnight + timedelta(days=day, minutes=minute)
+        for day in range(8)
+        for minute in boundaries
+    )
+    for at in candidates:
+        if at > local:
+            runners = desired_runners(schedule, at)
+            if runners != current:
+                return {"at": at.isoformat(), "runners": runners}
+    return None
+
+
+# -------- Group ---------
+
+def group_members(schedule: CapacitySchedule) -> List[RunnerInstance]:
+    members = select_instances(labels=schedule.labels)
+    if schedule.github_url:
+        members = [instance for instance in members if instance.github_url == schedule.github_url]
+    return members
+
+
+def plan(schedule: CapacitySchedule, members: List[RunnerInstance], statuses: Dict[str, str], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Decide what to do for the group to reach its runner count; changes nothing.
+
+    Runners count as running when their container runs and they are not
+    draining. A runner draining towards "stop" can be kept instead, and a
+    stopped one started, before a new one is created.
+    """
+    target = desired_runners(schedule, now)
+    running = [i for i in members if statuses.get(i.runner_name) == "active" and i.drain_state is None]
+    stopping = [i for i in members if i.drain_state == "draining" and i.drain_action == "stop" and statuses.get(i.runner_name) == "active"]
+    stopped = [i for i in members if statuses.get(i.runner_name) == "inactive" and i.drain_state != "draining"]
+    result: Dict[str, Any] = {"target": target, "running": len(running), "keep": [], "start": [], "create": 0, "drain": [], "delete": []}
+
+    missing = target - len(running)
+    if missing > 0:
+        result["keep"] = [i.id for i in stopping[:missing]]
+        missing -= len(result["keep"])
+        result["start"] = [i.id for i in stopped[:missing]]
+        missing -= len(result["start"])
+        result["create"] = missing
+    elif missing < 0:
+        # Idle runners first, newest first among equals, so jobs in flight and long-lived runners stay
+        excess = sorted(running, key=lambda i: (i.job_state == "busy", -i.id))[:-missing]
+        result["drain"] = [i.id for i in excess]
+
+    # Stopped runners are kept for the busiest window; the rest only cost disk
+    idle_stopped = [i for i in stopped if i.id not in result["start"]]
+    spare = len(idle_stopped) - max(peak_runners(schedule) - target, 0)
+    if spare > 0:
+        result["delete"] = [i.id for i in sorted(idle_stopped, key=lambda i: -i.id)[:spare]]
+    return result
+
+
+def _create(schedule: CapacitySchedule, members: List[RunnerInstance], count: int) -> int:
+    """Create `count` runners in the group; returns how many came up."""
+    source = members[-1] if members else None
+    created = 0
+    if source is None:
+        if not (schedule.github_url and schedule.token):
+            raise RuntimeError("The group has no runner to clone; set github_url and token on the schedule")
+        source = RunnerInstance.create(
+            runner_name=RunnerInstance.generate_runner_name(schedule.name.split("-")[0]),
+            github_url=schedule.github_url,
+            token=schedule.token,
+            labels=schedule.labels,
+            template_id=schedule.template_id,
+        )
+        success, message = provision_runner(source)
+        if not success:
+            raise RuntimeError(f"Creating {source.runner_name} failed: {message}")
+        created, count = 1, count - 1
+    if count > 0:
+        result = clone_runners(source, count, token=schedule.token)
+        created += len(result["created_instances"])
+        if result["failed_clones"]:
+            raise RuntimeError(f"{len(result['failed_clones'])} of {count} runners could not be created: {result['failed_clones'][0]['error']}")
+    return created
+
+
+def reconcile(schedule: CapacitySchedule, now: Optional[datetime] = None, dry_run: bool = False) -> Dict[str, Any]:
+    """Bring the schedule's group to the runner count it asks for at `now`."""
+    with _lock:
+        members = group_members(schedule)
+        statuses = container_status_map()
+        steps = plan(schedule, members, statuses, now)
+        CAPACITY_TARGET.labels(schedule.name).set(steps["target"])
+        if dry_run:
+            return steps
+
+        by_id = {instance.id: instance for instance in members}
+        errors = []
+        for instance_id in steps["keep"]:
+            cancel_drain(by_id[instance_id])
+        for instance_id in steps["start"]:
+            try:
+                start_runner(by_id[instance_id])
+            except Exception as e:
+                errors.append(f"starting {by_id[instance_id].runner_name}: {str(e)}")
+                steps["create"] += 1  # Make up for it with a new one
+        if steps["create"]:
+            try:
+                _create(schedule, members, steps["create"])
+            except Exception as e:
+                errors.append(str(e))
+        for instance_id in steps["drain"]:
+            request_drain(by_id[instance_id], "stop")
+        for instance_id in steps["delete"]:
+            try:
+                delete_runner(by_id[instance_id])
+            except Exception as e:
+                errors.append(f"deleting {by_id[instance_id].runner_name}: {str(e)}")
+
+        counts = {"kept": len(steps["keep"]), "started": len(steps["start"]), "created": steps["create"], "draining": len(steps["drain"]), "deleted": len(steps["delete"])}
+        changed = any(counts.values())
+        schedule.target = steps["target"]
+        schedule.applied_at = datetime.now()
+        if errors or changed:
+            schedule.message = "; ".join(errors) or ", ".join(f"{count} {what}" for what, count in counts.items() if count)
+        schedule.save()
+        CAPACITY_RUNNERS.labels(schedule.name).set(steps["running"])
+        if changed or errors:
+            publish("capacity.applied", {"schedule_id": schedule.id, "name": schedule.name, **steps, "errors": errors})
+        return {**steps, "errors": errors}
+
+
+# -------- Loop ---------
+
+def reconcile_all(now: Optional[datetime] = None) -> None:
+    now = now or clock()
+    # Materialized so reconcile() can write while no read snapshot is held open
+    for schedule in list(CapacitySchedule.select().where(CapacitySchedule.enabled).order_by(CapacitySchedule.id)):
+        try:
+            reconcile(schedule, now)
+        except Exception as e:
+            print(f"Warning: Capacity schedule '{schedule.name}' failed: {str(e)}")
+
+
+def _capacity_loop() -> None:
+    while True:
+        reconcile_all()
+        time.sleep(settings.CAPACITY_CHECK_SECONDS)
+
+
+def start_capacity_scheduler() -> None:
+    """Reconcile capacity schedules periodically. Runs in the leader only."""
+    global _loop
+    if not DOCKER_AVAILABLE:
+        return
+    if _loop is not None and _loop.is_alive():
+        return
+    _loop = threading.Thread(target=_capacity_loop, daemon=True, name="capacity")
+    _loop.start()
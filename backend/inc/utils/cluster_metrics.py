@@ -0,0 +1,80 @@
+# /metrics for every API worker from whichever one is scraped.
+#
+# Metrics are kept in the memory of the worker that records them, and a
+# scrape reaches one worker. Each worker writes an export of its metrics to
+# VOLUME_PATH/cluster/metrics/<worker>.json every METRICS_SNAPSHOT_SECONDS;
+# /metrics renders its own live metrics and the latest export of every other
+# live worker, each series labelled with the worker it comes from. Counters
+# stay monotonic per worker, so rates work; sum without (worker) for totals.
+# Exports of workers that exited are dropped at the next scrape.
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from inc.config import settings
+from inc.utils.coordination import CLUSTER_DIR, WORKER_ID, worker_alive
+from inc.utils.metrics import export_metrics, render_metrics
+
+METRICS_DIR = os.path.join(CLUSTER_DIR, "metrics")
+
+_loop: Optional[threading.Thread] = None
+
+
+def _export_path(worker_id: str) -> str:
+    return os.path.join(METRICS_DIR, f"{worker_id}.json")
+
+
+def write_export() -> None:
+    """Publish this worker's metrics for the others; replaced atomically."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _export_path(WORKER_ID)
+    with open(f"{path}.partial", "w") as f:
+        json.dump(export_metrics(), f, separators=(",", ":"))
+    os.replace(f"{path}.partial", path)
+
+
+def _peer_exports() -> Dict[str, Dict[str, Any]]:
+    exports: Dict[str, Dict[str, Any]] = {}
+    if not os.path.isdir(METRICS_DIR):
+        return exports
+    for name in sorted(os.listdir(METRICS_DIR)):
+        worker_id, extension = os.path.splitext(name)
+        if extension != ".json" or worker_id == WORKER_ID:
+            continue
+        if not worker_alive(worker_id):
+            try:
+                os.unlink(os.path.join(METRICS_DIR, name))
+            except FileNotFoundError:
+                pass  # Removed by another worker's scrape
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name)) as f:
+                exports[worker_id] = json.load(f)
+        except (OSError, ValueError):
+            continue  # Written before the rename was atomic, or gone; skipped this scrape
+    return exports
+
+
+def render_cluster_metrics() -> str:
+    """Prometheus text of every live worker, this one's current and the others' last exports."""
+    return render_metrics({WORKER_ID: export_metrics(), **_peer_exports()})
+
+
+def _export_loop() -> None:
+    while True:
+        time.sleep(settings.METRICS_SNAPSHOT_SECONDS)
+        try:
+            write_export()
+        except Exception as e:
+            print(f"Warning: Could not publish metrics of worker {WORKER_ID}: {str(e)}")
+
+
+def start_metrics_export() -> None:
+    """Publish this worker's metrics periodically. Runs in every worker."""
+    global _loop
+    if _loop is not None and _loop.is_alive():
+        return
+    _loop = threading.Thread(target=_export_loop, daemon=True, name="metrics-export")
+    _loop.start()
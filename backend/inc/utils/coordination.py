@@ -0,0 +1,207 @@
+# Coordination between API worker processes (`fastapi run --workers N`).
+#
+# Leader election: the worker holding an exclusive flock on
+# VOLUME_PATH/cluster/leader.lock runs the singleton loops and all
+# background Docker work. The kernel drops the lock when that process
+# dies, and a follower takes over within LEADER_RETRY_SECONDS.
+#
+# Pub/sub: a message is delivered to the sender's own handlers right away
+# and stored as a `cluster_message` row that the other workers poll for.
+# Each worker also holds a lock file of its own, so a sender can tell
+# whether there is anyone to write rows for.
+import fcntl
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from inc.config import settings
+
+WORKER_ID = f"{os.getpid()}-{os.urandom(3).hex()}"
+CLUSTER_DIR = os.path.join(settings.VOLUME_PATH, "cluster")
+WORKERS_DIR = os.path.join(CLUSTER_DIR, "workers")
+PEER_CHECK_SECONDS = 2
+PRUNE_SECONDS = 30
+
+Handler = Callable[[Dict[str, Any]], None]
+
+_handlers: Dict[str, List[Tuple[Handler, bool]]] = {}
+_elected: List[Tuple[str, Callable[[], None]]] = []
+_lock = threading.Lock()
+_leader_file = None
+_worker_file = None
+_started = False
+_peers: Tuple[float, bool] = (0.0, False)  # (checked at, other workers alive)
+
+
+def is_leader() -> bool:
+    return _leader_file is not None
+
+
+def on_elected(name: str, func: Callable[[], None]) -> None:
+    """Run `func` once this worker becomes the leader, e.g. to start a singleton loop."""
+    with _lock:
+        _elected.append((name, func))
+        run_now = is_leader()
+    if run_now:
+        _run_elected(name, func)
+
+
+def subscribe(channel: str, handler: Handler, leader_only: bool = False) -> None:
+    """Call `handler(payload)` for every message on `channel`, in any worker or only in the leader."""
+    with _lock:
+        _handlers.setdefault(channel, []).append((handler, leader_only))
+
+
+def broadcast(channel: str, payload: Dict[str, Any], local: bool = True) -> None:
+    """Deliver a message to the handlers of every worker; with `local=False` to the other workers only."""
+    if local:
+        _dispatch(channel, payload)
+    if _started and _has_peers():
+        from models import ClusterMessage
+
+        ClusterMessage.create(channel=channel, payload=json.dumps(payload, separators=(",", ":")), origin=WORKER_ID)
+
+
+def _dispatch(channel: str, payload: Dict[str, Any]) -> None:
+    for handler, leader_only in list(_handlers.get(channel, ())):
+        if leader_only and not is_leader():
+            continue
+        try:
+            handler(payload)
+        except Exception as e:
+            print(f"Warning: Handler for cluster message '{channel}' failed: {str(e)}")
+
+
+def _run_elected(name: str, func: Callable[[], None]) -> None:
+    try:
+        func()
+    except Exception as e:
+        print(f"Warning: Leader task '{name}' failed to start: {str(e)}")
+
+
+# -------- Locks ---------
+
+def _try_lock(path: str):
+    """Open `path` and take an exclusive flock on it; return the file, or None when held elsewhere."""
+    handle = open(path, "a+")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return None
+    return handle
+
+
+def _has_peers() -> bool:
+    """Whether another worker is alive, checked at most every PEER_CHECK_SECONDS."""
+    global _peers
+    checked_at, alive = _peers
+    if time.monotonic() - checked_at < PEER_CHECK_SECONDS:
+        return alive
+    alive = False
+    for name in os.listdir(WORKERS_DIR):
+        if not name.endswith(".lock") or name == f"{WORKER_ID}.lock":
+            continue
+        path = os.path.join(WORKERS_DIR, name)
+        handle = _try_lock(path)
+        if handle is None:
+            alive = True
+            continue
+        # Left behind by a worker that exited
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass  # Another worker cleaned it up first
+        handle.close()
+    _peers = (time.monotonic(), alive)
+    return alive
+
+
+def worker_alive(worker_id: str) -> bool:
+    """Whether the worker with this id is still running; its lock file is held until it exits."""
+    path = os.path.join(WORKERS_DIR, f"{worker_id}.lock")
+    if worker_id == WORKER_ID:
+        return True
+    if not os.path.exists(path):
+        return False
+    handle = _try_lock(path)
+    if handle is None:
+        return True
+    handle.close()
+    return False
+
+
+def _try_become_leader() -> bool:
+    global _leader_file
+    handle = _try_lock(os.path.join(CLUSTER_DIR, "leader.lock"))
+    if handle is None:
+        return False
+    handle.seek(0)
+    handle.truncate()
+    handle.write(WORKER_ID)
+    handle.flush()
+    with _lock:
+        _leader_file = handle  # Held, and so leadership kept, until this process exits
+        elected = list(_elected)
+    print(f"Worker {WORKER_ID} elected leader")
+    for name, func in elected:
+        _run_elected(name, func)
+    return True
+
+
+def _election_loop() -> None:
+    while not _try_become_leader():
+        time.sleep(settings.LEADER_RETRY_SECONDS)
+
+
+# -------- Message polling ---------
+
+def _poll_loop(last_id: int) -> None:
+    from models import ClusterMessage
+
+    last_prune = 0.0
+    while True:
+        time.sleep(settings.CLUSTER_POLL_MS / 1000.0)
+        try:
+            for message in (
+                ClusterMessage.select()
+                .where((ClusterMessage.id > last_id) & (ClusterMessage.origin != WORKER_ID))
+                .order_by(ClusterMessage.id)
+            ):
+                last_id = message.id
+                _dispatch(message.channel, json.loads(message.payload))
+            if is_leader() and time.monotonic() - last_prune > PRUNE_SECONDS:
+                last_prune = time.monotonic()
+                cutoff = datetime.now() - timedelta(seconds=settings.CLUSTER_MESSAGE_RETENTION_SECONDS)
+                ClusterMessage.delete().where(ClusterMessage.created_at < cutoff).execute()
+        except Exception as e:
+            print(f"Warning: Cluster message poll failed: {str(e)}")
+
+
+def start_coordination() -> None:
+    """Register this worker, start message polling and run for leader. Call after on_elected registrations."""
+    global _started, _worker_file
+    from models import ClusterMessage
+
+    with _lock:
+        if _started:
+            return
+        _started = True
+    os.makedirs(WORKERS_DIR, exist_ok=True)
+    # Locked under a temporary name first, so no peer sees the file unlocked and removes it
+    pending = os.path.join(WORKERS_DIR, f"{WORKER_ID}.starting")
+    _worker_file = _try_lock(pending)
+    os.rename(pending, os.path.join(WORKERS_DIR, f"{WORKER_ID}.lock"))
+
+    last_id = ClusterMessage.select(ClusterMessage.id).order_by(ClusterMessage.id.desc()).scalar() or 0
+    threading.Thread(target=_poll_loop, args=(last_id,), daemon=True, name="cluster-poll").start()
+    # The first worker up leads before it serves requests; the rest keep trying in the background
+    if not _try_become_leader():
+        threading.Thread(target=_election_loop, daemon=True, name="leader-election").start()
+
+
+def coordination_state() -> Dict[str, Any]:
+    return {"worker_id": WORKER_ID, "leader": is_leader(), "peers": _peers[1]}
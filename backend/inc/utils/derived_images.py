@@ -0,0 +1,209 @@
+# Runner images derived from the base image per template.
+#
+# A template's `image_spec` lists apt and pip packages and setup commands.
+# They are rendered into a Dockerfile on top of the base image (the
+# template's own `base`, or the image the runner is created or rolled out
+# with) and built once through the Docker API, so jobs start with their
+# toolchain installed instead of spending their first minutes in apt-get.
+#
+# The image is tagged DERIVED_IMAGE_REPOSITORY:<hash>, where the hash covers
+# the rendered Dockerfile and the ID of the base image. Templates with the
+# same packages and steps share one build, and a new base image or a changed
+# template yields a new tag. gc_derived_images() removes derived images that
+# no template resolves to and no container uses.
+import calendar
+import fcntl
+import functools
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from inc.config import settings
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+
+LOCKS_DIR = os.path.join(settings.VOLUME_PATH, "images", "locks")
+DERIVED_LABEL = "runnerpilot.derived"  # Value: the content hash
+TEMPLATE_LABEL = "runnerpilot.template"
+BASE_LABEL = "runnerpilot.base"
+BASE_ID_LABEL = "runnerpilot.base_id"  # Image ID of the base, so rollouts can tell which base a runner is on
+BUILD_LOG_LINES = 30
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def image_spec(template: Any) -> Optional[Dict[str, Any]]:
+    """The template's image spec with defaults filled in; None when it adds nothing to the base."""
+    spec = json.loads(template.image_spec) if template is not None and template.image_spec else {}
+    spec = {
+        "base": spec.get("base"),
+        # Sorted so the same packages listed in another order share a build
+        "apt_packages": sorted(set(spec.get("apt_packages") or [])),
+        "pip_packages": sorted(set(spec.get("pip_packages") or [])),
+        "setup": list(spec.get("setup") or []),
+    }
+    if not (spec["apt_packages"] or spec["pip_packages"] or spec["setup"]):
+        return None
+    return spec
+
+
+def render_dockerfile(spec: Dict[str, Any], base: str, user: str) -> str:
+    lines = [f"FROM {base}", "USER root"]
+    if spec["apt_packages"]:
+        lines.append(
+            "RUN apt-get update && DEBIAN_FRONTEND=noninteractive apt-get install -y --no-install-recommends "
+            + " ".join(spec["apt_packages"])
+            + " && apt-get clean && rm -rf /var/lib/apt/lists/*"
+        )
+    if spec["pip_packages"]:
+        # The variable lets pip install into the system Python on distributions that mark it externally managed
+        lines.append("RUN PIP_BREAK_SYSTEM_PACKAGES=1 pip3 install --no-cache-dir " + " ".join(json.dumps(p) for p in spec["pip_packages"]))
+    for step in spec["setup"]:
+        lines.append(f"RUN {step}")
+    lines.append(f"USER {user or 'root'}")
+    return "\n".join(lines) + "\n"
+
+
+def _base_image(base: str) -> Any:
+    client = get_docker_client()
+    try:
+        return client.images.get(base)
+    except docker.errors.ImageNotFound:
+        return client.images.pull(base)
+
+
+def _resolve(spec: Dict[str, Any], base: str) -> Dict[str, str]:
+    """Dockerfile and tag of the derived image for `spec` on top of `base`."""
+    base_image = _base_image(base)
+    dockerfile = render_dockerfile(spec, base, base_image.attrs.get("Config", {}).get("User", ""))
+    digest = hashlib.sha256(f"{base_image.id}\n{dockerfile}".encode()).hexdigest()[:16]
+    return {"dockerfile": dockerfile, "hash": digest, "tag": f"{settings.DERIVED_IMAGE_REPOSITORY}:{digest}", "base_id": base_image.id}
+
+
+@contextmanager
+def _build_lock(digest: str):
+    """One build per hash across threads and API workers; the others wait and reuse it."""
+    with _locks_guard:
+        lock = _locks.setdefault(digest, threading.Lock())
+    os.makedirs(LOCKS_DIR, exist_ok=True)
+    with lock, open(os.path.join(LOCKS_DIR, f"{digest}.lock"), "a+") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+def _exists(tag: str) -> bool:
+    try:
+        get_docker_client().images.get(tag)
+        return True
+    except docker.errors.ImageNotFound:
+        return False
+
+
+def build_derived_image(template: Any, base: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Build the template's derived image unless it exists; returns its tag and whether it was built."""
+    spec = image_spec(template)
+    if spec is None:
+        return None
+    base = spec["base"] or base or settings.RUNNER_IMAGE
+    resolved = _resolve(spec, base)
+    if _exists(resolved["tag"]):
+        return {"tag": resolved["tag"], "hash": resolved["hash"], "built": False}
+
+    with _build_lock(resolved["hash"]):
+        if _exists(resolved["tag"]):
+            return {"tag": resolved["tag"], "hash": resolved["hash"], "built": False}  # Built while we waited
+        started = time.monotonic()
+        try:
+            get_docker_client().images.build(
+                fileobj=io.BytesIO(resolved["dockerfile"].encode()),
+                tag=resolved["tag"],
+                labels={
+                    DERIVED_LABEL: resolved["hash"],
+                    TEMPLATE_LABEL: template.name,
+                    BASE_LABEL: base,
+                    BASE_ID_LABEL: resolved["base_id"],
+                },
+                rm=True,
+                forcerm=True,
+            )
+        except docker.errors.BuildError as e:
+            log = "".join(entry.get("stream", "") or entry.get("error", "") for entry in e.build_log if isinstance(entry, dict))
+            tail = "\n".join(log.strip().splitlines()[-BUILD_LOG_LINES:])
+            raise RuntimeError(f"Building the image of template '{template.name}' failed: {e.msg}\n{tail}")
+        print(f"Built {resolved['tag']} for template '{template.name}' in {time.monotonic() - started:.0f}s")
+    return {"tag": resolved["tag"], "hash": resolved["hash"], "built": True}
+
+
+def derived_image(template: Any, base: Optional[str] = None) -> Optional[str]:
+    """Image a runner of `template` should run, building it first if needed; None for the plain base image."""
+    result = build_derived_image(template, base)
+    return result["tag"] if result else None
+
+
+@functools.lru_cache(maxsize=1024)
+def base_image_id(image_id: str) -> Optional[str]:
+    """Base image ID of a derived image, None for any other image. Image IDs are immutable, hence the cache."""
+    try:
+        labels = get_docker_client().images.get(image_id).labels or {}
+    except docker.errors.ImageNotFound:
+        return None
+    return labels.get(BASE_ID_LABEL)
+
+
+def pins_base(template: Any) -> bool:
+    """Whether the template builds on its own base image, which rollouts of another image leave alone."""
+    spec = image_spec(template)
+    return spec is not None and bool(spec["base"])
+
+
+def derived_image_state(template: Any, base: Optional[str] = None) -> Dict[str, Any]:
+    spec = image_spec(template)
+    if spec is None:
+        return {"spec": None, "tag": None, "built": False, "dockerfile": None}
+    resolved = _resolve(spec, spec["base"] or base or settings.RUNNER_IMAGE)
+    return {"spec": spec, "tag": resolved["tag"], "built": _exists(resolved["tag"]), "dockerfile": resolved["dockerfile"]}
+
+
+# -------- Garbage collection ---------
+
+def gc_derived_images(templates: List[Any], grace_hours: Optional[float] = None) -> Dict[str, Any]:
+    """Remove derived images that no template resolves to, no container uses and that are past the grace period.
+
+    The grace period protects an image built for a template update that has
+    not been rolled out yet, and one being built into right now.
+    """
+    if not DOCKER_AVAILABLE:
+        return {"removed": [], "kept": 0}
+    grace_hours = settings.DERIVED_IMAGE_GRACE_HOURS if grace_hours is None else grace_hours
+    client = get_docker_client()
+
+    current = set()
+    for template in templates:
+        spec = image_spec(template)
+        if spec is None:
+            continue
+        try:
+            current.add(_resolve(spec, spec["base"] or settings.RUNNER_IMAGE)["tag"])
+        except Exception as e:
+            print(f"Warning: Could not resolve the image of template '{template.name}': {str(e)}")
+    in_use = {container["ImageID"] for container in client.api.containers(all=True)}
+
+    removed: List[str] = []
+    kept = 0
+    for image in client.images.list(filters={"label": DERIVED_LABEL}):
+        created = calendar.timegm(time.strptime(image.attrs["Created"][:19], "%Y-%m-%dT%H:%M:%S"))
+        if image.id in in_use or current.intersection(image.tags) or time.time() - created < grace_hours * 3600:
+            kept += 1
+            continue
+        try:
+            client.images.remove(image.id)
+            removed.extend(image.tags or [image.short_id])
+        except docker.errors.APIError as e:
+            kept += 1
+            print(f"Warning: Could not remove derived image {image.short_id}: {str(e)}")
+    return {"removed": removed, "kept": kept}
@@ -0,0 +1,369 @@
+# Disk-pressure manager for the Docker host.
+#
+# Jobs share the host daemon through the mounted socket and leave stopped
+# containers, dangling images, anonymous volumes and BuildKit cache behind.
+# The leader checks the disk Docker stores its data on (psutil) every
+# DISK_GC_INTERVAL_SECONDS. Once usage passes DISK_GC_HIGH_WATERMARK it
+# reclaims space in priority order, cheapest and safest first, and stops as
+# soon as usage is back under DISK_GC_LOW_WATERMARK:
+#
+#   1. stopped containers RunnerPilot does not manage
+#   2. dangling images
+#   3. anonymous volumes no container uses
+#   4. BuildKit cache not used for DISK_GC_MIN_AGE_HOURS
+#   5. stale derived template images and runner release installs
+#   6. unused images, least recently used first
+#
+# Anything younger than DISK_GC_MIN_AGE_HOURS is left alone, and so are
+# RunnerPilot's own containers and volumes, the runner image, images of
+# running rollouts, current template images and the registry mirror. What
+# each run reclaimed is kept in VOLUME_PATH/disk-gc.json for every worker to
+# report.
+import calendar
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from inc.config import settings
+from inc.utils.derived_images import DERIVED_LABEL, gc_derived_images
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.lazy_imports import defer
+from inc.utils.metrics import DISK_GC_RECLAIMED_BYTES, DISK_USED_RATIO
+from inc.utils.release_cache import VERSION_LABEL, cached_versions, install_path, resolve_release, tarball_path
+from models import Rollout, RunnerInstance, RunnerTemplate
+
+psutil = defer("psutil")
+
+STATE_PATH = os.path.join(settings.VOLUME_PATH, "disk-gc.json")
+MANAGED_LABEL_PREFIX = "runnerpilot."  # Containers and volumes labelled by RunnerPilot itself
+
+_lock = threading.Lock()  # One run at a time in this worker
+_loop: Optional[threading.Thread] = None
+_docker_root: Optional[str] = None
+
+
+# -------- Measuring ---------
+
+def watched_path() -> str:
+    """Path whose filesystem holds Docker's data, as seen from this process."""
+    global _docker_root
+    if settings.DISK_GC_PATH:
+        return settings.DISK_GC_PATH
+    if _docker_root is None and DOCKER_AVAILABLE:
+        try:
+            _docker_root = get_docker_client().info().get("DockerRootDir") or ""
+        except Exception:
+            pass
+    if _docker_root and os.path.isdir(_docker_root):
+        return _docker_root
+    # In a container, / is an overlay whose statfs reports the disk Docker stores it on
+    return "/"
+
+
+def disk_usage() -> Dict[str, Any]:
+    path = watched_path()
+    usage = psutil.disk_usage(path)
+    DISK_USED_RATIO.labels().set(usage.used / usage.total)
+    return {"path": path, "total_bytes": usage.total, "used_bytes": usage.used, "free_bytes": usage.free, "used_percent": round(usage.used / usage.total * 100, 1)}
+
+
+def docker_usage() -> Dict[str, Any]:
+    """What Docker stores, per kind, and how much of it could go."""
+    df = get_docker_client().df()
+    images = df.get("Images") or []
+    containers = df.get("Containers") or []
+    volumes = df.get("Volumes") or []
+    build_cache = df.get("BuildCache") or []
+    volume_size = lambda v: max((v.get("UsageData") or {}).get("Size", 0), 0)
+    return {
+        "images": {
+            "count": len(images),
+            "bytes": df.get("LayersSize", 0),  # Layers shared between images counted once
+            "unused_bytes": sum(i.get("Size", 0) - max(i.get("SharedSize", 0), 0) for i in images if i.get("Containers", 0) == 0),
+        },
+        "containers": {
+            "count": len(containers),
+            "bytes": sum(c.get("SizeRw", 0) for c in containers),
+            "stopped_bytes": sum(c.get("SizeRw", 0) for c in containers if c.get("State") != "running"),
+        },
+        "volumes": {
+            "count": len(volumes),
+            "bytes": sum(volume_size(v) for v in volumes),
+            "unused_bytes": sum(volume_size(v) for v in volumes if (v.get("UsageData") or {}).get("RefCount", 0) == 0),
+        },
+        "build_cache": {
+            "count": len(build_cache),
+            "bytes": sum(b.get("Size", 0) for b in build_cache if not b.get("Shared")),
+            "unused_bytes": sum(b.get("Size", 0) for b in build_cache if not b.get("InUse") and not b.get("Shared")),
+        },
+    }
+
+
+# -------- What must stay ---------
+
+def _managed_container_names() -> Set[str]:
+    return {name for (name,) in RunnerInstance.select(RunnerInstance.runner_name).tuples()}
+
+
+def _is_managed(labels: Optional[Dict[str, str]]) -> bool:
+    return any(key.startswith(MANAGED_LABEL_PREFIX) for key in (labels or {}))
+
+
+def _protected_images() -> Set[str]:
+    """Image references and IDs that are never removed."""
+    protected = {settings.RUNNER_IMAGE, settings.REGISTRY_MIRROR_IMAGE}
+    protected.update(image for (image,) in Rollout.select(Rollout.image).where(Rollout.status.in_(("pending", "running"))).tuples())
+    protected.update(digest for (digest,) in RunnerInstance.select(RunnerInstance.image_digest).tuples() if digest)
+    client = get_docker_client()
+    for reference in list(protected):
+        if reference.startswith("sha256:"):
+            continue
+        try:
+            protected.add(client.images.get(reference).id)
+        except docker.errors.ImageNotFound:
+            pass
+    return protected
+
+
+def _older_than_min_age(created: float) -> bool:
+    return time.time() - created >= settings.DISK_GC_MIN_AGE_HOURS * 3600
+
+
+def _until() -> str:
+    return f"{settings.DISK_GC_MIN_AGE_HOURS}h"
+
+
+# -------- Steps ---------
+
+def _prune_stopped_containers() -> Tuple[int, int]:
+    client = get_docker_client()
+    managed = _managed_container_names()
+    sizes = {c["Id"]: c.get("SizeRw", 0) for c in client.df().get("Containers") or []}
+    removed = reclaimed = 0
+    for summary in client.api.containers(all=True, filters={"status": ["exited", "created", "dead"]}):
+        names = {name.lstrip("/") for name in summary.get("Names") or []}
+        if names & managed or _is_managed(summary.get("Labels")) or not _older_than_min_age(summary.get("Created", 0)):
+            continue
+        try:
+            client.api.remove_container(summary["Id"], v=True)
+            removed += 1
+            reclaimed += sizes.get(summary["Id"], 0)
+        except docker.errors.APIError as e:
+            print(f"Warning: Could not remove stopped container {summary['Id'][:12]}: {str(e)}")
+    return removed, reclaimed
+
+
+def _prune_dangling_images() -> Tuple[int, int]:
+    result = get_docker_client().images.prune(filters={"dangling": True, "until": _until()})
+    return len(result.get("ImagesDeleted") or []), result.get("SpaceReclaimed") or 0
+
+
+def _prune_anonymous_volumes() -> Tuple[int, int]:
+    # Without `all`, the daemon only prunes anonymous volumes; named ones, like RunnerPilot's, stay
+    result = get_docker_client().volumes.prune(filters={"label!": "runnerpilot.runner"})
+    return len(result.get("VolumesDeleted") or []), result.get("SpaceReclaimed") or 0
+
+
+def _prune_build_cache(target_bytes: int) -> Tuple[int, int]:
+    """Drop old build cache, keeping at most what the low watermark still allows, least recently used first."""
+    usage = disk_usage()
+    over = max(usage["used_bytes"] - target_bytes, 0)
+    cache = docker_usage()["build_cache"]["bytes"]
+    result = get_docker_client().api.prune_builds(filters={"until": _until()}, keep_storage=max(cache - over, 0))
+    return len(result.get("CachesDeleted") or []), result.get("SpaceReclaimed") or 0
+
+
+def _make_writable(root: str) -> None:
+    # Installs are made read-only after extraction; rmtree cannot unlink from read-only directories
+    for directory, dirnames, _ in os.walk(root):
+        os.chmod(directory, os.stat(directory).st_mode | stat.S_IWUSR)
+
+
+def _prune_stale_releases() -> Tuple[int, int]:
+    """Runner release installs and tarballs other than the current version that no container runs."""
+    try:
+        current, _ = resolve_release()
+    except Exception:
+        return 0, 0  # Unknown which version is current; keep everything
+    in_use = {current}
+    for summary in get_docker_client().api.containers(all=True, filters={"label": VERSION_LABEL}):
+        in_use.add(summary["Labels"][VERSION_LABEL])
+    removed = reclaimed = 0
+    versions = cached_versions()
+    for version in set(versions["installs"]) | set(versions["tarballs"]):
+        if version in in_use:
+            continue
+        for path in (install_path(version), tarball_path(version)):
+            if not os.path.exists(path):
+                continue
+            if os.path.isdir(path):
+                size = sum(os.lstat(os.path.join(d, f)).st_size for d, _, files in os.walk(path) for f in files)
+                _make_writable(path)
+                shutil.rmtree(path)
+            else:
+                size = os.path.getsize(path)
+                os.remove(path)
+            removed += 1
+            reclaimed += size
+    return removed, reclaimed
+
+
+def _prune_stale_derived_images() -> Tuple[int, int]:
+    sizes = _image_sizes()
+    result = gc_derived_images(list(RunnerTemplate.select()))
+    return len(result["removed"]), sum(sizes.get(tag, 0) for tag in result["removed"])
+
+
+def _image_sizes() -> Dict[str, int]:
+    """Bytes only this image holds (not shared with others), by ID and by tag."""
+    sizes: Dict[str, int] = {}
+    for image in get_docker_client().df().get("Images") or []:
+        unique = image.get("Size", 0) - max(image.get("SharedSize", 0), 0)
+        sizes[image["Id"]] = unique
+        for tag in image.get("RepoTags") or []:
+            sizes[tag] = unique
+    return sizes
+
+
+def _prune_lru_images(target_bytes: int) -> Tuple[int, int]:
+    """Remove images no container uses, least recently used first, until usage is under the target."""
+    client = get_docker_client()
+    protected = _protected_images()
+    in_use = {summary["ImageID"] for summary in client.api.containers(all=True)}
+    sizes = _image_sizes()
+    candidates = []
+    for image in client.images.list():
+        if image.id in in_use or image.id in protected or protected.intersection(image.tags):
+            continue
+        if DERIVED_LABEL in (image.labels or {}):
+            continue  # Left to the derived image GC, which knows which ones templates still need
+        # The daemon does not record when an image was last used; the last tag or pull is the closest it has
+        last_used = image.attrs.get("Metadata", {}).get("LastTagTime") or image.attrs.get("Created", "")
+        candidates.append((last_used, image))
+
+    removed = reclaimed = 0
+    for _, image in sorted(candidates, key=lambda candidate: candidate[0]):
+        if disk_usage()["used_bytes"] <= target_bytes:
+            break
+        if not _older_than_min_age(_created(image)):
+            continue
+        try:
+            client.images.remove(image.id, force=False)
+            removed += 1
+            reclaimed += sizes.get(image.id, 0)
+        except docker.errors.APIError as e:
+            print(f"Warning: Could not remove image {image.short_id}: {str(e)}")
+    return removed, reclaimed
+
+
+def _created(image: Any) -> float:
+    return calendar.timegm(time.strptime(image.attrs.get("Created", "1970-01-01T00:00:00")[:19], "%Y-%m-%dT%H:%M:%S"))
+
+
+# (name, step); steps taking the target get the byte count usage must drop to
+STEPS: List[Tuple[str, Callable[..., Tuple[int, int]], bool]] = [
+    ("stopped_containers", _prune_stopped_containers, False),
+    ("dangling_images", _prune_dangling_images, False),
+    ("anonymous_volumes", _prune_anonymous_volumes, False),
+    ("build_cache", _prune_build_cache, True),
+    ("derived_images", _prune_stale_derived_images, False),
+    ("runner_releases", _prune_stale_releases, False),
+    ("lru_images", _prune_lru_images, True),
+]
+
+
+# -------- Runs ---------
+
+def _read_state() -> Dict[str, Any]:
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(state: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    partial = f"{STATE_PATH}.{os.getpid()}.partial"
+    with open(partial, "w") as f:
+        json.dump(state, f)
+    os.replace(partial, STATE_PATH)
+
+
+def run_gc(force: bool = False) -> Dict[str, Any]:
+    """Reclaim space if usage is over the high watermark (or `force`), down to the low watermark."""
+    with _lock:
+        before = disk_usage()
+        report: Dict[str, Any] = {"started_at": time.time(), "forced": force, "before": before, "steps": [], "reclaimed_bytes": 0}
+        if before["used_percent"] < settings.DISK_GC_HIGH_WATERMARK and not force:
+            return {**report, "skipped": "under the high watermark"}
+
+        target = int(before["total_bytes"] * settings.DISK_GC_LOW_WATERMARK / 100)
+        for name, step, wants_target in STEPS:
+            if disk_usage()["used_bytes"] <= target:
+                break
+            started = time.monotonic()
+            try:
+                removed, reclaimed = step(target) if wants_target else step()
+                error = None
+            except Exception as e:
+                removed, reclaimed, error = 0, 0, str(e)
+                print(f"Warning: Disk GC step {name} failed: {error}")
+            DISK_GC_RECLAIMED_BYTES.labels(name).inc(reclaimed)
+            report["steps"].append({"step": name, "removed": removed, "reclaimed_bytes": reclaimed, "seconds": round(time.monotonic() - started, 2), "error": error})
+            report["reclaimed_bytes"] += reclaimed
+
+        report["after"] = disk_usage()
+        report["finished_at"] = time.time()
+        state = _read_state()
+        state["last_run"] = report
+        state["total_reclaimed_bytes"] = state.get("total_reclaimed_bytes", 0) + report["reclaimed_bytes"]
+        state["runs"] = state.get("runs", 0) + 1
+        _write_state(state)
+        if report["reclaimed_bytes"]:
+            print(f"Disk GC reclaimed {report['reclaimed_bytes'] / 1024 / 1024:.0f} MB, disk at {report['after']['used_percent']}%")
+        return report
+
+
+def _gc_loop() -> None:
+    while True:
+        try:
+            run_gc()
+        except Exception as e:
+            print(f"Warning: Disk GC failed: {str(e)}")
+        time.sleep(settings.DISK_GC_INTERVAL_SECONDS)
+
+
+def start_disk_gc() -> None:
+    """Start the disk-pressure loop. Runs in the leader only."""
+    global _loop
+    if not settings.DISK_GC or not DOCKER_AVAILABLE or psutil is None:
+        return
+    if _loop is not None and _loop.is_alive():
+        return
+    _loop = threading.Thread(target=_gc_loop, daemon=True, name="disk-gc")
+    _loop.start()
+
+
+def disk_gc_state() -> Dict[str, Any]:
+    state = _read_state()
+    report: Dict[str, Any] = {
+        "enabled": settings.DISK_GC,
+        "high_watermark_percent": settings.DISK_GC_HIGH_WATERMARK,
+        "low_watermark_percent": settings.DISK_GC_LOW_WATERMARK,
+        "disk": disk_usage(),
+        "docker": None,
+        "last_run": state.get("last_run"),
+        "runs": state.get("runs", 0),
+        "total_reclaimed_bytes": state.get("total_reclaimed_bytes", 0),
+    }
+    if DOCKER_AVAILABLE:
+        try:
+            report["docker"] = docker_usage()
+        except Exception as e:
+            print(f"Warning: Could not read Docker disk usage: {str(e)}")
+    return report
@@ -0,0 +1,94 @@
+import functools
+import time
+from typing import Any, Callable, Optional
+from inc.config import settings
+from inc.utils.docker_governor import DOCKER_AVAILABLE, docker, govern, install_request_timeouts
+from inc.utils.metrics import DOCKER_CALL_ERRORS, DOCKER_CALL_SECONDS
+from inc.utils.tracing import KIND_CLIENT, start_span
+
+
+# Low-level API methods that are instrumented, with the operation name they report as
+INSTRUMENTED_API_METHODS = {
+    "containers": "list",
+    "inspect_container": "get",
+    "create_container": "create",
+    "start": "start",
+    "stop": "stop",
+    "restart": "restart",
+    "kill": "kill",
+    "remove_container": "remove",
+    "logs": "logs",
+    "stats": "stats",
+    "exec_create": "exec",
+    "exec_start": "exec",
+    "pull": "pull",
+    "images": "images.list",
+    "inspect_image": "images.get",
+    "remove_image": "images.remove",
+    "build": "build",
+    "df": "df",
+    "prune_containers": "prune",
+    "prune_images": "prune",
+    "prune_volumes": "prune",
+    "prune_builds": "prune",
+    "ping": "ping",
+}
+
+_client: Optional[Any] = None
+
+
+def _instrument(operation: str, func: Callable) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with start_span(f"docker {operation}", KIND_CLIENT):
+                return func(*args, **kwargs)
+        except Exception as e:
+            DOCKER_CALL_ERRORS.labels(operation, type(e).__name__).inc()
+            raise
+        finally:
+            DOCKER_CALL_SECONDS.labels(operation).observe(time.perf_counter() - started)
+    return wrapper
+
+
+def _instrument_client(client: Any) -> Any:
+    """Wrap the client's API methods so every Docker call is governed, timed and traced.
+
+    High-level objects (containers, images) call through `client.api`, so
+    wrapping the instance attributes covers them as well. The governor sits
+    outside the timing, so each retry is measured as its own call.
+    """
+    install_request_timeouts(client.api)
+    for method, operation in INSTRUMENTED_API_METHODS.items():
+        setattr(client.api, method, govern(operation, _instrument(operation, getattr(client.api, method))))
+    return client
+
+
+@functools.lru_cache(maxsize=None)
+def _client_class() -> type:
+    # Built on first use so importing this module does not load the Docker SDK
+    class InstrumentedDockerClient(docker.DockerClient):
+        """DockerClient whose `containers.run` is also timed as a whole (create + start)."""
+
+        @property
+        def containers(self):
+            collection = super().containers
+            collection.run = _instrument("containers.run", collection.run)
+            return collection
+
+    return InstrumentedDockerClient
+
+
+def get_docker_client() -> Any:
+    """Return a process-wide Docker client.
+
+    The client is created once and reused so concurrent callers share one
+    connection pool instead of paying for a new handshake on every call.
+    """
+    global _client
+    if not DOCKER_AVAILABLE:
+        raise RuntimeError("Docker is not available")
+    if _client is None:
+        _client = _instrument_client(_client_class().from_env(max_pool_size=settings.DOCKER_MAX_POOL_SIZE))
+    return _client
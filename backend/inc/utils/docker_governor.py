@@ -0,0 +1,241 @@
+# Governs calls to the Docker daemon so an overloaded or stuck daemon slows
+# RunnerPilot down instead of hanging it:
+#  - every non-streaming request gets a per-operation timeout,
+#  - an AIMD limit caps calls in flight and shrinks as read latency rises
+#    above its baseline, then grows back one call per window,
+#  - idempotent reads are retried with jittered exponential backoff,
+#  - a circuit breaker fails calls fast after repeated daemon failures and
+#    lets a single probe through once the cooldown has passed.
+import contextvars
+import functools
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from inc.config import settings
+from inc.utils.lazy_imports import defer
+from inc.utils.metrics import DOCKER_CALLS_REJECTED, DOCKER_CALL_RETRIES, DOCKER_CIRCUIT_OPEN, DOCKER_CONCURRENCY_LIMIT
+
+# Loaded on first use, so importing the app does not pay for the Docker SDK and requests.
+# Other modules take `docker` from here (via docker_client) rather than `import docker`.
+docker = defer("docker")
+requests = defer("requests")
+DOCKER_AVAILABLE = docker is not None
+
+
+# Safe to repeat, so retried on daemon failures
+READ_OPERATIONS = {"list", "get", "images.list", "images.get", "df", "ping", "stats"}
+# Their latency tracks daemon load; other calls also wait on containers or registries
+LATENCY_OPERATIONS = {"list", "get", "images.list", "images.get", "ping"}
+# Heavier calls that get the longer timeout
+SLOW_OPERATIONS = {"create", "remove", "images.remove", "df"}
+# Long by design (pulls, builds, graceful stops, prunes); breaker only, the caller sets any timeout
+UNLIMITED_OPERATIONS = {"pull", "build", "stop", "restart", "prune"}
+
+RETRY_BASE_SECONDS = 0.1
+LATENCY_FLOOR_SECONDS = 0.005  # Jitter below this is not treated as load
+
+_request_timeout: contextvars.ContextVar[Any] = contextvars.ContextVar("docker_request_timeout", default=None)
+_NO_TIMEOUT = object()  # _request_timeout of an UNLIMITED_OPERATIONS call: no read timeout at all
+
+
+class DockerUnavailable(RuntimeError):
+    """Raised without calling Docker while the circuit is open or the daemon is saturated."""
+
+
+class AdaptiveLimiter:
+    """AIMD cap on Docker calls in flight, driven by read latency against a per-operation baseline."""
+
+    def __init__(self, minimum: int, maximum: int, tolerance: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.tolerance = tolerance
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self._baseline: Dict[str, float] = {}
+        self._condition = threading.Condition()
+        DOCKER_CONCURRENCY_LIMIT.labels().set(self.limit)
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, operation: str, latency: Optional[float]) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if latency is not None and operation in LATENCY_OPERATIONS:
+                # Follows the fastest recent latency and drifts up slowly, so a lasting
+                # shift (bigger fleet, slower disk) eventually becomes the new normal
+                baseline = self._baseline.get(operation)
+                baseline = latency if baseline is None else min(latency, baseline * 1.01)
+                self._baseline[operation] = baseline
+                if latency > baseline * self.tolerance + LATENCY_FLOOR_SECONDS:
+                    self._set_limit(self.limit * 0.9)
+                else:
+                    self._set_limit(self.limit + 1.0 / self.limit)
+            self._condition.notify()
+
+    def backoff(self) -> None:
+        """Halve the limit, e.g. after a timeout."""
+        with self._condition:
+            self._set_limit(self.limit * 0.5)
+
+    def _set_limit(self, limit: float) -> None:
+        self.limit = min(float(self.maximum), max(float(self.minimum), limit))
+        DOCKER_CONCURRENCY_LIMIT.labels().set(self.limit)
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, cooldown: float):
+        self.failures = max(1, failures)
+        self.cooldown = cooldown
+        self.state = "closed"  # "closed", "open", "half_open"
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "half_open" and not self._probing:
+                self._probing = True  # Exactly one probe decides whether to close again
+                return True
+            return self.state == "closed"
+
+    def success(self) -> None:
+        with self._lock:
+            self.consecutive = 0
+            self._probing = False
+            if self.state != "closed":
+                self.state = "closed"
+                DOCKER_CIRCUIT_OPEN.labels().set(0)
+
+    def failure(self) -> None:
+        with self._lock:
+            self.consecutive += 1
+            self._probing = False
+            if self.state == "half_open" or self.consecutive >= self.failures:
+                if self.state != "open":
+                    print(f"Warning: Docker circuit opened after {self.consecutive} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                DOCKER_CIRCUIT_OPEN.labels().set(1)
+
+
+_limiter = AdaptiveLimiter(settings.DOCKER_MIN_CONCURRENCY, settings.DOCKER_MAX_CONCURRENCY, settings.DOCKER_LATENCY_TOLERANCE)
+_breaker = CircuitBreaker(settings.DOCKER_BREAKER_FAILURES, settings.DOCKER_BREAKER_COOLDOWN_SECONDS)
+
+
+def circuit_open() -> bool:
+    """True while Docker calls are being failed fast (open or probing)."""
+    return _breaker.state != "closed"
+
+
+def governor_state() -> Dict[str, Any]:
+    return {
+        "circuit": _breaker.state,
+        "concurrency_limit": int(_limiter.limit),
+        "in_flight": _limiter.in_flight,
+    }
+
+
+def _is_daemon_failure(e: Exception) -> bool:
+    """Failures that say the daemon is down or struggling, as opposed to a bad request."""
+    if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return isinstance(e, docker.errors.APIError) and (e.status_code or 0) >= 500
+
+
+def _is_stream(operation: str, kwargs: Dict[str, Any]) -> bool:
+    if operation == "stats":
+        return kwargs.get("stream", True)
+    return bool(kwargs.get("stream") or kwargs.get("follow"))
+
+
+def _timeout_for(operation: str) -> float:
+    if operation in SLOW_OPERATIONS:
+        return settings.DOCKER_SLOW_TIMEOUT_SECONDS
+    return settings.DOCKER_TIMEOUT_SECONDS
+
+
+def _call_once(operation: str, func: Callable, args, kwargs, streaming: bool) -> Any:
+    if not _breaker.allow():
+        DOCKER_CALLS_REJECTED.labels(operation, "circuit_open").inc()
+        raise DockerUnavailable(f"Docker daemon unavailable, {operation} not attempted")
+
+    limited = not streaming and operation not in UNLIMITED_OPERATIONS
+    timeout = _timeout_for(operation)
+    if limited and not _limiter.acquire(timeout):
+        _breaker.failure()
+        DOCKER_CALLS_REJECTED.labels(operation, "overloaded").inc()
+        raise DockerUnavailable(f"Docker daemon overloaded, {operation} waited {timeout}s for a slot")
+
+    latency = None
+    token = _request_timeout.set(None if streaming else _NO_TIMEOUT if operation in UNLIMITED_OPERATIONS else timeout)
+    started = time.monotonic()
+    try:
+        result = func(*args, **kwargs)
+        latency = time.monotonic() - started
+        _breaker.success()
+        return result
+    except Exception as e:
+        if _is_daemon_failure(e):
+            _breaker.failure()
+            if limited and isinstance(e, requests.exceptions.Timeout):
+                _limiter.backoff()
+        else:
+            _breaker.success()  # The daemon answered, just not with what we wanted
+        raise
+    finally:
+        _request_timeout.reset(token)
+        if limited:
+            _limiter.release(operation, latency)
+
+
+def govern(operation: str, func: Callable) -> Callable:
+    """Wrap a low-level Docker API method with timeouts, concurrency limiting, retries and the breaker."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        streaming = _is_stream(operation, kwargs)
+        attempts = 1 + settings.DOCKER_READ_RETRIES if operation in READ_OPERATIONS and not streaming else 1
+        for attempt in range(attempts):
+            if attempt:
+                DOCKER_CALL_RETRIES.labels(operation).inc()
+                time.sleep(random.uniform(0, RETRY_BASE_SECONDS * 2 ** attempt))
+            try:
+                return _call_once(operation, func, args, kwargs, streaming)
+            except Exception as e:
+                if attempt + 1 >= attempts or not _is_daemon_failure(e):
+                    raise
+    return wrapper
+
+
+def install_request_timeouts(api: Any) -> None:
+    """Make the API client use the timeout of the governed call in progress.
+
+    Calls that pass an explicit timeout, such as `stop`, keep it. The other
+    UNLIMITED_OPERATIONS, such as prunes, which can take minutes on a full
+    disk, wait without a read timeout instead of the client's default.
+    """
+    default = api.timeout
+
+    def set_request_timeout(kwargs):
+        timeout = _request_timeout.get()
+        if timeout is _NO_TIMEOUT:
+            kwargs.setdefault("timeout", None)
+        else:
+            kwargs.setdefault("timeout", timeout if timeout is not None else default)
+        return kwargs
+
+    api._set_request_timeout = set_request_timeout
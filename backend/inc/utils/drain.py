@@ -0,0 +1,162 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from inc.config import settings
+from inc.utils.coordination import broadcast, subscribe
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.job_markers import parse_marker
+from inc.utils.job_state import refresh_job_state
+from inc.utils.runner_ops import delete_runner, restart_runner, stop_runner
+from models import RunnerInstance
+
+
+DRAIN_ACTIONS = ("stop", "restart", "delete")
+DRAIN_POLL_SECONDS = 2
+
+_threads: dict = {}
+_threads_lock = threading.Lock()
+
+
+def _watch_for_completion(stream, idle: threading.Event) -> None:
+    """Read a followed log stream and keep `idle` set while no job runs; set it for good when the stream ends.
+
+    The listener can take its next job right after the last one completes,
+    so a "Running job" line after the completion clears `idle` again.
+    """
+    buffer = ""
+    try:
+        for chunk in stream:
+            buffer += chunk.decode("utf-8", errors="replace")
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                marker = parse_marker(line)
+                if marker and marker[0] == "completed":
+                    idle.set()
+                elif marker and marker[0] == "started":
+                    idle.clear()
+    except Exception:
+        pass  # Stream closed by the drain worker or the daemon
+    idle.set()
+
+
+def _finish(instance: RunnerInstance, forced: bool) -> None:
+    """Apply the drain action once the runner is idle or its deadline passed."""
+    action = instance.drain_action
+    try:
+        if action == "delete":
+            delete_runner(instance)
+            return
+        if action == "restart":
+            restart_runner(instance)
+            instance.drain_state = None
+            instance.drain_action = None
+            instance.drain_deadline = None
+        else:
+            stop_runner(instance)
+            instance.drain_state = "forced" if forced else "drained"
+    except Exception as e:
+        print(f"Warning: Drain of {instance.runner_name} failed: {str(e)}")
+        instance.drain_state = "failed"
+    instance.save()
+
+
+def _drain_worker(instance_id: int) -> None:
+    try:
+        instance = RunnerInstance.get_or_none(RunnerInstance.id == instance_id)
+        if instance is None or instance.drain_state != "draining":
+            return
+
+        try:
+            container = get_docker_client().containers.get(instance.runner_name)
+        except docker.errors.NotFound:
+            _finish(instance, forced=False)
+            return
+
+        # Follow from before the idle check so a job finishing in between is not missed
+        since = int(time.time())
+        if container.status != "running":
+            _finish(instance, forced=False)
+            return
+        refresh_job_state(instance, container)
+        if instance.job_state != "busy":
+            _finish(instance, forced=False)
+            return
+
+        idle = threading.Event()
+        stream = container.logs(stream=True, follow=True, stdout=True, stderr=True, since=since)
+        threading.Thread(target=_watch_for_completion, args=(stream, idle), daemon=True).start()
+
+        forced = False
+        try:
+            while True:
+                if idle.wait(DRAIN_POLL_SECONDS):
+                    # Re-read the logs since the completion: a job picked up meanwhile keeps the drain waiting
+                    refresh_job_state(instance, container)
+                    if instance.job_state != "busy":
+                        break
+                    time.sleep(DRAIN_POLL_SECONDS)  # The stream clears `idle` once it sees the new job too
+                instance = RunnerInstance.get_or_none(RunnerInstance.id == instance_id)
+                if instance is None or instance.drain_state != "draining":
+                    return  # Drain cancelled or runner deleted meanwhile
+                if instance.drain_deadline and datetime.now() >= instance.drain_deadline:
+                    forced = True
+                    break
+        finally:
+            stream.close()
+
+        instance = RunnerInstance.get_or_none(RunnerInstance.id == instance_id)
+        if instance is not None and instance.drain_state == "draining":
+            _finish(instance, forced=forced)
+    except Exception as e:
+        print(f"Warning: Drain worker for instance {instance_id} failed: {str(e)}")
+    finally:
+        with _threads_lock:
+            _threads.pop(instance_id, None)
+
+
+def launch_drain(instance_id: int) -> None:
+    """Run the drain of one runner in a background thread unless it is already running here."""
+    with _threads_lock:
+        if instance_id in _threads:
+            return
+        thread = threading.Thread(target=_drain_worker, args=(instance_id,), daemon=True, name=f"drain-{instance_id}")
+        _threads[instance_id] = thread
+    thread.start()
+
+
+def request_drain(instance: RunnerInstance, action: str, timeout_seconds: Optional[int] = None) -> RunnerInstance:
+    """Mark a runner as draining and apply `action` once its current job completes.
+
+    The action is forced when the job is still running after `timeout_seconds`.
+    """
+    if action not in DRAIN_ACTIONS:
+        raise ValueError(f"Unknown drain action '{action}'")
+    timeout_seconds = settings.DRAIN_TIMEOUT_SECONDS if timeout_seconds is None else timeout_seconds
+    instance.drain_state = "draining"
+    instance.drain_action = action
+    instance.drain_deadline = datetime.now() + timedelta(seconds=timeout_seconds)
+    instance.save()
+    broadcast("drain.launch", {"instance_id": instance.id})  # Drains run in the leader worker
+    return instance
+
+
+def cancel_drain(instance: RunnerInstance) -> RunnerInstance:
+    """Put a draining runner back in service; the worker notices on its next poll."""
+    instance.drain_state = None
+    instance.drain_action = None
+    instance.drain_deadline = None
+    instance.save()
+    return instance
+
+
+def resume_drains() -> None:
+    """Relaunch drains interrupted by a backend restart."""
+    if not DOCKER_AVAILABLE:
+        return
+    for instance in RunnerInstance.select().where(RunnerInstance.drain_state == "draining"):
+        launch_drain(instance.id)
+
+
+subscribe("drain.launch", lambda payload: launch_drain(payload["instance_id"]), leader_only=True)
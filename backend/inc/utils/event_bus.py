@@ -0,0 +1,165 @@
+# In-process broadcast of dashboard events over Server-Sent Events.
+#
+# Every event is encoded to SSE bytes once and appended to a shared ring
+# buffer. Clients do not get their own queues: each one keeps a cursor into
+# the ring and awaits one shared future that is resolved on publish or
+# heartbeat, so idle clients cost one suspended task each. A client that
+# falls behind the ring (slow reader) gets a `resync` event instead of
+# making the publisher wait or buffer for it.
+#
+# Events published in one API worker are batched and forwarded to the
+# other workers over the cluster channel. Event ids are per worker, so a
+# client reconnecting to a different worker gets a `resync`.
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from inc.config import settings
+from inc.utils import coordination
+from inc.utils.fast_json import dumps
+
+# Ids are "<boot>-<seq>" so a Last-Event-ID from before a restart is recognised as unknown
+BOOT_ID = os.urandom(4).hex()
+
+_ring: Deque[Tuple[int, bytes]] = deque(maxlen=settings.SSE_REPLAY_EVENTS)
+_ring_lock = threading.Lock()
+_sequence = 0
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_signal: Optional[asyncio.Future] = None
+_clients = 0
+_outbox: Optional[List[Tuple[str, Dict[str, Any]]]] = None  # Events for the other workers; None until started
+_outbox_lock = threading.Lock()
+
+
+def _encode(event_id: str, event: str, data: Any) -> bytes:
+    return f"id: {event_id}\nevent: {event}\ndata: ".encode() + dumps(data) + b"\n\n"
+
+
+def _wake() -> None:
+    """Resolve the shared future all waiting clients await and arm a new one. Loop thread only."""
+    global _signal
+    signal, _signal = _signal, _loop.create_future()
+    if signal is not None and not signal.done():
+        signal.set_result(None)
+
+
+def publish(event: str, data: Dict[str, Any]) -> None:
+    """Broadcast an event to every connected dashboard. Safe to call from any thread."""
+    with _outbox_lock:
+        if _outbox is not None:
+            _outbox.append((event, data))
+    _publish_local(event, data)
+
+
+def _publish_local(event: str, data: Dict[str, Any]) -> None:
+    global _sequence
+    with _ring_lock:
+        _sequence += 1
+        _ring.append((_sequence, _encode(f"{BOOT_ID}-{_sequence}", event, data)))
+    if _loop is not None and _clients:
+        try:
+            _loop.call_soon_threadsafe(_wake)
+        except RuntimeError:
+            pass  # Loop closed during shutdown
+
+
+async def _heartbeat() -> None:
+    while True:
+        await asyncio.sleep(settings.SSE_HEARTBEAT_SECONDS)
+        if _clients:
+            _wake()
+
+
+def _forward_loop() -> None:
+    """Send this worker's events to the other workers, one message per batch."""
+    global _outbox
+    while True:
+        time.sleep(settings.CLUSTER_POLL_MS / 1000.0)
+        with _outbox_lock:
+            batch, _outbox = _outbox, []
+        if batch:
+            try:
+                coordination.broadcast("events", {"events": batch}, local=False)
+            except Exception as e:
+                print(f"Warning: Could not forward {len(batch)} events to other workers: {str(e)}")
+
+
+def _receive(payload: Dict[str, Any]) -> None:
+    for event, data in payload["events"]:
+        _publish_local(event, data)
+
+
+def start_event_bus() -> None:
+    """Bind the bus to the running event loop and start the shared heartbeat. Call on startup."""
+    global _loop, _signal, _outbox
+    _loop = asyncio.get_running_loop()
+    _signal = _loop.create_future()
+    _loop.create_task(_heartbeat())
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = []
+            threading.Thread(target=_forward_loop, daemon=True, name="event-forward").start()
+
+
+def _parse_last_event_id(last_event_id: Optional[str]) -> Optional[int]:
+    if not last_event_id:
+        return None
+    boot, _, sequence = last_event_id.partition("-")
+    if boot != BOOT_ID or not sequence.isdigit():
+        return None
+    return int(sequence)
+
+
+def _pending(cursor: int) -> Tuple[int, list, bool]:
+    """Encoded events after `cursor`, the new cursor, and whether events were lost."""
+    with _ring_lock:
+        if not _ring:
+            return max(cursor, _sequence), [], False
+        oldest = _ring[0][0]
+        if cursor < oldest - 1:
+            return _sequence, [], True
+        return _sequence, [chunk for sequence, chunk in _ring if sequence > cursor], False
+
+
+async def subscribe(last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+    """Yield SSE chunks for one client, replaying from `last_event_id` when still buffered."""
+    global _clients
+    if _loop is None:
+        start_event_bus()
+
+    resume_from = _parse_last_event_id(last_event_id)
+    with _ring_lock:
+        head = _sequence
+    cursor = head
+    _clients += 1
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n".encode()
+        if last_event_id and resume_from is None:
+            # Unknown or pre-restart id: the client cannot be caught up from the ring
+            yield _encode(f"{BOOT_ID}-{head}", "resync", {"reason": "unknown last event id"})
+        elif resume_from is not None:
+            cursor = min(resume_from, head)
+
+        while True:
+            signal = _signal
+            cursor, chunks, lost = _pending(cursor)
+            if lost:
+                yield _encode(f"{BOOT_ID}-{cursor}", "resync", {"reason": "client fell behind"})
+            elif chunks:
+                # One write per wakeup; a slow client only delays itself
+                yield b"".join(chunks)
+            else:
+                yield b": heartbeat\n\n"
+            await signal
+    finally:
+        _clients -= 1
+
+
+def client_count() -> int:
+    return _clients
+
+
+coordination.subscribe("events", _receive)
@@ -0,0 +1,26 @@
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes, via orjson when installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response for plain dicts and lists that skips FastAPI's validation and encoding pass."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
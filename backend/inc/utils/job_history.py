@@ -0,0 +1,177 @@
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from peewee import EXCLUDED, Case, fn
+
+from inc.config import settings
+from inc.db import db
+from models import JobRollupDay, JobRollupHour, JobRollupMinute, JobRun, RunnerInstance
+
+# Upper bounds (seconds) of the job duration histogram; the last bucket is open ended
+DURATION_BUCKETS = [5, 10, 15, 30, 60, 120, 180, 300, 600, 900, 1200, 1800, 2700, 3600, 5400, 7200, 10800, 21600]
+
+ROLLUPS = {
+    "minute": JobRollupMinute,
+    "hour": JobRollupHour,
+    "day": JobRollupDay,
+}
+
+FLEET_LABEL = "*"
+COUNTERS = ("jobs", "failed_jobs", "duration_sum", "busy_seconds", "capacity_seconds")
+
+_prune_lock = threading.Lock()
+_last_prune: Optional[datetime] = None
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _duration_bucket(seconds: float) -> int:
+    for index, bound in enumerate(DURATION_BUCKETS):
+        if seconds <= bound:
+            return index
+    return len(DURATION_BUCKETS)
+
+
+def _rollup_keys(instance: RunnerInstance) -> List[Tuple[str, str]]:
+    """(label, repo) pairs a runner contributes to: each of its labels plus the fleet total."""
+    labels = [label.strip() for label in (instance.labels or "").split(",") if label.strip()]
+    return [(label, instance.github_url) for label in labels] + [(FLEET_LABEL, instance.github_url)]
+
+
+def _apply(granularity: str, bucket: datetime, label: str, repo: str, delta: Dict[str, Any]) -> None:
+    """Add `delta` to one rollup row, creating it on first use.
+
+    A single upsert that adds in SQL, so writers in other threads or API
+    workers never overwrite each other's increments.
+    """
+    model = ROLLUPS[granularity]
+    values: Dict[str, Any] = {name: delta.get(name, 0) for name in COUNTERS}
+    update = {getattr(model, name): getattr(model, name) + getattr(EXCLUDED, name) for name in COUNTERS}
+    if "duration_bucket" in delta:
+        hist = [0] * (len(DURATION_BUCKETS) + 1)
+        hist[delta["duration_bucket"]] = 1
+        values["duration_hist"] = json.dumps(hist)
+        path = f"$[{delta['duration_bucket']}]"
+        update[model.duration_hist] = Case(None, [(
+            # Rows created by capacity accounting start with an empty histogram
+            fn.json_array_length(fn.COALESCE(model.duration_hist, "[]")) == 0, EXCLUDED.duration_hist,
+        )], fn.json_set(model.duration_hist, path, fn.json_extract(model.duration_hist, path) + 1))
+    model.insert(bucket_start=bucket, label=label, repo=repo, **values).on_conflict(
+        conflict_target=[model.bucket_start, model.label, model.repo],
+        update=update,
+    ).execute()
+
+
+def record_job_events(instance: RunnerInstance, events: Iterable[Dict[str, Any]]) -> None:
+    """Store completed jobs in the history and add them to every rollup granularity."""
+    completed = [event for event in events if event["kind"] == "completed"]
+    if not completed:
+        return
+
+    with db.atomic():
+        for event in completed:
+            started_at = event.get("started_at")
+            duration = (event["at"] - started_at).total_seconds() if started_at else None
+            JobRun.create(
+                runner_id=instance.id,
+                runner_name=instance.runner_name,
+                repo=instance.github_url,
+                labels=instance.labels,
+                job_name=event["job"],
+                result=event["result"],
+                started_at=started_at,
+                finished_at=event["at"],
+                duration_seconds=duration,
+            )
+
+            delta: Dict[str, Any] = {"jobs": 1, "failed_jobs": int(event["result"] != "Succeeded")}
+            if duration is not None:
+                delta["duration_sum"] = duration
+                delta["duration_bucket"] = _duration_bucket(duration)
+            for granularity in ROLLUPS:
+                bucket = bucket_start(event["at"], granularity)
+                for label, repo in _rollup_keys(instance):
+                    _apply(granularity, bucket, label, repo, delta)
+
+
+def record_capacity(instances: Iterable[RunnerInstance], elapsed_seconds: float, now: Optional[datetime] = None) -> None:
+    """Account `elapsed_seconds` of capacity (and busy time) for every online runner."""
+    now = now or datetime.now()
+    totals: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(lambda: {"busy_seconds": 0.0, "capacity_seconds": 0.0})
+    for instance in instances:
+        if instance.job_state not in ("idle", "busy"):
+            continue
+        for key in _rollup_keys(instance):
+            totals[key]["capacity_seconds"] += elapsed_seconds
+            if instance.job_state == "busy":
+                totals[key]["busy_seconds"] += elapsed_seconds
+
+    if not totals:
+        return
+    with db.atomic():
+        for granularity in ROLLUPS:
+            bucket = bucket_start(now, granularity)
+            for (label, repo), delta in totals.items():
+                _apply(granularity, bucket, label, repo, delta)
+    _prune(now)
+
+
+def _prune(now: datetime) -> None:
+    """Drop fine-grained rows past their retention, at most once an hour."""
+    global _last_prune
+    with _prune_lock:
+        if _last_prune and now - _last_prune < timedelta(hours=1):
+            return
+        _last_prune = now
+    JobRollupMinute.delete().where(
+        JobRollupMinute.bucket_start < now - timedelta(hours=settings.ROLLUP_MINUTE_RETENTION_HOURS)
+    ).execute()
+    JobRollupHour.delete().where(
+        JobRollupHour.bucket_start < now - timedelta(days=settings.ROLLUP_HOUR_RETENTION_DAYS)
+    ).execute()
+    JobRun.delete().where(
+        JobRun.finished_at < now - timedelta(days=settings.JOB_HISTORY_RETENTION_DAYS)
+    ).execute()
+
+
+def pick_granularity(since: datetime, until: datetime) -> str:
+    """Coarsest-enough granularity so a query touches at most a few hundred buckets per key."""
+    span = until - since
+    if span <= timedelta(hours=6):
+        return "minute"
+    if span <= timedelta(days=14):
+        return "hour"
+    return "day"
+
+
+def percentile_from_hist(hist: List[int], percentile: float) -> Optional[float]:
+    """Estimate a percentile from histogram counts, interpolating inside the bucket."""
+    total = sum(hist)
+    if not total:
+        return None
+    rank = total * percentile / 100.0
+    seen = 0
+    for index, count in enumerate(hist):
+        if count and seen + count >= rank:
+            lower = DURATION_BUCKETS[index - 1] if index > 0 else 0
+            upper = DURATION_BUCKETS[index] if index < len(DURATION_BUCKETS) else DURATION_BUCKETS[-1]
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return float(DURATION_BUCKETS[-1])
+
+
+def merge_hists(raw_hists: Iterable[str]) -> List[int]:
+    merged = [0] * (len(DURATION_BUCKETS) + 1)
+    for raw in raw_hists:
+        for index, count in enumerate(json.loads(raw or "[]")):
+            merged[index] += count
+    return merged
@@ -0,0 +1,28 @@
+import re
+from typing import Optional, Tuple
+
+# Lines printed by the Actions runner listener, e.g.
+#   2024-05-01 10:00:00Z: Listening for Jobs
+#   2024-05-01 10:00:05Z: Running job: build
+#   2024-05-01 10:03:12Z: Job build completed with result: Succeeded
+LISTENING_RE = re.compile(r"Listening for Jobs")
+RUNNING_JOB_RE = re.compile(r"Running job: (?P<job>.+?)\s*$")
+JOB_COMPLETED_RE = re.compile(r"Job (?P<job>.+?) completed with result: (?P<result>\w+)")
+
+
+def parse_marker(line: str) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+    """Classify a runner log line.
+
+    Returns (kind, job_name, result) where kind is "listening", "started" or
+    "completed", or None when the line is not a job marker.
+    """
+    match = JOB_COMPLETED_RE.search(line)
+    if match:
+        return "completed", match.group("job"), match.group("result")
+    match = RUNNING_JOB_RE.search(line)
+    if match:
+        return "started", match.group("job"), None
+    if LISTENING_RE.search(line):
+        return "listening", None, None
+    return None
+
@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from inc.config import settings
+from inc.db import db
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.job_history import record_capacity, record_job_events
+from inc.utils.job_markers import parse_marker
+from models import RunnerInstance
+
+
+_tracker: Optional[threading.Thread] = None
+_tracker_lock = threading.Lock()
+_refresh_locks: Dict[int, threading.Lock] = defaultdict(threading.Lock)
+
+JOB_STATE_FIELDS = (
+    RunnerInstance.job_state,
+    RunnerInstance.job_name,
+    RunnerInstance.job_started_at,
+    RunnerInstance.log_cursor,
+)
+
+
+def _parse_timestamp(value: str) -> Tuple[int, int]:
+    """Parse a Docker RFC3339Nano timestamp into (epoch seconds, nanoseconds).
+
+    Docker trims trailing zeros from the fraction, so timestamps are compared
+    as numbers rather than strings.
+    """
+    value = value.rstrip("Z")
+    whole, _, fraction = value.partition(".")
+    seconds = int(datetime.strptime(whole, "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc).timestamp())
+    nanos = int((fraction + "000000000")[:9]) if fraction else 0
+    return seconds, nanos
+
+
+def _to_datetime(timestamp: Tuple[int, int]) -> datetime:
+    """Local naive datetime, matching the other DateTimeFields in the DB."""
+    return datetime.fromtimestamp(timestamp[0] + timestamp[1] / 1e9)
+
+
+def _read_new_lines(container: Any, cursor: Optional[str]) -> List[Tuple[str, Tuple[int, int], str]]:
+    """Return (raw_timestamp, parsed_timestamp, text) for log lines after `cursor`."""
+    cursor_ts = _parse_timestamp(cursor) if cursor else None
+    kwargs: Dict[str, Any] = {"stdout": True, "stderr": True, "timestamps": True}
+    if cursor_ts:
+        # Whole seconds keep this portable across daemons; lines up to the cursor are skipped below
+        kwargs["since"] = cursor_ts[0]
+    raw = container.logs(**kwargs).decode("utf-8", errors="replace")
+
+    lines = []
+    for line in raw.splitlines():
+        stamp, _, text = line.partition(" ")
+        try:
+            parsed = _parse_timestamp(stamp)
+        except ValueError:
+            continue
+        if cursor_ts and parsed <= cursor_ts:
+            continue
+        lines.append((stamp, parsed, text))
+    return lines
+
+
+def refresh_job_state(instance: RunnerInstance, container: Any = None) -> List[Dict[str, Any]]:
+    """Advance the job state machine of a runner over log lines it has not seen yet.
+
+    Only the timestamp of the last parsed line is stored, so each line is
+    parsed once. Returns the job events found, oldest first, as dicts with
+    "kind" ("started" or "completed"), "job", "result" and "at"; completed
+    events also carry the "started_at" of the job when it was seen.
+    """
+    with _refresh_locks[instance.id]:
+        # Another thread may have advanced the cursor since `instance` was loaded
+        fresh = RunnerInstance.get_or_none(RunnerInstance.id == instance.id)
+        if fresh is None:
+            return []
+        for field in JOB_STATE_FIELDS:
+            setattr(instance, field.name, getattr(fresh, field.name))
+        return _advance(instance, container)
+
+
+def _advance(instance: RunnerInstance, container: Any) -> List[Dict[str, Any]]:
+    if container is None:
+        try:
+            container = get_docker_client().containers.get(instance.runner_name)
+        except docker.errors.NotFound:
+            container = None
+
+    if container is None or container.status != "running":
+        if instance.job_state != "offline":
+            instance.job_state = "offline"
+            instance.job_name = None
+            instance.job_started_at = None
+            instance.save(only=JOB_STATE_FIELDS)
+        return []
+
+    events: List[Dict[str, Any]] = []
+    state = instance.job_state if instance.job_state in ("idle", "busy") else None
+    job_name = instance.job_name
+    job_started_at = instance.job_started_at
+    cursor = instance.log_cursor
+
+    for stamp, parsed, text in _read_new_lines(container, instance.log_cursor):
+        cursor = stamp
+        marker = parse_marker(text)
+        if marker is None:
+            continue
+        kind, job, result = marker
+        at = _to_datetime(parsed)
+        if kind == "started":
+            state, job_name, job_started_at = "busy", job, at
+            events.append({"kind": "started", "job": job, "result": None, "at": at})
+        elif kind == "completed":
+            events.append({"kind": "completed", "job": job, "result": result, "at": at, "started_at": job_started_at})
+            state, job_name, job_started_at = "idle", None, None
+        else:
+            state, job_name, job_started_at = "idle", None, None
+
+    # A running container that has not printed a marker yet is still configuring
+    state = state or "starting"
+    # Jobs are recorded in the transaction that moves the cursor past them, the
+    # cursor last, so a crash in between neither loses nor double counts a job
+    with db.atomic():
+        record_job_events(instance, events)
+        if (state, job_name, job_started_at) != (instance.job_state, instance.job_name, instance.job_started_at):
+            instance.job_state = state
+            instance.job_name = job_name
+            instance.job_started_at = job_started_at
+            instance.log_cursor = cursor
+            instance.save(only=JOB_STATE_FIELDS)
+        elif cursor != instance.log_cursor:
+            # Only the cursor moved: nothing visible changed, so the runner revision stays
+            instance.log_cursor = cursor
+            instance.save(only=[RunnerInstance.log_cursor])
+    return events
+
+
+def refresh_all_job_states() -> List[RunnerInstance]:
+    """Refresh every runner using a single container list call."""
+    instances = list(RunnerInstance.select())
+    managed = {instance.runner_name for instance in instances}
+    containers = {}
+    # Sparse listing skips the per-container inspect docker-py otherwise does;
+    # the listing's "State" string is all `container.status` needs
+    for container in get_docker_client().containers.list(all=True, sparse=True):
+        for name in container.attrs.get("Names") or []:
+            if name.lstrip("/") in managed:
+                containers[name.lstrip("/")] = container
+    for instance in instances:
+        try:
+            refresh_job_state(instance, containers.get(instance.runner_name))
+        except Exception as e:
+            print(f"Warning: Failed to refresh job state of {instance.runner_name}: {str(e)}")
+    return instances
+
+
+def _tracker_loop() -> None:
+    last_tick = time.monotonic()
+    while True:
+        try:
+            instances = refresh_all_job_states()
+            now = time.monotonic()
+            # Cap the interval so a stalled loop does not book hours of capacity at once
+            record_capacity(instances, min(now - last_tick, 2 * settings.JOB_STATE_POLL_SECONDS))
+            last_tick = now
+        except Exception as e:
+            print(f"Warning: Job state tracker failed: {str(e)}")
+        time.sleep(settings.JOB_STATE_POLL_SECONDS)
+
+
+def start_job_state_tracker() -> None:
+    """Start the background loop that keeps runner job states current."""
+    global _tracker
+    if not DOCKER_AVAILABLE:
+        return
+    with _tracker_lock:
+        if _tracker is not None and _tracker.is_alive():
+            return
+        _tracker = threading.Thread(target=_tracker_loop, daemon=True, name="job-state-tracker")
+        _tracker.start()
@@ -0,0 +1,28 @@
+# Deferred loading of heavy third-party modules.
+#
+# `defer("docker")` returns a module whose body runs on first attribute
+# access, moving its import cost from process start to the first call that
+# actually needs it. Share the returned object instead of writing
+# `import docker` elsewhere: an import statement inspects the module and so
+# loads it right away.
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Optional
+
+
+def defer(name: str) -> Optional[ModuleType]:
+    """Register `name` for loading on first use; None when it is not installed."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        return None
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
@@ -0,0 +1,158 @@
+# Bounded container logs for runners.
+#
+# Left to the daemon's default json-file driver, a chatty build grows its
+# runner's log without limit, and every log read (job state, drains, the
+# logs endpoint) has the daemon scan a larger file. Runners are created with
+# a driver that rotates at max_size and keeps max_file files, so a runner
+# never holds more than max_size * max_file of logs on the host:
+#
+#   local      Docker's compact binary format, cheaper to write and read (default)
+#   json-file  the daemon's default, for tools that read the files directly
+#
+# A template's `log_config` overrides the RUNNER_LOG_* settings for its
+# runners. Containers keep the configuration they were created with, so
+# migrate_log_config() recreates runners whose containers differ, each once
+# it is idle.
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from inc.config import settings
+from inc.utils.docker_client import docker, get_docker_client
+
+LOG_DRIVERS = ("local", "json-file")
+SIZE_UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+MIGRATE_POLL_SECONDS = 5
+
+
+def log_config(template: Any) -> Dict[str, Any]:
+    """The template's log settings with the RUNNER_LOG_* defaults filled in."""
+    spec = json.loads(template.log_config) if template is not None and template.log_config else {}
+    return {
+        "driver": spec.get("driver") or settings.RUNNER_LOG_DRIVER,
+        "max_size": spec.get("max_size") or settings.RUNNER_LOG_MAX_SIZE,
+        "max_file": spec.get("max_file") or settings.RUNNER_LOG_MAX_FILE,
+        "compress": spec.get("compress", settings.RUNNER_LOG_COMPRESS),
+    }
+
+
+def docker_log_config(template: Any) -> Dict[str, Any]:
+    """The `log_config` argument for containers.run; the daemon takes every option as a string."""
+    config = log_config(template)
+    return {
+        "type": config["driver"],
+        "config": {
+            "max-size": config["max_size"],
+            "max-file": str(config["max_file"]),
+            "compress": "true" if config["compress"] else "false",
+        },
+    }
+
+
+def size_bytes(size: str) -> int:
+    """Bytes in a Docker size option like "20m"."""
+    unit = SIZE_UNITS.get(size[-1:].lower())
+    return int(size[:-1]) * unit if unit else int(size)
+
+
+def max_log_bytes(template: Any) -> int:
+    """Most log data a runner of `template` keeps on the host, compression aside."""
+    config = log_config(template)
+    return size_bytes(config["max_size"]) * config["max_file"]
+
+
+def container_log_config(attrs: Dict[str, Any]) -> Dict[str, Any]:
+    config = (attrs.get("HostConfig") or {}).get("LogConfig") or {}
+    return {"type": config.get("Type") or "json-file", "config": config.get("Config") or {}}
+
+
+def log_config_current(attrs: Dict[str, Any], template: Any) -> bool:
+    """Whether a container, by its inspect data, was created with the log settings it should have."""
+    current, wanted = container_log_config(attrs), docker_log_config(template)
+    # The daemon may add its own default options (daemon.json log-opts) to the ones given
+    return current["type"] == wanted["type"] and all(current["config"].get(k) == v for k, v in wanted["config"].items())
+
+
+# -------- Migration ---------
+
+def _recreate_image(attrs: Dict[str, Any]) -> str:
+    """Image to recreate a container from: the base of a template's derived image, so it is not derived twice."""
+    from inc.utils.derived_images import BASE_LABEL
+
+    try:
+        labels = (get_docker_client().images.get(attrs["Image"]).attrs.get("Config") or {}).get("Labels") or {}
+    except docker.errors.ImageNotFound:
+        labels = {}
+    return labels.get(BASE_LABEL) or attrs["Config"]["Image"]
+
+
+def outdated_runners(labels: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Runners whose containers do not have their template's log settings yet."""
+    from inc.utils.runner_ops import runner_template, select_instances
+
+    client = get_docker_client()
+    outdated = []
+    for instance in select_instances(labels=labels):
+        try:
+            attrs = client.containers.get(instance.runner_name).attrs
+        except docker.errors.NotFound:
+            continue  # Gets the current settings when it is created
+        template = runner_template(instance)
+        if not log_config_current(attrs, template):
+            outdated.append({"instance": instance, "attrs": attrs, "current": container_log_config(attrs), "wanted": docker_log_config(template)})
+    return outdated
+
+
+def _migrate(instance: Any, attrs: Dict[str, Any], token: Optional[str] = None) -> None:
+    from inc.utils.runner_ops import recreate_runner
+
+    # Stopped and drained runners are only created, so they stay out of service and never register a job
+    recreate_runner(instance, image=_recreate_image(attrs), start=attrs["State"].get("Running", False), token=token)
+
+
+def migrate_log_config(
+    labels: Optional[str] = None,
+    wait_seconds: Optional[int] = None,
+    token: Optional[str] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """Recreate runners with outdated log settings, one at a time and only while idle.
+
+    Busy runners are retried until `wait_seconds` (DRAIN_TIMEOUT_SECONDS by
+    default) have passed, then left for the next migration. Runners being
+    drained are skipped. Recreated runners register with `token`, or with
+    their stored token when none is given. Progress is derived from the containers, so an
+    interrupted migration picks up where it stopped.
+    """
+    from inc.utils.job_state import refresh_job_state
+
+    wait_seconds = settings.DRAIN_TIMEOUT_SECONDS if wait_seconds is None else wait_seconds
+    deadline = time.monotonic() + wait_seconds
+    total = len(outdated_runners(labels))
+    migrated: List[str] = []
+    failed: List[Dict[str, str]] = []
+    while True:
+        busy: List[str] = []
+        skipped: List[str] = []
+        for entry in outdated_runners(labels):
+            instance, attrs = entry["instance"], entry["attrs"]
+            if instance.runner_name in {f["runner_name"] for f in failed}:
+                continue
+            if instance.drain_state == "draining":
+                skipped.append(instance.runner_name)
+                continue
+            if attrs["State"].get("Running"):
+                refresh_job_state(instance, get_docker_client().containers.get(instance.runner_name))
+                if instance.job_state == "busy":
+                    busy.append(instance.runner_name)
+                    continue
+            try:
+                _migrate(instance, attrs, token)
+                migrated.append(instance.runner_name)
+            except Exception as e:
+                failed.append({"runner_name": instance.runner_name, "error": str(e)})
+            if on_progress:
+                on_progress(len(migrated) + len(failed), total)
+        if not busy or time.monotonic() >= deadline:
+            return {"migrated": migrated, "failed": failed, "busy": busy, "skipped": skipped}
+        time.sleep(MIGRATE_POLL_SECONDS)
@@ -0,0 +1,248 @@
+# Minimal Prometheus metrics: counters, gauges and pre-bucketed histograms.
+# Updates are plain writes on per-label children without locks; a lost
+# increment under thread contention is an accepted trade for hot paths.
+# Metrics live in the process that records them; cluster_metrics collects
+# the other API workers' exports so one scrape covers them all.
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def export(self) -> List[List[Any]]:
+        """[label values, state] of every child, JSON serialisable."""
+        return [[list(values), child.state()] for values, child in list(self._children.items())]
+
+    def render(self, workers: Optional[Dict[str, List[List[Any]]]] = None) -> List[str]:
+        """Exposition lines; with `workers` ({worker: export}), every worker's series with a `worker` label."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        if workers is None:
+            for values, child in list(self._children.items()):
+                lines.extend(child.render(self.name, self.labelnames, values))
+            return lines
+        labelnames = self.labelnames + ("worker",)
+        for worker, series in workers.items():
+            for values, state in series:
+                child = self._new_child()
+                child.load(state)
+                lines.extend(child.render(self.name, labelnames, tuple(values) + (worker,)))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def state(self) -> float:
+        return self.value
+
+    def load(self, state: float) -> None:
+        self.value = state
+
+    def render(self, name: str, labelnames, values) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, values)} {self.value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def state(self) -> List[Any]:
+        return [list(self.counts), self.sum]
+
+    def load(self, state: List[Any]) -> None:
+        self.counts, self.sum = list(state[0]), state[1]
+
+    def render(self, name: str, labelnames, values) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+        cumulative += self.counts[-1]
+        le = 'le="+Inf"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, values)} {self.sum}")
+        lines.append(f"{name}_count{_format_labels(labelnames, values)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+
+REGISTRY: List[_Metric] = []
+
+
+def export_metrics() -> Dict[str, List[List[Any]]]:
+    """This process's metrics by name, for other workers to render."""
+    return {metric.name: metric.export() for metric in REGISTRY}
+
+
+def render_metrics(workers: Optional[Dict[str, Dict[str, List[List[Any]]]]] = None) -> str:
+    """Prometheus text of this process, or of every worker in `workers` ({worker: export_metrics()})."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        if workers is None:
+            lines.extend(metric.render())
+        else:
+            lines.extend(metric.render({worker: export.get(metric.name, []) for worker, export in workers.items()}))
+    return "\n".join(lines) + "\n"
+
+
+# -------- RunnerPilot metrics ---------
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "runnerpilot_http_request_duration_seconds",
+    "HTTP request latency until the response starts, by route template",
+    ("method", "route", "status"),
+)
+DOCKER_CALL_SECONDS = Histogram(
+    "runnerpilot_docker_call_duration_seconds",
+    "Docker SDK call latency by operation",
+    ("operation",),
+)
+DOCKER_CALL_ERRORS = Counter(
+    "runnerpilot_docker_call_errors_total",
+    "Docker SDK calls that raised, by operation and exception type",
+    ("operation", "error"),
+)
+DB_QUERY_SECONDS = Histogram(
+    "runnerpilot_db_query_duration_seconds",
+    "Peewee query latency by statement type",
+    ("statement",),
+)
+ACTIVE_LOG_STREAMS = Gauge(
+    "runnerpilot_active_log_streams",
+    "Container log streams currently being served",
+)
+ACTIVE_CLONE_OPERATIONS = Gauge(
+    "runnerpilot_active_clone_operations",
+    "Clone operations currently in progress",
+)
+DOCKER_CONCURRENCY_LIMIT = Gauge(
+    "runnerpilot_docker_concurrency_limit",
+    "Current adaptive limit on Docker calls in flight",
+)
+DOCKER_CIRCUIT_OPEN = Gauge(
+    "runnerpilot_docker_circuit_open",
+    "1 while the Docker circuit breaker is failing calls fast",
+)
+DOCKER_CALLS_REJECTED = Counter(
+    "runnerpilot_docker_calls_rejected_total",
+    "Docker calls failed without reaching the daemon, by operation and reason",
+    ("operation", "reason"),
+)
+DOCKER_CALL_RETRIES = Counter(
+    "runnerpilot_docker_call_retries_total",
+    "Retried idempotent Docker reads by operation",
+    ("operation",),
+)
+STARTUP_PHASE_SECONDS = Gauge(
+    "runnerpilot_startup_phase_seconds",
+    "Time spent in each startup phase of this worker",
+    ("phase",),
+)
+REGISTRY_MIRROR_REQUESTS = Gauge(
+    "runnerpilot_registry_mirror_requests",
+    "Pulls served by the registry mirror from its cache (hit) or upstream (miss), by kind",
+    ("kind", "result"),
+)
+REGISTRY_MIRROR_BYTES = Gauge(
+    "runnerpilot_registry_mirror_bytes",
+    "Size of the blobs cached by the registry mirror",
+)
+REGISTRY_MIRROR_EVICTED_BYTES = Counter(
+    "runnerpilot_registry_mirror_evicted_bytes_total",
+    "Bytes of least recently used blobs evicted from the registry mirror",
+)
+CAPACITY_TARGET = Gauge(
+    "runnerpilot_capacity_target_runners",
+    "Runner count a capacity schedule asks for right now",
+    ("schedule",),
+)
+CAPACITY_RUNNERS = Gauge(
+    "runnerpilot_capacity_running_runners",
+    "Runners of a capacity schedule's group found running at its last reconcile",
+    ("schedule",),
+)
+DISK_USED_RATIO = Gauge(
+    "runnerpilot_disk_used_ratio",
+    "Share of the disk holding Docker's data that is in use",
+)
+DISK_GC_RECLAIMED_BYTES = Counter(
+    "runnerpilot_disk_gc_reclaimed_bytes_total",
+    "Bytes reclaimed by the disk-pressure manager, by step",
+    ("step",),
+)
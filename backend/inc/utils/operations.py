@@ -0,0 +1,265 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Set
+
+from fastapi.responses import JSONResponse
+
+from inc.config import settings
+from inc.utils.capacity import reconcile
+from inc.utils.coordination import broadcast, subscribe
+from inc.utils.derived_images import build_derived_image, gc_derived_images
+from inc.utils.disk_gc import run_gc
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.event_bus import publish
+from inc.utils.log_config import migrate_log_config
+from inc.utils.release_cache import ensure_runner_install, list_releases
+from inc.utils.runner_ops import clone_runners, delete_runner, provision_runner, restart_runner
+from inc.utils.tracing import start_span
+from models import CapacitySchedule, Operation, RunnerInstance, RunnerTemplate
+
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_scheduled: Set[int] = set()  # Operations submitted to the pool in this process
+_lock = threading.Lock()
+
+
+def operation_data(operation: Operation) -> Dict[str, Any]:
+    """Public view of an operation; its params are left out since they may hold tokens."""
+    return {
+        "id": operation.id,
+        "kind": operation.kind,
+        "status": operation.status,
+        "progress": operation.progress,
+        "total": operation.total,
+        "message": operation.message,
+        "result": json.loads(operation.result) if operation.result else None,
+        "attempts": operation.attempts,
+        "created_at": operation.created_at.isoformat(),
+        "started_at": operation.started_at.isoformat() if operation.started_at else None,
+        "updated_at": operation.updated_at.isoformat(),
+    }
+
+
+def _announce(operation: Operation) -> None:
+    data = operation_data(operation)
+    data.pop("result")  # Clone results grow with every runner; poll the operation for them
+    publish("operation.updated", data)
+
+
+def _update(operation_id: int, **fields) -> None:
+    fields["updated_at"] = datetime.now()
+    Operation.update(**fields).where(Operation.id == operation_id).execute()
+    operation = Operation.get_or_none(Operation.id == operation_id)
+    if operation is not None:
+        _announce(operation)
+
+
+# -------- Handlers ---------
+# Each handler may run again after a restart interrupted it, so it has to
+# pick up from whatever state the previous attempt left behind.
+
+def _run_create(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    if not DOCKER_AVAILABLE:
+        raise RuntimeError("Docker is not available")
+    instance = RunnerInstance.get_or_none(RunnerInstance.id == params["instance_id"])
+    if instance is None:
+        raise RuntimeError(f"Instance {params['instance_id']} was deleted")
+    try:
+        # Started by an interrupted attempt; just record it
+        container = get_docker_client().containers.get(instance.runner_name)
+        instance.hostname = container.id
+        instance.image_digest = container.attrs.get("Image")
+        instance.save()
+    except docker.errors.NotFound:
+        success, message = provision_runner(instance)
+        if not success:
+            raise RuntimeError(message)
+    return {"instance_id": instance.id, "runner_name": instance.runner_name, "container_id": instance.hostname}
+
+
+def _run_clone(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    instance = RunnerInstance.get_or_none(RunnerInstance.id == params["instance_id"])
+    if instance is None:
+        raise RuntimeError(f"Instance {params['instance_id']} not found")
+    previous = json.loads(operation.result) if operation.result else {}
+
+    def on_progress(created, failed, pending):
+        # `pending` is stored before the clone is created, so a resumed operation adopts it
+        _update(
+            operation.id,
+            progress=len(created) + len(failed),
+            result=json.dumps({"created_instances": created, "failed_clones": failed, "pending": pending}),
+        )
+
+    return clone_runners(
+        instance,
+        params["count"],
+        token=params.get("token"),
+        created_instances=previous.get("created_instances"),
+        failed_clones=previous.get("failed_clones"),
+        on_progress=on_progress,
+        pending=previous.get("pending"),
+    )
+
+
+def _run_restart(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    if not DOCKER_AVAILABLE:
+        raise RuntimeError("Docker is not available")
+    instance = RunnerInstance.get_or_none(RunnerInstance.id == params["instance_id"])
+    if instance is None:
+        raise RuntimeError(f"Instance {params['instance_id']} not found")
+    try:
+        return restart_runner(instance)
+    except docker.errors.NotFound:
+        raise RuntimeError(f"Container not found for instance {instance.id}")
+
+
+def _run_delete(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    instance = RunnerInstance.get_or_none(RunnerInstance.id == params["instance_id"])
+    if instance is None:
+        # Deleted by an interrupted attempt
+        return {"status": "ok", "message": f"Instance {params['instance_id']} deleted", "id": params["instance_id"]}
+    return delete_runner(instance)
+
+
+def _run_setup(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    from inc.utils.setup_helpers import setup_streaming_generator
+
+    steps = []
+    for line in setup_streaming_generator():
+        step = json.loads(line)
+        steps.append(step)
+        if step.get("action") == "error":
+            raise RuntimeError(step.get("message", "Setup failed"))
+        _update(operation.id, message=step.get("message") or f"{step.get('action')}: {step.get('status')}")
+    return {"steps": steps}
+
+
+def _run_release(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    if params.get("refresh"):
+        list_releases(refresh=True)
+    version, path = ensure_runner_install(params.get("version"))
+    return {"version": version, "path": path}
+
+
+def _run_image(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    template = RunnerTemplate.get_or_none(RunnerTemplate.id == params["template_id"])
+    if template is None:
+        raise RuntimeError(f"Template {params['template_id']} not found")
+    result = build_derived_image(template)
+    # The image this one replaces is collected once no runner uses it and the grace period is over
+    gc_derived_images(list(RunnerTemplate.select()))
+    return result or {"tag": None, "built": False}
+
+
+def _run_disk_gc(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    if not DOCKER_AVAILABLE:
+        raise RuntimeError("Docker is not available")
+    return run_gc(force=params.get("force", False))
+
+
+def _run_log_config(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    if not DOCKER_AVAILABLE:
+        raise RuntimeError("Docker is not available")
+    return migrate_log_config(
+        labels=params.get("labels"),
+        wait_seconds=params.get("wait_seconds"),
+        token=params.get("token"),
+        on_progress=lambda done, total: _update(operation.id, progress=done),
+    )
+
+
+def _run_capacity(operation: Operation, params: Dict[str, Any]) -> Dict[str, Any]:
+    if not DOCKER_AVAILABLE:
+        raise RuntimeError("Docker is not available")
+    schedule = CapacitySchedule.get_or_none(CapacitySchedule.id == params["schedule_id"])
+    if schedule is None:
+        raise RuntimeError(f"Capacity schedule {params['schedule_id']} not found")
+    return reconcile(schedule)
+
+
+HANDLERS: Dict[str, Callable[[Operation, Dict[str, Any]], Dict[str, Any]]] = {
+    "create": _run_create,
+    "clone": _run_clone,
+    "restart": _run_restart,
+    "delete": _run_delete,
+    "setup": _run_setup,
+    "release": _run_release,
+    "image": _run_image,
+    "disk-gc": _run_disk_gc,
+    "log-config": _run_log_config,
+    "capacity": _run_capacity,
+}
+
+
+# -------- Worker pool ---------
+
+def _run(operation_id: int) -> None:
+    try:
+        now = datetime.now()
+        claimed = (
+            Operation.update(status="running", started_at=now, updated_at=now, attempts=Operation.attempts + 1)
+            .where((Operation.id == operation_id) & (Operation.status.in_(ACTIVE_STATUSES)))
+            .execute()
+        )
+        if not claimed:
+            return
+        operation = Operation.get_by_id(operation_id)
+        _announce(operation)
+        try:
+            with start_span(f"operation {operation.kind}", root=True, **{"operation.id": operation_id}):
+                result = HANDLERS[operation.kind](operation, json.loads(operation.params))
+            _update(operation_id, status="completed", progress=operation.total, result=json.dumps(result), message=None)
+        except Exception as e:
+            _update(operation_id, status="failed", message=str(e))
+    finally:
+        with _lock:
+            _scheduled.discard(operation_id)
+
+
+def _schedule(operation_id: int) -> None:
+    """Queue an operation on the worker pool unless it is already queued in this process."""
+    global _executor
+    with _lock:
+        if operation_id in _scheduled:
+            return
+        _scheduled.add(operation_id)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, settings.OPERATION_WORKERS), thread_name_prefix="operation")
+    _executor.submit(_run, operation_id)
+
+
+def enqueue_operation(kind: str, params: Dict[str, Any], total: int = 1) -> Operation:
+    """Persist an operation and hand it to the worker pool."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown operation '{kind}'")
+    operation = Operation.create(kind=kind, params=json.dumps(params), total=total)
+    _announce(operation)
+    broadcast("operation.enqueued", {"operation_id": operation.id})  # Operations run in the leader worker
+    return operation
+
+
+def operation_accepted(operation: Operation, **extra) -> JSONResponse:
+    """Answer 202 pointing at the queued operation."""
+    return JSONResponse(
+        status_code=202,
+        headers={"Location": f"/operations/{operation.id}"},
+        content={"status": "queued", "operation_id": operation.id, "kind": operation.kind, **extra},
+    )
+
+
+def resume_operations() -> None:
+    """Requeue operations interrupted by a backend restart and drop old finished ones."""
+    cutoff = datetime.now() - timedelta(days=settings.OPERATION_RETENTION_DAYS)
+    Operation.delete().where(
+        Operation.status.not_in(ACTIVE_STATUSES) & (Operation.updated_at < cutoff)
+    ).execute()
+    for operation in Operation.select(Operation.id).where(Operation.status.in_(ACTIVE_STATUSES)).order_by(Operation.id):
+        _schedule(operation.id)
+
+
+subscribe("operation.enqueued", lambda payload: _schedule(payload["operation_id"]), leader_only=True)
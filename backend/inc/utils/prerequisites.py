@@ -1,16 +1,9 @@
 import platform
-import psutil
-import distro
 import os
 from typing import Dict, Any, List
 from pydantic import BaseModel
 from inc.config import settings
-
-try:
-    import docker
-    DOCKER_AVAILABLE = True
-except ImportError:
-    DOCKER_AVAILABLE = False
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker
 
 
 class PrerequisiteCheck(BaseModel):
@@ -32,11 +25,15 @@ def get_cpu_architecture() -> str:
 
 def get_total_ram_gb() -> float:
     """Get total RAM in GB"""
+    import psutil
+
     return psutil.virtual_memory().total / (1024 ** 3)
 
 
 def is_debian_based() -> bool:
     """Check if system is Debian or Ubuntu based"""
+    import distro
+
     os_id = distro.id()
     return os_id in ["debian", "ubuntu"]
 
@@ -77,6 +74,8 @@ def check_prerequisites() -> PrerequisitesResponse:
     Returns a response with individual checks and a global status.
     All checks are mandatory for system setup.
     """
+    import distro
+
     checks: List[PrerequisiteCheck] = []
 
     # Check 1: Docker Available
@@ -0,0 +1,276 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from inc.config import settings
+from inc.utils.coordination import broadcast, subscribe
+
+PROFILES_DIR = os.path.join(settings.VOLUME_PATH, "profiles")
+PROFILING_META_KEY = "profiling_config"
+
+# Threads that execute request work besides the event loop: Starlette's threadpool
+# for sync endpoints and executors started by request handlers (bulk actions)
+REQUEST_THREAD_PREFIXES = ("AnyIO worker thread", "bulk")
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# How often the runtime config is re-read, so a change made through one worker reaches all of them
+CONFIG_REFRESH_SECONDS = 5.0
+
+_config: Dict[str, Any] = {
+    "enabled": settings.PROFILING_ENABLED,
+    "sample_rate": settings.PROFILING_SAMPLE_RATE,
+    "slow_ms": settings.PROFILING_SLOW_MS,
+}
+_config_loaded_at = 0.0
+
+# (monotonic time, folded stack) of every busy request thread, newest last
+_samples: Deque[Tuple[float, str]] = deque(maxlen=settings.PROFILING_MAX_SAMPLES)
+_in_flight = 0
+_loop_threads: Set[int] = set()  # Event loop threads, recorded by the middleware
+_state_lock = threading.Lock()
+_wakeup = threading.Event()
+_sampler: Optional[threading.Thread] = None
+_store_lock = threading.Lock()
+
+
+# -------- Runtime config ---------
+
+def get_profiling_config() -> Dict[str, Any]:
+    global _config_loaded_at
+    now = time.monotonic()
+    if now - _config_loaded_at >= CONFIG_REFRESH_SECONDS:
+        _config_loaded_at = now
+        try:
+            from inc.utils.meta import get_meta
+
+            stored = get_meta(PROFILING_META_KEY)
+            if stored:
+                _config.update({key: stored[key] for key in _config if key in stored})
+        except Exception as e:
+            print(f"Warning: Could not load profiling config: {str(e)}")
+    return dict(_config)
+
+
+def set_profiling_config(**changes: Any) -> Dict[str, Any]:
+    """Update and persist the profiling switches; takes effect without a restart."""
+    global _config_loaded_at
+    from inc.utils.meta import set_meta
+
+    get_profiling_config()
+    _config.update({key: value for key, value in changes.items() if value is not None})
+    set_meta(PROFILING_META_KEY, dict(_config), "json")
+    _config_loaded_at = time.monotonic()
+    broadcast("profiling.config", {}, local=False)
+    return dict(_config)
+
+
+def _reload_config(payload: Dict[str, Any]) -> None:
+    """Another worker changed the switches; reload them on next use instead of within 5 s."""
+    global _config_loaded_at
+    _config_loaded_at = 0.0
+
+
+# -------- Stack sampler ---------
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(APP_ROOT):
+        filename = os.path.relpath(filename, APP_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+
+def _fold(frame) -> Optional[str]:
+    """Folded stack, outermost frame first; None for threads not running app code."""
+    labels = []
+    in_app = False
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(APP_ROOT):
+            in_app = True
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    if not in_app:
+        return None  # Idle: waiting on the event loop selector or the worker queue
+    return ";".join(reversed(labels))
+
+
+def _take_sample() -> None:
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    own = threading.get_ident()
+    now = time.monotonic()
+    for ident, frame in sys._current_frames().items():
+        if ident == own:
+            continue
+        if ident in _loop_threads:
+            name = "event-loop"
+        else:
+            name = names.get(ident, "")
+            if not name.startswith(REQUEST_THREAD_PREFIXES):
+                continue  # Background loops (job state, stats, drains)
+            name = "worker"
+        folded = _fold(frame)
+        if folded:
+            _samples.append((now, f"{name};{folded}"))
+
+
+def _sampler_loop() -> None:
+    interval = settings.PROFILING_INTERVAL_MS / 1000.0
+    while True:
+        # Only burn cycles while profiled requests are in flight
+        _wakeup.wait()
+        try:
+            _take_sample()
+        except Exception as e:
+            print(f"Warning: Profiling sample failed: {str(e)}")
+        time.sleep(interval)
+
+
+def _ensure_sampler() -> None:
+    global _sampler
+    if _sampler is not None and _sampler.is_alive():
+        return
+    _sampler = threading.Thread(target=_sampler_loop, daemon=True, name="profiling-sampler")
+    _sampler.start()
+
+
+def _request_started() -> None:
+    global _in_flight
+    with _state_lock:
+        _in_flight += 1
+        _ensure_sampler()
+        _wakeup.set()
+
+
+def _request_finished() -> None:
+    global _in_flight
+    with _state_lock:
+        _in_flight -= 1
+        if _in_flight == 0:
+            _wakeup.clear()
+
+
+# -------- Middleware ---------
+
+async def profile_request(request, call_next):
+    """Sample the stacks of request threads while the request runs.
+
+    The profile is kept for a random `sample_rate` fraction of requests and
+    for every request slower than `slow_ms`. Samples from concurrent requests
+    overlap, so a profile shows everything the app was doing meanwhile.
+    """
+    config = get_profiling_config()
+    if not config["enabled"]:
+        return await call_next(request)
+
+    _loop_threads.add(threading.get_ident())
+    sampled = random.random() < config["sample_rate"]
+    started = time.monotonic()
+    status = 500
+    _request_started()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        _request_finished()
+        finished = time.monotonic()
+        elapsed_ms = (finished - started) * 1000
+        if sampled or elapsed_ms >= config["slow_ms"]:
+            route = request.scope.get("route")
+            await run_in_threadpool(_save_profile, {
+                "method": request.method,
+                "path": request.url.path,
+                "route": route.path if route is not None else None,
+                "status": status,
+                "duration_ms": round(elapsed_ms, 1),
+                "reason": "slow" if elapsed_ms >= config["slow_ms"] else "sampled",
+                "interval_ms": settings.PROFILING_INTERVAL_MS,
+            }, started, finished)
+
+
+# -------- Store ---------
+
+def _save_profile(info: Dict[str, Any], started: float, finished: float) -> None:
+    stacks = Counter(stack for at, stack in list(_samples) if started <= at <= finished)
+    profile_id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+    info.update({
+        "id": profile_id,
+        "created_at": datetime.now().isoformat(),
+        "samples": sum(stacks.values()),
+    })
+    try:
+        with _store_lock:
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            with open(os.path.join(PROFILES_DIR, f"{profile_id}.folded"), "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+            with open(os.path.join(PROFILES_DIR, f"{profile_id}.json"), "w") as f:
+                json.dump(info, f)
+            _prune_store()
+    except OSError as e:
+        print(f"Warning: Could not store profile: {str(e)}")
+
+
+def _prune_store() -> None:
+    """Drop the oldest profiles beyond the configured count and size limits."""
+    entries = []
+    for name in os.listdir(PROFILES_DIR):
+        if name.endswith(".json"):
+            profile_id = name[:-5]
+            size = sum(
+                os.path.getsize(path)
+                for path in (_profile_path(profile_id, "json"), _profile_path(profile_id, "folded"))
+                if os.path.exists(path)
+            )
+            entries.append((profile_id, size))
+    entries.sort()  # Ids start with a millisecond timestamp
+
+    total = sum(size for _, size in entries)
+    while entries and (len(entries) > settings.PROFILING_MAX_PROFILES or total > settings.PROFILING_MAX_BYTES):
+        profile_id, size = entries.pop(0)
+        for extension in ("json", "folded"):
+            try:
+                os.remove(_profile_path(profile_id, extension))
+            except FileNotFoundError:
+                pass
+        total -= size
+
+
+def _profile_path(profile_id: str, extension: str) -> str:
+    return os.path.join(PROFILES_DIR, f"{profile_id}.{extension}")
+
+
+def list_profiles(limit: int = 100) -> List[Dict[str, Any]]:
+    """Stored profile metadata, newest first."""
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    ids = sorted((name[:-5] for name in os.listdir(PROFILES_DIR) if name.endswith(".json")), reverse=True)
+    profiles = []
+    for profile_id in ids[:limit]:
+        try:
+            with open(_profile_path(profile_id, "json")) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # Pruned concurrently or partially written
+    return profiles
+
+
+def get_profile_path(profile_id: str) -> Optional[str]:
+    """Path of a stored folded-stack profile, or None. Ids are validated against the store."""
+    if os.path.basename(profile_id) != profile_id:
+        return None
+    path = _profile_path(profile_id, "folded")
+    return path if os.path.isfile(path) else None
+
+
+subscribe("profiling.config", _reload_config)
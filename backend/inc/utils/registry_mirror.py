@@ -0,0 +1,286 @@
+# Pull-through registry mirror for runner jobs.
+#
+# Jobs run `docker pull` against the host daemon through the mounted socket,
+# so every runner fetches the same layers from the upstream registry. With
+# REGISTRY_MIRROR on, the leader keeps one `registry` container running in
+# proxy mode, storing what it fetched under VOLUME_PATH/registry-mirror and
+# published on 127.0.0.1:REGISTRY_MIRROR_PORT. The host daemon uses it once
+# its daemon.json lists that address under "registry-mirrors" (loopback
+# registries may be plain HTTP); mirror_state() says whether it does and
+# gives the snippet to add. When the mirror is down the daemon falls back to
+# the upstream registry, so it is never a single point of failure for pulls.
+#
+# Eviction has two parts: the registry drops cached content
+# REGISTRY_MIRROR_TTL_HOURS after fetching it, and the leader removes the
+# least recently used blobs once the store grows past REGISTRY_MIRROR_QUOTA_MB.
+# A removed blob is fetched upstream again on its next pull.
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+from inc.config import settings
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.metrics import REGISTRY_MIRROR_BYTES, REGISTRY_MIRROR_EVICTED_BYTES, REGISTRY_MIRROR_REQUESTS
+from inc.utils.release_cache import host_path
+
+MIRROR_DIR = os.path.join(settings.VOLUME_PATH, "registry-mirror")
+BLOBS_DIR = os.path.join(MIRROR_DIR, "docker", "registry", "v2", "blobs")
+STATS_PATH = os.path.join(settings.VOLUME_PATH, "registry-mirror-stats.json")
+
+CONTAINER_NAME = "runnerpilot-registry-mirror"
+ROLE_LABEL = "runnerpilot.role"
+CONFIG_LABEL = "runnerpilot.config"
+EVICT_TO = 0.9  # Evict down to this fraction of the quota, so one pull over it does not evict again
+STAT_KINDS = ("blobs", "manifests")
+STAT_FIELDS = ("Requests", "Hits", "Misses", "BytesPulled", "BytesPushed")
+
+_lock = threading.Lock()
+_loop: Optional[threading.Thread] = None
+
+
+def mirror_url() -> str:
+    """Address the host daemon pulls through."""
+    return f"http://127.0.0.1:{settings.REGISTRY_MIRROR_PORT}"
+
+
+def _debug_url() -> str:
+    return (settings.REGISTRY_MIRROR_DEBUG_URL or f"http://127.0.0.1:{settings.REGISTRY_MIRROR_DEBUG_PORT}").rstrip("/")
+
+
+# -------- Container ---------
+
+def _environment() -> Dict[str, str]:
+    environment = {
+        "REGISTRY_PROXY_REMOTEURL": settings.REGISTRY_MIRROR_UPSTREAM,
+        "REGISTRY_PROXY_TTL": f"{settings.REGISTRY_MIRROR_TTL_HOURS}h",
+        "REGISTRY_HTTP_DEBUG_ADDR": ":5001",
+        "REGISTRY_STORAGE_DELETE_ENABLED": "true",
+    }
+    if settings.REGISTRY_MIRROR_USERNAME:
+        environment["REGISTRY_PROXY_USERNAME"] = settings.REGISTRY_MIRROR_USERNAME
+        environment["REGISTRY_PROXY_PASSWORD"] = settings.REGISTRY_MIRROR_PASSWORD
+    return environment
+
+
+def _config_hash() -> str:
+    """Changes whenever the container would be created differently, so it gets recreated."""
+    config = [settings.REGISTRY_MIRROR_IMAGE, settings.REGISTRY_MIRROR_PORT, settings.REGISTRY_MIRROR_DEBUG_PORT, _environment()]
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _get_container():
+    try:
+        return get_docker_client().containers.get(CONTAINER_NAME)
+    except docker.errors.NotFound:
+        return None
+
+
+def ensure_mirror() -> str:
+    """Create, recreate or start the mirror container as needed; returns what was done."""
+    if not DOCKER_AVAILABLE:
+        raise RuntimeError("Docker is not available")
+    with _lock:
+        container = _get_container()
+        if container is not None and container.labels.get(CONFIG_LABEL) == _config_hash():
+            if container.status == "running":
+                return "running"
+            container.start()
+            return "started"
+        if container is not None:
+            container.remove(force=True)  # Settings changed; the cached content on disk is kept
+
+        os.makedirs(MIRROR_DIR, exist_ok=True)
+        get_docker_client().containers.run(
+            image=settings.REGISTRY_MIRROR_IMAGE,
+            name=CONTAINER_NAME,
+            environment=_environment(),
+            volumes={host_path(MIRROR_DIR): {"bind": "/var/lib/registry", "mode": "rw"}},
+            ports={
+                "5000/tcp": ("127.0.0.1", settings.REGISTRY_MIRROR_PORT),
+                "5001/tcp": ("127.0.0.1", settings.REGISTRY_MIRROR_DEBUG_PORT),
+            },
+            labels={ROLE_LABEL: "registry-mirror", CONFIG_LABEL: _config_hash()},
+            restart_policy={"Name": "unless-stopped"},
+            detach=True,
+        )
+        return "recreated" if container is not None else "created"
+
+
+def daemon_mirrors() -> List[str]:
+    """Registry mirrors the host daemon is configured with."""
+    info = get_docker_client().info()
+    return [mirror.rstrip("/") for mirror in (info.get("RegistryConfig") or {}).get("Mirrors") or []]
+
+
+# -------- Hit ratio ---------
+
+def _read_counters() -> Dict[str, Dict[str, int]]:
+    """Proxy counters the registry publishes with expvar; they reset when it restarts."""
+    with urllib.request.urlopen(f"{_debug_url()}/debug/vars", timeout=settings.DOCKER_TIMEOUT_SECONDS) as response:
+        proxy = json.load(response).get("registry", {}).get("proxy", {})
+    return {kind: {field: int(proxy.get(kind, {}).get(field, 0)) for field in STAT_FIELDS} for kind in STAT_KINDS}
+
+
+def _read_stats_file() -> Dict[str, Any]:
+    try:
+        with open(STATS_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_stats_file(**changes: Any) -> None:
+    """Shared by all workers: the leader evicts, any worker may fold in counters."""
+    stored = {**_read_stats_file(), **changes}
+    os.makedirs(os.path.dirname(STATS_PATH), exist_ok=True)
+    partial = f"{STATS_PATH}.{os.getpid()}.{threading.get_ident()}.partial"
+    with open(partial, "w") as f:
+        json.dump(stored, f)
+    os.replace(partial, STATS_PATH)
+
+
+def _combine(carried: Dict[str, Dict[str, int]], counters: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    return {
+        kind: {field: carried.get(kind, {}).get(field, 0) + counters[kind][field] for field in STAT_FIELDS}
+        for kind in STAT_KINDS
+    }
+
+
+def record_counters() -> Dict[str, Dict[str, int]]:
+    """Fold the registry's counters into totals that survive mirror restarts; returns the totals."""
+    counters = _read_counters()
+    stored = _read_stats_file()
+    carried, last = stored.get("carried", {}), stored.get("last")
+    if last and any(counters[kind]["Requests"] < last[kind]["Requests"] for kind in STAT_KINDS):
+        carried = _combine(carried, last)  # The registry restarted; keep what it counted before
+    _update_stats_file(carried=carried, last=counters)
+
+    totals = _combine(carried, counters)
+    for kind in STAT_KINDS:
+        REGISTRY_MIRROR_REQUESTS.labels(kind, "hit").set(totals[kind]["Hits"])
+        REGISTRY_MIRROR_REQUESTS.labels(kind, "miss").set(totals[kind]["Misses"])
+    return totals
+
+
+def _hit_stats(totals: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, Any]]:
+    stats = {}
+    for kind, counts in totals.items():
+        served = counts["Hits"] + counts["Misses"]
+        stats[kind] = {
+            "requests": counts["Requests"],
+            "hits": counts["Hits"],
+            "misses": counts["Misses"],
+            "hit_ratio": round(counts["Hits"] / served, 4) if served else None,
+            "bytes_from_upstream": counts["BytesPulled"],
+            "bytes_served": counts["BytesPushed"],
+        }
+    return stats
+
+
+# -------- Size and eviction ---------
+
+def _blobs() -> List[Tuple[str, int, float]]:
+    """(blob directory, size, last use) of every cached blob."""
+    blobs = []
+    for root, _, filenames in os.walk(BLOBS_DIR):
+        if "data" in filenames:
+            info = os.stat(os.path.join(root, "data"))
+            # atime is coarse under relatime but still orders blobs by use; mtime covers noatime mounts
+            blobs.append((root, info.st_size, max(info.st_atime, info.st_mtime)))
+    return blobs
+
+
+def store_size() -> int:
+    return sum(size for _, size, _ in _blobs())
+
+
+def evict(quota_bytes: Optional[int] = None) -> Tuple[int, int]:
+    """Remove least recently used blobs until the store fits the quota; returns (blobs, bytes) removed."""
+    quota_bytes = settings.REGISTRY_MIRROR_QUOTA_MB * 1024 * 1024 if quota_bytes is None else quota_bytes
+    blobs = _blobs()
+    size = sum(blob_size for _, blob_size, _ in blobs)
+    REGISTRY_MIRROR_BYTES.labels().set(size)
+    if size <= quota_bytes:
+        return 0, 0
+
+    removed = freed = 0
+    target = quota_bytes * EVICT_TO
+    for path, blob_size, _ in sorted(blobs, key=lambda blob: blob[2]):
+        if size - freed <= target:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+        freed += blob_size
+
+    container = _get_container() if DOCKER_AVAILABLE else None
+    if container is not None and container.status == "running":
+        # The registry caches blob descriptors in memory; a restart makes it notice the removed
+        # blobs and fetch them upstream instead of failing. Pulls fall back upstream meanwhile.
+        container.restart(timeout=settings.RUNNER_STOP_TIMEOUT_SECONDS)
+    REGISTRY_MIRROR_BYTES.labels().set(size - freed)
+    REGISTRY_MIRROR_EVICTED_BYTES.labels().inc(freed)
+    _update_stats_file(last_eviction={"at": time.time(), "blobs": removed, "bytes": freed})
+    print(f"Registry mirror over its quota: evicted {removed} blobs, {freed / 1024 / 1024:.0f} MB")
+    return removed, freed
+
+
+# -------- Loop ---------
+
+def _mirror_loop() -> None:
+    while True:
+        try:
+            ensure_mirror()
+            evict()
+            record_counters()
+        except Exception as e:
+            print(f"Warning: Registry mirror check failed: {str(e)}")
+        time.sleep(settings.REGISTRY_MIRROR_CHECK_SECONDS)
+
+
+def start_registry_mirror() -> None:
+    """Keep the mirror running and within its quota. Runs in the leader only."""
+    global _loop
+    if not settings.REGISTRY_MIRROR or not DOCKER_AVAILABLE:
+        return
+    with _lock:
+        if _loop is not None and _loop.is_alive():
+            return
+        _loop = threading.Thread(target=_mirror_loop, daemon=True, name="registry-mirror")
+        _loop.start()
+
+
+def mirror_state() -> Dict[str, Any]:
+    state: Dict[str, Any] = {
+        "enabled": settings.REGISTRY_MIRROR,
+        "url": mirror_url(),
+        "upstream": settings.REGISTRY_MIRROR_UPSTREAM,
+        "image": settings.REGISTRY_MIRROR_IMAGE,
+        "ttl_hours": settings.REGISTRY_MIRROR_TTL_HOURS,
+        "quota_bytes": settings.REGISTRY_MIRROR_QUOTA_MB * 1024 * 1024,
+        "size_bytes": store_size(),
+        "last_eviction": _read_stats_file().get("last_eviction"),
+        "container": None,
+        "daemon_configured": None,
+        "daemon_json": {"registry-mirrors": [mirror_url()]},
+        "stats": None,
+    }
+    if DOCKER_AVAILABLE:
+        try:
+            container = _get_container()
+            state["container"] = {"id": container.short_id, "status": container.status} if container else None
+            state["daemon_configured"] = mirror_url() in daemon_mirrors()
+        except Exception as e:
+            print(f"Warning: Could not inspect the registry mirror: {str(e)}")
+    try:
+        state["stats"] = _hit_stats(record_counters())
+    except Exception:
+        stored = _read_stats_file()
+        if stored.get("last"):
+            # Mirror unreachable; report what was counted up to the last check
+            state["stats"] = _hit_stats(_combine(stored.get("carried", {}), stored["last"]))
+    return state
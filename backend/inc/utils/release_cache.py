@@ -0,0 +1,280 @@
+# Host-local cache of GitHub Actions runner releases.
+#
+# Release metadata is fetched from RELEASE_API_URL at most once per
+# RELEASE_CACHE_TTL_HOURS. Each runner version is downloaded once, checked
+# against the digest GitHub publishes for the asset, and extracted once into
+# a read-only directory keyed by version:
+#
+#   VOLUME_PATH/releases/metadata.json
+#   VOLUME_PATH/releases/tarballs/actions-runner-linux-x64-2.329.0.tar.gz
+#   VOLUME_PATH/releases/runners/2.329.0-linux-x64/
+#
+# With RUNNER_RELEASE_CACHE on, runner containers mount that directory at
+# RUNNER_INSTALL_MOUNT instead of using the runner baked into the image, so a
+# version bump is one download and extraction per host rather than an image
+# rebuild and a pull per runner.
+import fcntl
+import hashlib
+import json
+import os
+import platform
+import shutil
+import socket
+import stat
+import tarfile
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+from inc.config import settings
+from inc.utils.docker_client import DOCKER_AVAILABLE, get_docker_client
+
+RELEASES_DIR = os.path.join(settings.VOLUME_PATH, "releases")
+METADATA_PATH = os.path.join(RELEASES_DIR, "metadata.json")
+TARBALLS_DIR = os.path.join(RELEASES_DIR, "tarballs")
+RUNNERS_DIR = os.path.join(RELEASES_DIR, "runners")
+# Shipped with the backend; used when the release API cannot be reached and nothing is cached yet
+BUNDLED_METADATA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "volumn", "runner-release.json")
+
+VERSION_LABEL = "runnerpilot.runner_version"
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+ARCHITECTURES = {"x86_64": "x64", "amd64": "x64", "aarch64": "arm64", "arm64": "arm64", "armv7l": "arm"}
+
+_lock = threading.Lock()
+_host_volume_path: Optional[str] = None
+
+
+def runner_arch() -> str:
+    return settings.RUNNER_ARCH or ARCHITECTURES.get(platform.machine().lower(), "x64")
+
+
+# -------- Metadata ---------
+
+def _trim(release: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep what the cache needs; the API response carries release notes and avatars for every entry."""
+    return {
+        "version": release["tag_name"].lstrip("v"),
+        "draft": release.get("draft", False),
+        "prerelease": release.get("prerelease", False),
+        "published_at": release.get("published_at"),
+        "assets": [
+            {
+                "name": asset["name"],
+                "url": asset["browser_download_url"],
+                "digest": asset.get("digest"),
+                "size": asset.get("size"),
+            }
+            for asset in release.get("assets", [])
+            if asset["name"].endswith(".tar.gz")
+        ],
+    }
+
+
+def _read_metadata() -> Optional[Dict[str, Any]]:
+    try:
+        with open(METADATA_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _fetch_releases() -> List[Dict[str, Any]]:
+    request = urllib.request.Request(settings.RELEASE_API_URL, headers={"Accept": "application/vnd.github+json"})
+    with urllib.request.urlopen(request, timeout=settings.DOCKER_SLOW_TIMEOUT_SECONDS) as response:
+        return [_trim(release) for release in json.load(response)]
+
+
+def _write_json(path: str, data: Any) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.partial"
+    with open(partial, "w") as f:
+        json.dump(data, f)
+    os.replace(partial, path)
+
+
+def list_releases(refresh: bool = False) -> Tuple[List[Dict[str, Any]], float]:
+    """Return cached releases (newest first) and when they were fetched, refreshing them once stale.
+
+    When the API is unreachable the stale cache is used, or the bundled
+    runner-release.json when there is no cache yet.
+    """
+    metadata = _read_metadata()
+    age = time.time() - metadata["fetched_at"] if metadata else None
+    if metadata and not refresh and age < settings.RELEASE_CACHE_TTL_HOURS * 3600:
+        return metadata["releases"], metadata["fetched_at"]
+    try:
+        metadata = {"fetched_at": time.time(), "releases": _fetch_releases()}
+        _write_json(METADATA_PATH, metadata)
+    except Exception as e:
+        print(f"Warning: Could not fetch runner releases from {settings.RELEASE_API_URL}: {str(e)}")
+        if metadata is None:
+            with open(BUNDLED_METADATA_PATH) as f:
+                metadata = {"fetched_at": os.path.getmtime(BUNDLED_METADATA_PATH), "releases": [_trim(r) for r in json.load(f)]}
+    return metadata["releases"], metadata["fetched_at"]
+
+
+def resolve_release(version: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """Return (version, tarball asset) for `version`, RUNNER_VERSION or the latest stable release."""
+    version = (version or settings.RUNNER_VERSION).lstrip("v")
+    asset_name = lambda v: f"actions-runner-linux-{runner_arch()}-{v}.tar.gz"
+    for refresh in (False, True):
+        # A pinned version newer than the cached metadata triggers one refresh
+        releases, _ = list_releases(refresh=refresh)
+        for release in releases:
+            if version and release["version"] != version:
+                continue
+            if not version and (release["draft"] or release["prerelease"]):
+                continue
+            for asset in release["assets"]:
+                if asset["name"] == asset_name(release["version"]):
+                    return release["version"], asset
+            if version:
+                raise RuntimeError(f"Runner {version} has no linux-{runner_arch()} tarball")
+        if not version:
+            break
+    raise RuntimeError(f"Runner release {version or 'latest'} not found")
+
+
+# -------- Tarballs and installs ---------
+
+class _FileLock:
+    """Exclusive flock, so only one API worker downloads or extracts a version."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.handle = open(self.path, "a+")
+        fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        self.handle.close()
+
+
+def _download(asset: Dict[str, Any], path: str) -> None:
+    algorithm, _, expected = (asset.get("digest") or "").partition(":")
+    digest = hashlib.new(algorithm) if expected else None
+    partial = f"{path}.{os.getpid()}.partial"
+    try:
+        with urllib.request.urlopen(asset["url"], timeout=settings.DOCKER_SLOW_TIMEOUT_SECONDS) as response, open(partial, "wb") as f:
+            while chunk := response.read(DOWNLOAD_CHUNK_BYTES):
+                f.write(chunk)
+                if digest:
+                    digest.update(chunk)
+        if digest and digest.hexdigest() != expected:
+            raise RuntimeError(f"Digest mismatch for {asset['name']}: expected {expected}, got {digest.hexdigest()}")
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def _make_read_only(root: str) -> None:
+    write_bits = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+    for directory, dirnames, filenames in os.walk(root, topdown=False):
+        for name in filenames + dirnames:
+            path = os.path.join(directory, name)
+            if not os.path.islink(path):
+                os.chmod(path, os.stat(path).st_mode & ~write_bits)
+    os.chmod(root, os.stat(root).st_mode & ~write_bits)
+
+
+def tarball_path(version: str) -> str:
+    return os.path.join(TARBALLS_DIR, f"actions-runner-linux-{runner_arch()}-{version}.tar.gz")
+
+
+def install_path(version: str) -> str:
+    return os.path.join(RUNNERS_DIR, f"{version}-linux-{runner_arch()}")
+
+
+def ensure_runner_install(version: Optional[str] = None) -> Tuple[str, str]:
+    """Download and extract a runner release unless it already is; return (version, install directory)."""
+    version, asset = resolve_release(version)
+    target = install_path(version)
+    if os.path.isdir(target):
+        return version, target
+
+    with _lock, _FileLock(os.path.join(RELEASES_DIR, "locks", f"{version}.lock")):
+        if os.path.isdir(target):
+            return version, target  # Extracted by another worker while we waited
+        tarball = tarball_path(version)
+        if not os.path.exists(tarball):
+            os.makedirs(TARBALLS_DIR, exist_ok=True)
+            _download(asset, tarball)
+
+        # Extracted next to the target and renamed into place, so a crash never leaves a partial install
+        staging = f"{target}.{os.getpid()}.partial"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            with tarfile.open(tarball) as archive:
+                archive.extractall(staging, filter="data")
+            _make_read_only(staging)
+            os.rename(staging, target)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+    return version, target
+
+
+def cached_versions() -> Dict[str, List[str]]:
+    def versions(directory: str, prefix: str, suffix: str) -> List[str]:
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name[len(prefix):len(name) - len(suffix)]
+            for name in os.listdir(directory)
+            if name.startswith(prefix) and name.endswith(suffix)
+        )
+
+    arch = runner_arch()
+    return {
+        "tarballs": versions(TARBALLS_DIR, f"actions-runner-linux-{arch}-", ".tar.gz"),
+        "installs": versions(RUNNERS_DIR, "", f"-linux-{arch}"),
+    }
+
+
+# -------- Mounting ---------
+
+def _detect_host_volume_path() -> str:
+    """Host side of VOLUME_PATH; differs when the backend itself runs in a container."""
+    volume_path = os.path.abspath(settings.VOLUME_PATH)
+    if DOCKER_AVAILABLE and os.path.exists("/.dockerenv"):
+        try:
+            own = get_docker_client().containers.get(socket.gethostname())
+            for mount in own.attrs.get("Mounts", []):
+                if mount.get("Destination") == volume_path:
+                    return mount["Source"]
+        except Exception as e:
+            print(f"Warning: Could not find the host path of {volume_path}: {str(e)}")
+    return volume_path
+
+
+def host_path(path: str) -> str:
+    """Translate a path under VOLUME_PATH to the path Docker should bind-mount."""
+    global _host_volume_path
+    if _host_volume_path is None:
+        _host_volume_path = settings.HOST_VOLUME_PATH or _detect_host_volume_path()
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(settings.VOLUME_PATH))
+    return os.path.join(_host_volume_path, relative)
+
+
+def runner_install_mount() -> Tuple[str, Dict[str, Dict[str, str]]]:
+    """(version, volumes entry) mounting the shared read-only runner install into a container."""
+    version, directory = ensure_runner_install()
+    return version, {host_path(directory): {"bind": settings.RUNNER_INSTALL_MOUNT, "mode": "ro"}}
+
+
+def release_cache_state() -> Dict[str, Any]:
+    metadata = _read_metadata()
+    return {
+        "enabled": settings.RUNNER_RELEASE_CACHE,
+        "arch": runner_arch(),
+        "pinned_version": settings.RUNNER_VERSION or None,
+        "metadata_fetched_at": metadata["fetched_at"] if metadata else None,
+        "ttl_hours": settings.RELEASE_CACHE_TTL_HOURS,
+        **cached_versions(),
+    }
@@ -0,0 +1,220 @@
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from inc.config import settings
+from inc.utils.coordination import broadcast, subscribe
+from inc.utils.derived_images import base_image_id, pins_base
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.event_bus import publish
+from inc.utils.job_state import refresh_job_state
+from inc.utils.runner_ops import recreate_runner, runner_template, select_instances
+from models import Rollout, RunnerInstance
+
+
+HEALTH_POLL_SECONDS = 3
+
+_threads: dict = {}
+_threads_lock = threading.Lock()
+
+
+def _split_image(image: str) -> tuple[str, Optional[str]]:
+    """Split `repo[:tag]` into repository and tag, ignoring a registry port."""
+    repository, sep, tag = image.rpartition(":")
+    if not sep or "/" in tag:
+        return image, None
+    return repository, tag
+
+
+def _pull_image(image: str) -> str:
+    """Pull `image` once and return its image ID (content digest)."""
+    repository, tag = _split_image(image)
+    publish("pull.progress", {"image": image, "status": "starting"})
+    try:
+        pulled = get_docker_client().images.pull(repository, tag=tag)
+    except Exception as e:
+        publish("pull.progress", {"image": image, "status": "failed", "error": str(e)})
+        raise
+    publish("pull.progress", {"image": image, "status": "completed", "digest": pulled.id})
+    return pulled.id
+
+
+def _backfill_digest(instance: RunnerInstance) -> None:
+    """Record the image digest of runners created before digests were tracked."""
+    try:
+        container = get_docker_client().containers.get(instance.runner_name)
+    except docker.errors.NotFound:
+        return
+    instance.image_digest = container.attrs.get("Image")
+    instance.save()
+
+
+def _on_target(image_digest: Optional[str], target_digest: str) -> bool:
+    """A runner on a template's derived image is on target when that image is built on the target."""
+    return image_digest == target_digest or (image_digest is not None and base_image_id(image_digest) == target_digest)
+
+
+def _pending_instances(rollout: Rollout) -> List[RunnerInstance]:
+    """Runners matching the rollout selector that are not on the target image yet."""
+    pending = []
+    for instance in select_instances(labels=rollout.labels):
+        if instance.drain_state is not None:
+            continue  # Being drained on purpose; recreating it would put it back to work
+        if pins_base(runner_template(instance)):
+            continue  # Built on the template's own base image, not the one being rolled out
+        if instance.image_digest is None:
+            _backfill_digest(instance)
+        if not _on_target(instance.image_digest, rollout.target_digest):
+            pending.append(instance)
+    return pending
+
+
+def _is_busy(instance: RunnerInstance) -> bool:
+    """Whether a runner is running a job; recreating it now would kill the job."""
+    refresh_job_state(instance)
+    return instance.job_state == "busy"
+
+
+def _is_ready(instance: RunnerInstance) -> bool:
+    """A recreated runner is ready once its container runs and the listener is idle."""
+    try:
+        container = get_docker_client().containers.get(instance.runner_name)
+    except docker.errors.NotFound:
+        return False
+    refresh_job_state(instance, container)
+    return instance.job_state == "idle"
+
+
+def _wait_for_wave(wave: List[RunnerInstance], timeout_seconds: int) -> List[RunnerInstance]:
+    """Wait until every runner of the wave is ready; return the ones that never got there."""
+    deadline = time.monotonic() + timeout_seconds
+    waiting = list(wave)
+    while waiting and time.monotonic() < deadline:
+        waiting = [instance for instance in waiting if not _is_ready(instance)]
+        if waiting:
+            time.sleep(HEALTH_POLL_SECONDS)
+    return waiting
+
+
+def _update(rollout_id: int, **fields) -> bool:
+    """Update a rollout unless it was cancelled meanwhile; return whether it is still active."""
+    fields["updated_at"] = datetime.now()
+    updated = (
+        Rollout.update(**fields)
+        .where((Rollout.id == rollout_id) & (Rollout.status.in_(["pending", "running"])))
+        .execute()
+    )
+    return updated > 0
+
+
+def _run_rollout(rollout_id: int) -> None:
+    try:
+        rollout = Rollout.get_by_id(rollout_id)
+        if not rollout.target_digest:
+            _update(rollout_id, status="running", message=f"Pulling {rollout.image}")
+            _update(rollout_id, target_digest=_pull_image(rollout.image))
+
+        if not _update(rollout_id, status="running", message=None):
+            return
+
+        while True:
+            rollout = Rollout.get_by_id(rollout_id)
+            if rollout.status not in ("pending", "running"):
+                return
+
+            pending = _pending_instances(rollout)
+            if not pending:
+                _update(rollout_id, status="completed", message="All runners are on the target image")
+                return
+
+            # Only idle runners join a wave; busy ones are picked up by a later one
+            idle = [instance for instance in pending if not _is_busy(instance)]
+            if not idle:
+                if not _update(rollout_id, message=f"Waiting for {len(pending)} busy runner(s) to finish their jobs"):
+                    return
+                time.sleep(HEALTH_POLL_SECONDS)
+                continue
+            _update(rollout_id, message=None)
+            wave = idle[: max(1, rollout.max_unavailable)]
+            with ThreadPoolExecutor(max_workers=len(wave)) as executor:
+                results = list(executor.map(
+                    lambda instance: _recreate_safely(instance, rollout.image, rollout.target_digest, rollout.token),
+                    wave,
+                ))
+
+            recreated = [instance for instance, error in zip(wave, results) if error is None]
+            errors = [f"{instance.runner_name}: {error}" for instance, error in zip(wave, results) if error]
+            unready = _wait_for_wave(recreated, rollout.wave_timeout_seconds)
+            errors += [f"{instance.runner_name}: not ready after {rollout.wave_timeout_seconds}s" for instance in unready]
+
+            fields = {"upgraded": Rollout.upgraded + len(recreated) - len(unready)}
+            if errors:
+                # Halt so a bad image never takes down more than one wave
+                fields.update(failed=Rollout.failed + len(errors), status="failed", message="; ".join(errors))
+            if not _update(rollout_id, **fields) or errors:
+                return
+    except Exception as e:
+        _update(rollout_id, status="failed", message=f"Rollout failed: {str(e)}")
+    finally:
+        with _threads_lock:
+            _threads.pop(rollout_id, None)
+
+
+def _recreate_safely(instance: RunnerInstance, image: str, target_digest: str, token: Optional[str] = None) -> Optional[str]:
+    try:
+        result = recreate_runner(instance, image=image, token=token)
+    except Exception as e:
+        return str(e)
+    if not _on_target(result["image_digest"], target_digest):
+        # The tag moved after the pre-pull; stop instead of chasing it forever
+        return f"came up on {result['image_digest']}, expected {target_digest}"
+    return None
+
+
+def launch_rollout(rollout: Rollout) -> None:
+    """Run a rollout in a background thread unless it is already running in this process."""
+    with _threads_lock:
+        if rollout.id in _threads:
+            return
+        thread = threading.Thread(target=_run_rollout, args=(rollout.id,), daemon=True, name=f"rollout-{rollout.id}")
+        _threads[rollout.id] = thread
+    thread.start()
+
+
+def active_rollout() -> Optional[Rollout]:
+    return Rollout.get_or_none(Rollout.status.in_(["pending", "running"]))
+
+
+def start_rollout(
+    image: Optional[str] = None,
+    max_unavailable: int = 1,
+    labels: Optional[str] = None,
+    wave_timeout_seconds: int = 300,
+    token: Optional[str] = None,
+) -> Rollout:
+    rollout = Rollout.create(
+        image=image or settings.RUNNER_IMAGE,
+        labels=labels,
+        token=token,
+        max_unavailable=max_unavailable,
+        wave_timeout_seconds=wave_timeout_seconds,
+    )
+    broadcast("rollout.launch", {"rollout_id": rollout.id})  # Rollouts run in the leader worker
+    return rollout
+
+
+def resume_rollouts() -> None:
+    """Relaunch rollouts interrupted by a backend restart.
+
+    Progress is derived from each runner's stored image digest, so runners
+    upgraded before the restart are not recreated again.
+    """
+    if not DOCKER_AVAILABLE:
+        return
+    for rollout in Rollout.select().where(Rollout.status.in_(["pending", "running"])):
+        launch_rollout(rollout)
+
+
+subscribe("rollout.launch", lambda payload: launch_rollout(Rollout.get_by_id(payload["rollout_id"])), leader_only=True)
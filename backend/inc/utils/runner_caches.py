@@ -0,0 +1,419 @@
+# Shared tool and dependency caches for the runners of a template.
+#
+# Each cache of a template is a store of immutable snapshots ("generations")
+# on the host:
+#
+#   VOLUME_PATH/caches/<template>/<cache>/generations/<id>/   snapshot
+#   VOLUME_PATH/caches/<template>/<cache>/current             symlink to the latest one
+#   VOLUME_PATH/caches/<template>/<cache>/layers/<runner>/    upper + work dirs of one runner
+#
+# A runner mounts a Docker `local` volume of type overlay: the current
+# generation is the read-only lower dir and the runner's own layer the
+# upper dir, so concurrent runners never write to shared files. Once the
+# runner's container is removed (deleted, recreated or updated) its writes
+# are merged into a new generation: hard links of the current one, with the
+# changed files copied in and deletions applied, then swapped in by
+# replacing the `current` symlink. Layers are never merged while mounted:
+# a job could still be writing to them, and a half-written file would be
+# published to every runner. Merges of one store are serialised, so
+# concurrent runners add to each other's results instead of overwriting
+# them. A merge also evicts the least recently used entries (a tool
+# version, a package directory) until the store fits its quota, and drops
+# generations no runner mounts any more.
+import fcntl
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from inc.config import settings
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.release_cache import host_path
+
+CACHES_DIR = os.path.join(settings.VOLUME_PATH, "caches")
+
+# Known caches: mount path in the runner and the depth of an eviction unit (e.g. tool/version)
+KNOWN_CACHES: Dict[str, Tuple[str, int]] = {
+    "hostedtoolcache": ("/opt/hostedtoolcache", 2),
+    "npm": ("/home/runner/.npm", 1),
+    "pip": ("/home/runner/.cache/pip", 1),
+    "yarn": ("/home/runner/.cache/yarn", 1),
+    "go": ("/home/runner/go/pkg/mod", 2),
+    "gradle": ("/home/runner/.gradle/caches", 1),
+    "maven": ("/home/runner/.m2/repository", 2),
+}
+# Environment that points actions at a cache, e.g. setup-node and setup-python at the tool cache
+CACHE_ENV: Dict[str, Dict[str, str]] = {
+    "hostedtoolcache": {"RUNNER_TOOL_CACHE": "/opt/hostedtoolcache", "AGENT_TOOLSDIRECTORY": "/opt/hostedtoolcache"},
+}
+
+VOLUME_LABEL = "runnerpilot.cache"
+OVERLAY_OPAQUE_XATTR = "trusted.overlay.opaque"
+
+_store_locks: Dict[str, threading.Lock] = {}
+_store_locks_guard = threading.Lock()
+
+
+# -------- Specs ---------
+
+def cache_specs(template: Any) -> List[Dict[str, Any]]:
+    """Caches declared by a template, with paths, eviction depth and quota filled in."""
+    if template is None or not template.caches:
+        return []
+    specs = []
+    for cache in json.loads(template.caches):
+        path, depth = KNOWN_CACHES.get(cache["name"], (None, 1))
+        specs.append({
+            "name": cache["name"],
+            "path": cache.get("path") or path,
+            "depth": cache.get("depth") or depth,
+            "quota_mb": cache.get("quota_mb") or settings.CACHE_DEFAULT_QUOTA_MB,
+        })
+    return specs
+
+
+def store_path(template_name: str, cache_name: str) -> str:
+    return os.path.join(CACHES_DIR, template_name, cache_name)
+
+
+@contextmanager
+def _store_lock(store: str):
+    """Serialise changes to a store across threads and API workers."""
+    with _store_locks_guard:
+        lock = _store_locks.setdefault(store, threading.Lock())
+    with lock:
+        os.makedirs(store, exist_ok=True)
+        with open(os.path.join(store, ".lock"), "a+") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            yield
+
+
+def _volume_name(runner_name: str, cache_name: str) -> str:
+    return f"{runner_name}-cache-{cache_name}"
+
+
+# -------- Generations ---------
+
+def _current(store: str) -> str:
+    """Path of the current generation, creating an empty one for a new store."""
+    link = os.path.join(store, "current")
+    if not os.path.islink(link):
+        os.makedirs(os.path.join(store, "generations"), exist_ok=True)
+        _publish(store, _new_generation(store))
+    return os.path.join(store, "generations", os.readlink(link))
+
+
+def _new_generation(store: str) -> str:
+    generation = os.path.join(store, "generations", f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(generation)
+    _give_to_runner(generation)
+    return generation
+
+
+def _publish(store: str, generation: str) -> None:
+    """Point `current` at `generation` in one atomic rename."""
+    staging = os.path.join(store, f"current.{uuid.uuid4().hex[:8]}")
+    os.symlink(os.path.basename(generation), staging)
+    os.replace(staging, os.path.join(store, "current"))
+
+
+def _give_to_runner(path: str) -> None:
+    """Let the unprivileged runner user write to a directory it mounts."""
+    if os.geteuid() == 0:
+        os.chown(path, settings.RUNNER_UID, settings.RUNNER_UID)
+    else:
+        os.chmod(path, 0o777)
+
+
+def _copy_dir_attrs(source: str, target: str) -> None:
+    """Mode, times and owner, so the runner user can still write below the directory through the overlay."""
+    shutil.copystat(source, target)
+    if os.geteuid() == 0:
+        info = os.lstat(source)
+        os.chown(target, info.st_uid, info.st_gid)
+
+
+def _link_tree(source: str, target: str) -> None:
+    """Copy a tree as hard links: instant, and files stay shared with the source generation."""
+    for directory, dirnames, filenames in os.walk(source):
+        destination = os.path.join(target, os.path.relpath(directory, source))
+        os.makedirs(destination, exist_ok=True)
+        _copy_dir_attrs(directory, destination)
+        for name in list(dirnames):
+            if os.path.islink(os.path.join(directory, name)):
+                dirnames.remove(name)
+                filenames.append(name)
+        for name in filenames:
+            path = os.path.join(directory, name)
+            if os.path.islink(path):
+                os.symlink(os.readlink(path), os.path.join(destination, name))
+            else:
+                os.link(path, os.path.join(destination, name))
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def _is_opaque(path: str) -> bool:
+    try:
+        return os.getxattr(path, OVERLAY_OPAQUE_XATTR, follow_symlinks=False) == b"y"
+    except OSError:
+        return False  # Not opaque, or xattrs not readable here; the directories are then merged
+
+
+def _apply_layer(upper: str, generation: str) -> int:
+    """Apply an overlay upper dir to a linked generation; returns the number of files written.
+
+    Files are written to a temporary name and renamed over the hard link, so
+    older generations never change. Files already merged on an earlier pass
+    (same size and mtime) are skipped.
+    """
+    written = 0
+    for directory, dirnames, filenames in os.walk(upper):
+        target_dir = os.path.join(generation, os.path.relpath(directory, upper))
+        for name in list(dirnames):
+            source, target = os.path.join(directory, name), os.path.join(target_dir, name)
+            if os.path.islink(source):
+                dirnames.remove(name)
+                filenames.append(name)
+                continue
+            if _is_opaque(source) or (os.path.lexists(target) and (os.path.islink(target) or not os.path.isdir(target))):
+                _remove(target)
+            os.makedirs(target, exist_ok=True)
+            _copy_dir_attrs(source, target)
+        for name in filenames:
+            source, target = os.path.join(directory, name), os.path.join(target_dir, name)
+            info = os.lstat(source)
+            if stat.S_ISCHR(info.st_mode) and info.st_rdev == 0:
+                _remove(target)  # Whiteout: deleted by the runner
+            elif stat.S_ISLNK(info.st_mode):
+                _remove(target)
+                os.symlink(os.readlink(source), target)
+            elif stat.S_ISREG(info.st_mode):
+                try:
+                    existing = os.lstat(target)
+                    if existing.st_size == info.st_size and existing.st_mtime_ns == info.st_mtime_ns:
+                        continue
+                except FileNotFoundError:
+                    pass
+                if os.path.isdir(target) and not os.path.islink(target):
+                    shutil.rmtree(target)
+                partial = f"{target}.rp-partial"
+                shutil.copy2(source, partial)
+                if os.geteuid() == 0:
+                    os.chown(partial, info.st_uid, info.st_gid)
+                os.replace(partial, target)
+                written += 1
+    return written
+
+
+def _entries(generation: str, depth: int) -> List[str]:
+    """Eviction units: the paths `depth` levels below the cache root."""
+    level = [generation]
+    for _ in range(depth):
+        children = []
+        for path in level:
+            if os.path.isdir(path) and not os.path.islink(path):
+                children.extend(os.path.join(path, name) for name in os.listdir(path))
+            else:
+                children.append(path)  # Shallower than `depth`; evicted as a whole
+        level = children
+    return level
+
+
+def _usage(path: str, seen: Set[int]) -> Tuple[int, float]:
+    """Bytes on disk (each inode once) and most recent access or change time below `path`."""
+    paths = [path]
+    if os.path.isdir(path) and not os.path.islink(path):
+        paths = [os.path.join(d, n) for d, dirnames, filenames in os.walk(path) for n in filenames + dirnames]
+    size, last_used = 0, 0.0
+    for item in paths:
+        try:
+            info = os.lstat(item)
+        except FileNotFoundError:
+            continue
+        last_used = max(last_used, info.st_atime, info.st_mtime)
+        if info.st_ino not in seen:
+            seen.add(info.st_ino)
+            size += info.st_blocks * 512
+    return size, last_used
+
+
+def _evict(generation: str, depth: int, quota_bytes: int) -> Tuple[int, int]:
+    """Remove least recently used entries until the generation fits `quota_bytes`; returns (size, evicted)."""
+    seen: Set[int] = set()
+    entries = [(path, *_usage(path, seen)) for path in _entries(generation, depth)]
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+        if total <= quota_bytes:
+            break
+        _remove(path)
+        total -= size
+        evicted += 1
+    return total, evicted
+
+
+def _referenced_generations(store: str) -> Set[str]:
+    referenced = {os.readlink(os.path.join(store, "current"))}
+    layers = os.path.join(store, "layers")
+    for layer in os.listdir(layers) if os.path.isdir(layers) else []:
+        try:
+            with open(os.path.join(layers, layer, "generation")) as f:
+                referenced.add(f.read().strip())
+        except OSError:
+            continue
+    return referenced
+
+
+def _drop_unused_generations(store: str) -> None:
+    generations = os.path.join(store, "generations")
+    referenced = _referenced_generations(store)
+    for name in os.listdir(generations):
+        if name not in referenced:
+            shutil.rmtree(os.path.join(generations, name), ignore_errors=True)
+
+
+def _merge_layer(store: str, upper: str, depth: int, quota_mb: int) -> None:
+    """Fold a runner's writes into a new generation of `store`. Caller holds the store lock."""
+    current = _current(store)
+    if not os.path.isdir(upper) or not os.listdir(upper):
+        return
+    generation = _new_generation(store)
+    try:
+        _link_tree(current, generation)
+        _apply_layer(upper, generation)
+        _evict(generation, depth, quota_mb * 1024 * 1024)
+    except Exception:
+        shutil.rmtree(generation, ignore_errors=True)
+        raise
+    _publish(store, generation)
+    _drop_unused_generations(store)
+
+
+# -------- Runner lifecycle ---------
+
+def _runner_layers(runner_name: str) -> List[Tuple[str, str]]:
+    """(store, layer dir) of every cache a runner has a layer in, whatever its template is now."""
+    layers = []
+    if not os.path.isdir(CACHES_DIR):
+        return layers
+    for template_name in os.listdir(CACHES_DIR):
+        for cache_name in os.listdir(os.path.join(CACHES_DIR, template_name)):
+            store = store_path(template_name, cache_name)
+            layer = os.path.join(store, "layers", runner_name)
+            if os.path.isdir(layer):
+                layers.append((store, layer))
+    return layers
+
+
+def _store_settings(store: str) -> Tuple[int, int]:
+    try:
+        with open(os.path.join(store, "settings.json")) as f:
+            data = json.load(f)
+        return data["depth"], data["quota_mb"]
+    except (OSError, ValueError, KeyError):
+        return 1, settings.CACHE_DEFAULT_QUOTA_MB
+
+
+def cache_mounts(template: Any, runner_name: str) -> Tuple[Dict[str, Dict[str, str]], Dict[str, str]]:
+    """Create a runner's overlay cache volumes; returns the `volumes` and environment for containers.run."""
+    specs = cache_specs(template)
+    if not specs:
+        return {}, {}
+    client = get_docker_client()
+    volumes: Dict[str, Dict[str, str]] = {}
+    environment: Dict[str, str] = {}
+    for spec in specs:
+        if not spec["path"]:
+            raise ValueError(f"Cache '{spec['name']}' needs a path")
+        store = store_path(template.name, spec["name"])
+        layer = os.path.join(store, "layers", runner_name)
+        name = _volume_name(runner_name, spec["name"])
+        with _store_lock(store):
+            with open(os.path.join(store, "settings.json"), "w") as f:
+                json.dump({"depth": spec["depth"], "quota_mb": spec["quota_mb"]}, f)
+            if os.path.isdir(layer):
+                # Left behind by a container that was not removed through RunnerPilot
+                _merge_layer(store, os.path.join(layer, "upper"), spec["depth"], spec["quota_mb"])
+                shutil.rmtree(layer)
+            generation = _current(store)
+            for part in ("upper", "work"):
+                os.makedirs(os.path.join(layer, part))
+            _give_to_runner(os.path.join(layer, "upper"))
+            with open(os.path.join(layer, "generation"), "w") as f:
+                f.write(os.path.basename(generation))
+        try:
+            client.volumes.get(name).remove(force=True)
+        except docker.errors.NotFound:
+            pass
+        client.volumes.create(
+            name=name,
+            driver="local",
+            driver_opts={
+                "type": "overlay",
+                "device": "overlay",
+                "o": f"lowerdir={host_path(generation)},upperdir={host_path(os.path.join(layer, 'upper'))},"
+                     f"workdir={host_path(os.path.join(layer, 'work'))}",
+            },
+            labels={VOLUME_LABEL: spec["name"], "runnerpilot.runner": runner_name},
+        )
+        volumes[name] = {"bind": spec["path"], "mode": "rw"}
+        environment.update(CACHE_ENV.get(spec["name"], {}))
+    return volumes, environment
+
+
+def release_runner_caches(runner_name: str) -> None:
+    """Merge and drop a runner's cache layers and volumes. Call after its container is removed."""
+    for store, layer in _runner_layers(runner_name):
+        cache_name = os.path.basename(store)
+        with _store_lock(store):
+            try:
+                _merge_layer(store, os.path.join(layer, "upper"), *_store_settings(store))
+            except Exception as e:
+                print(f"Warning: Could not merge the {cache_name} cache of {runner_name}: {str(e)}")
+            shutil.rmtree(layer, ignore_errors=True)
+            _drop_unused_generations(store)
+        if DOCKER_AVAILABLE:
+            try:
+                get_docker_client().volumes.get(_volume_name(runner_name, cache_name)).remove(force=True)
+            except docker.errors.NotFound:
+                pass
+            except Exception as e:
+                print(f"Warning: Could not remove cache volume of {runner_name}: {str(e)}")
+
+
+def cache_usage(template: Any) -> List[Dict[str, Any]]:
+    """Size, quota and generation of each cache of a template."""
+    usage = []
+    for spec in cache_specs(template):
+        store = store_path(template.name, spec["name"])
+        data = {"name": spec["name"], "path": spec["path"], "quota_bytes": spec["quota_mb"] * 1024 * 1024,
+                "size_bytes": 0, "generation": None, "runners": 0}
+        if os.path.islink(os.path.join(store, "current")):
+            generation = _current(store)
+            data["size_bytes"] = _usage(generation, set())[0]
+            data["generation"] = os.path.basename(generation)
+            layers = os.path.join(store, "layers")
+            data["runners"] = len(os.listdir(layers)) if os.path.isdir(layers) else 0
+        usage.append(data)
+    return usage
+
+
+def clear_cache(template: Any, cache_name: str) -> None:
+    """Start a cache over empty; runners keep their current snapshot until recreated."""
+    store = store_path(template.name, cache_name)
+    with _store_lock(store):
+        if os.path.isdir(store):
+            _current(store)
+            _publish(store, _new_generation(store))
+            _drop_unused_generations(store)
@@ -0,0 +1,137 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from peewee import fn
+
+from inc.config import settings
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.event_bus import publish
+from inc.utils.runner_ops import container_status_map
+from models import Revision, RunnerInstance, RunnerTombstone
+
+
+RUNNER_REVISION = "runner"
+TOMBSTONE_FLOOR = "runner_tombstone_floor"  # Highest revision whose tombstones were pruned
+
+# Container events that can change a runner's status
+WATCHED_ACTIONS = {"create", "start", "restart", "die", "stop", "kill", "pause", "unpause", "destroy", "oom"}
+EVENT_RETRY_SECONDS = 10
+
+_watcher_lock = threading.Lock()
+_threads: List[threading.Thread] = []
+_reconcile_now = threading.Event()
+_last_prune: Optional[datetime] = None
+
+
+def current_revision() -> int:
+    return Revision.current(RUNNER_REVISION)
+
+
+def changes_since(since: int) -> Tuple[int, Optional[List[Dict[str, Any]]], List[int]]:
+    """Return (revision, changed runner rows, deleted runner ids) after revision `since`.
+
+    Changed runners is None when deletions older than the retained tombstones
+    may have been missed; the caller must then resync from the full list.
+    The revision is read first, so a change racing with this call is returned
+    again on the next poll rather than skipped.
+    """
+    revision = current_revision()
+    if since < Revision.current(TOMBSTONE_FLOOR):
+        return revision, None, []
+    changed = list(
+        RunnerInstance.select()
+        .where(RunnerInstance.revision > since)
+        .order_by(RunnerInstance.revision)
+        .dicts()
+    )
+    deleted = [
+        row.runner_id
+        for row in RunnerTombstone.select(RunnerTombstone.runner_id).where(RunnerTombstone.revision > since)
+    ]
+    return revision, changed, deleted
+
+
+def reconcile_container_statuses() -> int:
+    """Store each runner's container status, bumping revisions of runners whose status changed."""
+    statuses = container_status_map()
+    changed = 0
+    # Read every row before the first save: writing while a select is still
+    # stepping keeps its read snapshot open, and WAL refuses to upgrade a stale
+    # snapshot to a write (SQLITE_BUSY_SNAPSHOT) once another worker has written
+    instances = list(RunnerInstance.select(
+        RunnerInstance.id, RunnerInstance.runner_name, RunnerInstance.hostname, RunnerInstance.container_status
+    ))
+    for instance in instances:
+        status = statuses.get(instance.runner_name, "inactive") if instance.hostname else "inactive"
+        if status != instance.container_status:
+            previous = instance.container_status
+            instance.container_status = status
+            instance.save(only=[RunnerInstance.container_status])
+            publish("runner.status", {
+                "id": instance.id,
+                "runner_name": instance.runner_name,
+                "status": status,
+                "previous": previous,
+                "revision": instance.revision,
+            })
+            changed += 1
+    return changed
+
+
+def _prune_tombstones() -> None:
+    """Drop old tombstones at most once an hour and remember how far the feed is complete."""
+    global _last_prune
+    now = datetime.now()
+    if _last_prune and now - _last_prune < timedelta(hours=1):
+        return
+    _last_prune = now
+    cutoff = now - timedelta(hours=settings.RUNNER_TOMBSTONE_RETENTION_HOURS)
+    pruned = RunnerTombstone.select(fn.MAX(RunnerTombstone.revision)).where(RunnerTombstone.deleted_at < cutoff).scalar()
+    if pruned:
+        Revision.insert(name=TOMBSTONE_FLOOR, value=pruned).on_conflict(
+            conflict_target=[Revision.name],
+            update={Revision.value: fn.MAX(Revision.value, pruned)},
+        ).execute()
+        RunnerTombstone.delete().where(RunnerTombstone.revision <= pruned).execute()
+
+
+def _reconcile_loop() -> None:
+    while True:
+        # Woken early by container events; the timeout catches anything the event stream missed
+        _reconcile_now.wait(timeout=settings.CONTAINER_RECONCILE_SECONDS)
+        time.sleep(0.2)  # Coalesce bursts, e.g. a bulk stop
+        _reconcile_now.clear()
+        try:
+            reconcile_container_statuses()
+            _prune_tombstones()
+        except Exception as e:
+            print(f"Warning: Container status reconcile failed: {str(e)}")
+
+
+def _events_loop() -> None:
+    while True:
+        try:
+            for event in get_docker_client().events(decode=True, filters={"type": "container"}):
+                if event.get("Action", event.get("status", "")).split(":")[0] in WATCHED_ACTIONS:
+                    _reconcile_now.set()
+        except Exception as e:
+            print(f"Warning: Docker event stream failed: {str(e)}")
+        time.sleep(EVENT_RETRY_SECONDS)
+
+
+def start_container_watch() -> None:
+    """Keep stored container statuses, and with them runner revisions, current."""
+    if not DOCKER_AVAILABLE:
+        return
+    with _watcher_lock:
+        if any(thread.is_alive() for thread in _threads):
+            return
+        _threads[:] = [
+            threading.Thread(target=_reconcile_loop, daemon=True, name="container-reconcile"),
+            threading.Thread(target=_events_loop, daemon=True, name="container-events"),
+        ]
+        for thread in _threads:
+            thread.start()
+        _reconcile_now.set()  # Initial reconcile right away
@@ -0,0 +1,483 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Generator, Iterable, List, Optional, Tuple
+
+from inc.config import settings
+from inc.utils.derived_images import derived_image
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.event_bus import publish
+from inc.utils.log_config import docker_log_config
+from inc.utils.metrics import ACTIVE_CLONE_OPERATIONS
+from inc.utils.release_cache import VERSION_LABEL, runner_install_mount
+from inc.utils.runner_caches import cache_mounts, release_runner_caches
+from inc.utils.tracing import in_context, start_span
+from inc.utils.work_storage import remove_work_storage, work_cleanup_env, work_mounts
+from models import RunnerInstance, RunnerTemplate
+
+
+RUNNER_ACTIONS = ("start", "stop", "restart", "delete")
+
+
+def _run_docker_container(
+    runner_name: str,
+    github_url: str,
+    token: str,
+    labels: Optional[str] = None,
+    image: Optional[str] = None,
+    template: Optional[RunnerTemplate] = None,
+    start: bool = True,
+) -> Tuple[bool, str, Optional[str], Optional[str]]:
+    """
+    Run a Docker container for the GitHub runner; with start=False only create it.
+    
+    Returns:
+        tuple: (success: bool, message: str, container_id: Optional[str], image_digest: Optional[str])
+    """
+    if not DOCKER_AVAILABLE:
+        return False, "Docker is not available", None, None
+    
+    image = image or settings.RUNNER_IMAGE
+    try:
+        client = get_docker_client()
+
+        # Runners of a template with packages or setup steps run its derived image, built on first use
+        image = derived_image(template, image) or image
+        
+        # Prepare environment variables
+        env = {
+            "RUNNER_URL": github_url,
+            "RUNNER_TOKEN": token,
+            "RUNNER_NAME": runner_name,
+        }
+        
+        if labels:
+            env["RUNNER_LABELS"] = labels
+        
+        # Prepare volumes - mount docker socket for running docker commands inside the runner
+        volumes = {
+            "/var/run/docker.sock": {"bind": "/var/run/docker.sock", "mode": "rw"}
+        }
+        container_labels = {}
+
+        if settings.RUNNER_RELEASE_CACHE:
+            # Runner binaries from the host's shared read-only install; the entrypoint links them in
+            version, install = runner_install_mount()
+            volumes.update(install)
+            env["RUNNER_INSTALL_DIR"] = settings.RUNNER_INSTALL_MOUNT
+            container_labels[VERSION_LABEL] = version
+
+        # Copy-on-write views of the template's shared tool and dependency caches
+        cache_volumes, cache_env = cache_mounts(template, runner_name)
+        volumes.update(cache_volumes)
+        env.update(cache_env)
+
+        # Work directory on tmpfs, a fast host disk or a volume instead of the overlay filesystem
+        work_volumes, tmpfs = work_mounts(template, runner_name)
+        volumes.update(work_volumes)
+        env.update(work_cleanup_env(template))
+        
+        options = dict(
+            image=image,
+            environment=env,
+            volumes=volumes,
+            tmpfs=tmpfs,
+            labels=container_labels,
+            log_config=docker_log_config(template),  # Rotated, so chatty jobs cannot fill the disk with logs
+            restart_policy={"Name": "unless-stopped"},
+            name=runner_name,  # Use runner_name as container name
+        )
+        if not start:
+            # Replacing a stopped runner: it stays out of service until started
+            container = client.containers.create(**options)
+            return True, "Container created successfully", container.id, container.attrs.get("Image")
+
+        # Run the container
+        container = client.containers.run(detach=True, **options)  # Run in background
+        
+        return True, "Container started successfully", container.id, container.attrs.get("Image")
+        
+    except docker.errors.ImageNotFound:
+        return False, f"Docker image {image} not found", None, None
+    except docker.errors.ContainerError as e:
+        return False, f"Container error: {str(e)}", None, None
+    except Exception as e:
+        return False, f"Failed to run container: {str(e)}", None, None
+
+
+def runner_template(instance: RunnerInstance) -> Optional[RunnerTemplate]:
+    if instance.template_id is None:
+        return None
+    return RunnerTemplate.get_or_none(RunnerTemplate.id == instance.template_id)
+
+
+def _stop_timeout(timeout: Optional[int]) -> int:
+    return settings.RUNNER_STOP_TIMEOUT_SECONDS if timeout is None else timeout
+
+
+def start_runner(instance: RunnerInstance) -> Dict[str, Any]:
+    """Start the container of a runner instance.
+
+    Raises docker.errors.NotFound when the container does not exist.
+    """
+    container = get_docker_client().containers.get(instance.runner_name)
+    container.start()
+
+    # Update the instance hostname with container ID if not already set
+    if not instance.hostname or instance.hostname != container.id:
+        instance.hostname = container.id
+        instance.save()
+
+    # A started runner is back in service
+    if instance.drain_state is not None:
+        instance.drain_state = None
+        instance.drain_action = None
+        instance.drain_deadline = None
+        instance.save()
+
+    return {
+        "status": "started",
+        "message": "Container started successfully",
+        "instance_id": instance.id,
+        "container_id": container.id,
+    }
+
+
+def stop_runner(instance: RunnerInstance, timeout: Optional[int] = None) -> Dict[str, Any]:
+    """Stop the container of a runner instance (container remains for restart)."""
+    try:
+        container = get_docker_client().containers.get(instance.runner_name)
+    except docker.errors.NotFound:
+        return {
+            "status": "not_running",
+            "message": "Container not found (already stopped?)",
+            "instance_id": instance.id,
+        }
+
+    container.stop(timeout=_stop_timeout(timeout))
+    return {
+        "status": "stopped",
+        "message": "Container stopped (can be restarted)",
+        "instance_id": instance.id,
+        "container_id": container.id,
+    }
+
+
+def restart_runner(instance: RunnerInstance, timeout: Optional[int] = None) -> Dict[str, Any]:
+    """Stop and start the container of a runner instance.
+
+    Raises docker.errors.NotFound when the container does not exist.
+    """
+    container = get_docker_client().containers.get(instance.runner_name)
+    container.stop(timeout=_stop_timeout(timeout))
+    container.start()
+    return {
+        "status": "restarted",
+        "message": "Container restarted successfully",
+        "instance_id": instance.id,
+        "container_id": container.id,
+        "container_status": "running",
+    }
+
+
+def delete_runner(instance: RunnerInstance, timeout: Optional[int] = None) -> Dict[str, Any]:
+    """Stop and remove the container of a runner instance, then delete its record."""
+    instance_id = instance.id
+    if DOCKER_AVAILABLE and instance.runner_name:
+        try:
+            container = get_docker_client().containers.get(instance.runner_name)
+            container.stop(timeout=_stop_timeout(timeout))
+            container.remove()
+        except docker.errors.NotFound:
+            pass  # Container already removed
+        except Exception as e:
+            print(f"Warning: Failed to remove container: {str(e)}")
+        release_runner_caches(instance.runner_name)
+        remove_work_storage(instance.runner_name, runner_template(instance))
+
+    instance.delete_instance()
+    return {"status": "ok", "message": f"Instance {instance_id} deleted (container removed)", "id": instance_id}
+
+
+def recreate_runner(
+    instance: RunnerInstance,
+    image: Optional[str] = None,
+    timeout: Optional[int] = None,
+    start: bool = True,
+    token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Replace the container of a runner instance with a fresh one from `image`.
+
+    The runner keeps its name, URL and labels; the record is updated with the
+    new container ID and image digest. The new container registers again, so
+    `token` should be a current registration token; it is stored on the
+    runner, which keeps its own when none is given. With start=False the new
+    container is only created, for runners that should stay stopped.
+    """
+    client = get_docker_client()
+    try:
+        container = client.containers.get(instance.runner_name)
+        container.stop(timeout=_stop_timeout(timeout))
+        container.remove()
+    except docker.errors.NotFound:
+        pass  # Nothing to replace, just create it
+    # Fold the old container's cache writes in; the new one starts from the merged snapshot
+    release_runner_caches(instance.runner_name)
+
+    success, message, container_id, image_digest = _run_docker_container(
+        runner_name=instance.runner_name,
+        github_url=instance.github_url,
+        token=token or instance.token,
+        labels=instance.labels,
+        image=image,
+        template=runner_template(instance),
+        start=start,
+    )
+    if not success:
+        raise RuntimeError(message)
+
+    instance.hostname = container_id
+    instance.image_digest = image_digest
+    instance.token = token or instance.token
+    instance.save()
+    return {
+        "status": "recreated",
+        "instance_id": instance.id,
+        "container_id": container_id,
+        "image_digest": image_digest,
+    }
+
+
+def provision_runner(instance: RunnerInstance) -> Tuple[bool, str]:
+    """Run the container for a runner record and store its container ID and image digest."""
+    success, message, container_id, image_digest = _run_docker_container(
+        runner_name=instance.runner_name,
+        github_url=instance.github_url,
+        token=instance.token,
+        labels=instance.labels,
+        template=runner_template(instance),
+    )
+    if success:
+        instance.hostname = container_id
+        instance.image_digest = image_digest
+        instance.save()
+    return success, message
+
+
+def _adopt_or_provision(instance: RunnerInstance) -> Tuple[bool, str]:
+    """Provision a runner record, or take over the container an interrupted attempt already ran for it."""
+    if not DOCKER_AVAILABLE:
+        return provision_runner(instance)
+    try:
+        container = get_docker_client().containers.get(instance.runner_name)
+    except docker.errors.NotFound:
+        return provision_runner(instance)
+    if container.status != "running":
+        container.start()
+    if instance.hostname != container.id:
+        instance.hostname = container.id
+        instance.image_digest = container.attrs.get("Image")
+        instance.save()
+    return True, "Container adopted from an interrupted clone"
+
+
+def clone_runners(
+    instance: RunnerInstance,
+    count: int,
+    token: Optional[str] = None,
+    created_instances: Optional[List[Dict[str, Any]]] = None,
+    failed_clones: Optional[List[Dict[str, Any]]] = None,
+    on_progress: Optional[Callable[[List[Dict[str, Any]], List[Dict[str, Any]], Optional[str]], None]] = None,
+    pending: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Create `count` runners from the settings of `instance`, one after another.
+
+    Clones already recorded in `created_instances` and `failed_clones` count
+    as done, so an interrupted clone can be continued. `on_progress` is
+    called with both lists and the name of the clone about to be created,
+    before its record and container exist, and again with both lists once it
+    is done. Passing that name back as `pending` adopts the record and
+    container an interrupted attempt left, instead of creating one more.
+    """
+    token = token or instance.token
+    created_instances = list(created_instances or [])
+    failed_clones = list(failed_clones or [])
+    ACTIVE_CLONE_OPERATIONS.labels().inc()
+    try:
+        publish("clone.started", {"instance_id": instance.id, "count": count})
+        for i in range(len(created_instances) + len(failed_clones), count):
+            try:
+                with start_span("runner.clone", **{"clone.index": i}):
+                    clone_runner_name = pending
+                    if clone_runner_name is None:
+                        # Generate unique runner name for each clone
+                        clone_base_name = instance.runner_name.split("-")[0]
+                        clone_runner_name = RunnerInstance.generate_runner_name(clone_base_name)
+                        if on_progress:
+                            on_progress(created_instances, failed_clones, clone_runner_name)
+                    pending = None
+
+                    cloned_instance = RunnerInstance.get_or_none(RunnerInstance.runner_name == clone_runner_name)
+                    if cloned_instance is None:
+                        cloned_instance = RunnerInstance.create(
+                            runner_name=clone_runner_name,
+                            github_url=instance.github_url,
+                            token=token,
+                            labels=instance.labels,
+                            template_id=instance.template_id,
+                        )
+                    success, message = _adopt_or_provision(cloned_instance)
+                    if success:
+                        created_instances.append({
+                            "id": cloned_instance.id,
+                            "runner_name": clone_runner_name,
+                            "status": "running",
+                            "container_id": cloned_instance.hostname,
+                        })
+                    else:
+                        failed_clones.append({
+                            "runner_name": clone_runner_name,
+                            "error": message,
+                        })
+            except Exception as e:
+                failed_clones.append({
+                    "error": f"Clone {i+1} failed: {str(e)}",
+                })
+            if on_progress:
+                on_progress(created_instances, failed_clones, None)
+            publish("clone.progress", {
+                "instance_id": instance.id,
+                "index": i + 1,
+                "count": count,
+                "succeeded": len(created_instances),
+                "failed": len(failed_clones),
+            })
+
+        publish("clone.completed", {
+            "instance_id": instance.id,
+            "count": count,
+            "succeeded": len(created_instances),
+            "failed": len(failed_clones),
+        })
+        return {
+            "status": "completed",
+            "message": f"Clone process completed: {len(created_instances)} successful, {len(failed_clones)} failed",
+            "instance_id": instance.id,
+            "count": count,
+            "created_instances": created_instances,
+            "failed_clones": failed_clones if failed_clones else None,
+        }
+    finally:
+        ACTIVE_CLONE_OPERATIONS.labels().dec()
+
+
+def container_status_map() -> Dict[str, str]:
+    """Map container name to runner status ("active", "inactive", "error") using one list call."""
+    if not DOCKER_AVAILABLE:
+        return {}
+    statuses: Dict[str, str] = {}
+    # Sparse listing skips the per-container inspect docker-py otherwise does
+    for container in get_docker_client().containers.list(all=True, sparse=True):
+        if container.status == "running":
+            status = "active"
+        elif container.status in ("exited", "created"):
+            status = "inactive"  # Stopped, or created stopped by a recreate
+        else:
+            status = "error"
+        for name in container.attrs.get("Names") or []:
+            statuses[name.lstrip("/")] = status
+    return statuses
+
+
+def _parse_labels(labels: Optional[str]) -> List[str]:
+    return [label.strip() for label in (labels or "").split(",") if label.strip()]
+
+
+def select_instances(
+    ids: Optional[List[int]] = None,
+    labels: Optional[str] = None,
+    status: Optional[str] = None,
+) -> List[RunnerInstance]:
+    """Select runner instances by id list, label set and container status.
+
+    All given criteria must match. A runner matches `labels` when it carries
+    every one of the comma-separated labels.
+    """
+    query = RunnerInstance.select().order_by(RunnerInstance.id)
+    if ids:
+        query = query.where(RunnerInstance.id.in_(ids))
+    instances = list(query)
+
+    wanted_labels = set(_parse_labels(labels))
+    if wanted_labels:
+        instances = [i for i in instances if wanted_labels.issubset(_parse_labels(i.labels))]
+
+    if status:
+        statuses = container_status_map()
+        instances = [i for i in instances if statuses.get(i.runner_name, "inactive") == status]
+
+    return instances
+
+
+def _action_handler(action: str, stop_timeout: Optional[int]) -> Callable[[RunnerInstance], Dict[str, Any]]:
+    if action == "start":
+        return start_runner
+    if action == "stop":
+        return lambda instance: stop_runner(instance, timeout=stop_timeout)
+    if action == "restart":
+        return lambda instance: restart_runner(instance, timeout=stop_timeout)
+    if action == "delete":
+        return lambda instance: delete_runner(instance, timeout=stop_timeout)
+    raise ValueError(f"Unknown action '{action}'")
+
+
+def bulk_action_generator(
+    action: str,
+    instances: Iterable[RunnerInstance],
+    concurrency: Optional[int] = None,
+    stop_timeout: Optional[int] = None,
+) -> Generator[str, None, None]:
+    """Run a lifecycle action over many runners with bounded parallelism.
+
+    Yields one JSON line per runner as soon as its operation finishes, so a
+    fleet-wide stop takes roughly one stop timeout instead of one per runner.
+    """
+    instances = list(instances)
+    handler = _action_handler(action, stop_timeout)
+    workers = max(1, min(concurrency or settings.BULK_MAX_CONCURRENCY, settings.BULK_MAX_CONCURRENCY))
+    started_at = time.monotonic()
+
+    yield json.dumps({
+        "status": "started",
+        "action": action,
+        "total": len(instances),
+        "concurrency": workers,
+    }) + "\n"
+
+    succeeded = 0
+    failed = 0
+    if instances:
+        with ThreadPoolExecutor(max_workers=min(workers, len(instances)), thread_name_prefix="bulk") as executor:
+            # Run each action in the request's context so its spans join the request trace
+            futures = {executor.submit(in_context(handler), instance): instance for instance in instances}
+            for future in as_completed(futures):
+                instance = futures[future]
+                item = {"instance_id": instance.id, "runner_name": instance.runner_name}
+                try:
+                    item.update({"status": "ok", "result": future.result()})
+                    succeeded += 1
+                except docker.errors.NotFound:
+                    item.update({"status": "error", "message": f"Container '{instance.runner_name}' not found"})
+                    failed += 1
+                except Exception as e:
+                    item.update({"status": "error", "message": str(e)})
+                    failed += 1
+                yield json.dumps(item) + "\n"
+
+    yield json.dumps({
+        "status": "completed",
+        "action": action,
+        "succeeded": succeeded,
+        "failed": failed,
+        "elapsed_seconds": round(time.monotonic() - started_at, 3),
+    }) + "\n"
@@ -4,13 +4,10 @@ import urllib.request
 import time
 from typing import Any, Generator
 from inc.config import settings
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker
+from inc.utils.event_bus import publish
 from inc.utils.prerequisites import check_prerequisites
-
-try:
-    import docker
-    DOCKER_AVAILABLE = True
-except ImportError:
-    DOCKER_AVAILABLE = False
+from inc.utils.release_cache import ensure_runner_install
 
 
 def _is_gh_runner_image_available() -> bool:
@@ -58,6 +55,7 @@ def _pull_gh_runner_docker_image() -> Generator[str, None, None]:
             "status": "starting",
         })
         yield f"{start_json}\n"
+        publish("pull.progress", {"image": "0xaungkon/gh-runner:latest", "status": "starting"})
         
         last_yield_time = time.time()
         
@@ -77,6 +75,7 @@ def _pull_gh_runner_docker_image() -> Generator[str, None, None]:
                         "progress": progress,
                     })
                     yield f"{progress_json}\n"
+                    publish("pull.progress", {"image": "0xaungkon/gh-runner:latest", "status": status, "progress": progress})
                     last_yield_time = current_time
         
         # Yield completion message
@@ -86,6 +85,7 @@ def _pull_gh_runner_docker_image() -> Generator[str, None, None]:
             "message": "0xaungkon/gh-runner:latest image pulled successfully",
         })
         yield f"{completion_json}\n"
+        publish("pull.progress", {"image": "0xaungkon/gh-runner:latest", "status": "completed"})
         
     except Exception as e:
         error_json = json.dumps({
@@ -93,6 +93,7 @@ def _pull_gh_runner_docker_image() -> Generator[str, None, None]:
             "message": f"Failed to pull gh-runner image: {str(e)}",
         })
         yield f"{error_json}\n"
+        publish("pull.progress", {"image": "0xaungkon/gh-runner:latest", "status": "failed", "error": str(e)})
 
 
 def setup_streaming_generator() -> Generator[str, None, None]:
@@ -130,7 +131,25 @@ def setup_streaming_generator() -> Generator[str, None, None]:
     else:
         yield from _pull_gh_runner_docker_image()
     
-    # Step 3: Mark setup as complete
+    # Step 3: Download and extract the runner release the containers will mount
+    if settings.RUNNER_RELEASE_CACHE:
+        try:
+            version, path = ensure_runner_install()
+            release_json = json.dumps({
+                "action": "preparing runner release",
+                "status": "completed",
+                "message": f"Runner {version} ready at {path}",
+            })
+            yield f"{release_json}\n"
+        except Exception as e:
+            error_json = json.dumps({
+                "action": "error",
+                "message": f"Failed to prepare runner release: {str(e)}",
+            })
+            yield f"{error_json}\n"
+            return
+
+    # Step 4: Mark setup as complete
     from inc.utils.meta import set_meta
     set_meta("is_setup", True, meta_type="bool")
     
@@ -0,0 +1,72 @@
+# Startup timing and readiness for one API worker.
+#
+# main.py marks when its imports are done and wraps each startup step in
+# `phase()`; the worker is ready once `mark_ready()` runs. The durations are
+# exported as a metric, returned by /readyz and read by
+# scripts/startup_report.py, so a slow import or init step shows up as a
+# number instead of a vague "restarts feel slow".
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from inc.config import settings
+from inc.utils.metrics import STARTUP_PHASE_SECONDS
+
+_process_started = time.perf_counter()
+_phases: Dict[str, float] = {}  # Phase name -> seconds
+_errors: Dict[str, str] = {}
+_ready = threading.Event()
+_ready_after: Optional[float] = None
+
+
+def _record(name: str, seconds: float) -> None:
+    _phases[name] = seconds
+    STARTUP_PHASE_SECONDS.labels(name).set(seconds)
+
+
+def mark_imported() -> None:
+    """Record the time spent importing the application. Call at the end of main.py."""
+    if "import" not in _phases:
+        _record("import", time.perf_counter() - _process_started)
+
+
+@contextmanager
+def phase(name: str, required: bool = True):
+    """Time a startup step; failures of steps that are not required are recorded instead of raised."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        _errors[name] = str(e)
+        if required:
+            raise
+        print(f"Warning: Startup step '{name}' failed: {str(e)}")
+    finally:
+        _record(name, time.perf_counter() - started)
+
+
+def mark_ready() -> None:
+    global _ready_after
+    _ready_after = time.perf_counter() - _process_started
+    _record("total", _ready_after)
+    _ready.set()
+    steps = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in _phases.items() if name != "total")
+    if _ready_after * 1000 > settings.STARTUP_BUDGET_MS:
+        print(f"Warning: Startup took {_ready_after * 1000:.0f} ms, over the {settings.STARTUP_BUDGET_MS} ms budget ({steps})")
+    else:
+        print(f"Ready in {_ready_after * 1000:.0f} ms ({steps})")
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def startup_report() -> Dict[str, Any]:
+    return {
+        "ready": is_ready(),
+        "total_ms": round(_ready_after * 1000, 1) if _ready_after is not None else None,
+        "budget_ms": settings.STARTUP_BUDGET_MS,
+        "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in _phases.items() if name != "total"},
+        "errors": dict(_errors),
+    }
@@ -0,0 +1,267 @@
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from inc.config import settings
+from inc.utils.coordination import broadcast, subscribe
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from models import RunnerInstance
+
+
+METRICS = (
+    "cpu_percent",
+    "memory_bytes",
+    "memory_limit_bytes",
+    "net_rx_bps",
+    "net_tx_bps",
+    "blk_read_bps",
+    "blk_write_bps",
+)
+
+# (window name, bucket seconds or None for raw samples, capacity setting)
+WINDOWS = (
+    ("raw", None, "STATS_RAW_POINTS"),
+    ("minute", 60, "STATS_MINUTE_POINTS"),
+    ("hour", 3600, "STATS_HOUR_POINTS"),
+)
+
+
+class RingBuffer:
+    """Fixed-size float ring buffer backed by an array; old values are overwritten."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._head = 0
+        self._count = 0
+
+    def push(self, value: float) -> None:
+        self._data[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def values(self) -> List[float]:
+        """Values oldest first."""
+        start = (self._head - self._count) % self.capacity
+        if start + self._count <= self.capacity:
+            return self._data[start:start + self._count].tolist()
+        return self._data[start:].tolist() + self._data[:self._head].tolist()
+
+    def last(self) -> Optional[float]:
+        return self._data[(self._head - 1) % self.capacity] if self._count else None
+
+
+class StatsWindow:
+    """One resolution of a runner's samples: a timestamp ring plus one ring per metric.
+
+    Windows with a bucket size average the samples falling into the current
+    bucket and push one point when the bucket closes.
+    """
+
+    def __init__(self, capacity: int, bucket_seconds: Optional[int]):
+        self.bucket_seconds = bucket_seconds
+        self.timestamps = RingBuffer(capacity)
+        self.metrics = {name: RingBuffer(capacity) for name in METRICS}
+        self._bucket: Optional[int] = None
+        self._sums = dict.fromkeys(METRICS, 0.0)
+        self._samples = 0
+
+    def _push(self, timestamp: float, values: Dict[str, float]) -> None:
+        self.timestamps.push(timestamp)
+        for name in METRICS:
+            self.metrics[name].push(values[name])
+
+    def add(self, timestamp: float, values: Dict[str, float]) -> None:
+        if self.bucket_seconds is None:
+            self._push(timestamp, values)
+            return
+        bucket = int(timestamp // self.bucket_seconds)
+        if self._bucket is not None and bucket != self._bucket and self._samples:
+            self._push(self._bucket * self.bucket_seconds, {n: s / self._samples for n, s in self._sums.items()})
+            self._sums = dict.fromkeys(METRICS, 0.0)
+            self._samples = 0
+        self._bucket = bucket
+        for name in METRICS:
+            self._sums[name] += values[name]
+        self._samples += 1
+
+    def points(self, limit: Optional[int] = None) -> List[Dict[str, float]]:
+        timestamps = self.timestamps.values()
+        columns = {name: ring.values() for name, ring in self.metrics.items()}
+        points = [
+            {"t": t, **{name: columns[name][i] for name in METRICS}}
+            for i, t in enumerate(timestamps)
+        ]
+        return points[-limit:] if limit else points
+
+
+class RunnerStats:
+    def __init__(self):
+        self.windows = {
+            name: StatsWindow(getattr(settings, capacity), bucket)
+            for name, bucket, capacity in WINDOWS
+        }
+        self.previous: Optional[Tuple[float, ...]] = None  # Cumulative counters of the last sample
+
+    def add(self, timestamp: float, values: Dict[str, float]) -> None:
+        for window in self.windows.values():
+            window.add(timestamp, values)
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        raw = self.windows["raw"]
+        if not len(raw.timestamps):
+            return None
+        return {"t": raw.timestamps.last(), **{name: ring.last() for name, ring in raw.metrics.items()}}
+
+
+_stats: Dict[str, RunnerStats] = {}
+_stats_lock = threading.Lock()
+_sampler: Optional[threading.Thread] = None
+_sampler_lock = threading.Lock()
+
+
+def _counters(raw: Dict[str, Any]) -> Tuple[float, ...]:
+    """Cumulative counters from a Docker stats payload: cpu, system cpu, net rx/tx, blk read/write."""
+    cpu = raw.get("cpu_stats") or {}
+    networks = raw.get("networks") or {}
+    blkio = (raw.get("blkio_stats") or {}).get("io_service_bytes_recursive") or []
+    return (
+        float((cpu.get("cpu_usage") or {}).get("total_usage", 0)),
+        float(cpu.get("system_cpu_usage", 0)),
+        float(sum(n.get("rx_bytes", 0) for n in networks.values())),
+        float(sum(n.get("tx_bytes", 0) for n in networks.values())),
+        float(sum(e.get("value", 0) for e in blkio if str(e.get("op", "")).lower() == "read")),
+        float(sum(e.get("value", 0) for e in blkio if str(e.get("op", "")).lower() == "write")),
+    )
+
+
+def _sample_values(raw: Dict[str, Any], counters: Tuple[float, ...], previous: Optional[Tuple[float, ...]], elapsed: float) -> Dict[str, float]:
+    memory = raw.get("memory_stats") or {}
+    mem_stats = memory.get("stats") or {}
+    # Page cache is reclaimable; subtract it like `docker stats` does (cgroup v2, then v1)
+    cache = mem_stats.get("inactive_file", mem_stats.get("total_inactive_file", 0))
+    values = {
+        "cpu_percent": 0.0,
+        "memory_bytes": float(max(memory.get("usage", 0) - cache, 0)),
+        "memory_limit_bytes": float(memory.get("limit", 0)),
+        "net_rx_bps": 0.0,
+        "net_tx_bps": 0.0,
+        "blk_read_bps": 0.0,
+        "blk_write_bps": 0.0,
+    }
+    if previous is None or elapsed <= 0:
+        return values
+
+    cpu_delta = counters[0] - previous[0]
+    system_delta = counters[1] - previous[1]
+    online_cpus = (raw.get("cpu_stats") or {}).get("online_cpus") or 1
+    if cpu_delta > 0 and system_delta > 0:
+        values["cpu_percent"] = cpu_delta / system_delta * online_cpus * 100.0
+    for index, name in ((2, "net_rx_bps"), (3, "net_tx_bps"), (4, "blk_read_bps"), (5, "blk_write_bps")):
+        # Counters reset when a container restarts; treat that interval as zero
+        values[name] = max(counters[index] - previous[index], 0) / elapsed
+    return values
+
+
+def _sample_one(name: str, container_id: str) -> Optional[Tuple[str, float, Dict[str, Any]]]:
+    try:
+        raw = get_docker_client().api.stats(container_id, stream=False, one_shot=True)
+        return name, time.time(), raw
+    except Exception:
+        return None
+
+
+def sample_once(executor: ThreadPoolExecutor) -> None:
+    """Take one non-streaming sample of every running runner container.
+
+    One-shot stats calls return immediately instead of waiting a second for a
+    second reading, so CPU and I/O rates are derived from our previous sample.
+    """
+    managed = {row[0] for row in RunnerInstance.select(RunnerInstance.runner_name).tuples()}
+    containers = []
+    # Sparse listing skips the per-container inspect docker-py otherwise does
+    for container in get_docker_client().containers.list(sparse=True):
+        for name in container.attrs.get("Names") or []:
+            if name.lstrip("/") in managed:
+                containers.append((name.lstrip("/"), container.id))
+    results = list(executor.map(lambda entry: _sample_one(*entry), containers))
+
+    samples = []
+    with _stats_lock:
+        for result in results:
+            if result is None:
+                continue
+            name, timestamp, raw = result
+            stats = _stats.get(name)
+            if stats is None:
+                stats = _stats[name] = RunnerStats()
+            counters = _counters(raw)
+            previous_time = stats.windows["raw"].timestamps.last()
+            elapsed = timestamp - previous_time if previous_time else 0.0
+            values = _sample_values(raw, counters, stats.previous, elapsed)
+            stats.add(timestamp, values)
+            stats.previous = counters
+            samples.append((name, timestamp, values))
+        _forget_unmanaged(managed)
+
+    # Only the leader samples; the other workers keep their buffers from this
+    broadcast("stats.samples", {"samples": samples, "managed": sorted(managed)}, local=False)
+
+
+def _forget_unmanaged(managed: Set[str]) -> None:
+    """Keep memory bounded by the fleet: forget runners that no longer exist. Hold _stats_lock."""
+    for name in list(_stats):
+        if name not in managed:
+            del _stats[name]
+
+
+def _receive_samples(payload: Dict[str, Any]) -> None:
+    with _stats_lock:
+        for name, timestamp, values in payload["samples"]:
+            stats = _stats.get(name)
+            if stats is None:
+                stats = _stats[name] = RunnerStats()
+            stats.add(timestamp, values)
+        _forget_unmanaged(set(payload["managed"]))
+
+
+def _sampler_loop() -> None:
+    with ThreadPoolExecutor(max_workers=settings.STATS_SAMPLER_CONCURRENCY, thread_name_prefix="stats") as executor:
+        while True:
+            started = time.monotonic()
+            try:
+                sample_once(executor)
+            except Exception as e:
+                print(f"Warning: Stats sampler failed: {str(e)}")
+            time.sleep(max(settings.STATS_INTERVAL_SECONDS - (time.monotonic() - started), 0.1))
+
+
+def start_stats_sampler() -> None:
+    """Start the single background loop sampling all runner containers."""
+    global _sampler
+    if not DOCKER_AVAILABLE:
+        return
+    with _sampler_lock:
+        if _sampler is not None and _sampler.is_alive():
+            return
+        _sampler = threading.Thread(target=_sampler_loop, daemon=True, name="stats-sampler")
+        _sampler.start()
+
+
+def get_runner_stats(runner_name: str, window: str = "raw", limit: Optional[int] = None) -> List[Dict[str, float]]:
+    with _stats_lock:
+        stats = _stats.get(runner_name)
+        return stats.windows[window].points(limit) if stats else []
+
+
+def get_latest_stats() -> Dict[str, Dict[str, float]]:
+    with _stats_lock:
+        return {name: latest for name, stats in _stats.items() if (latest := stats.latest()) is not None}
+
+
+subscribe("stats.samples", _receive_samples)
@@ -0,0 +1,190 @@
+# Lightweight tracing: spans kept in a contextvar and exported as OTLP-JSON
+# (one ExportTraceServiceRequest per line) to rotating files under VOLUME_PATH.
+import contextvars
+import fcntl
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from inc.config import settings
+
+TRACES_DIR = os.path.join(settings.VOLUME_PATH, "traces")
+TRACE_FILE = "spans.jsonl"
+SERVICE_NAME = "runnerpilot-backend"
+FLUSH_INTERVAL_SECONDS = 1.0
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "status", "message")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = STATUS_OK
+        self.message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.message = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status, "message": self.message} if self.message else {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _Unsampled:
+    """Marks a trace that was not sampled, so its children are skipped too."""
+
+
+_UNSAMPLED = _Unsampled()
+_current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+_pending: List[Span] = []
+_pending_lock = threading.Lock()
+_exporter: Optional[threading.Thread] = None
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def current_span() -> Optional[Span]:
+    span = _current.get()
+    return span if isinstance(span, Span) else None
+
+
+@contextmanager
+def start_span(name: str, kind: int = KIND_INTERNAL, root: bool = False, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Open a child of the current span.
+
+    Without a current span nothing is recorded unless `root` is set, which
+    starts a new trace subject to sampling; background loops therefore do not
+    produce traces from their Docker and DB calls. Yields None when nothing
+    is recorded, so callers setting attributes should go through `if span:`.
+    """
+    parent = _current.get()
+    if parent is _UNSAMPLED or (parent is None and not root):
+        yield None
+        return
+    if parent is None:
+        if not settings.TRACING_ENABLED or random.random() >= settings.TRACING_SAMPLE_RATIO:
+            token = _current.set(_UNSAMPLED)
+            try:
+                yield None
+            finally:
+                _current.reset(token)
+            return
+        span = Span(name, os.urandom(16).hex(), None, kind, attributes)
+    else:
+        span = Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        span.end_ns = time.time_ns()
+        _enqueue(span)
+
+
+def in_context(func: Callable) -> Callable:
+    """Bind `func` to the caller's context, for work handed to executor threads."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+# -------- Export ---------
+
+def _enqueue(span: Span) -> None:
+    global _exporter
+    with _pending_lock:
+        _pending.append(span)
+        if _exporter is None or not _exporter.is_alive():
+            _exporter = threading.Thread(target=_export_loop, daemon=True, name="trace-exporter")
+            _exporter.start()
+
+
+def _export_loop() -> None:
+    while True:
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        try:
+            flush()
+        except Exception as e:
+            print(f"Warning: Trace export failed: {str(e)}")
+
+
+def flush() -> None:
+    """Write all finished spans as one OTLP-JSON line and rotate the file by size."""
+    global _pending
+    with _pending_lock:
+        spans, _pending = _pending, []
+    if not spans:
+        return
+
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME), _otlp_attribute("process.pid", os.getpid())]},
+            "scopeSpans": [{"scope": {"name": "runnerpilot"}, "spans": [span.to_otlp() for span in spans]}],
+        }]
+    }
+    os.makedirs(TRACES_DIR, exist_ok=True)
+    path = os.path.join(TRACES_DIR, TRACE_FILE)
+    # Workers share the file; the lock keeps lines whole and rotation single
+    with open(os.path.join(TRACES_DIR, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        with open(path, "a") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        if os.path.getsize(path) >= settings.TRACING_MAX_FILE_BYTES:
+            _rotate(path)
+
+
+def _rotate(path: str) -> None:
+    """spans.jsonl -> spans.jsonl.1 -> ... dropping the oldest beyond TRACING_MAX_FILES."""
+    for index in range(settings.TRACING_MAX_FILES - 1, 0, -1):
+        source = f"{path}.{index}"
+        if os.path.exists(source):
+            os.replace(source, f"{path}.{index + 1}")
+    os.replace(path, f"{path}.1")
+    oldest = f"{path}.{settings.TRACING_MAX_FILES}"
+    if os.path.exists(oldest):
+        os.remove(oldest)
@@ -0,0 +1,151 @@
+# Where a runner keeps its work directory: checkouts, build output, _temp.
+#
+# A template's `work_storage` picks one of:
+#
+#   overlay  the container's writable layer, what runners always used (default)
+#   tmpfs    memory-backed and capped at size_mb; nothing touches a disk
+#   bind     <path>/<runner> on a fast local disk of the host
+#   volume   a named Docker volume per runner, outside the overlay filesystem
+#
+# mounted at RUNNER_WORK_MOUNT, the runner's default work folder, so the
+# runner itself needs no configuration. Unless the template turns it off,
+# whatever a job leaves behind is removed once it completes (the runner's
+# own action and tool caches excepted) by a job-completed hook inside the
+# container, before the runner takes its next job. Bind and volume storage
+# are removed with the runner.
+#
+# A bind path must be the same on the host and in the backend, which creates
+# each runner's directory and hands it to RUNNER_UID.
+import json
+import os
+import shutil
+from typing import Any, Dict, Optional, Tuple
+
+from inc.config import settings
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+
+STORAGE_TYPES = ("overlay", "tmpfs", "bind", "volume")
+# Downloaded actions, the runner's tool cache, and _temp, which the hook runs from and the runner empties itself
+KEEP_BETWEEN_JOBS = ("_actions", "_tool", "_temp")
+VOLUME_LABEL = "runnerpilot.work"
+
+
+def work_storage(template: Any) -> Dict[str, Any]:
+    """The template's work storage with defaults filled in; overlay when there is no template."""
+    spec = json.loads(template.work_storage) if template is not None and template.work_storage else {}
+    return {
+        "type": spec.get("type", "overlay"),
+        "size_mb": spec.get("size_mb"),
+        "path": spec.get("path"),
+        "clean_between_jobs": spec.get("clean_between_jobs", True),
+    }
+
+
+def _volume_name(runner_name: str) -> str:
+    return f"{runner_name}-work"
+
+
+def _bind_path(storage: Dict[str, Any], runner_name: str) -> str:
+    return os.path.join(storage["path"], runner_name)
+
+
+def work_mounts(template: Any, runner_name: str) -> Tuple[Dict[str, Dict[str, str]], Dict[str, str]]:
+    """Prepare a runner's work storage; returns the `volumes` and `tmpfs` arguments for containers.run."""
+    storage = work_storage(template)
+    mount = settings.RUNNER_WORK_MOUNT
+    owner = f"uid={settings.RUNNER_UID},gid={settings.RUNNER_UID}"
+    if storage["type"] == "tmpfs":
+        # Docker mounts tmpfs noexec by default, which would break every build that runs what it compiled
+        return {}, {mount: f"rw,exec,nosuid,size={storage['size_mb']}m,{owner},mode=0755"}
+    if storage["type"] == "bind":
+        directory = _bind_path(storage, runner_name)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            os.chown(directory, settings.RUNNER_UID, settings.RUNNER_UID)
+        except PermissionError:
+            print(f"Warning: Could not hand {directory} to uid {settings.RUNNER_UID}; the runner may not be able to write to it")
+        return {directory: {"bind": mount, "mode": "rw"}}, {}
+    if storage["type"] == "volume":
+        # Kept across recreates so checkouts stay warm; Docker copies the image's ownership of the mount point into it
+        name = _volume_name(runner_name)
+        try:
+            get_docker_client().volumes.get(name)
+        except docker.errors.NotFound:
+            get_docker_client().volumes.create(name=name, labels={VOLUME_LABEL: "true", "runnerpilot.runner": runner_name})
+        return {name: {"bind": mount, "mode": "rw"}}, {}
+    return {}, {}
+
+
+def remove_work_storage(runner_name: str, template: Any) -> None:
+    """Remove a runner's work volume or bind directory. Call after its container is removed."""
+    storage = work_storage(template)
+    if storage["type"] == "bind":
+        shutil.rmtree(_bind_path(storage, runner_name), ignore_errors=True)
+    if not DOCKER_AVAILABLE:
+        return
+    try:
+        # Looked up whatever the template says now; it may have used a volume when the runner was created
+        get_docker_client().volumes.get(_volume_name(runner_name)).remove(force=True)
+    except docker.errors.NotFound:
+        pass
+    except Exception as e:
+        print(f"Warning: Could not remove work volume of {runner_name}: {str(e)}")
+
+
+# -------- Cleanup between jobs ---------
+
+def work_cleanup_env(template: Any) -> Dict[str, str]:
+    """Environment that has the runner empty its work directory after every job, or none for overlay storage."""
+    storage = work_storage(template)
+    if storage["type"] == "overlay" or not storage["clean_between_jobs"]:
+        return {}
+    return {
+        "ACTIONS_RUNNER_HOOK_JOB_COMPLETED": settings.RUNNER_WORK_CLEANUP_HOOK,
+        "WORK_CLEANUP_DIR": settings.RUNNER_WORK_MOUNT,
+        "WORK_CLEANUP_KEEP": " ".join(KEEP_BETWEEN_JOBS),
+    }
+
+
+# -------- Usage ---------
+
+def _du(container: Any, path: str) -> Optional[int]:
+    result = container.exec_run(["du", "-sxb", path])
+    try:
+        return int(result.output.split()[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for directory, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(directory, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def work_disk_usage(runner_name: str, template: Any) -> Dict[str, Any]:
+    """Bytes in a runner's work directory and in its container's writable layer."""
+    storage = work_storage(template)
+    usage: Dict[str, Any] = {
+        "storage": storage["type"],
+        "work_path": settings.RUNNER_WORK_MOUNT,
+        "work_bytes": None,
+        "work_limit_bytes": storage["size_mb"] * 1024 * 1024 if storage["type"] == "tmpfs" else None,
+        "container_rw_bytes": None,
+    }
+    if storage["type"] == "bind":
+        directory = _bind_path(storage, runner_name)
+        usage["work_bytes"] = _tree_size(directory) if os.path.isdir(directory) else 0
+    client = get_docker_client()
+    container = client.containers.get(runner_name)
+    # The size of the writable layer is only computed on request, and it is not cheap
+    listed = client.api.containers(all=True, size=True, filters={"id": container.id})
+    if listed:
+        usage["container_rw_bytes"] = listed[0].get("SizeRw")
+    if usage["work_bytes"] is None and container.status == "running":
+        usage["work_bytes"] = _du(container, settings.RUNNER_WORK_MOUNT)
+    return usage
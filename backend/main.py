@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+# Imported first so the startup clock covers every import below
+from inc.utils.startup import mark_imported, mark_ready, phase, startup_report
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from routers import meta
-from inc.config import is_dev
-import json, random
+from fastapi.responses import JSONResponse, PlainTextResponse
+from inc.config import is_dev, settings
+from inc.utils.metrics import HTTP_REQUEST_SECONDS
+from inc.utils.profiling import profile_request
+from inc.utils.tracing import KIND_SERVER, start_span
+import asyncio, functools, json, random, secrets, threading, time
 
 app = FastAPI()
 
@@ -16,32 +21,199 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+	started = time.perf_counter()
+	status = 500
+	try:
+		response = await call_next(request)
+		status = response.status_code
+		return response
+	finally:
+		# Label by route template, not the raw path, to keep label cardinality bounded
+		route = request.scope.get("route")
+		path = route.path if route is not None else "unmatched"
+		HTTP_REQUEST_SECONDS.labels(request.method, path, str(status)).observe(time.perf_counter() - started)
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+	# Opt-in and switchable at runtime through /system/profiling
+	return await profile_request(request, call_next)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+	# Root span of a sampled trace; Docker and DB calls made for the request become its children
+	with start_span(f"{request.method} {request.url.path}", KIND_SERVER, root=True) as span:
+		response = await call_next(request)
+		if span:
+			route = request.scope.get("route")
+			if route is not None:
+				span.name = f"{request.method} {route.path}"
+				span.set_attribute("http.route", route.path)
+			span.set_attribute("http.method", request.method)
+			span.set_attribute("http.target", request.url.path)
+			span.set_attribute("http.status_code", response.status_code)
+		return response
+
+
 @app.on_event("startup")
 async def startup_event():
-	# Initialize DB connection and create tables for all models in `models` package
 	from inc.db import init_db
+	from inc.utils.docker_client import get_docker_client
+
+	def docker_handshake():
+		# Loads the Docker SDK and opens the first connection while the database is set up;
+		# a slow or missing daemon does not hold up startup, /readyz reports how it went
+		with phase("docker", required=False):
+			get_docker_client().ping()
+
+	threading.Thread(target=docker_handshake, daemon=True, name="docker-handshake").start()
+
+	# Initialize DB connection and create tables for all models in `models` package
+	with phase("db"):
+		await asyncio.to_thread(init_db)
+
+	with phase("coordination"):
+		# Background work runs in one worker only, the elected leader (`--workers N`);
+		# the others serve requests. A worker taking over after the leader died
+		# resumes whatever the old leader left unfinished.
+		from inc.utils.coordination import on_elected, start_coordination
+
+		# Pick up rolling upgrades, drains and background operations interrupted by a restart
+		from inc.utils.rollout import resume_rollouts
+		from inc.utils.drain import resume_drains
+		from inc.utils.operations import resume_operations
+
+		on_elected("rollouts", resume_rollouts)
+		on_elected("drains", resume_drains)
+		on_elected("operations", resume_operations)
+
+		# Keep per-runner idle/busy state current from the runner logs
+		from inc.utils.job_state import start_job_state_tracker
+
+		on_elected("job-state", start_job_state_tracker)
+
+		# Size runner groups to their capacity schedules
+		from inc.utils.capacity import start_capacity_scheduler
+
+		on_elected("capacity", start_capacity_scheduler)
 
-	init_db()
+		# Sample container resource usage into fixed-size ring buffers, shared with the other workers
+		from inc.utils.stats_sampler import start_stats_sampler
+
+		on_elected("stats", start_stats_sampler)
+
+		# Track container state changes so runner revisions and the change feed reflect them
+		from inc.utils.runner_changes import start_container_watch
+
+		on_elected("container-watch", start_container_watch)
+
+		# Keep the pull-through registry mirror running and within its quota
+		from inc.utils.registry_mirror import start_registry_mirror
+
+		on_elected("registry-mirror", start_registry_mirror)
+
+		# Keep the Docker disk between its watermarks by collecting what jobs leave behind
+		from inc.utils.disk_gc import start_disk_gc
+
+		on_elected("disk-gc", start_disk_gc)
+
+		# Broadcast runner, clone and pull events to dashboards over SSE, in every worker
+		from inc.utils.event_bus import start_event_bus
+
+		start_event_bus()
+		start_coordination()
+
+		# Publish this worker's metrics so /metrics of any worker covers all of them
+		from inc.utils.cluster_metrics import start_metrics_export
+
+		start_metrics_export()
+
+	mark_ready()
 
 
 from routers import auth, common
-from routers import runner_instance
+from routers import runner_instance, runner_bulk, runner_rollout, runner_stats, runner_template
+from routers import capacity_schedule
 from routers import system
-import random
+from routers import analytics
+from routers import events
+from routers import operations
 
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(common.router, prefix="/common", tags=["common"])
 app.include_router(system.router, prefix="/system", tags=["system"])
+app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+app.include_router(events.router, tags=["events"])
+app.include_router(operations.router, prefix="/operations", tags=["operations"])
+app.include_router(runner_template.router, tags=["templates"])
+app.include_router(capacity_schedule.router, tags=["capacity"])
 
-with open("volumn/jokes.json", "r") as f:
-	_jokes = json.load(f)
+@functools.lru_cache(maxsize=1)
+def _jokes() -> list:
+	# Read on the first request rather than at import
+	with open("volumn/jokes.json", "r") as f:
+		return json.load(f)
 
 @app.get("/", tags=["root"])
 async def root():
-	return {"joke": random.choice(_jokes)}
+	return {"joke": random.choice(_jokes())}
+
+@app.get("/readyz", tags=["root"])
+def readyz():
+	"""Readiness probe: 200 once this worker finished starting and its database answers."""
+	from inc.db import db
+	from inc.utils.coordination import coordination_state
+	from inc.utils.docker_governor import governor_state
+
+	report = startup_report()
+	try:
+		db.execute_sql("SELECT 1")
+		database = "ok"
+	except Exception as e:
+		database = f"error: {str(e)}"
+	if "docker" in report["errors"]:
+		docker_status = f"error: {report['errors']['docker']}"
+	else:
+		docker_status = "ok" if "docker" in report["phases_ms"] else "pending"
+	ready = report["ready"] and database == "ok"
+	content = {
+		"status": "ready" if ready else "starting",
+		"database": database,
+		"docker": docker_status,
+		"governor": governor_state(),
+		"cluster": coordination_state(),
+		"startup": report,
+	}
+	return JSONResponse(status_code=200 if ready else 503, content=content)
+
+@app.get("/metrics", tags=["root"], response_class=PlainTextResponse)
+async def metrics(request: Request):
+	"""Prometheus text exposition of request, Docker and DB metrics of every API worker.
+
+	Each series carries a `worker` label; other workers' values are at most
+	METRICS_SNAPSHOT_SECONDS old.
+	"""
+	if settings.METRICS_TOKEN:
+		expected = f"Bearer {settings.METRICS_TOKEN}"
+		if not secrets.compare_digest(request.headers.get("authorization", ""), expected):
+			raise HTTPException(status_code=401, detail="Invalid metrics token")
+	from inc.utils.cluster_metrics import render_cluster_metrics
+
+	return PlainTextResponse(await asyncio.to_thread(render_cluster_metrics), media_type="text/plain; version=0.0.4")
 
 if is_dev():
+	# from routers import meta
 	# app.include_router(meta.router, prefix="/meta", tags=["meta"])
 	pass
 
+# Bulk, rollout and stats routes must be registered before `/runner/{instance_id}/...` so their
+# literal segments are not parsed as an instance id
+app.include_router(runner_bulk.router, tags=["runners"])
+app.include_router(runner_rollout.router, tags=["runners"])
+app.include_router(runner_stats.router, tags=["runners"])
 app.include_router(runner_instance.router, tags=["runners"], include_in_schema=True)
+
+mark_imported()
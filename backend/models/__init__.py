@@ -1,2 +1,9 @@
 from .meta import Meta
-from .runner_instance import RunnerInstance
\ No newline at end of file
+from .runner_instance import RunnerInstance
+from .runner_template import RunnerTemplate
+from .rollout import Rollout
+from .job_history import JobRun, JobRollupMinute, JobRollupHour, JobRollupDay
+from .revision import Revision, RunnerTombstone
+from .operation import Operation
+from .cluster_message import ClusterMessage
+from .capacity_schedule import CapacitySchedule
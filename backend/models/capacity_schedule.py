@@ -0,0 +1,26 @@
+from peewee import BooleanField, CharField, IntegerField, TextField, DateTimeField
+from datetime import datetime
+from inc.helpers.model import BaseModel
+
+
+class CapacitySchedule(BaseModel):
+    """Runner count over the week for the runners matching `labels` and `github_url`, see inc/utils/capacity.py."""
+
+    name = CharField(unique=True)
+    labels = TextField(null=True)  # Comma-separated; runners of the group carry all of them
+    github_url = CharField(null=True)  # Runners of the group are registered to this URL
+    windows = TextField(default="[]")  # JSON list of {"days", "start", "end", "runners"}; the first matching window wins
+    default_runners = IntegerField(default=0)  # Runner count outside every window
+    timezone = CharField(default="UTC")  # IANA name the windows are in
+    template_id = IntegerField(null=True)  # For runners created while the group has none to clone
+    token = TextField(null=True)  # Registration token for those runners; never returned
+    enabled = BooleanField(default=True)
+    target = IntegerField(null=True)  # Runner count the scheduler last applied
+    message = TextField(null=True)  # What it did or why it could not
+    applied_at = DateTimeField(null=True)
+    created_at = DateTimeField(default=datetime.now)
+    updated_at = DateTimeField(default=datetime.now)
+
+    def save(self, *args, **kwargs):
+        self.updated_at = datetime.now()
+        return super().save(*args, **kwargs)
@@ -0,0 +1,14 @@
+from peewee import CharField, TextField, DateTimeField
+from playhouse.sqlite_ext import AutoIncrementField
+from datetime import datetime
+from inc.helpers.model import BaseModel
+
+
+class ClusterMessage(BaseModel):
+    """A message from one API worker process to the others."""
+    # AUTOINCREMENT, so ids never go back after pruning and pollers can read `id > last seen`
+    id = AutoIncrementField()
+    channel = CharField()
+    payload = TextField()  # JSON
+    origin = CharField()  # Worker id of the sender, which does not receive its own messages
+    created_at = DateTimeField(default=datetime.now, index=True)
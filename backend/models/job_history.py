@@ -0,0 +1,46 @@
+from peewee import CharField, IntegerField, FloatField, TextField, DateTimeField
+from inc.helpers.model import BaseModel
+
+
+class JobRun(BaseModel):
+    runner_id = IntegerField(index=True)  # Not a foreign key: history outlives deleted runners
+    runner_name = CharField()
+    repo = CharField(index=True)  # github_url of the runner
+    labels = TextField(null=True)
+    job_name = CharField()
+    result = CharField(null=True)  # "Succeeded", "Failed", "Canceled", ...
+    started_at = DateTimeField(null=True)
+    finished_at = DateTimeField(index=True)
+    duration_seconds = FloatField(null=True)
+
+
+class JobRollup(BaseModel):
+    """Pre-aggregated job and utilization counters for one time bucket.
+
+    One row per (bucket_start, label, repo). Every runner also contributes to
+    label "*" so fleet totals never double count multi-label runners.
+    """
+    bucket_start = DateTimeField()
+    label = CharField()
+    repo = CharField()
+    jobs = IntegerField(default=0)
+    failed_jobs = IntegerField(default=0)
+    duration_sum = FloatField(default=0)
+    duration_hist = TextField(default="[]")  # Counts per DURATION_BUCKETS bound, JSON
+    busy_seconds = FloatField(default=0)
+    capacity_seconds = FloatField(default=0)
+
+    class Meta:
+        indexes = ((("bucket_start", "label", "repo"), True),)
+
+
+class JobRollupMinute(JobRollup):
+    pass
+
+
+class JobRollupHour(JobRollup):
+    pass
+
+
+class JobRollupDay(JobRollup):
+    pass
@@ -0,0 +1,21 @@
+from peewee import CharField, IntegerField, TextField, DateTimeField
+from datetime import datetime
+from inc.helpers.model import BaseModel
+
+
+class Operation(BaseModel):
+    kind = CharField()  # "create", "clone", "restart", "delete", "setup"
+    params = TextField(default="{}")  # JSON arguments for the handler; may hold tokens, never returned
+    status = CharField(default="queued", index=True)  # "queued", "running", "completed", "failed"
+    progress = IntegerField(default=0)
+    total = IntegerField(default=1)
+    message = TextField(null=True)
+    result = TextField(null=True)  # JSON; for clones also the partial result to resume from
+    attempts = IntegerField(default=0)  # Greater than 1 when resumed after a restart
+    created_at = DateTimeField(default=datetime.now)
+    started_at = DateTimeField(null=True)
+    updated_at = DateTimeField(default=datetime.now)
+
+    def save(self, *args, **kwargs):
+        self.updated_at = datetime.now()
+        return super().save(*args, **kwargs)
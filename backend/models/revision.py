@@ -0,0 +1,36 @@
+from peewee import CharField, IntegerField, DateTimeField
+from datetime import datetime
+from inc.db import db
+from inc.helpers.model import BaseModel
+
+
+class Revision(BaseModel):
+    """Named monotonic counters; `runner` versions every visible runner change."""
+    name = CharField(primary_key=True)
+    value = IntegerField(default=0)
+
+    @classmethod
+    def next(cls, name: str) -> int:
+        """Increment and return a counter.
+
+        Call inside the transaction that writes the change: SQLite serializes
+        writers, so revisions become visible in the order they were handed out.
+        """
+        with db.atomic():
+            cls.insert(name=name, value=1).on_conflict(
+                conflict_target=[cls.name],
+                update={cls.value: cls.value + 1},
+            ).execute()
+            return cls.get_by_id(name).value
+
+    @classmethod
+    def current(cls, name: str) -> int:
+        row = cls.get_or_none(cls.name == name)
+        return row.value if row else 0
+
+
+class RunnerTombstone(BaseModel):
+    """Records a deleted runner so change feeds can report the deletion."""
+    runner_id = IntegerField()
+    revision = IntegerField(index=True)
+    deleted_at = DateTimeField(default=datetime.now)
@@ -0,0 +1,22 @@
+from peewee import CharField, IntegerField, TextField, DateTimeField
+from datetime import datetime
+from inc.helpers.model import BaseModel
+
+
+class Rollout(BaseModel):
+    image = CharField()
+    target_digest = CharField(null=True)  # Image ID resolved by the pre-pull
+    labels = TextField(null=True)  # Optional comma-separated selector
+    token = CharField(null=True)  # Registration token for the recreated runners; each keeps its own when unset
+    max_unavailable = IntegerField(default=1)
+    wave_timeout_seconds = IntegerField(default=300)
+    status = CharField(default="pending")  # "pending", "running", "completed", "failed", "cancelled"
+    message = TextField(null=True)
+    upgraded = IntegerField(default=0)
+    failed = IntegerField(default=0)
+    created_at = DateTimeField(default=datetime.now)
+    updated_at = DateTimeField(default=datetime.now)
+
+    def save(self, *args, **kwargs):
+        self.updated_at = datetime.now()
+        return super().save(*args, **kwargs)
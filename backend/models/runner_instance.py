@@ -1,8 +1,14 @@
-from peewee import CharField, TextField, DateTimeField
+from peewee import CharField, IntegerField, TextField, DateTimeField
 from datetime import datetime
 import string
 import random
+from inc.db import db
 from inc.helpers.model import BaseModel
+from inc.utils.event_bus import publish
+from .revision import Revision, RunnerTombstone
+
+# Bookkeeping fields whose updates are not visible through the API and do not bump the revision
+UNVERSIONED_FIELDS = {"log_cursor"}
 
 
 def generate_unique_suffix():
@@ -18,8 +24,51 @@ class RunnerInstance(BaseModel):
     token = TextField()
     labels = TextField(null=True)  # Comma-separated labels or JSON
     hostname = CharField(null=True)
+    template_id = IntegerField(null=True, index=True)  # RunnerTemplate the container is created from
     created_at = DateTimeField(default=datetime.now)
-    
+    image_digest = CharField(null=True)  # Image ID the container was created from
+    drain_state = CharField(null=True)  # None, "draining", "drained"
+    drain_action = CharField(null=True)  # "stop", "restart", "delete"
+    drain_deadline = DateTimeField(null=True)  # Force the action after this time
+    job_state = CharField(null=True)  # "starting", "idle", "busy", "offline"
+    job_name = CharField(null=True)
+    job_started_at = DateTimeField(null=True)
+    log_cursor = CharField(null=True)  # Docker timestamp of the last parsed log line
+    container_status = CharField(null=True)  # Last observed "active", "inactive" or "error"
+    revision = IntegerField(default=0, index=True)  # Revision.next("runner") of the last change
+
+    def save(self, *args, **kwargs):
+        only = kwargs.get("only")
+        if only is not None and {getattr(f, "name", f) for f in only} <= UNVERSIONED_FIELDS:
+            return super().save(*args, **kwargs)
+        created = self.id is None or kwargs.get("force_insert", False)
+        with db.atomic():
+            self.revision = Revision.next("runner")
+            if only is not None:
+                kwargs["only"] = list(only) + [RunnerInstance.revision]
+            result = super().save(*args, **kwargs)
+        publish("runner.created" if created else "runner.updated", self.event_data())
+        return result
+
+    def delete_instance(self, *args, **kwargs):
+        with db.atomic():
+            revision = Revision.next("runner")
+            RunnerTombstone.create(runner_id=self.id, revision=revision)
+            result = super().delete_instance(*args, **kwargs)
+        publish("runner.deleted", {"id": self.id, "runner_name": self.runner_name, "revision": revision})
+        return result
+
+    def event_data(self) -> dict:
+        """Dashboard event payload; never includes the registration token."""
+        return {
+            "id": self.id,
+            "runner_name": self.runner_name,
+            "revision": self.revision,
+            "container_status": self.container_status,
+            "job_state": self.job_state,
+            "drain_state": self.drain_state,
+        }
+
     @staticmethod
     def generate_runner_name(base_name: str) -> str:
         """Generate a unique runner name with base_name-XXXXXX format."""
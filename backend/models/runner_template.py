@@ -0,0 +1,20 @@
+from peewee import CharField, TextField, DateTimeField
+from datetime import datetime
+from inc.helpers.model import BaseModel
+
+
+class RunnerTemplate(BaseModel):
+    """Shared container settings for a group of runners; a runner points at one through `template_id`."""
+
+    name = CharField(unique=True)
+    description = TextField(null=True)
+    caches = TextField(null=True)  # JSON list of shared cache volumes, see inc/utils/runner_caches.py
+    image_spec = TextField(null=True)  # JSON packages and setup steps baked into a derived image, see inc/utils/derived_images.py
+    work_storage = TextField(null=True)  # JSON work directory placement, see inc/utils/work_storage.py
+    log_config = TextField(null=True)  # JSON container log driver and rotation, see inc/utils/log_config.py
+    created_at = DateTimeField(default=datetime.now)
+    updated_at = DateTimeField(default=datetime.now)
+
+    def save(self, *args, **kwargs):
+        self.updated_at = datetime.now()
+        return super().save(*args, **kwargs)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from peewee import fn
+from pydantic import BaseModel
+
+from inc.auth import AuthorizedUser, authorized_user
+from inc.utils.job_history import (
+    FLEET_LABEL,
+    ROLLUPS,
+    merge_hists,
+    percentile_from_hist,
+    pick_granularity,
+)
+from models import JobRun
+
+router = APIRouter()
+
+Granularity = Literal["minute", "hour", "day"]
+GroupBy = Literal["label", "repo", "fleet"]
+
+
+# -------- Models ---------
+
+class UtilizationPoint(BaseModel):
+    key: str
+    bucket_start: Optional[str] = None
+    busy_seconds: float
+    capacity_seconds: float
+    utilization: Optional[float]  # busy / capacity, None without capacity
+
+
+class UtilizationOut(BaseModel):
+    granularity: Granularity
+    since: str
+    until: str
+    points: List[UtilizationPoint]
+
+
+class JobStatsRow(BaseModel):
+    key: str
+    jobs: int
+    failed_jobs: int
+    avg_duration_seconds: Optional[float]
+    percentiles: Dict[str, Optional[float]]
+
+
+class JobStatsOut(BaseModel):
+    granularity: Granularity
+    since: str
+    until: str
+    rows: List[JobStatsRow]
+
+
+class JobRunOut(BaseModel):
+    id: int
+    runner_id: int
+    runner_name: str
+    repo: str
+    labels: Optional[str]
+    job_name: str
+    result: Optional[str]
+    started_at: Optional[str]
+    finished_at: str
+    duration_seconds: Optional[float]
+
+
+# -------- Helpers ---------
+
+def _window(since: Optional[datetime], until: Optional[datetime]) -> tuple[datetime, datetime]:
+    until = until or datetime.now()
+    since = since or until - timedelta(days=7)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="`since` must be before `until`")
+    return since, until
+
+
+def _rollup_query(model, group_by: GroupBy, since: datetime, until: datetime, label: Optional[str], repo: Optional[str]):
+    """Base query over one rollup table; never touches raw job events."""
+    query = model.select().where((model.bucket_start >= since) & (model.bucket_start < until))
+    if group_by == "label":
+        query = query.where(model.label == label if label else model.label != FLEET_LABEL)
+    else:
+        query = query.where(model.label == (label or FLEET_LABEL))
+    if repo:
+        query = query.where(model.repo == repo)
+    return query
+
+
+def _key_field(model, group_by: GroupBy):
+    if group_by == "label":
+        return model.label
+    if group_by == "repo":
+        return model.repo
+    return fn.MIN(FLEET_LABEL)
+
+
+# -------- Routes ----------
+
+@router.get("/utilization", response_model=UtilizationOut)
+def get_utilization(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    granularity: Optional[Granularity] = None,
+    group_by: GroupBy = "label",
+    label: Optional[str] = None,
+    repo: Optional[str] = None,
+    series: bool = False,
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """
+    Busy time over online capacity from the pre-aggregated rollups.
+
+    With `series=true` one point per bucket and key is returned, otherwise one
+    point per key for the whole window (default: the last 7 days).
+    """
+    since, until = _window(since, until)
+    granularity = granularity or pick_granularity(since, until)
+    model = ROLLUPS[granularity]
+
+    key = _key_field(model, group_by).alias("key")
+    columns = [key, fn.SUM(model.busy_seconds).alias("busy"), fn.SUM(model.capacity_seconds).alias("capacity")]
+    group = [] if group_by == "fleet" else [_key_field(model, group_by)]
+    if series:
+        columns.append(model.bucket_start)
+        group.append(model.bucket_start)
+
+    query = _rollup_query(model, group_by, since, until, label, repo).select(*columns)
+    if group:
+        query = query.group_by(*group)
+    if series:
+        query = query.order_by(model.bucket_start)
+
+    points = []
+    for row in query.dicts():
+        if row["capacity"] is None:
+            continue  # Aggregate over an empty window
+        points.append(UtilizationPoint(
+            key=row["key"],
+            bucket_start=row["bucket_start"].isoformat() if series else None,
+            busy_seconds=row["busy"],
+            capacity_seconds=row["capacity"],
+            utilization=row["busy"] / row["capacity"] if row["capacity"] else None,
+        ))
+    return UtilizationOut(granularity=granularity, since=since.isoformat(), until=until.isoformat(), points=points)
+
+
+@router.get("/jobs", response_model=JobStatsOut)
+def get_job_stats(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    granularity: Optional[Granularity] = None,
+    group_by: GroupBy = "repo",
+    label: Optional[str] = None,
+    repo: Optional[str] = None,
+    percentiles: str = Query("50,95", description="Comma-separated percentiles of job duration"),
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """Job counts, failure counts and duration percentiles per repo or label from the rollups."""
+    since, until = _window(since, until)
+    granularity = granularity or pick_granularity(since, until)
+    try:
+        wanted = [float(p) for p in percentiles.split(",") if p.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="percentiles must be numbers")
+    if any(p <= 0 or p > 100 for p in wanted):
+        raise HTTPException(status_code=422, detail="percentiles must be in (0, 100]")
+
+    model = ROLLUPS[granularity]
+    query = _rollup_query(model, group_by, since, until, label, repo).where(model.jobs > 0)
+
+    totals: Dict[str, Dict] = defaultdict(lambda: {"jobs": 0, "failed_jobs": 0, "duration_sum": 0.0, "hists": []})
+    for row in query.select(model.label, model.repo, model.jobs, model.failed_jobs, model.duration_sum, model.duration_hist).dicts():
+        key = row["label"] if group_by == "label" else row["repo"] if group_by == "repo" else FLEET_LABEL
+        totals[key]["jobs"] += row["jobs"]
+        totals[key]["failed_jobs"] += row["failed_jobs"]
+        totals[key]["duration_sum"] += row["duration_sum"]
+        totals[key]["hists"].append(row["duration_hist"])
+
+    rows = []
+    for key, total in sorted(totals.items()):
+        hist = merge_hists(total["hists"])
+        timed_jobs = sum(hist)
+        rows.append(JobStatsRow(
+            key=key,
+            jobs=total["jobs"],
+            failed_jobs=total["failed_jobs"],
+            avg_duration_seconds=total["duration_sum"] / timed_jobs if timed_jobs else None,
+            percentiles={f"p{p:g}": percentile_from_hist(hist, p) for p in wanted},
+        ))
+    return JobStatsOut(granularity=granularity, since=since.isoformat(), until=until.isoformat(), rows=rows)
+
+
+@router.get("/jobs/history", response_model=List[JobRunOut])
+def list_job_history(
+    limit: int = Query(100, ge=1, le=1000),
+    before_id: Optional[int] = None,
+    runner_id: Optional[int] = None,
+    repo: Optional[str] = None,
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """Recent finished jobs, newest first. Page with `before_id`."""
+    query = JobRun.select().order_by(JobRun.id.desc()).limit(limit)
+    if before_id:
+        query = query.where(JobRun.id < before_id)
+    if runner_id:
+        query = query.where(JobRun.runner_id == runner_id)
+    if repo:
+        query = query.where(JobRun.repo == repo)
+    return [
+        JobRunOut(
+            id=run.id,
+            runner_id=run.runner_id,
+            runner_name=run.runner_name,
+            repo=run.repo,
+            labels=run.labels,
+            job_name=run.job_name,
+            result=run.result,
+            started_at=run.started_at.isoformat() if run.started_at else None,
+            finished_at=run.finished_at.isoformat(),
+            duration_seconds=run.duration_seconds,
+        )
+        for run in query
+    ]
@@ -0,0 +1,213 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from inc.auth import AuthorizedUser, authorized_user
+from inc.utils.capacity import DOCKER_AVAILABLE, desired_runners, next_change, parse_days, parse_time, reconcile
+from inc.utils.operations import enqueue_operation, operation_accepted
+from models import CapacitySchedule, RunnerTemplate
+
+router = APIRouter()
+
+
+# -------- Models ---------
+
+class WindowSpec(BaseModel):
+    days: str = "*"  # "mon-fri", "sat,sun", "fri-mon" or "*"
+    start: str = Field(pattern=r"^\d{2}:\d{2}$")  # Local time the window opens, HH:MM
+    end: str = Field(pattern=r"^\d{2}:\d{2}$")  # Local time it closes; before `start` for windows past midnight
+    runners: int = Field(ge=0)
+
+
+class CapacityScheduleIn(BaseModel):
+    name: str = Field(pattern=r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+    labels: Optional[str] = None  # The group: runners carrying all these labels...
+    github_url: Optional[str] = None  # ...and/or registered to this URL
+    windows: List[WindowSpec] = []  # The first window that matches sets the runner count
+    default_runners: int = Field(default=0, ge=0)  # Outside every window
+    timezone: str = "UTC"
+    template_id: Optional[int] = None  # For runners created while the group has none to clone
+    token: Optional[str] = None  # Registration token for those runners; kept when omitted on update
+    enabled: bool = True
+
+
+class CapacityScheduleOut(BaseModel):
+    id: int
+    name: str
+    labels: Optional[str]
+    github_url: Optional[str]
+    windows: List[WindowSpec]
+    default_runners: int
+    timezone: str
+    template_id: Optional[int]
+    enabled: bool
+    desired: int  # Runner count the schedule asks for now
+    next_change: Optional[Dict[str, Any]]  # When and to what the count changes next
+    target: Optional[int]  # Runner count the scheduler last applied
+    message: Optional[str]
+    applied_at: Optional[str]
+    created_at: str
+    updated_at: str
+
+
+class CapacityPlanOut(BaseModel):
+    target: int
+    running: int
+    keep: List[int]  # Draining runners put back in service
+    start: List[int]  # Stopped runners to start
+    create: int  # Runners to create
+    drain: List[int]  # Runners to stop once their current job completes
+    delete: List[int]  # Stopped runners beyond the busiest window
+    errors: List[str] = []
+
+
+# -------- Helpers ---------
+
+def _schedule_out(schedule: CapacitySchedule) -> CapacityScheduleOut:
+    return CapacityScheduleOut(
+        id=schedule.id,
+        name=schedule.name,
+        labels=schedule.labels,
+        github_url=schedule.github_url,
+        windows=json.loads(schedule.windows or "[]"),
+        default_runners=schedule.default_runners,
+        timezone=schedule.timezone,
+        template_id=schedule.template_id,
+        enabled=schedule.enabled,
+        desired=desired_runners(schedule),
+        next_change=next_change(schedule),
+        target=schedule.target,
+        message=schedule.message,
+        applied_at=schedule.applied_at.isoformat() if schedule.applied_at else None,
+        created_at=schedule.created_at.isoformat(),
+        updated_at=schedule.updated_at.isoformat(),
+    )
+
+
+def _validate(payload: CapacityScheduleIn) -> None:
+    if not (payload.labels or payload.github_url):
+        raise HTTPException(status_code=400, detail="A schedule needs labels and/or a github_url to select its runners")
+    try:
+        ZoneInfo(payload.timezone)
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Unknown timezone '{payload.timezone}'")
+    try:
+        for window in payload.windows:
+            parse_days(window.days)
+            parse_time(window.start)
+            parse_time(window.end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if payload.template_id is not None and RunnerTemplate.get_or_none(RunnerTemplate.id == payload.template_id) is None:
+        raise HTTPException(status_code=404, detail=f"Template {payload.template_id} not found")
+
+
+def _apply_payload(schedule: CapacitySchedule, payload: CapacityScheduleIn) -> None:
+    schedule.name = payload.name
+    schedule.labels = payload.labels
+    schedule.github_url = payload.github_url
+    schedule.windows = json.dumps([window.model_dump() for window in payload.windows])
+    schedule.default_runners = payload.default_runners
+    schedule.timezone = payload.timezone
+    schedule.template_id = payload.template_id
+    if payload.token is not None:
+        schedule.token = payload.token
+    schedule.enabled = payload.enabled
+
+
+def _get_schedule(schedule_id: int) -> CapacitySchedule:
+    schedule = CapacitySchedule.get_or_none(CapacitySchedule.id == schedule_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail=f"Capacity schedule {schedule_id} not found")
+    return schedule
+
+
+# -------- Routes ----------
+
+@router.get("/capacity/schedules", response_model=List[CapacityScheduleOut])
+def list_schedules(user: AuthorizedUser = Depends(authorized_user)):
+    return [_schedule_out(schedule) for schedule in CapacitySchedule.select().order_by(CapacitySchedule.name)]
+
+
+@router.post("/capacity/schedules", response_model=CapacityScheduleOut, status_code=201)
+def create_schedule(payload: CapacityScheduleIn, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Create a capacity schedule. From its next check on, the scheduler owns
+    the group's size: it starts, stops and creates the group's runners to
+    match the schedule, also ones started or stopped by hand.
+    """
+    _validate(payload)
+    if CapacitySchedule.get_or_none(CapacitySchedule.name == payload.name) is not None:
+        raise HTTPException(status_code=409, detail=f"Capacity schedule '{payload.name}' already exists")
+    try:
+        schedule = CapacitySchedule()
+        _apply_payload(schedule, payload)
+        schedule.save()
+        return _schedule_out(schedule)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create capacity schedule: {str(e)}")
+
+
+@router.get("/capacity/schedules/{schedule_id}", response_model=CapacityScheduleOut)
+def get_schedule(schedule_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    return _schedule_out(_get_schedule(schedule_id))
+
+
+@router.put("/capacity/schedules/{schedule_id}", response_model=CapacityScheduleOut)
+def update_schedule(schedule_id: int, payload: CapacityScheduleIn, user: AuthorizedUser = Depends(authorized_user)):
+    schedule = _get_schedule(schedule_id)
+    _validate(payload)
+    other = CapacitySchedule.get_or_none(CapacitySchedule.name == payload.name)
+    if other is not None and other.id != schedule_id:
+        raise HTTPException(status_code=409, detail=f"Capacity schedule '{payload.name}' already exists")
+    try:
+        _apply_payload(schedule, payload)
+        schedule.save()
+        return _schedule_out(schedule)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update capacity schedule: {str(e)}")
+
+
+@router.delete("/capacity/schedules/{schedule_id}")
+def delete_schedule(schedule_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    """Delete a schedule. Its runners stay as they are."""
+    _get_schedule(schedule_id).delete_instance()
+    return {"status": "ok", "message": f"Capacity schedule {schedule_id} deleted", "id": schedule_id}
+
+
+@router.get("/capacity/schedules/{schedule_id}/plan", response_model=CapacityPlanOut)
+def plan_schedule(schedule_id: int, at: Optional[datetime] = None, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    What the scheduler would do for the group right now, without doing it.
+
+    - at: plan for the runner count at this time instead (ISO 8601; UTC without an offset)
+    """
+    schedule = _get_schedule(schedule_id)
+    if not DOCKER_AVAILABLE:
+        raise HTTPException(status_code=500, detail="Docker is not available")
+    try:
+        return reconcile(schedule, now=at, dry_run=True)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to plan capacity: {str(e)}")
+
+
+@router.post("/capacity/schedules/{schedule_id}/apply", response_model=CapacityPlanOut)
+def apply_schedule(schedule_id: int, background: bool = False, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Reconcile the group now instead of at the next check.
+
+    - background: run as a queued operation and answer 202 with its id
+    """
+    schedule = _get_schedule(schedule_id)
+    if not DOCKER_AVAILABLE:
+        raise HTTPException(status_code=500, detail="Docker is not available")
+    if background:
+        return operation_accepted(enqueue_operation("capacity", {"schedule_id": schedule_id}))
+    try:
+        return reconcile(schedule)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to apply capacity schedule: {str(e)}")
@@ -0,0 +1,29 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from inc.auth import AuthorizedUser, authorized_stream_user
+from inc.utils.event_bus import subscribe
+
+router = APIRouter()
+
+
+@router.get("/events")
+def stream_events(
+    last_event_id: Optional[str] = Query(default=None, description="Resume point for clients that cannot send Last-Event-ID"),
+    last_event_id_header: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    user: AuthorizedUser = Depends(authorized_stream_user),
+):
+    """
+    Live dashboard updates as Server-Sent Events.
+
+    Events: runner.created, runner.updated, runner.deleted, runner.status,
+    clone.started, clone.progress, clone.completed, pull.progress and resync.
+    Reconnecting clients send Last-Event-ID and get the events they missed;
+    on `resync` the client must refetch GET /runner. EventSource cannot set
+    headers, so the access token may be passed as `?token=`.
+    """
+    return StreamingResponse(
+        subscribe(last_event_id_header or last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,75 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from inc.auth import AuthorizedUser, authorized_user
+from inc.utils.operations import ACTIVE_STATUSES, operation_data
+from models import Operation
+
+router = APIRouter()
+
+STREAM_POLL_SECONDS = 0.5
+
+
+class OperationOut(BaseModel):
+    id: int
+    kind: str  # "create", "clone", "restart", "delete", "setup"
+    status: str  # "queued", "running", "completed", "failed"
+    progress: int
+    total: int
+    message: Optional[str]
+    result: Optional[Dict[str, Any]]
+    attempts: int
+    created_at: str
+    started_at: Optional[str]
+    updated_at: str
+
+
+def _get_operation(operation_id: int) -> Operation:
+    operation = Operation.get_or_none(Operation.id == operation_id)
+    if operation is None:
+        raise HTTPException(status_code=404, detail=f"Operation {operation_id} not found")
+    return operation
+
+
+@router.get("", response_model=List[OperationOut])
+def list_operations(
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """List background operations, newest first."""
+    query = Operation.select().order_by(Operation.id.desc()).limit(limit)
+    if status:
+        query = query.where(Operation.status == status)
+    return [operation_data(operation) for operation in query]
+
+
+@router.get("/{operation_id}", response_model=OperationOut)
+def get_operation(operation_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    return operation_data(_get_operation(operation_id))
+
+
+@router.get("/{operation_id}/stream")
+async def stream_operation(operation_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    """Stream JSON lines with the operation state on every change until it finishes."""
+    _get_operation(operation_id)
+
+    async def generator():
+        last = None
+        while True:
+            operation = Operation.get_or_none(Operation.id == operation_id)
+            if operation is None:
+                yield json.dumps({"id": operation_id, "status": "failed", "message": "Operation was removed"}) + "\n"
+                return
+            state = (operation.status, operation.progress, operation.message)
+            if state != last:
+                last = state
+                yield json.dumps(operation_data(operation)) + "\n"
+            if operation.status not in ACTIVE_STATUSES:
+                return
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+
+    return StreamingResponse(generator(), media_type="application/x-ndjson")
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from inc.auth import AuthorizedUser, authorized_user
+from inc.utils.runner_ops import DOCKER_AVAILABLE, bulk_action_generator, select_instances
+
+router = APIRouter()
+
+
+# -------- Models ---------
+
+class BulkRunnerActionIn(BaseModel):
+    ids: Optional[List[int]] = None
+    labels: Optional[str] = None  # Comma-separated, runner must carry all of them
+    status: Optional[Literal["active", "inactive", "error"]] = None
+    all: bool = False  # Required to target the whole fleet without a selector
+    concurrency: Optional[int] = None
+    stop_timeout: Optional[int] = None  # Seconds to wait before killing on stop
+
+
+# -------- Routes ----------
+
+@router.post("/runner/bulk/{action}")
+def bulk_instance_action(
+    action: Literal["start", "stop", "restart", "delete"],
+    payload: BulkRunnerActionIn,
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """
+    Run start/stop/restart/delete over many runner instances concurrently.
+
+    Runners are selected by `ids`, `labels` and/or `status`; set `all` to target
+    every runner. Returns streaming JSON lines with one result per runner.
+    """
+    if not DOCKER_AVAILABLE:
+        raise HTTPException(status_code=500, detail="Docker is not available")
+    if not (payload.ids or payload.labels or payload.status or payload.all):
+        raise HTTPException(status_code=400, detail="Provide ids, labels, status or set all=true")
+    if payload.concurrency is not None and payload.concurrency < 1:
+        raise HTTPException(status_code=400, detail="Concurrency must be at least 1")
+    if payload.stop_timeout is not None and payload.stop_timeout < 0:
+        raise HTTPException(status_code=400, detail="Stop timeout cannot be negative")
+
+    try:
+        instances = select_instances(ids=payload.ids, labels=payload.labels, status=payload.status)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to select instances: {str(e)}")
+
+    return StreamingResponse(
+        bulk_action_generator(
+            action,
+            instances,
+            concurrency=payload.concurrency,
+            stop_timeout=payload.stop_timeout,
+        ),
+        media_type="application/x-ndjson"
+    )
@@ -3,21 +3,31 @@ from __future__ import annotations
 import os
 import json
 from datetime import datetime
-from typing import Any, List, Optional
+from typing import Any, List, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from inc.auth import AuthorizedUser, authorized_user
 from inc.config import settings
-from models import RunnerInstance
-
-try:
-    import docker
-    DOCKER_AVAILABLE = True
-except ImportError:
-    DOCKER_AVAILABLE = False
+from inc.utils.docker_client import DOCKER_AVAILABLE, docker, get_docker_client
+from inc.utils.docker_governor import DockerUnavailable
+from inc.utils.drain import cancel_drain, request_drain
+from inc.utils.fast_json import FastJSONResponse
+from inc.utils.metrics import ACTIVE_LOG_STREAMS
+from inc.utils.operations import enqueue_operation, operation_accepted
+from inc.utils.runner_changes import changes_since, current_revision
+from inc.utils.runner_ops import (
+    clone_runners,
+    container_status_map,
+    delete_runner,
+    provision_runner,
+    restart_runner,
+    start_runner,
+    stop_runner,
+)
+from models import RunnerInstance, RunnerTemplate
 
 router = APIRouter()
 
@@ -35,16 +45,32 @@ class RunnerInstanceOut(BaseModel):
     hostname: Optional[str]
     created_at: str
     status: str  # "active", "inactive", "error"
+    drain_state: Optional[str] = None  # None, "draining", "drained", "forced", "failed"
+    drain_action: Optional[str] = None  # "stop", "restart", "delete"
+    drain_deadline: Optional[str] = None
+    job_state: Optional[str] = None  # "starting", "idle", "busy", "offline"
+    job_name: Optional[str] = None
+    job_started_at: Optional[str] = None
+    revision: int = 0  # Runner revision of the last change to this row
+    template_id: Optional[int] = None  # Runner template whose caches this runner shares
 
     class Config:
         from_attributes = True
 
 
+class RunnerChangesOut(BaseModel):
+    revision: int  # Pass as `since` on the next poll
+    full: bool  # True when `changed` is the complete list and local state must be replaced
+    changed: List[RunnerInstanceOut]
+    deleted: List[int]
+
+
 class CreateRunnerInstanceIn(BaseModel):
     runner_name: Optional[str] = None  # Optional, will auto-generate if not provided
     github_url: str
     token: str
     labels: Optional[str] = None
+    template_id: Optional[int] = None  # Share the caches of this runner template
 
 
 class UpdateRunnerInstanceIn(BaseModel):
@@ -60,6 +86,11 @@ class DeleteRunnerInstanceIn(BaseModel):
     id: int
 
 
+class DrainRunnerInstanceIn(BaseModel):
+    action: Literal["stop", "restart", "delete"] = "stop"
+    timeout_seconds: Optional[int] = None  # Force the action after this long; defaults to settings
+
+
 # -------- Helpers ---------
 
 def _get_instance_status(instance: RunnerInstance) -> str:
@@ -68,106 +99,206 @@ def _get_instance_status(instance: RunnerInstance) -> str:
         return "inactive"
     
     try:
-        client = docker.from_env()
+        client = get_docker_client()
         container = client.containers.get(instance.runner_name)
         
         if container.status == "running":
             return "active"
-        elif container.status == "exited":
+        elif container.status in ("exited", "created"):
             return "inactive"
         else:
             return "error"
     except docker.errors.NotFound:
         return "inactive"
+    except DockerUnavailable:
+        return instance.container_status or "error"  # Last status seen by the container watcher
     except Exception:
         return "error"
 
 
-def _run_docker_container(
-    runner_name: str,
-    github_url: str,
-    token: str,
-    labels: Optional[str] = None,
-) -> tuple[bool, str, Optional[str]]:
-    """
-    Run a Docker container for the GitHub runner.
-    
-    Returns:
-        tuple: (success: bool, message: str, container_id: Optional[str])
+def _instance_out(instance: RunnerInstance) -> RunnerInstanceOut:
+    return RunnerInstanceOut(
+        id=instance.id,
+        runner_name=instance.runner_name,
+        github_url=instance.github_url,
+        token=instance.token,
+        labels=instance.labels,
+        hostname=instance.hostname,
+        created_at=instance.created_at.isoformat(),
+        status=_get_instance_status(instance),
+        drain_state=instance.drain_state,
+        drain_action=instance.drain_action,
+        drain_deadline=instance.drain_deadline.isoformat() if instance.drain_deadline else None,
+        job_state=instance.job_state,
+        job_name=instance.job_name,
+        job_started_at=instance.job_started_at.isoformat() if instance.job_started_at else None,
+        revision=instance.revision or 0,
+        template_id=instance.template_id,
+    )
+
+
+# Fields a list response can be projected to with `fields=`
+LIST_FIELDS = tuple(RunnerInstanceOut.model_fields)
+DATETIME_FIELDS = ("created_at", "drain_deadline", "job_started_at")
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(LIST_FIELDS)
+    selected = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+
+def _select_rows(fields: List[str]):
+    """Select only the columns needed for `fields`, as plain dicts."""
+    columns = [name for name in fields if name != "status"]
+    if "status" in fields:
+        columns += ["runner_name", "hostname", "container_status"]
+    return RunnerInstance.select(*[getattr(RunnerInstance, name) for name in dict.fromkeys(columns)]).dicts()
+
+
+def _rows_out(rows: List[dict], fields: List[str]) -> Tuple[List[dict], bool]:
+    """Shape raw runner rows like RunnerInstanceOut, resolving container status with one Docker call.
+
+    Returns the rows and whether statuses are stale: when Docker cannot be
+    reached, the last status seen by the container watcher is used instead.
     """
-    if not DOCKER_AVAILABLE:
-        return False, "Docker is not available", None
-    
-    try:
-        client = docker.from_env()
-        
-        # Prepare environment variables
-        env = {
-            "RUNNER_URL": github_url,
-            "RUNNER_TOKEN": token,
-            "RUNNER_NAME": runner_name,
-        }
-        
-        if labels:
-            env["RUNNER_LABELS"] = labels
-        
-        # Prepare volumes - mount docker socket for running docker commands inside the runner
-        volumes = {
-            "/var/run/docker.sock": {"bind": "/var/run/docker.sock", "mode": "rw"}
-        }
-        
-        # Run the container
-        container = client.containers.run(
-            image="0xaungkon/gh-runner:latest",
-            environment=env,
-            volumes=volumes,
-            detach=True,  # Run in background
-            restart_policy={"Name": "unless-stopped"},
-            name=runner_name,  # Use runner_name as container name
-        )
-        
-        return True, f"Container started successfully", container.id
-        
-    except docker.errors.ImageNotFound:
-        return False, "Docker image 0xaungkon/gh-runner:latest not found", None
-    except docker.errors.ContainerError as e:
-        return False, f"Container error: {str(e)}", None
-    except Exception as e:
-        return False, f"Failed to run container: {str(e)}", None
+    statuses = None
+    stale = False
+    with_status = "status" in fields
+    if with_status and DOCKER_AVAILABLE:
+        try:
+            statuses = container_status_map()
+        except Exception:
+            stale = True
+
+    result = []
+    for row in rows:
+        for name in DATETIME_FIELDS:
+            if row.get(name) is not None:
+                row[name] = row[name].isoformat()
+        if "revision" in row:
+            row["revision"] = row["revision"] or 0
+        if with_status:
+            if not DOCKER_AVAILABLE or not row["hostname"]:
+                row["status"] = "inactive"
+            elif stale:
+                row["status"] = row["container_status"] or "error"
+            else:
+                row["status"] = statuses.get(row["runner_name"], "inactive")
+        result.append({name: row[name] for name in fields})
+    return result, stale
+
+
+def _stale_headers(stale: bool) -> dict:
+    return {"X-Status-Stale": "true"} if stale else {}
+
+
+def _list_etag(revision: int) -> str:
+    return f'W/"runners-{revision}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in [value.strip() for value in header.split(",")]
+
+
+def _drain_accepted(instance: RunnerInstance, action: str, timeout_seconds: Optional[int]) -> JSONResponse:
+    """Start a background drain and answer 202 with the runner's drain state."""
+    instance = request_drain(instance, action, timeout_seconds)
+    return JSONResponse(
+        status_code=202,
+        content={
+            "status": "draining",
+            "message": f"Runner will {action} after its current job completes",
+            "instance_id": instance.id,
+            "drain_action": instance.drain_action,
+            "drain_deadline": instance.drain_deadline.isoformat(),
+        },
+    )
 
 
 # -------- Routes ----------
 
 @router.get("/runner", response_model=List[RunnerInstanceOut])
-async def list_instances(user: AuthorizedUser = Depends(authorized_user)):
-    """List all runner instances."""
+async def list_instances(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,runner_name,status"),
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """
+    List all runner instances.
+
+    The response carries an ETag of the runner revision; sending it back in
+    `If-None-Match` answers 304 without touching Docker while nothing changed.
+    With `fields`, only those fields are returned and only their columns are
+    read; the registration token is then left out unless listed. Container
+    status costs one Docker list call and is skipped when not requested.
+    While Docker is unreachable, statuses are the last ones the container
+    watcher saw and the response carries `X-Status-Stale: true`.
+    """
+    selected = _parse_fields(fields)
     try:
-        instances = RunnerInstance.select().order_by(RunnerInstance.created_at.desc())
-        result = []
-        for instance in instances:
-            result.append(
-                RunnerInstanceOut(
-                    id=instance.id,
-                    runner_name=instance.runner_name,
-                    github_url=instance.github_url,
-                    token=instance.token,
-                    labels=instance.labels,
-                    hostname=instance.hostname,
-                    created_at=instance.created_at.isoformat(),
-                    status=_get_instance_status(instance),
-                )
-            )
-        return result
+        # Read before building the list, so a concurrent change yields a stale tag, never a skipped one
+        etag = _list_etag(current_revision())
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        rows, stale = _rows_out(list(_select_rows(selected).order_by(RunnerInstance.created_at.desc())), selected)
+        # A stale list must not be cached under the revision's tag
+        headers = _stale_headers(stale) if stale else {"ETag": etag}
+        return FastJSONResponse(rows, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list instances: {str(e)}")
 
 
+@router.get("/runner/changes", response_model=RunnerChangesOut)
+async def list_instance_changes(
+    since: int = Query(0, ge=0, description="Revision from the previous response"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return for changed runners"),
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """
+    Runners changed or deleted after revision `since`.
+
+    Covers DB changes and container state changes seen by the container
+    watcher. When `since` is older than the retained deletion history the
+    full list is returned with `full: true`.
+    """
+    selected = _parse_fields(fields)
+    try:
+        revision, changed, deleted = changes_since(since)
+        full = changed is None
+        if full:
+            changed = list(RunnerInstance.select().order_by(RunnerInstance.created_at.desc()).dicts())
+        rows, stale = _rows_out(changed, selected)
+        return FastJSONResponse({
+            "revision": revision,
+            "full": full,
+            "changed": rows,
+            "deleted": deleted,
+        }, headers=_stale_headers(stale))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list changes: {str(e)}")
+
+
 @router.post("/runner", response_model=RunnerInstanceOut)
 async def create_instance(
     payload: CreateRunnerInstanceIn,
+    background: bool = False,
     user: AuthorizedUser = Depends(authorized_user),
 ):
-    """Create a new runner instance."""
+    """Create a new runner instance.
+
+    With `background=true` the record is created right away and the container
+    is started by a queued operation; the response is 202 with its id.
+    """
+    if payload.template_id is not None and RunnerTemplate.get_or_none(RunnerTemplate.id == payload.template_id) is None:
+        raise HTTPException(status_code=404, detail=f"Template {payload.template_id} not found")
     try:
         # Generate runner name if not provided
         runner_name = payload.runner_name
@@ -183,34 +314,20 @@ async def create_instance(
             github_url=payload.github_url,
             token=payload.token,
             labels=payload.labels,
+            template_id=payload.template_id,
         )
         
-        # Try to run the docker container
-        success, message, container_id = _run_docker_container(
-            runner_name=runner_name,
-            github_url=payload.github_url,
-            token=payload.token,
-            labels=payload.labels,
-        )
+        if background:
+            operation = enqueue_operation("create", {"instance_id": instance.id})
+            return operation_accepted(operation, instance_id=instance.id, runner_name=instance.runner_name)
         
-        if success:
-            # Update hostname with container ID
-            instance.hostname = container_id
-            instance.save()
-        else:
+        # Try to run the docker container
+        success, message = provision_runner(instance)
+        if not success:
             # Log the error but still return the instance record
             print(f"Warning: Docker container creation failed: {message}")
         
-        return RunnerInstanceOut(
-            id=instance.id,
-            runner_name=instance.runner_name,
-            github_url=instance.github_url,
-            token=instance.token,
-            labels=instance.labels,
-            hostname=instance.hostname,
-            created_at=instance.created_at.isoformat(),
-            status=_get_instance_status(instance),
-        )
+        return _instance_out(instance)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create instance: {str(e)}")
 
@@ -218,28 +335,25 @@ async def create_instance(
 @router.delete("/runner/{instance_id}")
 async def delete_instance(
     instance_id: int,
+    graceful: bool = False,
+    drain_timeout: Optional[int] = None,
+    background: bool = False,
     user: AuthorizedUser = Depends(authorized_user),
 ):
-    """Delete a runner instance and its container."""
+    """Delete a runner instance and its container.
+
+    With `graceful=true` the runner is drained first: the container is removed
+    in the background once its current job completes (or `drain_timeout` passes).
+    With `background=true` the deletion is queued as an operation and the
+    response is 202 with its id.
+    """
     try:
         instance = RunnerInstance.get_by_id(instance_id)
-        
-        # Stop and remove the docker container if it exists
-        if DOCKER_AVAILABLE and instance.runner_name:
-            try:
-                client = docker.from_env()
-                try:
-                    container = client.containers.get(instance.runner_name)
-                    container.stop()
-                    container.remove()
-                except docker.errors.NotFound:
-                    pass  # Container already removed
-            except Exception as e:
-                print(f"Warning: Failed to remove container: {str(e)}")
-        
-        # Delete the database record
-        instance.delete_instance()
-        return {"status": "ok", "message": f"Instance {instance_id} deleted (container removed)", "id": instance_id}
+        if graceful:
+            return _drain_accepted(instance, "delete", drain_timeout)
+        if background:
+            return operation_accepted(enqueue_operation("delete", {"instance_id": instance_id}), instance_id=instance_id)
+        return delete_runner(instance)
     except RunnerInstance.DoesNotExist:
         raise HTTPException(status_code=404, detail=f"Instance {instance_id} not found")
     except Exception as e:
@@ -257,16 +371,7 @@ async def update_instance(
         instance = RunnerInstance.get_by_id(instance_id)
         instance.token = payload.token
         instance.save()
-        return RunnerInstanceOut(
-            id=instance.id,
-            runner_name=instance.runner_name,
-            github_url=instance.github_url,
-            token=instance.token,
-            labels=instance.labels,
-            hostname=instance.hostname,
-            created_at=instance.created_at.isoformat(),
-            status=_get_instance_status(instance),
-        )
+        return _instance_out(instance)
     except RunnerInstance.DoesNotExist:
         raise HTTPException(status_code=404, detail=f"Instance {instance_id} not found")
     except Exception as e:
@@ -277,81 +382,41 @@ async def update_instance(
 async def clone_instance(
     instance_id: int,
     payload: CloneRunnerInstanceIn,
+    background: bool = False,
     user: AuthorizedUser = Depends(authorized_user),
 ):
-    """Clone/setup multiple runner instances based on count."""
+    """Clone/setup multiple runner instances based on count.
+
+    With `background=true` the clones are created by a queued operation and
+    the response is 202 with its id.
+    """
     try:
         instance = RunnerInstance.get_by_id(instance_id)
         
-        # Use provided token or fall back to instance token
-        token = payload.token or instance.token
-        count = payload.count
-        
-        if count < 1:
+        if payload.count < 1:
             raise HTTPException(status_code=400, detail="Count must be at least 1")
         
-        created_instances = []
-        failed_clones = []
-        
-        # Create multiple instances
-        for i in range(count):
-            try:
-                # Generate unique runner name for each clone
-                clone_base_name = instance.runner_name.split("-")[0]
-                clone_runner_name = RunnerInstance.generate_runner_name(clone_base_name)
-                
-                # Create database record
-                cloned_instance = RunnerInstance.create(
-                    runner_name=clone_runner_name,
-                    github_url=instance.github_url,
-                    token=token,
-                    labels=instance.labels,
-                )
-                
-                # Try to run the docker container
-                success, message, container_id = _run_docker_container(
-                    runner_name=clone_runner_name,
-                    github_url=instance.github_url,
-                    token=token,
-                    labels=instance.labels,
-                )
-                
-                if success:
-                    cloned_instance.hostname = container_id
-                    cloned_instance.save()
-                    created_instances.append({
-                        "id": cloned_instance.id,
-                        "runner_name": clone_runner_name,
-                        "status": "running",
-                        "container_id": container_id,
-                    })
-                else:
-                    failed_clones.append({
-                        "runner_name": clone_runner_name,
-                        "error": message,
-                    })
-                    
-            except Exception as e:
-                failed_clones.append({
-                    "error": f"Clone {i+1} failed: {str(e)}",
-                })
+        if background:
+            operation = enqueue_operation(
+                "clone",
+                {"instance_id": instance_id, "count": payload.count, "token": payload.token},
+                total=payload.count,
+            )
+            return operation_accepted(operation, instance_id=instance_id)
         
-        return {
-            "status": "completed",
-            "message": f"Clone process completed: {len(created_instances)} successful, {len(failed_clones)} failed",
-            "instance_id": instance_id,
-            "count": count,
-            "created_instances": created_instances,
-            "failed_clones": failed_clones if failed_clones else None,
-        }
+        # Uses the provided token or falls back to the instance token
+        return clone_runners(instance, payload.count, token=payload.token)
     except RunnerInstance.DoesNotExist:
         raise HTTPException(status_code=404, detail=f"Instance {instance_id} not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to clone instance: {str(e)}")
 
 
 def _stream_container_logs(instance_id: int) -> Any:
     """Generator that streams container logs in real-time."""
+    ACTIVE_LOG_STREAMS.labels().inc()
     try:
         instance = RunnerInstance.get_by_id(instance_id)
         
@@ -364,7 +429,7 @@ def _stream_container_logs(instance_id: int) -> Any:
             return
         
         try:
-            client = docker.from_env()
+            client = get_docker_client()
             container = client.containers.get(instance.runner_name)
             
             # Get initial logs
@@ -406,6 +471,9 @@ def _stream_container_logs(instance_id: int) -> Any:
             "message": f"Failed to stream logs: {str(e)}",
         })
         yield f"{error_json}\n"
+    finally:
+        # Also runs when the client disconnects and the generator is closed
+        ACTIVE_LOG_STREAMS.labels().dec()
 
 
 
@@ -434,25 +502,7 @@ async def start_instance(
             raise HTTPException(status_code=500, detail="Docker is not available")
         
         try:
-            client = docker.from_env()
-            
-            # Get existing container by runner_name
-            container = client.containers.get(instance.runner_name)
-            
-            # Start the container
-            container.start()
-            
-            # Update the instance hostname with container ID if not already set
-            if not instance.hostname or instance.hostname != container.id:
-                instance.hostname = container.id
-                instance.save()
-            
-            return {
-                "status": "started",
-                "message": "Container started successfully",
-                "instance_id": instance_id,
-                "container_id": container.id,
-            }
+            return start_runner(instance)
         except docker.errors.NotFound:
             raise HTTPException(status_code=404, detail=f"Container '{instance.runner_name}' not found")
         except Exception as e:
@@ -466,34 +516,24 @@ async def start_instance(
 @router.post("/runner/{instance_id}/stop")
 async def stop_instance(
     instance_id: int,
+    graceful: bool = False,
+    drain_timeout: Optional[int] = None,
     user: AuthorizedUser = Depends(authorized_user),
 ):
-    """Stop a runner instance (container remains for restart)."""
+    """Stop a runner instance (container remains for restart).
+
+    With `graceful=true` the stop waits in the background for the current job.
+    """
     try:
         instance = RunnerInstance.get_by_id(instance_id)
+        if graceful:
+            return _drain_accepted(instance, "stop", drain_timeout)
         
         if not DOCKER_AVAILABLE:
             raise HTTPException(status_code=500, detail="Docker is not available")
         
         try:
-            client = docker.from_env()
-            
-            # Try to stop the container by name
-            try:
-                container = client.containers.get(instance.runner_name)
-                container.stop()
-                return {
-                    "status": "stopped",
-                    "message": "Container stopped (can be restarted)",
-                    "instance_id": instance_id,
-                    "container_id": container.id,
-                }
-            except docker.errors.NotFound:
-                return {
-                    "status": "not_running",
-                    "message": "Container not found (already stopped?)",
-                    "instance_id": instance_id,
-                }
+            return stop_runner(instance)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Docker error: {str(e)}")
     except RunnerInstance.DoesNotExist:
@@ -505,34 +545,31 @@ async def stop_instance(
 @router.post("/runner/{instance_id}/restart")
 async def restart_instance(
     instance_id: int,
+    graceful: bool = False,
+    drain_timeout: Optional[int] = None,
+    background: bool = False,
     user: AuthorizedUser = Depends(authorized_user),
 ):
-    """Restart a runner instance (stop and start)."""
+    """Restart a runner instance (stop and start).
+
+    With `graceful=true` the restart waits in the background for the current job.
+    With `background=true` the restart is queued as an operation and the
+    response is 202 with its id.
+    """
     try:
         instance = RunnerInstance.get_by_id(instance_id)
+        if graceful:
+            return _drain_accepted(instance, "restart", drain_timeout)
         
         if not DOCKER_AVAILABLE:
             raise HTTPException(status_code=500, detail="Docker is not available")
         
+        if background:
+            return operation_accepted(enqueue_operation("restart", {"instance_id": instance_id}), instance_id=instance_id)
+        
         try:
-            client = docker.from_env()
-            
             try:
-                container = client.containers.get(instance.runner_name)
-                
-                # Stop the container
-                container.stop()
-                
-                # Start the container again
-                container.start()
-                
-                return {
-                    "status": "restarted",
-                    "message": "Container restarted successfully",
-                    "instance_id": instance_id,
-                    "container_id": container.id,
-                    "container_status": "running",
-                }
+                return restart_runner(instance)
             except docker.errors.NotFound:
                 raise HTTPException(status_code=404, detail=f"Container not found for instance {instance_id}")
         except Exception as e:
@@ -543,6 +580,47 @@ async def restart_instance(
         raise HTTPException(status_code=500, detail=f"Failed to restart instance: {str(e)}")
 
 
+@router.post("/runner/{instance_id}/drain", status_code=202)
+async def drain_instance(
+    instance_id: int,
+    payload: DrainRunnerInstanceIn,
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """Drain a runner: let its current job finish, then stop, restart or delete it."""
+    try:
+        instance = RunnerInstance.get_by_id(instance_id)
+        if not DOCKER_AVAILABLE:
+            raise HTTPException(status_code=500, detail="Docker is not available")
+        if payload.timeout_seconds is not None and payload.timeout_seconds < 0:
+            raise HTTPException(status_code=400, detail="Drain timeout cannot be negative")
+        return _drain_accepted(instance, payload.action, payload.timeout_seconds)
+    except RunnerInstance.DoesNotExist:
+        raise HTTPException(status_code=404, detail=f"Instance {instance_id} not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to drain instance: {str(e)}")
+
+
+@router.delete("/runner/{instance_id}/drain", response_model=RunnerInstanceOut)
+async def cancel_instance_drain(
+    instance_id: int,
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """Cancel a pending drain and keep the runner in service."""
+    try:
+        instance = RunnerInstance.get_by_id(instance_id)
+        if instance.drain_state != "draining":
+            raise HTTPException(status_code=409, detail=f"Instance {instance_id} is not draining")
+        return _instance_out(cancel_drain(instance))
+    except RunnerInstance.DoesNotExist:
+        raise HTTPException(status_code=404, detail=f"Instance {instance_id} not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to cancel drain: {str(e)}")
+
+
 @router.post("/runner/{instance_id}/logs/clear")
 async def clear_instance_logs(
     instance_id: int,
@@ -556,7 +634,7 @@ async def clear_instance_logs(
             raise HTTPException(status_code=500, detail="Docker is not available")
         
         try:
-            client = docker.from_env()
+            client = get_docker_client()
             container = client.containers.get(instance.runner_name)
             
             # Get the container's log file path
@@ -595,9 +673,10 @@ async def clear_instance_logs(
                         detail="Could not determine log file path"
                     )
             else:
+                # The local driver rotates its own files; they stay within RUNNER_LOG_MAX_SIZE * RUNNER_LOG_MAX_FILE
                 raise HTTPException(
                     status_code=501,
-                    detail=f"Log driver '{log_config}' is not supported for clearing logs"
+                    detail=f"Log driver '{log_config}' is not supported for clearing logs; its logs are rotated by the daemon"
                 )
         except docker.errors.NotFound:
             raise HTTPException(status_code=404, detail=f"Container not found for instance {instance_id}")
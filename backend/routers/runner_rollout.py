@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from inc.auth import AuthorizedUser, authorized_user
+from inc.utils.log_config import outdated_runners
+from inc.utils.operations import ACTIVE_STATUSES, enqueue_operation, operation_accepted
+from inc.utils.rollout import DOCKER_AVAILABLE, active_rollout, start_rollout
+from models import Operation, Rollout
+
+router = APIRouter()
+
+
+# -------- Models ---------
+
+class RolloutIn(BaseModel):
+    image: Optional[str] = None  # Defaults to settings.RUNNER_IMAGE
+    max_unavailable: int = 1
+    labels: Optional[str] = None  # Only upgrade runners carrying all these labels
+    wave_timeout_seconds: int = 300
+    token: Optional[str] = None  # Registration token the recreated runners register with; their stored one by default
+
+
+class RolloutOut(BaseModel):
+    id: int
+    image: str
+    target_digest: Optional[str]
+    labels: Optional[str]
+    max_unavailable: int
+    wave_timeout_seconds: int
+    status: str  # "pending", "running", "completed", "failed", "cancelled"
+    message: Optional[str]
+    upgraded: int
+    failed: int
+    created_at: str
+    updated_at: str
+
+
+class LogConfigMigrationIn(BaseModel):
+    labels: Optional[str] = None  # Only migrate runners carrying all these labels
+    wait_seconds: Optional[int] = Field(default=None, ge=0)  # How long busy runners are waited for; DRAIN_TIMEOUT_SECONDS by default
+    token: Optional[str] = None  # Registration token the recreated runners register with; their stored one by default
+
+
+class OutdatedLogConfigOut(BaseModel):
+    id: int
+    runner_name: str
+    current: Dict[str, Any]  # Log driver and options the container was created with
+    wanted: Dict[str, Any]  # What its template asks for
+
+
+def _rollout_out(rollout: Rollout) -> RolloutOut:
+    return RolloutOut(
+        id=rollout.id,
+        image=rollout.image,
+        target_digest=rollout.target_digest,
+        labels=rollout.labels,
+        max_unavailable=rollout.max_unavailable,
+        wave_timeout_seconds=rollout.wave_timeout_seconds,
+        status=rollout.status,
+        message=rollout.message,
+        upgraded=rollout.upgraded,
+        failed=rollout.failed,
+        created_at=rollout.created_at.isoformat(),
+        updated_at=rollout.updated_at.isoformat(),
+    )
+
+
+# -------- Routes ----------
+
+@router.post("/runner/rollout", response_model=RolloutOut, status_code=202)
+def create_rollout(payload: RolloutIn, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Start a rolling image upgrade.
+
+    The image is pulled once, then runners are recreated in waves of at most
+    `max_unavailable`, waiting for each wave to report "Listening for Jobs".
+    Runners running a job are left for a later wave, once they are idle.
+    Recreated runners register again; registration tokens expire after an
+    hour, so pass a fresh `token` unless the stored ones are still current.
+    """
+    if not DOCKER_AVAILABLE:
+        raise HTTPException(status_code=500, detail="Docker is not available")
+    if payload.max_unavailable < 1:
+        raise HTTPException(status_code=400, detail="max_unavailable must be at least 1")
+    if active_rollout() is not None:
+        raise HTTPException(status_code=409, detail="Another rollout is already in progress")
+    rollout = start_rollout(
+        image=payload.image,
+        max_unavailable=payload.max_unavailable,
+        labels=payload.labels,
+        wave_timeout_seconds=payload.wave_timeout_seconds,
+        token=payload.token,
+    )
+    return _rollout_out(rollout)
+
+
+@router.get("/runner/rollout", response_model=List[RolloutOut])
+def list_rollouts(user: AuthorizedUser = Depends(authorized_user)):
+    """List rollouts, newest first."""
+    return [_rollout_out(r) for r in Rollout.select().order_by(Rollout.id.desc())]
+
+
+@router.get("/runner/rollout/{rollout_id}", response_model=RolloutOut)
+def get_rollout(rollout_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    rollout = Rollout.get_or_none(Rollout.id == rollout_id)
+    if rollout is None:
+        raise HTTPException(status_code=404, detail=f"Rollout {rollout_id} not found")
+    return _rollout_out(rollout)
+
+
+@router.post("/runner/rollout/{rollout_id}/cancel", response_model=RolloutOut)
+def cancel_rollout(rollout_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    """Cancel a rollout; the wave in flight finishes, no further waves start."""
+    rollout = Rollout.get_or_none(Rollout.id == rollout_id)
+    if rollout is None:
+        raise HTTPException(status_code=404, detail=f"Rollout {rollout_id} not found")
+    if rollout.status not in ("pending", "running"):
+        raise HTTPException(status_code=409, detail=f"Rollout is already {rollout.status}")
+    rollout.status = "cancelled"
+    rollout.save()
+    return _rollout_out(rollout)
+
+
+@router.get("/runner/log-config", response_model=List[OutdatedLogConfigOut])
+def list_outdated_log_config(labels: Optional[str] = None, user: AuthorizedUser = Depends(authorized_user)):
+    """Runners whose containers were created with other log settings than their template asks for."""
+    if not DOCKER_AVAILABLE:
+        raise HTTPException(status_code=500, detail="Docker is not available")
+    try:
+        return [
+            OutdatedLogConfigOut(id=entry["instance"].id, runner_name=entry["instance"].runner_name, current=entry["current"], wanted=entry["wanted"])
+            for entry in outdated_runners(labels)
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read runner log settings: {str(e)}")
+
+
+@router.post("/runner/log-config/migrate", status_code=202)
+def migrate_runner_log_config(payload: LogConfigMigrationIn, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Recreate runners with outdated log settings, e.g. ones created before
+    logs were bounded or before their template's log config changed.
+
+    Runs as an operation. Runners are recreated one at a time from the image
+    they run, each once it is idle; stopped runners stay stopped. As with
+    rollouts, pass a fresh registration `token` for them to register with.
+    """
+    if not DOCKER_AVAILABLE:
+        raise HTTPException(status_code=500, detail="Docker is not available")
+    if active_rollout() is not None:
+        raise HTTPException(status_code=409, detail="A rollout is in progress; migrate once it is done")
+    running = Operation.get_or_none((Operation.kind == "log-config") & Operation.status.in_(ACTIVE_STATUSES))
+    if running is not None:
+        raise HTTPException(status_code=409, detail=f"Log config migration {running.id} is already in progress")
+    try:
+        total = len(outdated_runners(payload.labels))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read runner log settings: {str(e)}")
+    return operation_accepted(enqueue_operation("log-config", payload.model_dump(exclude_none=True), total=max(total, 1)), runners=total)
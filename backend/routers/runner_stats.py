@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from typing import Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+
+from inc.auth import AuthorizedUser, authorized_user
+from inc.utils.docker_client import docker
+from inc.utils.runner_ops import runner_template
+from inc.utils.stats_sampler import METRICS, get_latest_stats, get_runner_stats
+from inc.utils.work_storage import work_disk_usage
+from models import RunnerInstance
+
+router = APIRouter()
+
+
+# -------- Models ---------
+
+class RunnerStatsOut(BaseModel):
+    instance_id: int
+    runner_name: str
+    window: str
+    points: List[Dict[str, float]]  # {"t": unix time, <metric>: value, ...}
+
+
+class RunnerStatsLatest(BaseModel):
+    instance_id: int
+    runner_name: str
+    sample: Dict[str, float]
+
+
+class RunnerDiskOut(BaseModel):
+    instance_id: int
+    runner_name: str
+    storage: str  # Work storage type: "overlay", "tmpfs", "bind" or "volume"
+    work_path: str
+    work_bytes: Optional[int]  # None when it cannot be measured, e.g. the container is stopped
+    work_limit_bytes: Optional[int]  # tmpfs size cap
+    container_rw_bytes: Optional[int]  # Container's writable layer, including an overlay work directory
+
+
+class FleetStatsOut(BaseModel):
+    runners: List[RunnerStatsLatest]
+    totals: Dict[str, float]  # Sum of the latest sample of every runner
+    top_cpu: List[str]  # Runner names with the highest CPU usage first
+    top_memory: List[str]
+
+
+# -------- Routes ----------
+
+@router.get("/runner/stats/summary", response_model=FleetStatsOut)
+def get_fleet_stats(
+    top: int = Query(5, ge=1, le=100),
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """Latest CPU, memory, network and block I/O sample of every runner plus fleet totals."""
+    latest = get_latest_stats()
+    ids = dict(RunnerInstance.select(RunnerInstance.runner_name, RunnerInstance.id).tuples())
+    runners = [
+        RunnerStatsLatest(instance_id=ids[name], runner_name=name, sample=sample)
+        for name, sample in latest.items()
+        if name in ids
+    ]
+    totals = {name: sum(r.sample[name] for r in runners) for name in METRICS}
+    by_cpu = sorted(runners, key=lambda r: r.sample["cpu_percent"], reverse=True)
+    by_memory = sorted(runners, key=lambda r: r.sample["memory_bytes"], reverse=True)
+    return FleetStatsOut(
+        runners=runners,
+        totals=totals,
+        top_cpu=[r.runner_name for r in by_cpu[:top]],
+        top_memory=[r.runner_name for r in by_memory[:top]],
+    )
+
+
+@router.get("/runner/{instance_id}/stats", response_model=RunnerStatsOut)
+def get_instance_stats(
+    instance_id: int,
+    window: Literal["raw", "minute", "hour"] = "raw",
+    limit: Optional[int] = Query(None, ge=1),
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """
+    Resource samples of a runner container, oldest first.
+
+    `raw` holds every sample, `minute` and `hour` hold averages; each window
+    keeps a fixed number of points.
+    """
+    instance = RunnerInstance.get_or_none(RunnerInstance.id == instance_id)
+    if instance is None:
+        raise HTTPException(status_code=404, detail=f"Instance {instance_id} not found")
+    return RunnerStatsOut(
+        instance_id=instance.id,
+        runner_name=instance.runner_name,
+        window=window,
+        points=get_runner_stats(instance.runner_name, window, limit),
+    )
+
+
+@router.get("/runner/{instance_id}/disk", response_model=RunnerDiskOut)
+def get_instance_disk(instance_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    """Disk used by a runner's work directory and by its container's writable layer."""
+    instance = RunnerInstance.get_or_none(RunnerInstance.id == instance_id)
+    if instance is None:
+        raise HTTPException(status_code=404, detail=f"Instance {instance_id} not found")
+    try:
+        usage = work_disk_usage(instance.runner_name, runner_template(instance))
+    except docker.errors.NotFound:
+        raise HTTPException(status_code=404, detail=f"Container for instance {instance_id} not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to measure disk usage: {str(e)}")
+    return RunnerDiskOut(instance_id=instance.id, runner_name=instance.runner_name, **usage)
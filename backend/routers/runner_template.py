@@ -0,0 +1,303 @@
+import json
+import os
+from typing import Annotated, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from inc.auth import AuthorizedUser, authorized_user
+from inc.utils.derived_images import build_derived_image, derived_image_state, gc_derived_images
+from inc.utils.log_config import log_config, max_log_bytes
+from inc.utils.operations import enqueue_operation, operation_accepted
+from inc.utils.runner_caches import KNOWN_CACHES, cache_usage, clear_cache
+from models import RunnerInstance, RunnerTemplate
+
+router = APIRouter()
+
+
+# -------- Models ---------
+
+class CacheSpec(BaseModel):
+    name: str = Field(pattern=r"^[a-z0-9][a-z0-9_.-]*$")  # A known cache (hostedtoolcache, npm, pip, ...) or your own
+    path: Optional[str] = None  # Mount path in the runner; required for caches that are not known
+    quota_mb: Optional[int] = Field(default=None, ge=1)  # Defaults to settings.CACHE_DEFAULT_QUOTA_MB
+    depth: Optional[int] = Field(default=None, ge=1, le=4)  # Directory depth evicted as a unit
+
+
+AptPackage = Annotated[str, Field(pattern=r"^[a-z0-9][a-z0-9+.:=~-]*$")]  # name or name=version
+PipPackage = Annotated[str, Field(pattern=r"^[A-Za-z0-9][A-Za-z0-9._\-\[\],<>=!~ ]*$")]  # requirement specifier
+
+
+class ImageSpec(BaseModel):
+    base: Optional[str] = None  # Build on this image instead of the one runners are created or rolled out with
+    apt_packages: List[AptPackage] = []
+    pip_packages: List[PipPackage] = []
+    setup: List[str] = []  # Shell commands run as root, in order, after the packages are installed
+
+
+class WorkStorageSpec(BaseModel):
+    type: Literal["overlay", "tmpfs", "bind", "volume"] = "overlay"
+    size_mb: Optional[int] = Field(default=None, ge=1)  # Required for tmpfs; counts against the runner's memory
+    path: Optional[str] = None  # Required for bind: fast disk directory, same path on the host and in the backend
+    clean_between_jobs: bool = True  # Empty the work directory after every job
+
+
+class LogConfigSpec(BaseModel):
+    # Unset fields fall back to the RUNNER_LOG_* settings
+    driver: Optional[Literal["local", "json-file"]] = None
+    max_size: Optional[str] = Field(default=None, pattern=r"^[1-9][0-9]*[kmg]$")  # Rotate at this size, e.g. "20m"
+    max_file: Optional[int] = Field(default=None, ge=1, le=100)  # Rotated files kept
+    compress: Optional[bool] = None  # Compress rotated files
+
+
+class EffectiveLogConfig(BaseModel):
+    driver: str
+    max_size: str
+    max_file: int
+    compress: bool
+    max_bytes: int  # Most log data a runner keeps on the host
+
+
+class RunnerTemplateIn(BaseModel):
+    name: str = Field(pattern=r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+    description: Optional[str] = None
+    caches: List[CacheSpec] = []
+    image: Optional[ImageSpec] = None  # Packages and setup steps baked into a derived runner image
+    work_storage: Optional[WorkStorageSpec] = None  # Where runners keep their work directory; overlay when omitted
+    log_config: Optional[LogConfigSpec] = None  # Container log driver and rotation; RUNNER_LOG_* when omitted
+
+
+class RunnerTemplateOut(BaseModel):
+    id: int
+    name: str
+    description: Optional[str]
+    caches: List[CacheSpec]
+    image: Optional[ImageSpec]
+    work_storage: Optional[WorkStorageSpec]
+    log_config: Optional[LogConfigSpec]
+    effective_log_config: EffectiveLogConfig  # What runners of this template are created with
+    runners: int  # Runners created from this template
+    created_at: str
+    updated_at: str
+
+
+class DerivedImageOut(BaseModel):
+    tag: Optional[str]  # <repository>:<content hash>; None when the template adds nothing to the base image
+    built: bool
+    dockerfile: Optional[str]
+
+
+class CacheUsageOut(BaseModel):
+    name: str
+    path: str
+    size_bytes: int
+    quota_bytes: int
+    generation: Optional[str]  # Snapshot new runners mount
+    runners: int  # Runners with a writable layer on this cache
+
+
+# -------- Helpers ---------
+
+def _template_out(template: RunnerTemplate) -> RunnerTemplateOut:
+    return RunnerTemplateOut(
+        id=template.id,
+        name=template.name,
+        description=template.description,
+        caches=json.loads(template.caches) if template.caches else [],
+        image=json.loads(template.image_spec) if template.image_spec else None,
+        work_storage=json.loads(template.work_storage) if template.work_storage else None,
+        log_config=json.loads(template.log_config) if template.log_config else None,
+        effective_log_config=EffectiveLogConfig(**log_config(template), max_bytes=max_log_bytes(template)),
+        runners=RunnerInstance.select().where(RunnerInstance.template_id == template.id).count(),
+        created_at=template.created_at.isoformat(),
+        updated_at=template.updated_at.isoformat(),
+    )
+
+
+def _validate(payload: RunnerTemplateIn) -> None:
+    names = [cache.name for cache in payload.caches]
+    if len(names) != len(set(names)):
+        raise HTTPException(status_code=400, detail="Cache names must be unique within a template")
+    for cache in payload.caches:
+        if cache.name not in KNOWN_CACHES and not cache.path:
+            raise HTTPException(status_code=400, detail=f"Cache '{cache.name}' is not a known cache and needs a path")
+    storage = payload.work_storage
+    if storage is not None and storage.type == "tmpfs" and not storage.size_mb:
+        raise HTTPException(status_code=400, detail="tmpfs work storage needs a size_mb cap")
+    if storage is not None and storage.type == "bind" and not (storage.path and os.path.isabs(storage.path)):
+        raise HTTPException(status_code=400, detail="bind work storage needs an absolute path")
+
+
+def _caches_json(payload: RunnerTemplateIn) -> Optional[str]:
+    caches = [cache.model_dump(exclude_none=True) for cache in payload.caches]
+    return json.dumps(caches) if caches else None
+
+
+def _image_json(payload: RunnerTemplateIn) -> Optional[str]:
+    image = payload.image
+    if image is None or not (image.apt_packages or image.pip_packages or image.setup):
+        return None
+    return image.model_dump_json(exclude_none=True)
+
+
+def _prebuild(template: RunnerTemplate) -> None:
+    """Build the derived image in the background, so the template's first runner does not wait for it."""
+    if template.image_spec:
+        enqueue_operation("image", {"template_id": template.id})
+
+
+def _work_storage_json(payload: RunnerTemplateIn) -> Optional[str]:
+    return payload.work_storage.model_dump_json(exclude_none=True) if payload.work_storage else None
+
+
+def _log_config_json(payload: RunnerTemplateIn) -> Optional[str]:
+    if payload.log_config is None:
+        return None
+    return payload.log_config.model_dump_json(exclude_none=True) if payload.log_config.model_dump(exclude_none=True) else None
+
+
+def _get_template(template_id: int) -> RunnerTemplate:
+    template = RunnerTemplate.get_or_none(RunnerTemplate.id == template_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail=f"Template {template_id} not found")
+    return template
+
+
+# -------- Routes ----------
+
+@router.get("/templates", response_model=List[RunnerTemplateOut])
+def list_templates(user: AuthorizedUser = Depends(authorized_user)):
+    return [_template_out(template) for template in RunnerTemplate.select().order_by(RunnerTemplate.name)]
+
+
+@router.post("/templates", response_model=RunnerTemplateOut, status_code=201)
+def create_template(payload: RunnerTemplateIn, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Create a runner template. Runners created with its `template_id` share
+    its caches: each gets a copy-on-write view that is merged back after
+    every job, and the least recently used entries are evicted past the quota.
+    """
+    _validate(payload)
+    if RunnerTemplate.get_or_none(RunnerTemplate.name == payload.name) is not None:
+        raise HTTPException(status_code=409, detail=f"Template '{payload.name}' already exists")
+    try:
+        template = RunnerTemplate.create(
+            name=payload.name,
+            description=payload.description,
+            caches=_caches_json(payload),
+            image_spec=_image_json(payload),
+            work_storage=_work_storage_json(payload),
+            log_config=_log_config_json(payload),
+        )
+        _prebuild(template)
+        return _template_out(template)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create template: {str(e)}")
+
+
+@router.get("/templates/{template_id}", response_model=RunnerTemplateOut)
+def get_template(template_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    return _template_out(_get_template(template_id))
+
+
+@router.put("/templates/{template_id}", response_model=RunnerTemplateOut)
+def update_template(template_id: int, payload: RunnerTemplateIn, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Update a template. Existing runners pick the change up when they are
+    recreated, e.g. by a rollout or, for log settings, POST
+    /runner/log-config/migrate; a changed image is built in the background.
+    """
+    template = _get_template(template_id)
+    _validate(payload)
+    if payload.name != template.name:
+        raise HTTPException(status_code=400, detail="A template cannot be renamed; its caches are stored by name")
+    try:
+        template.description = payload.description
+        template.caches = _caches_json(payload)
+        image_changed = template.image_spec != _image_json(payload)
+        template.image_spec = _image_json(payload)
+        template.work_storage = _work_storage_json(payload)
+        template.log_config = _log_config_json(payload)
+        template.save()
+        if image_changed:
+            _prebuild(template)
+        return _template_out(template)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update template: {str(e)}")
+
+
+@router.delete("/templates/{template_id}")
+def delete_template(template_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    template = _get_template(template_id)
+    in_use = RunnerInstance.select().where(RunnerInstance.template_id == template_id).count()
+    if in_use:
+        raise HTTPException(status_code=409, detail=f"Template {template_id} is used by {in_use} runners")
+    template.delete_instance()
+    return {"status": "ok", "message": f"Template {template_id} deleted", "id": template_id}
+
+
+@router.post("/templates/images/gc")
+def gc_template_images(
+    grace_hours: Optional[float] = Query(default=None, ge=0),
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """
+    Remove derived images that no template builds any more and no container
+    uses, e.g. after a template changed or was deleted.
+
+    - grace_hours: keep unused images younger than this; defaults to DERIVED_IMAGE_GRACE_HOURS
+    """
+    try:
+        return gc_derived_images(list(RunnerTemplate.select()), grace_hours)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to collect derived images: {str(e)}")
+
+
+@router.get("/templates/{template_id}/image", response_model=DerivedImageOut)
+def get_template_image(template_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    """The derived image runners of this template get, whether it is built, and the Dockerfile it is built from."""
+    template = _get_template(template_id)
+    try:
+        state = derived_image_state(template)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to resolve the base image: {str(e)}")
+    return DerivedImageOut(tag=state["tag"], built=state["built"], dockerfile=state["dockerfile"])
+
+
+@router.post("/templates/{template_id}/image")
+def build_template_image(template_id: int, background: bool = False, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Build the template's derived image now unless it exists.
+
+    - background: run as a queued operation and answer 202 with its id
+    """
+    template = _get_template(template_id)
+    if not template.image_spec:
+        raise HTTPException(status_code=400, detail=f"Template {template_id} adds nothing to the base image")
+    if background:
+        return operation_accepted(enqueue_operation("image", {"template_id": template_id}))
+    try:
+        return build_derived_image(template)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to build template image: {str(e)}")
+
+
+@router.get("/templates/{template_id}/caches", response_model=List[CacheUsageOut])
+def get_template_caches(template_id: int, user: AuthorizedUser = Depends(authorized_user)):
+    """Size, quota and current snapshot of each shared cache of a template."""
+    try:
+        return cache_usage(_get_template(template_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read cache usage: {str(e)}")
+
+
+@router.delete("/templates/{template_id}/caches/{cache_name}")
+def clear_template_cache(template_id: int, cache_name: str, user: AuthorizedUser = Depends(authorized_user)):
+    """Start a cache over empty. Running runners keep their snapshot until recreated."""
+    template = _get_template(template_id)
+    if cache_name not in {cache["name"] for cache in json.loads(template.caches or "[]")}:
+        raise HTTPException(status_code=404, detail=f"Template {template_id} has no cache '{cache_name}'")
+    clear_cache(template, cache_name)
+    return {"status": "ok", "message": f"Cache '{cache_name}' of template {template_id} cleared"}
@@ -1,11 +1,32 @@
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from inc.auth import AuthorizedUser, authorized_user
+from inc.config import settings
+from inc.utils.disk_gc import disk_gc_state, run_gc
+from inc.utils.operations import enqueue_operation, operation_accepted
 from inc.utils.prerequisites import check_prerequisites, PrerequisitesResponse
+from inc.utils.profiling import get_profile_path, get_profiling_config, list_profiles, set_profiling_config
+from inc.utils.registry_mirror import ensure_mirror, evict, mirror_state, mirror_url
+from inc.utils.release_cache import ensure_runner_install, list_releases, release_cache_state
 from inc.utils.setup_helpers import setup_streaming_generator
 
 router = APIRouter()
 
 
+class ProfilingConfig(BaseModel):
+    enabled: bool
+    sample_rate: float
+    slow_ms: int
+
+
+class ProfilingConfigIn(BaseModel):
+    enabled: Optional[bool] = None
+    sample_rate: Optional[float] = Field(default=None, ge=0, le=1)
+    slow_ms: Optional[int] = Field(default=None, ge=0)
+
+
 @router.get("/prerequisites", response_model=PrerequisitesResponse)
 def get_prerequisites():
     """
@@ -19,18 +40,167 @@ def get_prerequisites():
 
 
 @router.post("/setup")
-def setup_system():
+def setup_system(background: bool = False):
     """
     Setup the system by:
     1. Validating all prerequisites
     2. Downloading the latest runner image
     3. Pulling the ubuntu:latest Docker image
     
-    Returns streaming JSON lines with progress updates.
+    Returns streaming JSON lines with progress updates. With `background=true`
+    setup runs as a queued operation and the response is 202 with its id.
     """
+    if background:
+        return operation_accepted(enqueue_operation("setup", {}))
     return StreamingResponse(
         setup_streaming_generator(),
         media_type="application/x-ndjson"
     )
 
 
+@router.get("/profiling", response_model=ProfilingConfig)
+def get_profiling(user: AuthorizedUser = Depends(authorized_user)):
+    """Current request profiling switches."""
+    return get_profiling_config()
+
+
+@router.put("/profiling", response_model=ProfilingConfig)
+def update_profiling(payload: ProfilingConfigIn, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Switch request profiling at runtime; persisted, so it survives restarts.
+
+    - enabled: sample request thread stacks while requests run
+    - sample_rate: fraction of requests whose profile is kept
+    - slow_ms: requests at least this slow always keep their profile
+    """
+    try:
+        return set_profiling_config(**payload.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update profiling config: {str(e)}")
+
+
+@router.get("/profiles", response_model=List[Dict[str, Any]])
+def get_profiles(
+    limit: int = Query(100, ge=1, le=1000),
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """Stored request profiles, newest first."""
+    return list_profiles(limit)
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Download a profile as folded stacks (`frame;frame;... count` per line), the
+    input format of flamegraph.pl and speedscope.
+    """
+    path = get_profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
+
+@router.get("/runner-release")
+def get_runner_release(user: AuthorizedUser = Depends(authorized_user)):
+    """Runner release cache settings and the versions downloaded and extracted on this host."""
+    return release_cache_state()
+
+
+@router.post("/runner-release")
+def prepare_runner_release(
+    version: Optional[str] = None,
+    refresh: bool = False,
+    background: bool = False,
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """
+    Download and extract a runner release into the shared install, ahead of
+    creating or rolling out runners with it.
+
+    - version: release to prepare; RUNNER_VERSION or the latest stable one when omitted
+    - refresh: fetch release metadata even if the cached copy is within its TTL
+    - background: run as a queued operation and answer 202 with its id
+    """
+    if background:
+        return operation_accepted(enqueue_operation("release", {"version": version, "refresh": refresh}))
+    try:
+        if refresh:
+            list_releases(refresh=True)
+        version, path = ensure_runner_install(version)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to prepare runner release: {str(e)}")
+    return {"status": "ready", "version": version, "path": path}
+
+
+@router.get("/registry-mirror")
+def get_registry_mirror(user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Pull-through registry mirror: container status, cache size against its
+    quota, hit ratio for blobs and manifests, and whether the host daemon is
+    configured to pull through it (`daemon_json` is the setting to add to
+    /etc/docker/daemon.json when it is not).
+    """
+    try:
+        return mirror_state()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read registry mirror state: {str(e)}")
+
+
+@router.post("/registry-mirror")
+def provision_registry_mirror(user: AuthorizedUser = Depends(authorized_user)):
+    """Create the mirror container, or recreate it after its settings changed, without waiting for the next check."""
+    if not settings.REGISTRY_MIRROR:
+        raise HTTPException(status_code=409, detail="The registry mirror is disabled; set REGISTRY_MIRROR=true")
+    try:
+        return {"status": ensure_mirror(), "url": mirror_url()}
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to provision registry mirror: {str(e)}")
+
+
+@router.post("/registry-mirror/evict")
+def evict_registry_mirror(
+    target_mb: Optional[int] = Query(default=None, ge=0),
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """
+    Evict least recently used blobs now.
+
+    - target_mb: shrink the cache below this size instead of REGISTRY_MIRROR_QUOTA_MB; 0 empties it
+    """
+    try:
+        blobs, freed = evict(target_mb * 1024 * 1024 if target_mb is not None else None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to evict registry mirror blobs: {str(e)}")
+    return {"status": "ok", "evicted_blobs": blobs, "evicted_bytes": freed}
+
+
+@router.get("/disk")
+def get_disk(user: AuthorizedUser = Depends(authorized_user)):
+    """
+    Disk-pressure manager: usage of the disk Docker stores its data on, what
+    Docker holds on it by kind, and what the last collection reclaimed.
+    """
+    try:
+        return disk_gc_state()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read disk usage: {str(e)}")
+
+
+@router.post("/disk/gc")
+def collect_disk(
+    force: bool = False,
+    background: bool = False,
+    user: AuthorizedUser = Depends(authorized_user),
+):
+    """
+    Run a collection now instead of waiting for the next check.
+
+    - force: collect even under DISK_GC_HIGH_WATERMARK, still stopping at DISK_GC_LOW_WATERMARK
+    - background: queue it as an operation and answer 202 right away
+    """
+    if background:
+        return operation_accepted(enqueue_operation("disk-gc", {"force": force}))
+    try:
+        return run_gc(force=force)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Disk garbage collection failed: {str(e)}")
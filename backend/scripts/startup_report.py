@@ -0,0 +1,163 @@
+"""Import and startup time of the backend, with a budget to catch regressions.
+
+Usage:
+    make startup_report
+    python scripts/startup_report.py [--runs 5] [--boot] [--budget-ms 1500] [--json]
+
+Imports `main` in fresh interpreters with `-X importtime` and prints the
+median import time plus the heaviest application modules and third-party
+packages. With --boot it also starts uvicorn on a free port against a
+scratch database and measures the wall time until /readyz answers 200,
+along with the per-phase breakdown the worker reports there.
+
+Exits with status 1 when the median import time (or the time to ready,
+with --boot) exceeds --budget-ms.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PACKAGES = ("main", "inc", "models", "routers")
+
+
+def _scratch_env(directory: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(directory, 'startup.db')}")
+    env.setdefault("VOLUME_PATH", directory)
+    return env
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for every line of `-X importtime` output."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+def measure_import(env: Dict[str, str]) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """Import `main` in a fresh interpreter; return wall ms and the importtime entries."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing main failed:\n{result.stderr[-2000:]}")
+    return elapsed, parse_importtime(result.stderr)
+
+
+def heaviest(modules: List[Tuple[str, int, int]], top: int) -> Dict[str, Any]:
+    app = [(name, cumulative) for name, _, cumulative in modules if name.split(".")[0] in APP_PACKAGES]
+    packages: Dict[str, int] = defaultdict(int)
+    for name, _, cumulative in modules:
+        root = name.split(".")[0]
+        if root not in APP_PACKAGES and "." not in name:
+            packages[root] = max(packages[root], cumulative)
+    by_time = lambda item: -item[1]
+    return {
+        "app_modules_ms": {name: round(us / 1000, 1) for name, us in sorted(app, key=by_time)[:top]},
+        "packages_ms": {name: round(us / 1000, 1) for name, us in sorted(packages.items(), key=by_time)[:top]},
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_boot(env: Dict[str, str], timeout: float) -> Dict[str, Any]:
+    """Start uvicorn and poll /readyz; return wall ms until ready and the worker's own report."""
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1) as response:
+                    body = json.load(response)
+                return {"ready_ms": round((time.perf_counter() - started) * 1000, 1), "worker": body["startup"]}
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+        raise RuntimeError(f"Not ready after {timeout:.0f}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    imports = report["import"]
+    print(f"import main  median {imports['median_ms']:.0f} ms  (runs: {', '.join(f'{ms:.0f}' for ms in imports['runs_ms'])})")
+    print("\n  heaviest application modules (cumulative)")
+    for name, ms in imports["app_modules_ms"].items():
+        print(f"    {name:<40} {ms:>8.1f} ms")
+    print("\n  heaviest packages (cumulative)")
+    for name, ms in imports["packages_ms"].items():
+        print(f"    {name:<40} {ms:>8.1f} ms")
+    boot = report.get("boot")
+    if boot:
+        print(f"\nprocess start to ready  {boot['ready_ms']:.0f} ms")
+        for name, ms in boot["worker"]["phases_ms"].items():
+            print(f"    {name:<40} {ms:>8.1f} ms")
+        for name, error in boot["worker"]["errors"].items():
+            print(f"    {name} failed: {error}")
+    verdict = "over" if report["over_budget"] else "within"
+    print(f"\n{verdict} the {report['budget_ms']} ms budget")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh-interpreter imports to take the median of")
+    parser.add_argument("--top", type=int, default=10, help="Modules and packages to list")
+    parser.add_argument("--boot", action="store_true", help="Also start uvicorn and time it until /readyz is 200")
+    parser.add_argument("--boot-timeout", type=float, default=60)
+    parser.add_argument("--budget-ms", type=int, default=int(os.environ.get("STARTUP_BUDGET_MS", 1500)))
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = _scratch_env(directory)
+        runs = []
+        modules: List[Tuple[str, int, int]] = []
+        for _ in range(max(1, args.runs)):
+            elapsed, modules = measure_import(env)
+            runs.append(round(elapsed, 1))
+        report: Dict[str, Any] = {
+            "budget_ms": args.budget_ms,
+            "import": {"median_ms": statistics.median(runs), "runs_ms": runs, **heaviest(modules, args.top)},
+        }
+        if args.boot:
+            report["boot"] = measure_boot(env, args.boot_timeout)
+
+    worst = report["boot"]["ready_ms"] if args.boot else report["import"]["median_ms"]
+    report["over_budget"] = worst > args.budget_ms
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    sys.exit(1 if report["over_budget"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Offline latency breakdown from exported OTLP-JSON trace files.
+
+Usage:
+    make trace_report
+    python scripts/trace_report.py [--dir /volume/traces] [--operation "POST /runner"] [--json]
+
+For each root operation (by default create, clone and delete) prints the
+end-to-end latency percentiles and, per child span name, how much of that
+time it accounts for on average.
+"""
+import argparse
+import glob
+import json
+import os
+from collections import defaultdict
+from typing import Any, Dict, List
+
+DEFAULT_OPERATIONS = [
+    "POST /runner",
+    "POST /runner/{instance_id}/clone",
+    "DELETE /runner/{instance_id}",
+]
+
+
+def load_spans(directory: str) -> List[Dict[str, Any]]:
+    spans = []
+    for path in sorted(glob.glob(os.path.join(directory, "spans.jsonl*"))):
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                for resource in json.loads(line).get("resourceSpans", []):
+                    for scope in resource.get("scopeSpans", []):
+                        spans.extend(scope.get("spans", []))
+    return spans
+
+
+def _duration_ms(span: Dict[str, Any]) -> float:
+    return (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(percentile / 100.0 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def breakdown(spans: List[Dict[str, Any]], operations: List[str]) -> Dict[str, Any]:
+    children = defaultdict(list)
+    for span in spans:
+        if span.get("parentSpanId"):
+            children[span["parentSpanId"]].append(span)
+
+    def descendants(span_id: str):
+        for child in children.get(span_id, []):
+            yield child
+            yield from descendants(child["spanId"])
+
+    report = {}
+    for operation in operations:
+        roots = [span for span in spans if not span.get("parentSpanId") and span["name"] == operation]
+        if not roots:
+            continue
+        totals = [_duration_ms(root) for root in roots]
+        steps: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])  # name -> [total ms, calls]
+        for root in roots:
+            for span in descendants(root["spanId"]):
+                steps[span["name"]][0] += _duration_ms(span)
+                steps[span["name"]][1] += 1
+
+        mean_total = sum(totals) / len(totals)
+        report[operation] = {
+            "traces": len(roots),
+            "mean_ms": round(mean_total, 2),
+            "p50_ms": round(_percentile(totals, 50), 2),
+            "p95_ms": round(_percentile(totals, 95), 2),
+            "max_ms": round(max(totals), 2),
+            "steps": {
+                name: {
+                    "calls_per_trace": round(calls / len(roots), 2),
+                    "mean_ms_per_trace": round(total / len(roots), 2),
+                    # Nested and concurrent spans overlap, so shares can add up past 100%
+                    "share": round(total / len(roots) / mean_total, 3) if mean_total else None,
+                }
+                for name, (total, calls) in sorted(steps.items(), key=lambda item: -item[1][0])
+            },
+        }
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    if not report:
+        print("No matching traces found")
+        return
+    for operation, stats in report.items():
+        print(f"\n{operation}  ({stats['traces']} traces)")
+        print(f"  total  mean {stats['mean_ms']:.1f} ms  p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  max {stats['max_ms']:.1f} ms")
+        for name, step in stats["steps"].items():
+            share = f"{step['share'] * 100:5.1f}%" if step["share"] is not None else "    -"
+            print(f"  {name:<40} {step['mean_ms_per_trace']:>9.1f} ms  {share}  x{step['calls_per_trace']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=os.path.join(os.environ.get("VOLUME_PATH", "/volume"), "traces"))
+    parser.add_argument("--operation", action="append", help="Root span name to report; repeatable")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = breakdown(load_spans(args.dir), args.operation or DEFAULT_OPERATIONS)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
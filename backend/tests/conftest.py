@@ -0,0 +1,62 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read when inc.config is first imported, so the tests point
+# VOLUME_PATH and the database at a scratch directory before anything else
+_scratch = tempfile.mkdtemp(prefix="runnerpilot-tests-")
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+os.environ["VOLUME_PATH"] = _scratch
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'runnerpilot.db')}"
+os.environ["DOCKER_HOST"] = "tcp://127.0.0.1:9"  # Nothing listens there; tests needing a daemon use docker_daemon below
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def database():
+    """Every table, emptied again after the test."""
+    from inc.db import db, init_db
+
+    init_db()
+    yield db
+    for table in db.get_tables():
+        db.execute_sql(f'DELETE FROM "{table}"')
+
+
+@pytest.fixture
+def docker_daemon(monkeypatch, database):
+    """The benchmarks' fake Docker daemon, with the backend's client pointed at it."""
+    from benchmarks.fake_docker import FakeDockerDaemon
+    from inc.utils import docker_client
+
+    fake = FakeDockerDaemon(log_interval=0.05).start()
+    monkeypatch.setenv("DOCKER_HOST", fake.url)
+    monkeypatch.setattr(docker_client, "_client", None)
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def make_runner(docker_daemon):
+    """Create runner records with running fake containers."""
+    from inc.utils.runner_ops import provision_runner
+    from models import RunnerInstance
+
+    def make(name, labels="linux", token="registration-token", template=None):
+        instance = RunnerInstance.create(
+            runner_name=name,
+            github_url="https://github.com/acme/app",
+            token=token,
+            labels=labels,
+            template_id=template.id if template else None,
+        )
+        success, message = provision_runner(instance)
+        assert success, message
+        return instance
+
+    return make
@@ -0,0 +1,58 @@
+import json
+
+from inc.config import settings
+from inc.utils.runner_ops import bulk_action_generator, select_instances
+
+
+def _run(action, instances, **kwargs):
+    return [json.loads(line) for line in bulk_action_generator(action, instances, **kwargs)]
+
+
+def test_stop_streams_one_result_per_runner(make_runner, docker_daemon):
+    runners = [make_runner(f"runner-{i}") for i in range(3)]
+
+    lines = _run("stop", runners, stop_timeout=0)
+
+    assert lines[0]["status"] == "started" and lines[0]["total"] == 3
+    assert sorted(line["runner_name"] for line in lines[1:-1]) == ["runner-0", "runner-1", "runner-2"]
+    assert all(line["status"] == "ok" for line in lines[1:-1])
+    assert lines[-1]["status"] == "completed"
+    assert (lines[-1]["succeeded"], lines[-1]["failed"]) == (3, 0)
+    assert all(docker_daemon.find(r.runner_name).status == "exited" for r in runners)
+
+
+def test_a_missing_container_fails_only_its_runner(make_runner, docker_daemon):
+    runners = [make_runner(f"runner-{i}") for i in range(3)]
+    docker_daemon.remove(docker_daemon.find("runner-1"))
+
+    lines = _run("restart", runners, stop_timeout=0)
+
+    results = {line["runner_name"]: line for line in lines[1:-1]}
+    assert results["runner-1"]["status"] == "error"
+    assert "not found" in results["runner-1"]["message"]
+    assert results["runner-0"]["status"] == results["runner-2"]["status"] == "ok"
+    assert (lines[-1]["succeeded"], lines[-1]["failed"]) == (2, 1)
+
+
+def test_concurrency_is_capped(make_runner):
+    lines = _run("start", [make_runner("runner-0")], concurrency=10_000)
+
+    assert lines[0]["concurrency"] == settings.BULK_MAX_CONCURRENCY
+
+
+def test_no_runners_still_completes(database):
+    lines = _run("stop", [])
+
+    assert [line["status"] for line in lines] == ["started", "completed"]
+    assert lines[-1]["succeeded"] == 0
+
+
+def test_select_by_labels_and_status(make_runner, docker_daemon):
+    make_runner("runner-0", labels="linux,gpu")
+    make_runner("runner-1", labels="linux")
+    make_runner("runner-2", labels="gpu,linux,large")
+    docker_daemon.find("runner-2").status = "exited"
+
+    assert [i.runner_name for i in select_instances(labels="gpu")] == ["runner-0", "runner-2"]
+    assert [i.runner_name for i in select_instances(labels="linux", status="active")] == ["runner-0", "runner-1"]
+    assert [i.runner_name for i in select_instances(labels="gpu", status="inactive")] == ["runner-2"]
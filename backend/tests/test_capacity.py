@@ -0,0 +1,151 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from inc.utils import capacity
+from models import CapacitySchedule, RunnerInstance
+
+# 2026-10-19 is a Monday
+MONDAY = datetime(2026, 10, 19)
+
+
+def schedule(windows, default_runners=0, timezone="UTC"):
+    return CapacitySchedule(name="ci", labels="ci", windows=json.dumps(windows), default_runners=default_runners, timezone=timezone)
+
+
+def runner(id, job_state="idle", drain_state=None, drain_action=None):
+    return RunnerInstance(id=id, runner_name=f"runner-{id}", job_state=job_state, drain_state=drain_state, drain_action=drain_action)
+
+
+OFFICE = schedule([{"days": "mon-fri", "start": "08:00", "end": "20:00", "runners": 10}], default_runners=2)
+NIGHTLY = schedule([{"days": "mon-fri", "start": "22:00", "end": "02:00", "runners": 9}])
+
+
+@pytest.fixture
+def at(monkeypatch):
+    """Set the scheduler's clock."""
+    def set_clock(moment):
+        monkeypatch.setattr(capacity, "clock", lambda: moment)
+    return set_clock
+
+
+# -------- Windows ---------
+
+def test_parse_days():
+    assert capacity.parse_days("mon-fri") == {0, 1, 2, 3, 4}
+    assert capacity.parse_days("sat,sun") == {5, 6}
+    assert capacity.parse_days("fri-mon") == {4, 5, 6, 0}
+    assert capacity.parse_days("*") == set(range(7))
+    with pytest.raises(ValueError):
+        capacity.parse_days("mon-funday")
+
+
+def test_parse_time():
+    assert capacity.parse_time("08:30") == 510
+    assert capacity.parse_time("24:00") == 1440
+    for value in ("8:3", "08:60", "24:01", "noon"):
+        with pytest.raises(ValueError):
+            capacity.parse_time(value)
+
+
+def test_window_boundaries(at):
+    # Start is inclusive, end exclusive
+    for moment, runners in [
+        (MONDAY.replace(hour=7, minute=59), 2),
+        (MONDAY.replace(hour=8), 10),
+        (MONDAY.replace(hour=19, minute=59), 10),
+        (MONDAY.replace(hour=20), 2),
+        (datetime(2026, 10, 24, 12), 2),  # Saturday
+    ]:
+        at(moment)
+        assert capacity.desired_runners(OFFICE) == runners, moment
+
+
+def test_window_past_midnight(at):
+    counts = []
+    for moment in [
+        MONDAY.replace(hour=23),  # Monday night
+        datetime(2026, 10, 20, 1, 59),  # Early Tuesday, still Monday's window
+        datetime(2026, 10, 20, 2),  # Closed
+        datetime(2026, 10, 19, 1),  # Early Monday: Sunday has no window
+    ]:
+        at(moment)
+        counts.append(capacity.desired_runners(NIGHTLY))
+    assert counts == [9, 9, 0, 0]
+
+    at(datetime(2026, 10, 24, 1))  # Early Saturday belongs to Friday's window
+    assert capacity.desired_runners(NIGHTLY) == 9
+
+
+def test_timezone(at):
+    berlin = schedule([{"days": "*", "start": "08:00", "end": "20:00", "runners": 5}], timezone="Europe/Berlin")
+    at(datetime(2026, 11, 2, 6, 30))  # 07:30 in Berlin, winter time (UTC+1)
+    assert capacity.desired_runners(berlin) == 0
+    at(datetime(2026, 11, 2, 7))  # 08:00 in Berlin
+    assert capacity.desired_runners(berlin) == 5
+    # Summer time (UTC+2): 06:00 UTC is already 08:00 in Berlin
+    assert capacity.desired_runners(berlin, datetime(2026, 7, 1, 6)) == 5
+
+
+def test_next_change(at):
+    at(MONDAY.replace(hour=12))
+    assert capacity.next_change(OFFICE) == {"at": "2026-10-19T20:00:00+00:00", "runners": 2}
+    at(datetime(2026, 10, 23, 21))  # Friday night: next window opens Monday
+    assert capacity.next_change(OFFICE) == {"at": "2026-10-26T08:00:00+00:00", "runners": 10}
+    assert capacity.next_change(schedule([], default_runners=3)) is None
+
+
+def test_next_change_in_local_time(at):
+    berlin = schedule([{"days": "*", "start": "08:00", "end": "20:00", "runners": 5}], timezone="Europe/Berlin")
+    at(MONDAY.replace(hour=12))
+    assert capacity.next_change(berlin) == {"at": "2026-10-19T20:00:00+02:00", "runners": 0}
+    # Summer time ends in the night to Sunday 2026-10-25; the window still opens at 08:00 local
+    at(datetime(2026, 10, 24, 21))
+    assert capacity.next_change(berlin) == {"at": "2026-10-25T08:00:00+01:00", "runners": 5}
+
+
+# -------- Plan ---------
+
+def test_scale_up_keeps_then_starts_then_creates(at):
+    at(MONDAY.replace(hour=12))  # 10 runners wanted
+    members = [runner(i) for i in range(1, 6)] + [
+        runner(6, drain_state="draining", drain_action="stop"),
+        runner(7),
+        runner(8),
+    ]
+    statuses = {f"runner-{i}": "active" for i in range(1, 7)} | {"runner-7": "inactive", "runner-8": "inactive"}
+    steps = capacity.plan(OFFICE, members, statuses)
+    assert steps["running"] == 5
+    assert steps["keep"] == [6]
+    assert steps["start"] == [7, 8]
+    assert steps["create"] == 2
+    assert steps["drain"] == [] and steps["delete"] == []
+
+
+def test_scale_down_drains_idle_runners_first(at):
+    at(MONDAY.replace(hour=21))  # 2 runners wanted
+    members = [runner(1, "busy"), runner(2), runner(3, "busy"), runner(4), runner(5)]
+    statuses = {f"runner-{i}": "active" for i in range(1, 6)}
+    steps = capacity.plan(OFFICE, members, statuses)
+    # Idle before busy, newest first among equals
+    assert steps["drain"] == [5, 4, 2]
+    assert steps["create"] == 0 and steps["start"] == []
+
+
+def test_trim_deletes_stopped_runners_beyond_the_peak(at):
+    at(MONDAY.replace(hour=21))  # 2 wanted, 10 at peak: 8 stopped runners are kept
+    members = [runner(i) for i in range(1, 13)]
+    statuses = {"runner-1": "active", "runner-2": "active"} | {f"runner-{i}": "inactive" for i in range(3, 13)}
+    steps = capacity.plan(OFFICE, members, statuses)
+    assert steps["drain"] == [] and steps["start"] == []
+    assert steps["delete"] == [12, 11]
+
+
+def test_trim_never_deletes_runners_it_starts(at):
+    at(MONDAY.replace(hour=12))  # At the peak of 10: stopped runners beyond those started go
+    members = [runner(i) for i in range(1, 13)]
+    statuses = {f"runner-{i}": "inactive" for i in range(1, 13)}
+    steps = capacity.plan(OFFICE, members, statuses)
+    assert steps["start"] == list(range(1, 11))
+    assert steps["delete"] == [12, 11]
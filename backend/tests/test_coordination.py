@@ -0,0 +1,158 @@
+import json
+import os
+import time
+import types
+
+import pytest
+
+from inc.utils import coordination
+from models import ClusterMessage
+
+
+class StopPolling(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def cluster(monkeypatch, tmp_path):
+    """A fresh cluster directory and coordination state for every test."""
+    workers = tmp_path / "workers"
+    workers.mkdir()
+    monkeypatch.setattr(coordination, "CLUSTER_DIR", str(tmp_path))
+    monkeypatch.setattr(coordination, "WORKERS_DIR", str(workers))
+    monkeypatch.setattr(coordination, "_handlers", {})
+    monkeypatch.setattr(coordination, "_elected", [])
+    monkeypatch.setattr(coordination, "_leader_file", None)
+    monkeypatch.setattr(coordination, "_started", False)
+    monkeypatch.setattr(coordination, "_peers", (0.0, False))
+    held = []
+    yield held
+    for handle in held:
+        handle.close()
+    if coordination._leader_file is not None:
+        coordination._leader_file.close()
+
+
+def _other_worker(cluster, worker_id="4242-abcdef"):
+    """Hold a worker lock file the way another running process would."""
+    handle = coordination._try_lock(os.path.join(coordination.WORKERS_DIR, f"{worker_id}.lock"))
+    cluster.append(handle)
+    return worker_id
+
+
+# -------- Messages ---------
+
+def test_broadcasts_reach_local_handlers():
+    received = []
+    coordination.subscribe("runners", received.append)
+
+    coordination.broadcast("runners", {"id": 1})
+    coordination.broadcast("runners", {"id": 2}, local=False)
+
+    assert received == [{"id": 1}]
+
+
+def test_a_failing_handler_does_not_stop_the_others(capsys):
+    received = []
+    coordination.subscribe("runners", lambda payload: 1 / 0)
+    coordination.subscribe("runners", received.append)
+
+    coordination.broadcast("runners", {"id": 1})
+
+    assert received == [{"id": 1}]
+    assert "Handler for cluster message 'runners' failed" in capsys.readouterr().out
+
+
+def test_leader_only_handlers_wait_for_the_election():
+    received = []
+    coordination.subscribe("drain", received.append, leader_only=True)
+
+    coordination.broadcast("drain", {"id": 1})
+    coordination._try_become_leader()
+    coordination.broadcast("drain", {"id": 2})
+
+    assert received == [{"id": 2}]
+
+
+def test_messages_are_stored_only_when_other_workers_run(database, cluster, monkeypatch):
+    monkeypatch.setattr(coordination, "_started", True)
+
+    coordination.broadcast("runners", {"id": 1})
+    monkeypatch.setattr(coordination, "_peers", (0.0, False))  # Skip the cached peer check
+    _other_worker(cluster)
+    coordination.broadcast("runners", {"id": 2})
+
+    rows = [(m.channel, json.loads(m.payload), m.origin) for m in ClusterMessage.select()]
+    assert rows == [("runners", {"id": 2}, coordination.WORKER_ID)]
+
+
+def test_the_poller_delivers_messages_from_other_workers(database, monkeypatch):
+    received = []
+    coordination.subscribe("runners", received.append)
+    ClusterMessage.create(channel="runners", payload='{"id":1}', origin=coordination.WORKER_ID)
+    ClusterMessage.create(channel="runners", payload='{"id":2}', origin="4242-abcdef")
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) > 1:
+            raise StopPolling()
+
+    monkeypatch.setattr(coordination, "time", types.SimpleNamespace(sleep=sleep, monotonic=time.monotonic))
+    with pytest.raises(StopPolling):
+        coordination._poll_loop(0)
+
+    assert received == [{"id": 2}]  # Never its own messages
+
+
+# -------- Leader election ---------
+
+def test_the_first_worker_becomes_leader_and_runs_elected_tasks():
+    started = []
+    coordination.on_elected("sampler", lambda: started.append("sampler"))
+
+    assert coordination._try_become_leader()
+    coordination.on_elected("gc", lambda: started.append("gc"))  # Registered after the election
+
+    assert coordination.is_leader()
+    assert started == ["sampler", "gc"]
+    with open(os.path.join(coordination.CLUSTER_DIR, "leader.lock")) as f:
+        assert f.read() == coordination.WORKER_ID
+
+
+def test_followers_wait_while_the_leader_lock_is_held(cluster):
+    cluster.append(coordination._try_lock(os.path.join(coordination.CLUSTER_DIR, "leader.lock")))
+    started = []
+    coordination.on_elected("sampler", lambda: started.append("sampler"))
+
+    assert not coordination._try_become_leader()
+    assert not coordination.is_leader() and started == []
+
+    cluster.pop().close()  # The leader exits
+    assert coordination._try_become_leader() and started == ["sampler"]
+
+
+# -------- Workers ---------
+
+def test_worker_alive_follows_the_worker_lock(cluster):
+    worker_id = _other_worker(cluster)
+
+    assert coordination.worker_alive(coordination.WORKER_ID)
+    assert coordination.worker_alive(worker_id)
+    assert not coordination.worker_alive("9999-000000")
+
+    cluster.pop().close()
+    assert not coordination.worker_alive(worker_id)
+
+
+def test_peer_checks_remove_lock_files_of_exited_workers(cluster):
+    stale = os.path.join(coordination.WORKERS_DIR, "1111-000000.lock")
+    open(stale, "w").close()
+
+    assert not coordination._has_peers()
+    assert not os.path.exists(stale)
+
+    _other_worker(cluster)
+    assert not coordination._has_peers()  # Cached for PEER_CHECK_SECONDS
+    coordination._peers = (0.0, False)
+    assert coordination._has_peers()
@@ -0,0 +1,141 @@
+import json
+import threading
+
+import pytest
+
+from inc.config import settings
+from inc.utils.derived_images import (
+    BASE_ID_LABEL,
+    base_image_id,
+    build_derived_image,
+    gc_derived_images,
+    image_spec,
+    pins_base,
+    render_dockerfile,
+)
+from inc.utils.rollout import _on_target
+from inc.utils.runner_ops import delete_runner
+from models import RunnerTemplate
+
+
+@pytest.fixture
+def base(docker_daemon):
+    base_image_id.cache_clear()
+    docker_daemon.strict_images = True  # Otherwise every derived tag exists already
+    yield docker_daemon.add_image([settings.RUNNER_IMAGE], user="runner")
+    base_image_id.cache_clear()
+
+
+def _template(name="node", **spec):
+    spec = spec or {"apt_packages": ["jq", "zstd"], "pip_packages": ["awscli"], "setup": ["corepack enable"]}
+    return RunnerTemplate.create(name=name, image_spec=json.dumps(spec))
+
+
+def test_image_specs_are_normalised(database):
+    assert image_spec(_template("a", apt_packages=["zstd", "jq", "jq"]))["apt_packages"] == ["jq", "zstd"]
+    assert image_spec(_template("b", base="ubuntu:24.04")) is None  # Adds nothing to the base
+    assert image_spec(None) is None
+
+
+def test_the_dockerfile_switches_back_to_the_base_images_user():
+    spec = {"apt_packages": ["jq"], "pip_packages": ["requests>=2"], "setup": ["corepack enable"]}
+
+    lines = render_dockerfile(spec, "runner:2.319", "runner").splitlines()
+
+    assert lines[:2] == ["FROM runner:2.319", "USER root"]
+    assert "install -y --no-install-recommends jq" in lines[2]
+    assert lines[3].endswith('pip3 install --no-cache-dir "requests>=2"')
+    assert lines[4:] == ["RUN corepack enable", "USER runner"]
+
+
+def test_runners_of_a_template_share_one_build(make_runner, docker_daemon, base):
+    template = _template()
+
+    make_runner("runner-0", template=template)
+    make_runner("runner-1", template=template)
+
+    assert len(docker_daemon.builds) == 1
+    image = docker_daemon.find_image(docker_daemon.find("runner-0").image)
+    assert docker_daemon.find("runner-0").image.startswith(f"{settings.DERIVED_IMAGE_REPOSITORY}:")
+    assert image["Config"]["Labels"][BASE_ID_LABEL] == base["Id"]
+    assert docker_daemon.find("runner-1").image_id == image["Id"]
+
+
+def test_templates_with_the_same_packages_share_a_tag(docker_daemon, base, database):
+    first = build_derived_image(_template("a", apt_packages=["jq", "zstd"]))
+    second = build_derived_image(_template("b", apt_packages=["zstd", "jq"]))
+
+    assert first["tag"] == second["tag"]
+    assert (first["built"], second["built"]) == (True, False)
+
+
+def test_a_new_base_image_yields_a_new_tag(docker_daemon, base, database):
+    template = _template()
+    first = build_derived_image(template)
+
+    docker_daemon.add_image([settings.RUNNER_IMAGE], user="runner")  # The base tag moves to a new image
+    second = build_derived_image(template)
+
+    assert first["tag"] != second["tag"] and second["built"]
+
+
+def test_concurrent_provisions_build_once(docker_daemon, base, database):
+    template = _template()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(build_derived_image(template))) for _ in range(4)]
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(docker_daemon.builds) == 1
+    assert len({result["tag"] for result in results}) == 1
+
+
+def test_build_failures_report_the_build_log(docker_daemon, base, database):
+    template = _template(setup=["exit 1"])
+
+    with pytest.raises(RuntimeError, match="template 'node' failed") as error:
+        build_derived_image(template)
+
+    assert "Step 3/4 : RUN exit 1" in str(error.value)
+
+
+def test_base_image_ids_of_derived_images(docker_daemon, base, database):
+    tag = build_derived_image(_template())["tag"]
+
+    assert base_image_id(docker_daemon.find_image(tag)["Id"]) == base["Id"]
+    assert base_image_id(base["Id"]) is None
+
+
+def test_templates_can_pin_their_own_base(database):
+    assert pins_base(_template("a", base="ubuntu:24.04", apt_packages=["jq"]))
+    assert not pins_base(_template("b", apt_packages=["jq"]))
+    assert not pins_base(None)
+
+
+def test_gc_removes_only_unused_images_past_the_grace_period(make_runner, docker_daemon, base):
+    current = _template("current")
+    old = _template("old", apt_packages=["jq"])
+    runner = make_runner("runner-0", template=old)
+    old_tag = docker_daemon.find("runner-0").image
+    build_derived_image(current)
+
+    # Kept while the old template's runner still uses its image
+    assert gc_derived_images(list(RunnerTemplate.select()), grace_hours=0) == {"removed": [], "kept": 2}
+
+    old.image_spec = json.dumps({"apt_packages": ["zstd"]})
+    old.save()
+    assert gc_derived_images(list(RunnerTemplate.select()), grace_hours=0)["removed"] == []
+
+    delete_runner(runner)
+    assert gc_derived_images(list(RunnerTemplate.select()), grace_hours=1)["removed"] == []  # Built just now
+    assert gc_derived_images(list(RunnerTemplate.select()), grace_hours=0) == {"removed": [old_tag], "kept": 1}
+
+
+def test_rollouts_count_derived_images_of_the_target_as_on_target(docker_daemon, base, database):
+    derived_id = docker_daemon.find_image(build_derived_image(_template())["tag"])["Id"]
+
+    assert _on_target(derived_id, base["Id"])
+    assert not _on_target(derived_id, "sha256:" + "ef" * 32)
@@ -0,0 +1,124 @@
+import json
+import types
+
+import pytest
+
+from inc.config import settings
+from inc.utils import disk_gc
+from inc.utils.derived_images import DERIVED_LABEL
+from inc.utils.disk_gc import run_gc
+from inc.utils.docker_client import get_docker_client
+from inc.utils.docker_governor import install_request_timeouts
+
+GB = 1024 ** 3
+
+
+class FakeDisk:
+    """A 100 GB disk holding a fixed `base` plus whatever the fake daemon stores."""
+
+    def __init__(self, fake, base):
+        self.fake = fake
+        self.base = base
+
+    def disk_usage(self, path):
+        with self.fake.lock:
+            stored = (
+                sum(c.size_rw for c in self.fake.containers.values())
+                + sum(i["Size"] for i in self.fake.images.values())
+                + sum(v.get("Size", 0) for v in self.fake.volumes.values())
+                + self.fake.build_cache_bytes
+            )
+        used = self.base + stored
+        return types.SimpleNamespace(total=100 * GB, used=used, free=100 * GB - used)
+
+
+@pytest.fixture
+def leftovers(docker_daemon, make_runner, monkeypatch, tmp_path):
+    """A host at 90% with what jobs typically leave behind, 45 GB of it removable."""
+    monkeypatch.setattr(disk_gc, "STATE_PATH", str(tmp_path / "disk-gc.json"))
+    monkeypatch.setattr(settings, "DISK_GC_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "DISK_GC_MIN_AGE_HOURS", 0)
+    disk = FakeDisk(docker_daemon, base=0)
+    monkeypatch.setattr(disk_gc, "psutil", disk)
+
+    make_runner("runner-0")
+    docker_daemon.find("runner-0").status = "exited"
+    docker_daemon.find("runner-0").size_rw = 3 * GB  # Stopped, but RunnerPilot's own
+    docker_daemon.add_container("job-service", status="exited").size_rw = 10 * GB
+    docker_daemon.add_image([], size=5 * GB)  # Dangling
+    docker_daemon.volumes["f3a9"] = {"Name": "f3a9", "Anonymous": True, "Labels": {}, "Size": 2 * GB}
+    docker_daemon.build_cache_bytes = 20 * GB
+    docker_daemon.add_image(["node:18"], size=8 * GB)
+    disk.base = 90 * GB - disk.disk_usage("/").used
+    return disk
+
+
+def _steps(report):
+    return {step["step"]: (step["removed"], step["reclaimed_bytes"] // GB) for step in report["steps"]}
+
+
+def test_nothing_is_collected_under_the_high_watermark(leftovers, docker_daemon, monkeypatch):
+    monkeypatch.setattr(settings, "DISK_GC_HIGH_WATERMARK", 95)
+
+    report = run_gc()
+
+    assert report["skipped"] == "under the high watermark"
+    assert docker_daemon.find("job-service") is not None
+
+
+def test_collection_stops_at_the_low_watermark(leftovers, docker_daemon):
+    report = run_gc()
+
+    # 90 GB: -10 stopped container, -5 dangling image, -2 volume, then only 3 of 20 GB build cache to reach 70
+    assert _steps(report) == {
+        "stopped_containers": (1, 10),
+        "dangling_images": (1, 5),
+        "anonymous_volumes": (1, 2),
+        "build_cache": (1, 3),
+    }
+    assert report["after"]["used_percent"] == 70.0
+    assert docker_daemon.find("job-service") is None
+    assert docker_daemon.find("runner-0") is not None
+    assert docker_daemon.find_image("node:18") is not None
+
+
+def test_unused_images_go_last_and_protected_ones_stay(leftovers, docker_daemon, monkeypatch):
+    monkeypatch.setattr(settings, "DISK_GC_LOW_WATERMARK", 10)
+    derived = docker_daemon.add_image(["runnerpilot/runner:abc"], labels={DERIVED_LABEL: "abc"}, size=1 * GB)
+    runner_image = docker_daemon.add_image([settings.RUNNER_IMAGE], size=1 * GB)
+
+    report = run_gc()
+
+    assert _steps(report)["lru_images"] == (1, 8)
+    assert docker_daemon.find_image("node:18") is None
+    assert docker_daemon.find_image(derived["Id"]) is not None  # Left to the derived image GC
+    assert docker_daemon.find_image(runner_image["Id"]) is not None
+
+
+def test_young_leftovers_are_kept(leftovers, docker_daemon, monkeypatch):
+    monkeypatch.setattr(settings, "DISK_GC_MIN_AGE_HOURS", 1)
+
+    run_gc()
+
+    assert docker_daemon.find("job-service") is not None
+    assert docker_daemon.find_image("node:18") is not None
+
+
+def test_runs_are_recorded_for_every_worker(leftovers):
+    run_gc()
+    run_gc(force=True)
+
+    with open(disk_gc.STATE_PATH) as f:
+        state = json.load(f)
+    assert state["runs"] == 2
+    assert state["total_reclaimed_bytes"] == 20 * GB
+    assert state["last_run"]["forced"] is True
+
+
+def test_prunes_are_not_cut_off_by_the_client_timeout(leftovers, docker_daemon):
+    api = get_docker_client().api
+    api.timeout = 0.2
+    install_request_timeouts(api)  # With that as the client's default
+    docker_daemon.latency = 0.4  # A prune on a full disk outlasting the client's default read timeout
+
+    assert disk_gc._prune_dangling_images() == (1, 5 * GB)
@@ -0,0 +1,150 @@
+import threading
+
+import pytest
+
+from inc.config import settings
+from inc.utils import docker_governor
+from inc.utils.docker_governor import AdaptiveLimiter, CircuitBreaker, DockerUnavailable, govern
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(failures=3, cooldown=60)
+    monkeypatch.setattr(docker_governor, "_breaker", breaker)
+    monkeypatch.setattr(docker_governor, "_limiter", AdaptiveLimiter(1, 4, 2.0))
+    monkeypatch.setattr(docker_governor, "RETRY_BASE_SECONDS", 0)
+    monkeypatch.setattr(settings, "DOCKER_READ_RETRIES", 2)
+    return breaker
+
+
+def failing(calls, error):
+    def call(*args, **kwargs):
+        calls.append(args)
+        raise error
+    return call
+
+
+def connection_error():
+    return docker_governor.requests.exceptions.ConnectionError("refused")
+
+
+# -------- Limiter ---------
+
+def test_the_limit_shrinks_with_latency_and_grows_back():
+    limiter = AdaptiveLimiter(2, 8, 2.0)
+    for _ in range(3):
+        assert limiter.acquire(1)
+        limiter.release("list", 0.01)  # Sets the baseline
+    assert limiter.limit == 8
+
+    limiter.acquire(1)
+    limiter.release("list", 1.0)
+    assert limiter.limit == pytest.approx(7.2)
+
+    limiter.acquire(1)
+    limiter.release("list", 0.01)
+    assert limiter.limit == pytest.approx(7.2 + 1 / 7.2)
+
+    for _ in range(10):
+        limiter.backoff()
+    assert limiter.limit == 2  # Never below the minimum
+
+
+def test_calls_beyond_the_limit_wait_for_a_slot():
+    limiter = AdaptiveLimiter(1, 1, 2.0)
+    assert limiter.acquire(1)
+    assert not limiter.acquire(0.05)
+
+    threading.Timer(0.1, limiter.release, args=("create", None)).start()
+    assert limiter.acquire(2)
+
+
+# -------- Breaker ---------
+
+def test_the_circuit_opens_after_consecutive_daemon_failures(breaker):
+    calls = []
+    call = govern("create", failing(calls, connection_error()))
+
+    for _ in range(3):
+        with pytest.raises(docker_governor.requests.exceptions.ConnectionError):
+            call()
+    with pytest.raises(DockerUnavailable):
+        call()
+
+    assert len(calls) == 3  # The last call never reached the daemon
+    assert docker_governor.circuit_open()
+
+
+def test_one_probe_closes_the_circuit_again(breaker, monkeypatch):
+    for _ in range(3):
+        breaker.failure()
+    breaker.opened_at -= 60  # Cooldown over
+
+    assert breaker.allow()  # The probe
+    assert not breaker.allow()  # Everyone else waits for its outcome
+    breaker.success()
+
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_a_failed_probe_reopens_the_circuit(breaker):
+    for _ in range(3):
+        breaker.failure()
+    breaker.opened_at -= 60
+
+    assert breaker.allow()
+    breaker.failure()
+
+    assert breaker.state == "open" and not breaker.allow()
+
+
+# -------- Retries ---------
+
+def test_reads_are_retried_on_daemon_failures(breaker):
+    calls = []
+    responses = iter([connection_error(), connection_error()])
+
+    def flaky():
+        calls.append(1)
+        error = next(responses, None)
+        if error:
+            raise error
+        return "containers"
+
+    assert govern("list", flaky)() == "containers"
+    assert len(calls) == 3
+    assert breaker.state == "closed"
+
+
+def test_writes_and_bad_requests_are_not_retried(breaker):
+    writes, reads = [], []
+    not_found = docker_governor.docker.errors.NotFound("no such container")
+
+    with pytest.raises(docker_governor.requests.exceptions.ConnectionError):
+        govern("create", failing(writes, connection_error()))()
+    with pytest.raises(docker_governor.docker.errors.NotFound):
+        govern("get", failing(reads, not_found))()
+
+    assert (len(writes), len(reads)) == (1, 1)
+
+
+# -------- Timeouts ---------
+
+class FakeAPI:
+    timeout = 60
+
+
+@pytest.mark.parametrize("operation, kwargs, timeout", [
+    ("list", {}, settings.DOCKER_TIMEOUT_SECONDS),
+    ("create", {}, settings.DOCKER_SLOW_TIMEOUT_SECONDS),
+    ("prune", {}, None),  # Can take minutes on a full disk
+    ("stop", {"timeout": 25}, 25),  # Explicit timeouts are kept
+    ("logs", {"follow": True}, 60),  # Streams keep the client's default
+])
+def test_each_call_gets_its_request_timeout(breaker, operation, kwargs, timeout):
+    api = FakeAPI()
+    docker_governor.install_request_timeouts(api)
+
+    used = govern(operation, lambda **kwargs: api._set_request_timeout(dict(kwargs)))(**kwargs)
+
+    assert used["timeout"] == timeout
@@ -0,0 +1,123 @@
+import time
+
+import pytest
+
+from inc.utils import drain
+from models import RunnerInstance
+
+
+@pytest.fixture(autouse=True)
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(drain, "DRAIN_POLL_SECONDS", 0.1)
+
+
+def _drain(instance, action="stop", timeout_seconds=None):
+    drain.request_drain(instance, action, timeout_seconds)
+    drain.launch_drain(instance.id)  # Tests run outside the leader, which launches drains otherwise
+
+
+def _settle(instance, timeout=5):
+    """Wait for the drain worker of `instance` to finish."""
+    deadline = time.monotonic() + timeout
+    while instance.id in drain._threads:
+        assert time.monotonic() < deadline, "drain did not finish"
+        time.sleep(0.05)
+
+
+def _state(instance):
+    return RunnerInstance.get_by_id(instance.id).drain_state
+
+
+def test_an_idle_runner_is_stopped_right_away(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+
+    _drain(runner)
+    _settle(runner)
+
+    assert _state(runner) == "drained"
+    assert docker_daemon.find("runner-0").status == "exited"
+
+
+def test_a_busy_runner_is_stopped_once_its_job_completes(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+    container = docker_daemon.find("runner-0")
+    container.logs.append("Running job: build")
+
+    _drain(runner)
+    time.sleep(0.5)
+    assert _state(runner) == "draining" and container.status == "running"
+
+    container.logs.append("Job build completed with result: Succeeded")
+    _settle(runner)
+
+    assert _state(runner) == "drained"
+    assert container.status == "exited"
+
+
+def test_a_job_picked_up_after_the_last_one_keeps_the_drain_waiting(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+    container = docker_daemon.find("runner-0")
+    container.logs.append("Running job: build")
+
+    _drain(runner)
+    time.sleep(0.5)
+    container.logs += ["Job build completed with result: Succeeded", "Running job: deploy"]
+    time.sleep(1)
+
+    assert _state(runner) == "draining"
+    assert container.status == "running"
+
+    container.logs.append("Job deploy completed with result: Succeeded")
+    _settle(runner)
+
+    assert _state(runner) == "drained"
+
+
+def test_the_action_is_forced_at_the_deadline(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+    docker_daemon.find("runner-0").logs.append("Running job: build")
+
+    _drain(runner, timeout_seconds=0)
+    _settle(runner)
+
+    assert _state(runner) == "forced"
+    assert docker_daemon.find("runner-0").status == "exited"
+
+
+def test_a_cancelled_drain_leaves_the_runner_running(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+    docker_daemon.find("runner-0").logs.append("Running job: build")
+
+    _drain(runner)
+    time.sleep(0.3)
+    drain.cancel_drain(RunnerInstance.get_by_id(runner.id))
+    _settle(runner)
+
+    assert _state(runner) is None
+    assert docker_daemon.find("runner-0").status == "running"
+
+
+def test_restart_puts_the_runner_back_in_service(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+
+    _drain(runner, action="restart")
+    _settle(runner)
+
+    instance = RunnerInstance.get_by_id(runner.id)
+    assert (instance.drain_state, instance.drain_action, instance.drain_deadline) == (None, None, None)
+    assert docker_daemon.find("runner-0").status == "running"
+
+
+def test_delete_removes_the_runner(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+
+    _drain(runner, action="delete")
+    _settle(runner)
+
+    assert RunnerInstance.get_or_none(RunnerInstance.id == runner.id) is None
+    assert docker_daemon.find("runner-0") is None
+
+
+def test_unknown_actions_are_rejected(make_runner):
+    with pytest.raises(ValueError):
+        drain.request_drain(make_runner("runner-0"), "pause")
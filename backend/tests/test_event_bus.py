@@ -0,0 +1,79 @@
+import asyncio
+from collections import deque
+
+import pytest
+
+from inc.utils import event_bus
+from inc.utils.event_bus import BOOT_ID, publish
+
+
+@pytest.fixture(autouse=True)
+def bus(monkeypatch):
+    """A fresh bus holding three events, not yet bound to a loop and not forwarding."""
+    monkeypatch.setattr(event_bus, "_ring", deque(maxlen=3))
+    monkeypatch.setattr(event_bus, "_sequence", 0)
+    monkeypatch.setattr(event_bus, "_loop", None)
+    monkeypatch.setattr(event_bus, "_signal", None)
+    monkeypatch.setattr(event_bus, "_clients", 0)
+    monkeypatch.setattr(event_bus, "_outbox", [])
+
+
+def _events(chunks):
+    """(event, data) of every SSE event in `chunks`."""
+    events = []
+    for block in b"".join(chunks).decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], fields["data"]))
+    return events
+
+
+def _read(last_event_id=None, publish_after_first=(), chunks=2):
+    async def run():
+        stream = event_bus.subscribe(last_event_id)
+        received = [await stream.__anext__(), await stream.__anext__()]
+        for event, data in publish_after_first:
+            publish(event, data)
+        while len(received) < chunks:
+            received.append(await asyncio.wait_for(stream.__anext__(), 5))
+        await stream.aclose()
+        return received
+
+    return asyncio.run(run())
+
+
+def test_clients_get_events_published_while_connected():
+    chunks = _read(publish_after_first=[("runner.updated", {"id": 1})], chunks=3)
+
+    assert chunks[0].startswith(b"retry: ")
+    assert chunks[1] == b": heartbeat\n\n"
+    assert _events(chunks) == [("runner.updated", '{"id":1}')]
+    assert event_bus.client_count() == 0
+
+
+def test_reconnecting_clients_get_what_they_missed():
+    publish("runner.created", {"id": 1})
+    publish("runner.updated", {"id": 1})
+    publish("runner.deleted", {"id": 1})
+
+    chunks = _read(last_event_id=f"{BOOT_ID}-1")
+
+    assert [event for event, _ in _events(chunks)] == ["runner.updated", "runner.deleted"]
+
+
+def test_unknown_ids_and_slow_clients_resync():
+    for index in range(5):
+        publish("runner.updated", {"id": index})
+
+    assert _events(_read(last_event_id="0000-1"))[0][0] == "resync"  # From before a restart
+    assert _events(_read(last_event_id=f"{BOOT_ID}-1"))[0][0] == "resync"  # Fell out of the ring
+
+
+def test_events_are_forwarded_to_and_from_other_workers():
+    publish("runner.updated", {"id": 1})
+    assert event_bus._outbox == [("runner.updated", {"id": 1})]
+
+    event_bus._receive({"events": [["runner.deleted", {"id": 2}]]})
+
+    assert event_bus._outbox == [("runner.updated", {"id": 1})]  # Not sent back
+    assert event_bus._sequence == 2
@@ -0,0 +1,79 @@
+import time
+
+import docker
+import pytest
+
+from benchmarks.compare import _flatten
+
+
+@pytest.fixture
+def client(docker_daemon):
+    client = docker.DockerClient(base_url=docker_daemon.url)
+    yield client
+    client.close()
+
+
+def _log_lines(container, **kwargs):
+    return container.logs(timestamps=True, **kwargs).decode().splitlines()
+
+
+def test_containers_run_stop_and_list(client, docker_daemon):
+    container = client.containers.run("acme/runner:latest", name="runner-0", environment={"RUNNER_TOKEN": "t"}, detach=True)
+    client.containers.create("acme/runner:latest", name="runner-1")
+
+    assert docker_daemon.find("runner-0").env == ["RUNNER_TOKEN=t"]
+    assert [c.name for c in client.containers.list()] == ["runner-0"]
+    sparse = client.containers.list(all=True, sparse=True)
+    assert sorted((c.attrs["Names"], c.status) for c in sparse) == [(["/runner-0"], "running"), (["/runner-1"], "created")]
+
+    container.stop()
+    assert client.containers.get("runner-0").status == "exited"
+    container.remove()
+    assert docker_daemon.find("runner-0") is None
+
+
+def test_log_lines_keep_the_time_they_were_written(client, docker_daemon):
+    fake = docker_daemon.add_container("runner-0")
+    container = client.containers.get("runner-0")
+    first = _log_lines(container)
+    time.sleep(1.1)
+    fake.logs.append("Running job: build")
+
+    # A later read stamps the old lines as before, and `since` leaves them out
+    assert _log_lines(container)[:1] == first
+    since = int(fake.logs.times[-1])
+    assert [line.split(" ", 1)[1] for line in _log_lines(container, since=since)] == ["Running job: build"]
+
+
+def test_followed_logs_stream_lines_written_meanwhile(client, docker_daemon):
+    fake = docker_daemon.add_container("runner-0")
+    stream = client.containers.get("runner-0").logs(stream=True, follow=True)
+
+    assert next(stream).decode().strip() == "Listening for Jobs"
+    fake.logs.append("Running job: build")
+    lines = [next(stream).decode().strip() for _ in range(5)]
+    stream.close()
+
+    assert "Running job: build" in lines
+    assert all(line == "Running job: build" or line.startswith("bench-line ") for line in lines)
+
+
+def test_requests_are_counted(client, docker_daemon):
+    docker_daemon.add_container("runner-0")
+    before = docker_daemon.requests
+
+    client.containers.list(sparse=True)
+    client.containers.list()  # Inspects every listed container
+
+    assert docker_daemon.requests - before == 3
+
+
+def test_compare_labels_list_entries_by_their_parameter():
+    results = {"list": [{"fleet_size": 10, "p50_ms": 1.5}, {"fleet_size": 100, "p50_ms": 3}], "auth": {"ok": True}}
+
+    assert dict(_flatten(results)) == {
+        "list[fleet_size=10].fleet_size": 10.0,
+        "list[fleet_size=10].p50_ms": 1.5,
+        "list[fleet_size=100].fleet_size": 100.0,
+        "list[fleet_size=100].p50_ms": 3.0,
+    }
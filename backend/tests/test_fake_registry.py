@@ -0,0 +1,80 @@
+import json
+import os
+import urllib.request
+
+import pytest
+
+from benchmarks.fake_registry import FakeRegistry, MANIFEST_TYPE
+from inc.config import settings
+from inc.utils import registry_mirror
+
+
+def _pull(registry, image, tag="latest"):
+    """Fetch a manifest and its blobs the way the daemon pulls through a mirror; returns the manifest."""
+    with urllib.request.urlopen(f"{registry.url}/v2/{image}/manifests/{tag}") as response:
+        assert response.headers["Content-Type"] == MANIFEST_TYPE
+        manifest = json.load(response)
+    for blob in [manifest["config"]] + manifest["layers"]:
+        with urllib.request.urlopen(f"{registry.url}/v2/{image}/blobs/{blob['digest']}") as response:
+            assert len(response.read()) == blob["size"]
+    return manifest
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    """The fake mirror storing blobs where RunnerPilot's eviction looks for them."""
+    store = tmp_path / "registry-mirror"
+    monkeypatch.setattr(registry_mirror, "MIRROR_DIR", str(store))
+    monkeypatch.setattr(registry_mirror, "BLOBS_DIR", str(store / "docker" / "registry" / "v2" / "blobs"))
+    monkeypatch.setattr(registry_mirror, "STATS_PATH", str(tmp_path / "registry-mirror-stats.json"))
+    monkeypatch.setattr(registry_mirror, "DOCKER_AVAILABLE", False)  # No mirror container to restart
+    fake = FakeRegistry(str(store), layers=2, layer_size=4096).start()
+    monkeypatch.setattr(settings, "REGISTRY_MIRROR_DEBUG_URL", fake.url)
+    yield fake
+    fake.stop()
+
+
+def test_images_are_deterministic(registry):
+    first = _pull(registry, "library/node", "20")
+    assert _pull(registry, "library/node", "20") == first
+    assert _pull(registry, "library/node", "22")["layers"] != first["layers"]
+
+
+def test_second_pull_is_served_from_the_store(registry):
+    _pull(registry, "library/python")
+    _pull(registry, "library/python")
+    totals = registry_mirror.record_counters()
+    # 2 layers and a config per pull
+    assert (totals["blobs"]["Misses"], totals["blobs"]["Hits"]) == (3, 3)
+    assert (totals["manifests"]["Misses"], totals["manifests"]["Hits"]) == (1, 1)
+    assert totals["blobs"]["BytesPulled"] * 2 == totals["blobs"]["BytesPushed"]
+
+
+def test_counters_survive_a_mirror_restart(registry, monkeypatch):
+    _pull(registry, "library/python")
+    _pull(registry, "library/python")
+    registry_mirror.record_counters()
+
+    # A restarted registry counts from zero again; what it counted before is carried over
+    restarted = FakeRegistry(registry.store_dir, layers=2, layer_size=4096).start()
+    monkeypatch.setattr(settings, "REGISTRY_MIRROR_DEBUG_URL", restarted.url)
+    try:
+        _pull(restarted, "library/python")
+        totals = registry_mirror.record_counters()
+    finally:
+        restarted.stop()
+    assert totals["manifests"]["Requests"] == 3
+    assert (totals["blobs"]["Misses"], totals["blobs"]["Hits"]) == (3, 6)
+
+
+def test_evicted_blobs_are_pulled_again(registry):
+    _pull(registry, "library/alpine")
+    size = registry_mirror.store_size()
+
+    # Manifest, config and two layers
+    assert registry_mirror.evict(quota_bytes=0) == (4, size)
+    assert registry_mirror.store_size() == 0
+
+    _pull(registry, "library/alpine")
+    assert registry.counters["blobs"]["Misses"] == 6
+    assert registry_mirror.evict(quota_bytes=size) == (0, 0)
@@ -0,0 +1,114 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from inc.utils import job_history
+from models import JobRollupDay, JobRollupHour, JobRollupMinute, JobRun, RunnerInstance
+
+NOON = datetime(2026, 10, 19, 12, 0, 30)
+REPO = "https://github.com/acme/app"
+
+
+def runner(labels="linux,gpu", job_state="idle"):
+    return RunnerInstance(id=1, runner_name="runner-1", github_url=REPO, labels=labels, job_state=job_state)
+
+
+def completed(job, result="Succeeded", seconds=42, at=NOON):
+    return {"kind": "completed", "job": job, "result": result, "at": at, "started_at": at - timedelta(seconds=seconds)}
+
+
+def rollup(model, label, bucket):
+    return model.get((model.label == label) & (model.bucket_start == bucket))
+
+
+def test_jobs_are_added_to_every_label_and_granularity(database):
+    job_history.record_job_events(runner(), [completed("build"), completed("test", result="Failed", seconds=8)])
+
+    assert JobRun.select().count() == 2
+    for model, bucket in [
+        (JobRollupMinute, datetime(2026, 10, 19, 12, 0)),
+        (JobRollupHour, datetime(2026, 10, 19, 12)),
+        (JobRollupDay, datetime(2026, 10, 19)),
+    ]:
+        for label in ("linux", "gpu", job_history.FLEET_LABEL):
+            row = rollup(model, label, bucket)
+            assert (row.jobs, row.failed_jobs, row.duration_sum) == (2, 1, 50)
+            hist = json.loads(row.duration_hist)
+            assert hist[job_history._duration_bucket(42)] == hist[job_history._duration_bucket(8)] == 1
+            assert sum(hist) == 2
+
+
+def test_started_events_are_not_recorded(database):
+    job_history.record_job_events(runner(), [{"kind": "started", "job": "build", "result": None, "at": NOON}])
+
+    assert JobRun.select().count() == 0
+    assert JobRollupMinute.select().count() == 0
+
+
+def test_a_job_without_a_start_counts_without_a_duration(database):
+    job_history.record_job_events(runner(labels=""), [{**completed("build"), "started_at": None}])
+
+    row = rollup(JobRollupMinute, job_history.FLEET_LABEL, datetime(2026, 10, 19, 12, 0))
+    assert (row.jobs, row.duration_sum, sum(json.loads(row.duration_hist))) == (1, 0, 0)
+
+
+def test_capacity_rows_get_a_histogram_on_their_first_job(database):
+    job_history.record_capacity([runner(job_state="busy"), runner(job_state="offline")], 10, now=NOON)
+    job_history.record_job_events(runner(), [completed("build")])
+
+    row = rollup(JobRollupMinute, "linux", datetime(2026, 10, 19, 12, 0))
+    assert (row.capacity_seconds, row.busy_seconds, row.jobs) == (10, 10, 1)
+    assert len(json.loads(row.duration_hist)) == len(job_history.DURATION_BUCKETS) + 1
+    assert sum(json.loads(row.duration_hist)) == 1
+
+
+def test_concurrent_writers_never_lose_increments(database):
+    bucket = datetime(2026, 10, 19, 12, 0)
+
+    def write():
+        for _ in range(25):
+            job_history._apply("minute", bucket, "linux", REPO, {"jobs": 1, "duration_sum": 2, "duration_bucket": 0})
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    row = rollup(JobRollupMinute, "linux", bucket)
+    assert (row.jobs, row.duration_sum, json.loads(row.duration_hist)[0]) == (200, 400, 200)
+
+
+def test_old_rows_are_pruned(database, monkeypatch):
+    monkeypatch.setattr(job_history, "_last_prune", None)
+    old = NOON - timedelta(days=400)
+    job_history.record_job_events(runner(), [completed("build", at=old)])
+
+    job_history.record_capacity([runner()], 10, now=NOON)
+
+    assert JobRollupMinute.select().where(JobRollupMinute.bucket_start < NOON - timedelta(days=1)).count() == 0
+    assert JobRollupHour.select().where(JobRollupHour.bucket_start < NOON - timedelta(days=300)).count() == 0
+    assert JobRun.select().count() == 0
+    assert JobRollupDay.select().where(JobRollupDay.bucket_start < NOON - timedelta(days=300)).count() == 3
+
+
+@pytest.mark.parametrize("span, granularity", [
+    (timedelta(hours=1), "minute"),
+    (timedelta(hours=6), "minute"),
+    (timedelta(days=2), "hour"),
+    (timedelta(days=90), "day"),
+])
+def test_pick_granularity(span, granularity):
+    assert job_history.pick_granularity(NOON - span, NOON) == granularity
+
+
+def test_percentiles_interpolate_inside_buckets():
+    hist = [0] * (len(job_history.DURATION_BUCKETS) + 1)
+    hist[0], hist[1] = 2, 2  # Two jobs up to 5s, two between 5s and 10s
+
+    assert job_history.percentile_from_hist(hist, 50) == 5
+    assert job_history.percentile_from_hist(hist, 75) == 7.5
+    assert job_history.percentile_from_hist([0] * len(hist), 50) is None
+    assert job_history.merge_hists([json.dumps(hist), None, json.dumps(hist)])[:2] == [4, 4]
@@ -0,0 +1,92 @@
+import pytest
+
+from inc.utils.job_markers import parse_marker
+from inc.utils.job_state import refresh_all_job_states, refresh_job_state
+from models import RunnerInstance
+
+
+# -------- Markers ---------
+
+@pytest.mark.parametrize("line, marker", [
+    ("2024-05-01 10:00:00Z: Listening for Jobs", ("listening", None, None)),
+    ("2024-05-01 10:00:05Z: Running job: build", ("started", "build", None)),
+    ("Running job: test (ubuntu, 3.12)  \r", ("started", "test (ubuntu, 3.12)", None)),
+    ("2024-05-01 10:03:12Z: Job build completed with result: Succeeded", ("completed", "build", "Succeeded")),
+    ("Job deploy to prod completed with result: Failed", ("completed", "deploy to prod", "Failed")),
+    ("Job build completed with result: Canceled", ("completed", "build", "Canceled")),
+])
+def test_markers(line, marker):
+    assert parse_marker(line) == marker
+
+
+@pytest.mark.parametrize("line", ["", "Connected to GitHub", "Current runner version: '2.319.1'", "Running job:"])
+def test_other_lines_are_not_markers(line):
+    assert parse_marker(line) is None
+
+
+# -------- State machine ---------
+
+def _fresh(instance):
+    return RunnerInstance.get_by_id(instance.id)
+
+
+def test_job_lifecycle(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+    container = docker_daemon.find("runner-0")
+    container.logs.clear()
+    container.logs.times.clear()
+
+    assert refresh_job_state(runner) == []
+    assert _fresh(runner).job_state == "starting"  # Running, but not listening yet
+
+    container.logs.append("Listening for Jobs")
+    refresh_job_state(runner)
+    assert _fresh(runner).job_state == "idle"
+
+    container.logs.append("Running job: build")
+    events = refresh_job_state(runner)
+    instance = _fresh(runner)
+    assert [e["kind"] for e in events] == ["started"]
+    assert (instance.job_state, instance.job_name) == ("busy", "build")
+    assert instance.job_started_at is not None
+
+    container.logs.append("Job build completed with result: Failed")
+    events = refresh_job_state(runner)
+    instance = _fresh(runner)
+    assert [(e["kind"], e["job"], e["result"]) for e in events] == [("completed", "build", "Failed")]
+    assert events[0]["started_at"] is not None
+    assert (instance.job_state, instance.job_name, instance.job_started_at) == ("idle", None, None)
+
+
+def test_lines_are_parsed_once(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+    docker_daemon.find("runner-0").logs += ["Running job: build", "Job build completed with result: Succeeded"]
+
+    assert [e["kind"] for e in refresh_job_state(runner)] == ["started", "completed"]
+    assert refresh_job_state(runner) == []
+
+
+def test_a_stopped_runner_is_offline(make_runner, docker_daemon):
+    runner = make_runner("runner-0")
+    docker_daemon.find("runner-0").logs.append("Running job: build")
+    refresh_job_state(runner)
+
+    docker_daemon.find("runner-0").status = "exited"
+    refresh_job_state(runner)
+
+    instance = _fresh(runner)
+    assert (instance.job_state, instance.job_name) == ("offline", None)
+
+
+def test_refresh_all_lists_containers_once_without_inspecting_them(make_runner, docker_daemon):
+    make_runner("runner-0")
+    make_runner("runner-1")
+    docker_daemon.find("runner-1").logs.append("Running job: build")
+    docker_daemon.add_container("unmanaged")
+    requests = docker_daemon.requests
+
+    states = {i.runner_name: i.job_state for i in refresh_all_job_states()}
+
+    assert states == {"runner-0": "idle", "runner-1": "busy"}
+    # The list, then per runner a log read, which docker-py precedes with an inspect for the TTY flag
+    assert docker_daemon.requests - requests == 1 + 2 * 2
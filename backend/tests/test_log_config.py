@@ -0,0 +1,119 @@
+import json
+import threading
+
+import pytest
+
+from inc.config import settings
+from inc.utils import log_config
+from inc.utils.log_config import docker_log_config, log_config_current, max_log_bytes, migrate_log_config, outdated_runners, size_bytes
+from models import RunnerInstance, RunnerTemplate
+
+
+@pytest.fixture(autouse=True)
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(log_config, "MIGRATE_POLL_SECONDS", 0.05)
+
+
+def _log_config(fake, name):
+    return fake.find(name).inspect()["HostConfig"]["LogConfig"]
+
+
+def _fresh(instance):
+    return RunnerInstance.get_by_id(instance.id)
+
+
+def test_runners_get_rotated_logs_by_default():
+    assert docker_log_config(None) == {"type": "local", "config": {"max-size": "20m", "max-file": "5", "compress": "true"}}
+    assert max_log_bytes(None) == 100 * 1024 ** 2
+
+
+def test_templates_override_the_defaults(database):
+    template = RunnerTemplate.create(name="chatty", log_config=json.dumps({"driver": "json-file", "max_size": "1g", "compress": False}))
+
+    assert docker_log_config(template) == {"type": "json-file", "config": {"max-size": "1g", "max-file": "5", "compress": "false"}}
+    assert max_log_bytes(template) == 5 * 1024 ** 3
+
+
+@pytest.mark.parametrize("size, expected", [("512", 512), ("10k", 10240), ("20m", 20 * 1024 ** 2), ("2G", 2 * 1024 ** 3)])
+def test_size_bytes(size, expected):
+    assert size_bytes(size) == expected
+
+
+def test_daemon_defaults_added_to_the_options_do_not_count_as_a_difference():
+    wanted = docker_log_config(None)
+    attrs = {"HostConfig": {"LogConfig": {"Type": "local", "Config": {**wanted["config"], "mode": "non-blocking"}}}}
+
+    assert log_config_current(attrs, None)
+    assert not log_config_current({"HostConfig": {"LogConfig": {"Type": "json-file", "Config": {}}}}, None)
+
+
+def test_runners_are_created_with_the_log_settings(make_runner, docker_daemon):
+    make_runner("runner-0")
+
+    assert _log_config(docker_daemon, "runner-0") == {
+        "Type": "local",
+        "Config": {"max-size": "20m", "max-file": "5", "compress": "true"},
+    }
+    assert outdated_runners() == []
+
+
+# -------- Migration ---------
+
+def test_migration_recreates_outdated_runners_with_a_fresh_token(make_runner, docker_daemon, monkeypatch):
+    runners = [make_runner(f"runner-{i}") for i in range(2)]
+    monkeypatch.setattr(settings, "RUNNER_LOG_MAX_SIZE", "50m")
+    progress = []
+
+    result = migrate_log_config(token="fresh-token", on_progress=lambda done, total: progress.append((done, total)))
+
+    assert sorted(result["migrated"]) == ["runner-0", "runner-1"]
+    assert progress == [(1, 2), (2, 2)]
+    assert _log_config(docker_daemon, "runner-0")["Config"]["max-size"] == "50m"
+    assert "RUNNER_TOKEN=fresh-token" in docker_daemon.find("runner-0").env
+    assert {_fresh(runner).token for runner in runners} == {"fresh-token"}
+    assert outdated_runners() == []
+
+
+def test_stopped_runners_are_recreated_without_starting(make_runner, docker_daemon, monkeypatch):
+    make_runner("runner-0")
+    docker_daemon.find("runner-0").status = "exited"
+    monkeypatch.setattr(settings, "RUNNER_LOG_MAX_SIZE", "50m")
+
+    assert migrate_log_config()["migrated"] == ["runner-0"]
+
+    assert docker_daemon.find("runner-0").status == "created"
+    assert _log_config(docker_daemon, "runner-0")["Config"]["max-size"] == "50m"
+
+
+def test_draining_runners_are_skipped(make_runner, docker_daemon, monkeypatch):
+    runner = make_runner("runner-0")
+    runner.drain_state = "draining"
+    runner.save()
+    monkeypatch.setattr(settings, "RUNNER_LOG_MAX_SIZE", "50m")
+
+    result = migrate_log_config(wait_seconds=0)
+
+    assert (result["migrated"], result["skipped"]) == ([], ["runner-0"])
+
+
+def test_busy_runners_are_left_until_the_deadline(make_runner, docker_daemon, monkeypatch):
+    make_runner("runner-0")
+    docker_daemon.find("runner-0").logs.append("Running job: build")
+    monkeypatch.setattr(settings, "RUNNER_LOG_MAX_SIZE", "50m")
+
+    result = migrate_log_config(wait_seconds=0)
+
+    assert (result["migrated"], result["busy"]) == ([], ["runner-0"])
+    assert _log_config(docker_daemon, "runner-0")["Config"]["max-size"] == "20m"
+
+
+def test_busy_runners_are_migrated_once_their_job_completes(make_runner, docker_daemon, monkeypatch):
+    make_runner("runner-0")
+    container = docker_daemon.find("runner-0")
+    container.logs.append("Running job: build")
+    monkeypatch.setattr(settings, "RUNNER_LOG_MAX_SIZE", "50m")
+    threading.Timer(0.3, container.logs.append, args=("Job build completed with result: Succeeded",)).start()
+
+    result = migrate_log_config(wait_seconds=10)
+
+    assert (result["migrated"], result["busy"]) == (["runner-0"], [])
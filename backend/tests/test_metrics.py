@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from inc.utils import cluster_metrics, metrics
+from inc.utils.coordination import WORKER_ID
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty registry, so the process's own metrics stay out of the output."""
+    monkeypatch.setattr(metrics, "REGISTRY", [])
+    return metrics.REGISTRY
+
+
+def test_counters_and_gauges(registry):
+    requests = metrics.Counter("requests_total", "Requests", ("route",))
+    streams = metrics.Gauge("streams", "Open streams")
+    requests.labels('/runner/"{id}"').inc()
+    requests.labels('/runner/"{id}"').inc(2)
+    streams.labels().inc()
+    streams.labels().dec()
+
+    assert metrics.render_metrics().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/runner/\\"{id}\\""} 3.0',
+        "# HELP streams Open streams",
+        "# TYPE streams gauge",
+        "streams 0.0",
+    ]
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = metrics.Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.labels().observe(value)
+
+    lines = metrics.render_metrics().splitlines()
+
+    assert lines[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_every_worker_renders_with_a_worker_label(registry):
+    calls = metrics.Counter("calls_total", "Calls", ("operation",))
+    calls.labels("list").inc(5)
+    latency = metrics.Histogram("latency_seconds", "Latency", buckets=(1.0,))
+    latency.labels().observe(0.5)
+    exported = json.loads(json.dumps(metrics.export_metrics()))  # As read back from a peer's file
+
+    lines = metrics.render_metrics({"a": exported, "b": {}}).splitlines()
+
+    assert 'calls_total{operation="list",worker="a"} 5.0' in lines
+    assert 'latency_seconds_count{worker="a"} 1' in lines
+    assert not any('worker="b"' in line for line in lines)
+
+
+def test_scrapes_cover_live_peers_and_drop_exited_ones(registry, tmp_path, monkeypatch):
+    monkeypatch.setattr(cluster_metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(cluster_metrics, "worker_alive", lambda worker_id: worker_id != "exited")
+    calls = metrics.Counter("calls_total", "Calls")
+    calls.labels().inc(2)
+    (tmp_path / "peer.json").write_text(json.dumps({"calls_total": [[[], 7.0]]}))
+    (tmp_path / "exited.json").write_text(json.dumps({"calls_total": [[[], 9.0]]}))
+    (tmp_path / "torn.json").write_text('{"calls_total": [[')
+
+    cluster_metrics.write_export()
+    lines = cluster_metrics.render_cluster_metrics().splitlines()
+
+    assert f'calls_total{{worker="{WORKER_ID}"}} 2.0' in lines
+    assert 'calls_total{worker="peer"} 7.0' in lines
+    assert not any('"exited"' in line or '"torn"' in line for line in lines)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"{WORKER_ID}.json", "peer.json", "torn.json"]
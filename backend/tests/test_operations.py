@@ -0,0 +1,97 @@
+import json
+import time
+
+import pytest
+
+from inc.utils import operations
+from inc.utils.operations import enqueue_operation, operation_data, resume_operations
+from models import Operation, RunnerInstance
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    """Register a test operation kind whose handler records its calls."""
+    calls = []
+
+    def run(operation, params):
+        calls.append(params)
+        if params.get("fail"):
+            raise RuntimeError("daemon gone")
+        return {"echo": params}
+
+    monkeypatch.setitem(operations.HANDLERS, "test", run)
+    return calls
+
+
+def _wait_until_done(operation_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while Operation.get_by_id(operation_id).status in operations.ACTIVE_STATUSES:
+        assert time.monotonic() < deadline, "operation did not finish"
+        time.sleep(0.05)
+    return Operation.get_by_id(operation_id)
+
+
+def test_operations_complete_with_their_result(database, handler):
+    operation = enqueue_operation("test", {"token": "secret"})
+
+    operations._run(operation.id)
+
+    data = operation_data(Operation.get_by_id(operation.id))
+    assert (data["status"], data["attempts"], data["result"]) == ("completed", 1, {"echo": {"token": "secret"}})
+    assert "params" not in data  # They may hold registration tokens
+
+
+def test_failures_are_recorded(database, handler):
+    operation = enqueue_operation("test", {"fail": True})
+
+    operations._run(operation.id)
+
+    operation = Operation.get_by_id(operation.id)
+    assert (operation.status, operation.message) == ("failed", "daemon gone")
+
+
+def test_finished_operations_are_not_run_again(database, handler):
+    operation = enqueue_operation("test", {})
+    operations._run(operation.id)
+
+    operations._run(operation.id)
+
+    assert len(handler) == 1
+
+
+def test_interrupted_operations_resume(database, handler):
+    queued = enqueue_operation("test", {"n": 1})
+    interrupted = enqueue_operation("test", {"n": 2})
+    Operation.update(status="running", attempts=1).where(Operation.id == interrupted.id).execute()
+
+    resume_operations()
+
+    assert _wait_until_done(queued.id).status == "completed"
+    assert _wait_until_done(interrupted.id).attempts == 2
+    assert sorted(call["n"] for call in handler) == [1, 2]
+
+
+def test_unknown_kinds_are_rejected(database):
+    with pytest.raises(ValueError):
+        enqueue_operation("reboot", {})
+
+
+def test_an_interrupted_clone_adopts_the_runner_it_was_creating(make_runner, docker_daemon):
+    source = make_runner("runner-0")
+    # The previous attempt created the first clone and had started on the second
+    make_runner("runner-1")
+    make_runner("runner-2")
+    operation = enqueue_operation("clone", {"instance_id": source.id, "count": 3}, total=3)
+    Operation.update(status="running", result=json.dumps({
+        "created_instances": [{"id": 2, "runner_name": "runner-1"}],
+        "failed_clones": [],
+        "pending": "runner-2",
+    })).where(Operation.id == operation.id).execute()
+
+    operations._run(operation.id)
+
+    result = json.loads(Operation.get_by_id(operation.id).result)
+    assert [clone["runner_name"] for clone in result["created_instances"]][:2] == ["runner-1", "runner-2"]
+    assert len(result["created_instances"]) == 3
+    assert RunnerInstance.select().count() == 4
+    assert len(docker_daemon.containers) == 4
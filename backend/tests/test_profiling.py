@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from collections import deque
+
+import pytest
+
+from inc.config import settings
+from inc.utils import profiling
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILES_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "_samples", deque(maxlen=100))
+    return tmp_path
+
+
+def _busy_in(name, started, release):
+    def request_work():
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=request_work, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_only_request_threads_are_sampled(store):
+    release = threading.Event()
+    started = [threading.Event(), threading.Event()]
+    threads = [_busy_in("bulk_0", started[0], release), _busy_in("job-state-tracker", started[1], release)]
+    for event in started:
+        event.wait(5)
+
+    profiling._take_sample()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    stacks = [stack for _, stack in profiling._samples]
+    assert len(stacks) == 1
+    assert stacks[0].startswith("worker;")
+    assert "request_work (tests/test_profiling.py:" in stacks[0]
+
+
+def test_a_profile_keeps_the_samples_of_its_window(store):
+    now = time.monotonic()
+    profiling._samples.extend([(now - 10, "worker;old"), (now, "worker;a;b"), (now, "worker;a;b"), (now, "worker;a;c")])
+
+    profiling._save_profile({"path": "/runner"}, now - 1, now + 1)
+
+    [profile] = profiling.list_profiles()
+    assert (profile["path"], profile["samples"]) == ("/runner", 3)
+    with open(profiling.get_profile_path(profile["id"])) as f:
+        assert f.read().splitlines() == ["worker;a;b 2", "worker;a;c 1"]
+
+
+def test_the_store_keeps_the_newest_profiles(store, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_MAX_PROFILES", 2)
+    for path in ("/one", "/two", "/three"):
+        profiling._save_profile({"path": path}, 0, 0)
+        time.sleep(0.002)  # Ids sort by their millisecond prefix
+
+    assert [p["path"] for p in profiling.list_profiles()] == ["/three", "/two"]
+    assert len(os.listdir(store)) == 4
+
+
+def test_profile_ids_cannot_leave_the_store(store):
+    (store / "secret.folded").write_text("x")
+
+    assert profiling.get_profile_path("secret") is not None
+    assert profiling.get_profile_path("../secret") is None
+    assert profiling.get_profile_path("missing") is None
+
+
+def test_switches_are_persisted_for_every_worker(database, monkeypatch):
+    monkeypatch.setattr(profiling, "_config", {"enabled": False, "sample_rate": 0.0, "slow_ms": 1000})
+
+    profiling.set_profiling_config(enabled=True, slow_ms=250, sample_rate=None)
+
+    # Another worker reads the stored switches once its copy is stale
+    monkeypatch.setattr(profiling, "_config", {"enabled": False, "sample_rate": 0.0, "slow_ms": 1000})
+    monkeypatch.setattr(profiling, "_config_loaded_at", 0.0)
+    assert profiling.get_profiling_config() == {"enabled": True, "sample_rate": 0.0, "slow_ms": 250}
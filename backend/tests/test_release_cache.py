@@ -0,0 +1,110 @@
+import hashlib
+import io
+import json
+import os
+import stat
+import tarfile
+
+import pytest
+
+from inc.config import settings
+from inc.utils import release_cache
+
+
+def _tarball(path, files):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o755 if name.endswith(".sh") else 0o644
+            archive.addfile(info, io.BytesIO(data))
+    with open(path, "rb") as f:
+        return "sha256:" + hashlib.sha256(f.read()).hexdigest()
+
+
+def _release(version, tarball, digest, prerelease=False):
+    """A release entry as the GitHub API returns it, trimmed to the fields the cache reads."""
+    return {
+        "tag_name": f"v{version}",
+        "draft": False,
+        "prerelease": prerelease,
+        "published_at": "2026-10-01T00:00:00Z",
+        "body": "Release notes",
+        "assets": [
+            {"name": f"actions-runner-linux-x64-{version}.tar.gz", "browser_download_url": f"file://{tarball}", "digest": digest, "size": 1},
+            {"name": f"actions-runner-osx-x64-{version}.zip", "browser_download_url": "file:///nowhere", "digest": None, "size": 1},
+        ],
+    }
+
+
+@pytest.fixture
+def releases(tmp_path, monkeypatch):
+    """A file:// release API with 2.329.0 (stable) and 2.330.0 (prerelease), and an empty cache."""
+    cache = tmp_path / "releases"
+    monkeypatch.setattr(release_cache, "RELEASES_DIR", str(cache))
+    monkeypatch.setattr(release_cache, "METADATA_PATH", str(cache / "metadata.json"))
+    monkeypatch.setattr(release_cache, "TARBALLS_DIR", str(cache / "tarballs"))
+    monkeypatch.setattr(release_cache, "RUNNERS_DIR", str(cache / "runners"))
+    monkeypatch.setattr(settings, "RUNNER_ARCH", "x64")
+    monkeypatch.setattr(settings, "RUNNER_VERSION", "")
+
+    stable, preview = tmp_path / "stable.tar.gz", tmp_path / "preview.tar.gz"
+    entries = [
+        _release("2.330.0", preview, _tarball(preview, {"run.sh": b"#!/bin/bash\n"}), prerelease=True),
+        _release("2.329.0", stable, _tarball(stable, {"run.sh": b"#!/bin/bash\n", "bin/Runner.Listener": b"listener"})),
+    ]
+    api = tmp_path / "runner-release.json"
+    api.write_text(json.dumps(entries))
+    monkeypatch.setattr(settings, "RELEASE_API_URL", f"file://{api}")
+    return api
+
+
+def test_latest_stable_release(releases):
+    version, asset = release_cache.resolve_release()
+    assert version == "2.329.0"
+    assert asset["name"] == "actions-runner-linux-x64-2.329.0.tar.gz"
+    assert release_cache.resolve_release("v2.330.0")[0] == "2.330.0"
+    with pytest.raises(RuntimeError):
+        release_cache.resolve_release("2.1.0")
+
+
+def test_metadata_is_trimmed_and_cached(releases):
+    release_cache.list_releases()
+    with open(release_cache.METADATA_PATH) as f:
+        cached = json.load(f)["releases"]
+    assert "body" not in cached[0]
+    assert [asset["name"] for asset in cached[1]["assets"]] == ["actions-runner-linux-x64-2.329.0.tar.gz"]
+
+    # Fresh metadata is served from the cache, even with the API gone
+    releases.unlink()
+    assert release_cache.list_releases()[0] == cached
+
+
+def test_unreachable_api_falls_back_to_the_bundled_releases(releases, monkeypatch):
+    monkeypatch.setattr(settings, "RELEASE_API_URL", f"file://{releases.parent / 'missing.json'}")
+    found, _ = release_cache.list_releases()
+    assert found and all("version" in release for release in found)
+
+
+def test_install_is_extracted_once_and_read_only(releases):
+    version, install = release_cache.ensure_runner_install()
+    assert version == "2.329.0"
+    assert install == release_cache.install_path("2.329.0")
+    with open(os.path.join(install, "bin", "Runner.Listener"), "rb") as f:
+        assert f.read() == b"listener"
+    assert not os.stat(os.path.join(install, "run.sh")).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+    assert os.stat(os.path.join(install, "run.sh")).st_mode & stat.S_IXUSR
+
+    # Cached: neither downloaded nor extracted again
+    os.remove(release_cache.tarball_path("2.329.0"))
+    assert release_cache.ensure_runner_install() == (version, install)
+    assert release_cache.cached_versions() == {"tarballs": [], "installs": ["2.329.0"]}
+
+
+def test_digest_mismatch_is_rejected(releases):
+    entries = json.loads(releases.read_text())
+    entries[1]["assets"][0]["digest"] = "sha256:" + "0" * 64
+    releases.write_text(json.dumps(entries))
+    with pytest.raises(RuntimeError, match="Digest mismatch"):
+        release_cache.ensure_runner_install()
+    assert release_cache.cached_versions() == {"tarballs": [], "installs": []}
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from inc.utils import rollout as rollouts
+from inc.utils.runner_ops import recreate_runner
+from models import Rollout, RunnerInstance
+
+IMAGE = "acme/runner:v2"
+
+
+@pytest.fixture(autouse=True)
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(rollouts, "HEALTH_POLL_SECONDS", 0.1)
+
+
+def _env(docker_daemon, name):
+    return dict(entry.split("=", 1) for entry in docker_daemon.find(name).env)
+
+
+def _start(**fields):
+    rollout = Rollout.create(image=IMAGE, **fields)
+    thread = threading.Thread(target=rollouts._run_rollout, args=(rollout.id,), daemon=True)
+    thread.start()
+    return rollout, thread
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_runners_are_upgraded_and_register_with_the_new_token(make_runner, docker_daemon):
+    runners = [make_runner(f"runner-{i}", token="expired") for i in range(3)]
+
+    rollout, thread = _start(max_unavailable=2, token="fresh")
+    thread.join(10)
+
+    rollout = Rollout.get_by_id(rollout.id)
+    assert (rollout.status, rollout.upgraded, rollout.failed) == ("completed", 3, 0)
+    for runner in runners:
+        assert _env(docker_daemon, runner.runner_name)["RUNNER_TOKEN"] == "fresh"
+        assert RunnerInstance.get_by_id(runner.id).token == "fresh"
+
+
+def test_recreate_keeps_the_stored_token_by_default(make_runner, docker_daemon):
+    runner = make_runner("runner-0", token="stored")
+
+    recreate_runner(runner, image=IMAGE)
+
+    assert _env(docker_daemon, "runner-0")["RUNNER_TOKEN"] == "stored"
+    assert RunnerInstance.get_by_id(runner.id).token == "stored"
+
+
+def test_busy_runners_wait_for_their_job(make_runner, docker_daemon):
+    idle, busy = make_runner("runner-idle"), make_runner("runner-busy")
+    busy_container = docker_daemon.find("runner-busy")
+    busy_container.logs.append("Running job: deploy")
+
+    rollout, thread = _start(max_unavailable=2)
+    _wait_for(lambda: RunnerInstance.get_by_id(idle.id).image_digest != idle.image_digest)
+    time.sleep(0.5)
+
+    # The busy runner keeps its container, and with it the job
+    assert docker_daemon.find("runner-busy") is busy_container
+    assert busy_container.status == "running"
+    assert "busy" in Rollout.get_by_id(rollout.id).message
+
+    busy_container.logs.append("Job deploy completed with result: Succeeded")
+    thread.join(10)
+
+    assert docker_daemon.find("runner-busy") is not busy_container
+    assert Rollout.get_by_id(rollout.id).status == "completed"
+
+
+def test_drained_runners_are_left_alone(make_runner, docker_daemon):
+    make_runner("runner-0")
+    drained = make_runner("runner-1")
+    drained.drain_state = "drained"
+    drained.save()
+
+    rollout = Rollout.create(image=IMAGE, target_digest=rollouts._pull_image(IMAGE))
+
+    assert [i.runner_name for i in rollouts._pending_instances(rollout)] == ["runner-0"]
+
+
+def test_a_wave_that_never_gets_ready_halts_the_rollout(make_runner, docker_daemon, monkeypatch):
+    for i in range(3):
+        make_runner(f"runner-{i}")
+    monkeypatch.setattr(rollouts, "_is_ready", lambda instance: False)
+
+    rollout, thread = _start(max_unavailable=1, wave_timeout_seconds=0)
+    thread.join(10)
+
+    rollout = Rollout.get_by_id(rollout.id)
+    assert (rollout.status, rollout.upgraded, rollout.failed) == ("failed", 0, 1)
+    assert "not ready" in rollout.message
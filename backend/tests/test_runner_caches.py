@@ -0,0 +1,176 @@
+import json
+import os
+import stat
+import time
+
+import pytest
+
+from inc.config import settings
+from inc.utils import release_cache, runner_caches
+from inc.utils.job_state import refresh_job_state
+from inc.utils.runner_caches import cache_specs, cache_usage, clear_cache, release_runner_caches, store_path
+from inc.utils.runner_ops import delete_runner, recreate_runner
+from models import RunnerInstance, RunnerTemplate
+
+
+@pytest.fixture(autouse=True)
+def caches_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(runner_caches, "CACHES_DIR", str(tmp_path / "caches"))
+    monkeypatch.setattr(release_cache, "_host_volume_path", settings.VOLUME_PATH)
+    return tmp_path / "caches"
+
+
+@pytest.fixture
+def template(database):
+    caches = [{"name": "hostedtoolcache"}, {"name": "npm", "quota_mb": 64}]
+    return RunnerTemplate.create(name="node", caches=json.dumps(caches))
+
+
+def _layer(runner_name, cache_name="hostedtoolcache", template_name="node"):
+    return os.path.join(store_path(template_name, cache_name), "layers", runner_name)
+
+
+def _write(runner_name, relative, content="x", cache_name="hostedtoolcache"):
+    """Write a file the way a job in the runner would, through its overlay upper dir."""
+    path = os.path.join(_layer(runner_name, cache_name), "upper", relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def _current(cache_name="hostedtoolcache", template_name="node"):
+    store = store_path(template_name, cache_name)
+    return os.path.join(store, "generations", os.readlink(os.path.join(store, "current")))
+
+
+def _generations(cache_name="hostedtoolcache", template_name="node"):
+    return sorted(os.listdir(os.path.join(store_path(template_name, cache_name), "generations")))
+
+
+def test_cache_specs_fill_in_known_paths_and_defaults(template):
+    assert cache_specs(template) == [
+        {"name": "hostedtoolcache", "path": "/opt/hostedtoolcache", "depth": 2, "quota_mb": settings.CACHE_DEFAULT_QUOTA_MB},
+        {"name": "npm", "path": "/home/runner/.npm", "depth": 1, "quota_mb": 64},
+    ]
+    assert cache_specs(None) == []
+
+
+def test_runners_mount_the_current_generation_copy_on_write(make_runner, docker_daemon, template):
+    make_runner("runner-0", template=template)
+
+    volume = docker_daemon.volumes["runner-0-cache-hostedtoolcache"]
+    options = dict(part.split("=", 1) for part in volume["Options"]["o"].split(","))
+    assert volume["Options"]["type"] == "overlay"
+    assert os.path.basename(options["lowerdir"]) == os.path.basename(_current())
+    assert options["upperdir"].endswith("layers/runner-0/upper")
+    assert "runner-0-cache-npm" in docker_daemon.volumes
+    assert "RUNNER_TOOL_CACHE=/opt/hostedtoolcache" in docker_daemon.find("runner-0").env
+
+
+def test_writes_reach_the_shared_cache_once_the_runner_is_deleted(make_runner, docker_daemon, template):
+    runner = make_runner("runner-0", template=template)
+    first = _current()
+    _write("runner-0", "node/20.11.0/x64/bin/node", "v20")
+
+    delete_runner(runner)
+
+    with open(os.path.join(_current(), "node/20.11.0/x64/bin/node")) as f:
+        assert f.read() == "v20"
+    assert _current() != first
+    assert _generations() == [os.path.basename(_current())]  # The old one is no longer mounted
+    assert not os.path.exists(_layer("runner-0"))
+    assert "runner-0-cache-hostedtoolcache" not in docker_daemon.volumes
+
+
+def test_layers_are_not_merged_while_the_container_runs(make_runner, docker_daemon, template):
+    runner = make_runner("runner-0", template=template)
+    first = _current()
+    _write("runner-0", "node/20.11.0/x64/bin/node", "half-writ")
+    container = docker_daemon.find("runner-0")
+    container.logs += ["Running job: build", "Job build completed with result: Succeeded"]
+
+    refresh_job_state(runner)
+    time.sleep(0.5)  # Long enough for a merge in the background to show up
+
+    assert _current() == first
+    assert os.listdir(first) == []
+
+
+def test_recreated_runners_start_from_their_merged_writes(make_runner, docker_daemon, template):
+    runner = make_runner("runner-0", template=template)
+    _write("runner-0", "node/20.11.0/x64/bin/node")
+
+    result = recreate_runner(RunnerInstance.get_by_id(runner.id))
+
+    assert result["status"] == "recreated", result
+    with open(os.path.join(_layer("runner-0"), "generation")) as f:
+        assert f.read() == os.path.basename(_current())
+    assert os.path.exists(os.path.join(_current(), "node/20.11.0/x64/bin/node"))
+    assert os.listdir(os.path.join(_layer("runner-0"), "upper")) == []
+
+
+def test_concurrent_runners_add_to_each_other(make_runner, template):
+    runners = [make_runner(f"runner-{i}", template=template) for i in range(2)]
+    _write("runner-0", "node/20.11.0/x64/bin/node")
+    _write("runner-1", "python/3.12.1/x64/bin/python")
+
+    for runner in runners:
+        delete_runner(runner)
+
+    assert sorted(os.listdir(_current())) == ["node", "python"]
+    assert len(_generations()) == 1
+
+
+def test_deletions_and_replaced_directories_are_applied(make_runner, template):
+    runner = make_runner("runner-0", template=template)
+    _write("runner-0", "node/18.19.0/x64/bin/node")
+    _write("runner-0", "node/20.11.0/x64/bin/node")
+    release_runner_caches("runner-0")
+    runner = make_runner("runner-1", template=template)
+
+    upper = os.path.join(_layer("runner-1"), "upper")
+    os.makedirs(os.path.join(upper, "node"))
+    try:
+        os.mknod(os.path.join(upper, "node", "18.19.0"), stat.S_IFCHR, 0)  # Overlay whiteout
+    except PermissionError:
+        pytest.skip("creating whiteouts needs CAP_MKNOD")
+    delete_runner(runner)
+
+    assert os.listdir(os.path.join(_current(), "node")) == ["20.11.0"]
+
+
+def _write_entry(runner_name, name, size):
+    path = os.path.join(_layer(runner_name, "npm"), "upper", name, "data")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+
+
+def test_least_recently_used_entries_are_evicted_over_quota(make_runner, template):
+    template.caches = json.dumps([{"name": "npm", "quota_mb": 1}])
+    template.save()
+    make_runner("runner-0", template=template)
+    for name in ["_cacache", "_logs"]:
+        _write_entry("runner-0", name, 400 * 1024)
+    release_runner_caches("runner-0")
+    os.utime(os.path.join(_current("npm"), "_cacache", "data"), (1_000_000, 1_000_000))  # Used long ago
+    os.utime(os.path.join(_current("npm"), "_logs", "data"), (2_000_000, 2_000_000))
+    runner = make_runner("runner-1", template=template)
+    _write_entry("runner-1", "_npx", 400 * 1024)
+
+    delete_runner(runner)
+
+    assert sorted(os.listdir(_current("npm"))) == ["_logs", "_npx"]
+
+
+def test_cache_usage_and_clearing(make_runner, template):
+    make_runner("runner-0", template=template)
+    _write("runner-0", "node/20.11.0/x64/bin/node", "x" * 8192)
+    release_runner_caches("runner-0")
+
+    usage = {cache["name"]: cache for cache in cache_usage(template)}
+    assert usage["hostedtoolcache"]["size_bytes"] >= 8192
+    assert usage["npm"]["quota_bytes"] == 64 * 1024 * 1024
+
+    clear_cache(template, "hostedtoolcache")
+    assert os.listdir(_current()) == []
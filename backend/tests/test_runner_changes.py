@@ -0,0 +1,92 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from inc.utils import runner_changes
+from inc.utils.runner_changes import changes_since, current_revision, reconcile_container_statuses
+from models import Revision, RunnerInstance, RunnerTombstone
+
+
+def runner(name, **fields):
+    return RunnerInstance.create(runner_name=name, github_url="https://github.com/acme/app", token="t", **fields)
+
+
+def test_visible_changes_bump_the_revision(database):
+    instance = runner("runner-0")
+    created = instance.revision
+    assert current_revision() == created
+
+    instance.job_state = "busy"
+    instance.save()
+    assert instance.revision == current_revision() == created + 1
+
+    instance.log_cursor = "2026-10-19T12:00:00Z"
+    instance.save(only=[RunnerInstance.log_cursor])
+    assert current_revision() == created + 1  # Bookkeeping only
+
+
+def test_changes_since_a_revision(database):
+    runner("runner-0")
+    updated, deleted = runner("runner-1"), runner("runner-2")
+    since = current_revision()
+
+    updated.labels = "gpu"
+    updated.save()
+    deleted.delete_instance()
+
+    revision, changed, deleted_ids = changes_since(since)
+    assert revision == current_revision() == since + 2
+    assert [row["runner_name"] for row in changed] == ["runner-1"]
+    assert deleted_ids == [deleted.id]
+    assert changes_since(revision)[1:] == ([], [])
+
+
+def test_a_feed_older_than_the_pruned_tombstones_must_resync(database, monkeypatch):
+    runner("runner-0").delete_instance()
+    since = current_revision()
+    runner("runner-1").delete_instance()
+    RunnerTombstone.update(deleted_at=datetime.now() - timedelta(days=30)).execute()
+    monkeypatch.setattr(runner_changes, "_last_prune", None)
+
+    runner_changes._prune_tombstones()
+
+    assert RunnerTombstone.select().count() == 0
+    assert changes_since(since)[1] is None
+    assert changes_since(current_revision())[1] == []
+
+
+def test_container_statuses_are_stored_and_versioned(make_runner, docker_daemon, monkeypatch):
+    events = []
+    monkeypatch.setattr(runner_changes, "publish", lambda channel, data: events.append(data))
+    running, stopped = make_runner("runner-0"), make_runner("runner-1")
+    docker_daemon.find("runner-1").status = "exited"
+    runner("runner-2")  # Never got a container
+
+    assert reconcile_container_statuses() == 3
+    assert reconcile_container_statuses() == 0
+
+    statuses = {i.runner_name: i.container_status for i in RunnerInstance.select()}
+    assert statuses == {"runner-0": "active", "runner-1": "inactive", "runner-2": "inactive"}
+    assert [(e["runner_name"], e["previous"], e["status"]) for e in events][:2] == [
+        ("runner-0", None, "active"), ("runner-1", None, "inactive"),
+    ]
+    assert RunnerInstance.get_by_id(running.id).revision > running.revision
+
+
+def test_reconcile_survives_writes_from_other_workers(database, monkeypatch):
+    for index in range(5):
+        runner(f"runner-{index}")
+
+    def write_elsewhere(channel, data):
+        # Another worker commits between two of this loop's saves
+        thread = threading.Thread(target=Revision.next, args=("other",))
+        thread.start()
+        thread.join()
+
+    monkeypatch.setattr(runner_changes, "container_status_map", lambda: {})
+    monkeypatch.setattr(runner_changes, "publish", write_elsewhere)
+    RunnerInstance.update(container_status="active").execute()
+
+    assert reconcile_container_statuses() == 5
+    assert Revision.current("other") == 5
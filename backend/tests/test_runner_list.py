@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from inc.utils.fast_json import dumps
+from models import RunnerInstance
+from routers import runner_instance
+from routers.runner_instance import LIST_FIELDS, _instance_out, _parse_fields, _rows_out, _select_rows
+
+
+def test_fields_are_validated_and_deduplicated():
+    assert _parse_fields(None) == list(LIST_FIELDS)
+    assert _parse_fields(" id, status,id ,") == ["id", "status"]
+    with pytest.raises(HTTPException) as error:
+        _parse_fields("id,password")
+    assert error.value.status_code == 400
+
+
+def test_rows_match_the_full_response_model(make_runner, docker_daemon):
+    make_runner("runner-0")
+    stopped = make_runner("runner-1")
+    docker_daemon.find("runner-1").status = "exited"
+    stopped.drain_deadline = datetime(2026, 10, 19, 12)
+    stopped.save()
+
+    rows, stale = _rows_out(list(_select_rows(list(LIST_FIELDS))), list(LIST_FIELDS))
+
+    assert not stale
+    assert rows == [_instance_out(instance).model_dump() for instance in RunnerInstance.select().order_by(RunnerInstance.id)]
+    assert [row["status"] for row in rows] == ["active", "inactive"]
+
+
+def test_projection_selects_only_what_it_returns(make_runner):
+    make_runner("runner-0")
+
+    query = _select_rows(["id", "status"])
+    rows, _ = _rows_out(list(query), ["id", "status"])
+
+    selected = {column.name for column in query._returning}
+    assert selected == {"id", "runner_name", "hostname", "container_status"}
+    assert rows == [{"id": rows[0]["id"], "status": "active"}]
+
+
+def test_statuses_fall_back_to_the_last_seen_ones(make_runner, monkeypatch):
+    runner = make_runner("runner-0")
+    RunnerInstance.update(container_status="active").where(RunnerInstance.id == runner.id).execute()
+
+    def unreachable():
+        raise ConnectionError("daemon down")
+
+    monkeypatch.setattr(runner_instance, "container_status_map", unreachable)
+    rows, stale = _rows_out(list(_select_rows(["runner_name", "status"])), ["runner_name", "status"])
+
+    assert stale
+    assert rows == [{"runner_name": "runner-0", "status": "active"}]
+
+
+def test_fast_json_is_compact_and_keeps_non_ascii():
+    assert dumps({"name": "läufer", "ids": [1, 2], "ok": None}) == '{"name":"läufer","ids":[1,2],"ok":null}'.encode()
+    assert json.loads(dumps({1: "a"})) == {"1": "a"}
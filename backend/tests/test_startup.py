@@ -0,0 +1,112 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from inc.config import settings
+from inc.utils import startup
+from inc.utils.lazy_imports import defer
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def fresh_startup(monkeypatch):
+    """Startup state of a worker that has not started yet."""
+    monkeypatch.setattr(startup, "_phases", {})
+    monkeypatch.setattr(startup, "_errors", {})
+    monkeypatch.setattr(startup, "_ready", threading.Event())
+    monkeypatch.setattr(startup, "_ready_after", None)
+
+
+# -------- Deferred imports ---------
+
+def test_deferred_modules_load_on_first_use(tmp_path, monkeypatch):
+    (tmp_path / "heavy_module.py").write_text("import os\nos.environ['HEAVY_MODULE_LOADED'] = '1'\nVALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delenv("HEAVY_MODULE_LOADED", raising=False)
+    try:
+        module = defer("heavy_module")
+        assert "HEAVY_MODULE_LOADED" not in os.environ
+
+        assert module.VALUE == 42
+        assert os.environ["HEAVY_MODULE_LOADED"] == "1"
+        assert defer("heavy_module") is module
+    finally:
+        sys.modules.pop("heavy_module", None)
+
+
+def test_missing_modules_are_deferred_as_none():
+    assert defer("runnerpilot_not_installed") is None
+
+
+def test_importing_the_app_leaves_heavy_modules_unloaded():
+    code = (
+        "import importlib.util, sys\n"
+        "import main\n"
+        "print(sorted(name for name in ('docker', 'requests', 'psutil', 'distro')\n"
+        "    if name in sys.modules and not isinstance(sys.modules[name], importlib.util._LazyModule)))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+# -------- Phases ---------
+
+def test_phases_are_timed():
+    with startup.phase("db"):
+        pass
+    startup.mark_imported()
+
+    report = startup.startup_report()
+    assert set(report["phases_ms"]) == {"db", "import"}
+    assert report["ready"] is False and report["total_ms"] is None
+
+
+def test_optional_phases_record_their_failure(capsys):
+    with startup.phase("docker", required=False):
+        raise ConnectionError("daemon not running")
+    with pytest.raises(RuntimeError):
+        with startup.phase("db"):
+            raise RuntimeError("disk full")
+
+    report = startup.startup_report()
+    assert report["errors"] == {"docker": "daemon not running", "db": "disk full"}
+    assert set(report["phases_ms"]) == {"docker", "db"}
+    assert "Startup step 'docker' failed" in capsys.readouterr().out
+
+
+def test_a_slow_startup_is_reported_against_the_budget(monkeypatch, capsys):
+    with startup.phase("db"):
+        pass
+
+    monkeypatch.setattr(settings, "STARTUP_BUDGET_MS", 0)
+    startup.mark_ready()
+
+    assert startup.is_ready()
+    assert startup.startup_report()["total_ms"] is not None
+    assert "over the 0 ms budget" in capsys.readouterr().out
+
+
+# -------- Readiness ---------
+
+def test_readyz_waits_for_startup(database):
+    import main
+
+    response = main.readyz()
+    assert response.status_code == 503
+    assert json.loads(response.body)["docker"] == "pending"
+
+    with startup.phase("docker", required=False):
+        raise ConnectionError("daemon not running")
+    startup.mark_ready()
+
+    response = main.readyz()
+    body = json.loads(response.body)
+    assert response.status_code == 200
+    assert (body["status"], body["database"], body["docker"]) == ("ready", "ok", "error: daemon not running")
@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from inc.utils import stats_sampler
+from inc.utils.stats_sampler import METRICS, RingBuffer, StatsWindow
+
+
+def values(**overrides):
+    return {**dict.fromkeys(METRICS, 0.0), **overrides}
+
+
+def test_ring_buffer_overwrites_the_oldest_values():
+    ring = RingBuffer(3)
+    assert (len(ring), ring.values(), ring.last()) == (0, [], None)
+
+    for value in range(1, 6):
+        ring.push(value)
+
+    assert (len(ring), ring.values(), ring.last()) == (3, [3.0, 4.0, 5.0], 5.0)
+
+
+def test_bucketed_windows_push_the_average_when_a_bucket_closes():
+    window = StatsWindow(10, 60)
+    window.add(0, values(cpu_percent=10))
+    window.add(30, values(cpu_percent=30))
+    assert window.points() == []  # The first bucket is still open
+
+    window.add(60, values(cpu_percent=90))
+
+    assert [(p["t"], p["cpu_percent"]) for p in window.points()] == [(0, 20.0)]
+
+
+def test_rates_come_from_the_previous_sample():
+    raw = {
+        "cpu_stats": {"cpu_usage": {"total_usage": 300}, "system_cpu_usage": 2000, "online_cpus": 2},
+        "memory_stats": {"usage": 500, "limit": 1000, "stats": {"inactive_file": 100}},
+        "networks": {"eth0": {"rx_bytes": 3000, "tx_bytes": 50}},
+    }
+    counters = stats_sampler._counters(raw)
+
+    first = stats_sampler._sample_values(raw, counters, None, 0)
+    assert (first["cpu_percent"], first["net_rx_bps"], first["memory_bytes"]) == (0.0, 0.0, 400.0)
+
+    previous = (100.0, 1000.0, 1000.0, 100.0, 0.0, 0.0)
+    second = stats_sampler._sample_values(raw, counters, previous, 2.0)
+    assert second["cpu_percent"] == 40.0  # 200 of 1000 system ticks on 2 CPUs
+    assert second["net_rx_bps"] == 1000.0
+    assert second["net_tx_bps"] == 0.0  # The counter went back: the container restarted
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    monkeypatch.setattr(stats_sampler, "_stats", {})
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def test_only_running_runners_are_sampled(make_runner, docker_daemon, stats):
+    make_runner("runner-0")
+    make_runner("runner-1")
+    make_runner("runner-2")
+    docker_daemon.find("runner-2").status = "exited"
+    docker_daemon.add_container("unmanaged")
+    requests = docker_daemon.requests
+
+    stats_sampler.sample_once(stats)
+
+    assert sorted(stats_sampler.get_latest_stats()) == ["runner-0", "runner-1"]
+    assert docker_daemon.requests - requests == 1 + 2  # One sparse list, one stats call per runner
+
+
+def test_deleted_runners_are_forgotten(make_runner, docker_daemon, stats):
+    runner = make_runner("runner-0")
+    stats_sampler.sample_once(stats)
+    stats_sampler.sample_once(stats)
+    assert len(stats_sampler.get_runner_stats("runner-0")) == 2
+
+    runner.delete_instance()
+    stats_sampler.sample_once(stats)
+
+    assert stats_sampler.get_runner_stats("runner-0") == []
@@ -0,0 +1,85 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from inc.config import settings
+from inc.utils import tracing
+from inc.utils.tracing import KIND_CLIENT, STATUS_ERROR, current_span, in_context, start_span
+
+
+@pytest.fixture
+def traces(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACES_DIR", str(tmp_path))
+    monkeypatch.setattr(tracing, "_pending", [])
+    monkeypatch.setattr(tracing, "_exporter", threading.current_thread())  # Alive, so no exporter thread starts
+    monkeypatch.setattr(settings, "TRACING_ENABLED", True)
+    monkeypatch.setattr(settings, "TRACING_SAMPLE_RATIO", 1.0)
+    return tmp_path
+
+
+def _exported(traces):
+    tracing.flush()
+    lines = (traces / tracing.TRACE_FILE).read_text().splitlines()
+    return [span for line in lines for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+
+
+def test_child_spans_join_the_trace(traces):
+    with start_span("POST /runner", root=True, route="/runner") as root:
+        with start_span("docker create", KIND_CLIENT, attempt=1, cached=False) as child:
+            child.set_attribute("seconds", 0.5)
+
+    spans = {span["name"]: span for span in _exported(traces)}
+    assert spans["docker create"]["traceId"] == spans["POST /runner"]["traceId"] == root.trace_id
+    assert spans["docker create"]["parentSpanId"] == root.span_id
+    assert "parentSpanId" not in spans["POST /runner"]
+    assert spans["docker create"]["attributes"] == [
+        {"key": "attempt", "value": {"intValue": "1"}},
+        {"key": "cached", "value": {"boolValue": False}},
+        {"key": "seconds", "value": {"doubleValue": 0.5}},
+    ]
+
+
+def test_nothing_is_recorded_outside_a_trace(traces, monkeypatch):
+    with start_span("docker list") as span:
+        assert span is None
+
+    monkeypatch.setattr(settings, "TRACING_SAMPLE_RATIO", 0.0)
+    with start_span("GET /runner", root=True) as root:
+        with start_span("docker list") as child:
+            assert root is None and child is None
+
+    assert tracing._pending == []
+
+
+def test_errors_are_recorded_and_raised(traces):
+    with pytest.raises(RuntimeError):
+        with start_span("restart", root=True):
+            raise RuntimeError("daemon gone")
+
+    [span] = _exported(traces)
+    assert span["status"] == {"code": STATUS_ERROR, "message": "RuntimeError: daemon gone"}
+
+
+def test_executor_work_joins_the_callers_trace(traces):
+    with start_span("POST /runner/bulk/stop", root=True) as root:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            seen = executor.submit(in_context(current_span)).result()
+            unbound = executor.submit(current_span).result()
+
+    assert seen is root
+    assert unbound is None
+
+
+def test_files_rotate_by_size(traces, monkeypatch):
+    monkeypatch.setattr(settings, "TRACING_MAX_FILE_BYTES", 1)
+    monkeypatch.setattr(settings, "TRACING_MAX_FILES", 3)  # The live file and two rotated ones
+    for name in ("first", "second", "third"):
+        with start_span(name, root=True):
+            pass
+        tracing.flush()
+
+    assert sorted(path.name for path in traces.iterdir() if path.name != ".lock") == ["spans.jsonl.1", "spans.jsonl.2"]
+    assert '"third"' in (traces / "spans.jsonl.1").read_text()
+    assert '"second"' in (traces / "spans.jsonl.2").read_text()
@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+import time
+
+import pytest
+
+from inc.config import settings
+from inc.utils.job_state import refresh_job_state
+from inc.utils.runner_ops import delete_runner, recreate_runner, runner_template
+from inc.utils.work_storage import KEEP_BETWEEN_JOBS, work_cleanup_env, work_disk_usage, work_storage
+from models import RunnerInstance, RunnerTemplate
+
+CLEAN_WORK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "volumn", "runner", "clean-work.sh")
+
+
+def _template(database, **storage):
+    return RunnerTemplate.create(name=f"work-{storage.get('type')}", work_storage=json.dumps(storage))
+
+
+def _env(container):
+    return dict(entry.split("=", 1) for entry in container.env)
+
+
+def test_work_storage_defaults_to_the_overlay(database):
+    assert work_storage(None) == {"type": "overlay", "size_mb": None, "path": None, "clean_between_jobs": True}
+    assert work_cleanup_env(None) == {}
+
+
+def test_tmpfs_work_directories_stay_executable(make_runner, docker_daemon, database):
+    make_runner("runner-0", template=_template(database, type="tmpfs", size_mb=512))
+
+    container = docker_daemon.find("runner-0")
+    options = container.host_config["Tmpfs"][settings.RUNNER_WORK_MOUNT].split(",")
+    assert "exec" in options and "size=512m" in options
+    assert _env(container)["ACTIONS_RUNNER_HOOK_JOB_COMPLETED"] == settings.RUNNER_WORK_CLEANUP_HOOK
+    assert _env(container)["WORK_CLEANUP_KEEP"] == "_actions _tool _temp"
+
+
+def test_cleanup_between_jobs_can_be_turned_off(database):
+    assert work_cleanup_env(_template(database, type="tmpfs", size_mb=512, clean_between_jobs=False)) == {}
+
+
+def test_bind_directories_are_created_and_removed_with_the_runner(make_runner, docker_daemon, database, tmp_path):
+    runner = make_runner("runner-0", template=_template(database, type="bind", path=str(tmp_path)))
+    directory = tmp_path / "runner-0"
+
+    assert directory.is_dir()
+    assert f"{directory}:{settings.RUNNER_WORK_MOUNT}:rw" in docker_daemon.find("runner-0").host_config["Binds"]
+    (directory / "checkout").write_text("x" * 100)
+    assert work_disk_usage("runner-0", runner_template(runner))["work_bytes"] == 100
+
+    delete_runner(runner)
+    assert not directory.exists()
+
+
+def test_work_volumes_survive_recreates(make_runner, docker_daemon, database):
+    runner = make_runner("runner-0", template=_template(database, type="volume"))
+    assert "runner-0-work" in docker_daemon.volumes
+
+    recreate_runner(RunnerInstance.get_by_id(runner.id))
+    assert "runner-0-work" in docker_daemon.volumes
+
+    delete_runner(RunnerInstance.get_by_id(runner.id))
+    assert "runner-0-work" not in docker_daemon.volumes
+
+
+def test_the_backend_never_cleans_a_running_container(make_runner, docker_daemon, database):
+    runner = make_runner("runner-0", template=_template(database, type="tmpfs", size_mb=512))
+    container = docker_daemon.find("runner-0")
+    container.logs += ["Running job: build", "Job build completed with result: Succeeded"]
+
+    refresh_job_state(runner)
+    time.sleep(0.5)  # Long enough for a cleanup in the background to show up
+
+    assert container.execs == []  # The runner's own job-completed hook does it
+
+
+def test_usage_reports_the_writable_layer_and_tmpfs_limit(make_runner, docker_daemon, database):
+    template = _template(database, type="tmpfs", size_mb=512)
+    make_runner("runner-0", template=template)
+    docker_daemon.find("runner-0").size_rw = 4096
+    docker_daemon.exec_outputs["du"] = f"2048\t{settings.RUNNER_WORK_MOUNT}\n"
+
+    usage = work_disk_usage("runner-0", template)
+
+    assert (usage["storage"], usage["work_limit_bytes"]) == ("tmpfs", 512 * 1024 * 1024)
+    assert (usage["container_rw_bytes"], usage["work_bytes"]) == (4096, 2048)
+
+
+# -------- Cleanup hook ---------
+
+def _run_hook(work_dir):
+    environment = {**os.environ, "WORK_CLEANUP_DIR": str(work_dir), "WORK_CLEANUP_KEEP": " ".join(KEEP_BETWEEN_JOBS)}
+    return subprocess.run(["bash", CLEAN_WORK], env=environment, capture_output=True, text=True, timeout=30)
+
+
+def test_the_hook_empties_the_work_directory_but_keeps_runner_caches(tmp_path):
+    for name in ["_actions/checkout/v4", "_tool/node/20", "_temp/hook", "app/src", "app/.git"]:
+        (tmp_path / name).mkdir(parents=True)
+    (tmp_path / "build.log").write_text("done")
+    (tmp_path / ".hidden").write_text("x")
+
+    result = _run_hook(tmp_path)
+
+    assert result.returncode == 0
+    assert sorted(os.listdir(tmp_path)) == ["_actions", "_temp", "_tool"]
+    assert (tmp_path / "_actions/checkout/v4").is_dir()
+
+
+@pytest.mark.parametrize("work_dir", ["missing", ""])
+def test_the_hook_never_fails_the_job(tmp_path, work_dir):
+    assert _run_hook(tmp_path / work_dir if work_dir else "").returncode == 0
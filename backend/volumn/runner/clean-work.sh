@@ -0,0 +1,17 @@
+#!/bin/bash
+# Job-completed hook (ACTIONS_RUNNER_HOOK_JOB_COMPLETED) that RunnerPilot sets for
+# templates that clean the work directory between jobs. The runner runs it before
+# it takes its next job, so it can never remove files of a job in progress.
+# A failing hook fails the job, so this always exits 0.
+cd / || exit 0
+[ -d "${WORK_CLEANUP_DIR}" ] || exit 0
+
+keep=()
+for name in ${WORK_CLEANUP_KEEP}; do
+    keep+=(! -name "$name")
+done
+if ! find "${WORK_CLEANUP_DIR}" -mindepth 1 -maxdepth 1 "${keep[@]}" -exec rm -rf {} + 2>/dev/null; then
+    # Usually files a job created as root through the Docker socket; they go with the runner
+    echo "Warning: work directory cleanup left files behind in ${WORK_CLEANUP_DIR}" >&2
+fi
+exit 0
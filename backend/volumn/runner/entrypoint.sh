@@ -1,8 +1,43 @@
 #!/bin/bash
 set -e
 
+CONFIG_ARGS=()
+if [ -n "${RUNNER_INSTALL_DIR}" ] && [ -d "${RUNNER_INSTALL_DIR}/bin" ]; then
+    # Runner files come from a shared read-only install on the host. Only bin/ and
+    # externals/ are linked: config.sh and run.sh resolve their own location and
+    # write .runner, .credentials, .env, .path and _diag next to themselves, so the
+    # top-level scripts are copied into this container's own /app. Self-update is
+    # turned off since the install cannot be written to.
+    for entry in "${RUNNER_INSTALL_DIR}"/*; do
+        name=$(basename "$entry")
+        if [ -d "$entry" ]; then
+            case "$name" in
+                bin|externals)
+                    if [ "$(readlink "./${name}")" != "$entry" ]; then
+                        rm -rf "./${name}"
+                        ln -s "$entry" "./${name}"
+                    fi
+                    ;;
+            esac
+        elif [ -L "./${name}" ] || ! cmp -s "$entry" "./${name}"; then
+            # Replaces links left by older entrypoints and scripts of a previous version
+            rm -f "./${name}"
+            cp "$entry" "./${name}"
+            chmod u+w "./${name}"
+        fi
+    done
+    CONFIG_ARGS+=(--disableupdate)
+fi
+
+if [ -d "./_work" ] && [ ! -w "./_work" ]; then
+    # Work storage mounted by RunnerPilot (tmpfs, fast disk or volume) that this user cannot write to
+    echo "Error: $(pwd)/_work is not writable by $(id -un); check the template's work storage" >&2
+    exit 1
+fi
+
 if [ ! -f "./is_configured" ]; then
-    ./config.sh --unattended --url "${RUNNER_URL}" --token "${RUNNER_TOKEN}" --name "${RUNNER_NAME}" --labels "${RUNNER_LABELS}"
+    # A recreated container registers again under the runner's existing name
+    ./config.sh --unattended --url "${RUNNER_URL}" --token "${RUNNER_TOKEN}" --name "${RUNNER_NAME}" --labels "${RUNNER_LABELS}" --replace "${CONFIG_ARGS[@]}"
     touch ./is_configured
 fi
 